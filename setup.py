@@ -17,12 +17,15 @@ setup(
     install_requires=[
         "requests>=2.25.1",
         "biopython>=1.78",
-        "beautifulsoup4>=4.9.3",
         "parasail>=1.2",
         "immutabledict>=1.2.0",
         "stdlib_utils>=0.4.3",
         "immutable_data_validation>=0.2.1",
+        "numpy>=1.21",
     ],
+    entry_points={
+        "console_scripts": ["nuclease-off-target=nuclease_off_target.cli:main"]
+    },
     zip_safe=False,
     include_package_data=True,
     classifiers=[
@@ -1,36 +1,127 @@
 # -*- coding: utf-8 -*-
 """Docstring."""
+from . import cli
 from . import crispr_target
+from . import gene_index
+from . import genome_search
 from . import genomic_sequence
+from . import load_testing
+from . import local_ucsc_server
+from . import packed_sequence
+from . import rate_limiting
+from . import refseq_table
+from . import retries
+from . import scanning
+from . import seed_index
+from . import sequence_cache
+from . import sequence_sources
+from . import sequence_views
 from .constants import ALIGNMENT_GAP_CHARACTER
 from .constants import CAS_VARIETIES
+from .constants import DEFAULT_BULK_FETCH_MAX_GAP
+from .constants import DEFAULT_SCAN_CHUNK_SIZE
+from .constants import DEFAULT_SEED_LENGTH
+from .constants import DEFAULT_SEQUENCE_CACHE_MAX_BASES
 from .constants import SECONDS_BETWEEN_UCSC_REQUESTS
 from .constants import SEPARATION_BETWEEN_GUIDE_AND_PAM
+from .constants import UCSC_BROWSER_URL
+from .constants import UCSC_REQUEST_TIMEOUT_SECONDS
+from .constants import UCSC_SESSION_POOL_MAX_SIZE
 from .constants import VERTICAL_ALIGNMENT_DNA_BULGE_CHARACTER
 from .constants import VERTICAL_ALIGNMENT_MATCH_CHARACTER
 from .constants import VERTICAL_ALIGNMENT_MISMATCH_CHARACTER
 from .constants import VERTICAL_ALIGNMENT_RNA_BULGE_CHARACTER
+from .crispr_target import align_crispr_targets
+from .crispr_target import ALIGNMENT_ENGINES
+from .crispr_target import BEST_FIRST_ENGINE
+from .crispr_target import CAS_SCORING_PROFILES
+from .crispr_target import CasScoringProfile
 from .crispr_target import check_base_match
+from .crispr_target import create_alignment_string
 from .crispr_target import create_space_in_alignment_between_guide_and_pam
 from .crispr_target import CrisprAlignment
 from .crispr_target import CrisprTarget
 from .crispr_target import extract_cigar_str_from_result
+from .crispr_target import find_all_alignments_iteratively
 from .crispr_target import find_all_possible_alignments
+from .crispr_target import find_min_edit_distances
+from .crispr_target import find_pam_anchored_window_starts
+from .crispr_target import register_cas_variety
 from .crispr_target import sa_cas_off_target_score
+from .crispr_target import sa_cas_off_target_scores
 from .crispr_target import SaCasTarget
 from .crispr_target import sp_cas_off_target_score
+from .crispr_target import sp_cas_off_target_scores
 from .crispr_target import SpCasTarget
+from .exceptions import AlignmentEngineNotImplementedError
+from .exceptions import CasVarietyAlreadyRegisteredError
+from .exceptions import ChromosomeNotInSequenceSourceError
+from .exceptions import CoordinatesOutsideOfChromosomeError
 from .exceptions import DnaRequestGenomeMismatchError
+from .exceptions import InvalidFastaFileError
+from .exceptions import InvalidRefSeqTableFileError
+from .exceptions import InvalidSeedIndexFileError
+from .exceptions import InvalidTwoBitFileError
 from .exceptions import IsoformInDifferentChromosomeError
 from .exceptions import IsoformInDifferentStrandError
+from .exceptions import SequenceSourceAlreadyRegisteredError
+from .exceptions import UcscResponseMissingSequenceError
+from .exceptions import UcscTemporarilyUnavailableError
 from .exceptions import UrlNotImplementedForGenomeError
+from .gene_index import CutSiteAnnotation
+from .gene_index import GeneIndex
+from .gene_index import IntervalIndex
+from .genome_search import find_off_target_sites
+from .genome_search import OffTargetSite
 from .genomic_sequence import create_dict_by_chromosome_from_genes
 from .genomic_sequence import ExonCoordinates
 from .genomic_sequence import GeneCoordinates
 from .genomic_sequence import GeneIsoformCoordinates
 from .genomic_sequence import GenomicCoordinates
 from .genomic_sequence import GenomicSequence
+from .genomic_sequence import get_ucsc_browser_url
+from .genomic_sequence import get_ucsc_session
+from .genomic_sequence import iter_ucsc_refseq_table_genes
+from .genomic_sequence import iter_ucsc_refseq_table_isoforms
+from .genomic_sequence import iter_ucsc_refseq_table_rows
+from .genomic_sequence import merge_nearby_ranges
 from .genomic_sequence import parse_ucsc_refseq_table_into_gene_coordinates
+from .genomic_sequence import request_sequence_from_ucsc
+from .genomic_sequence import set_ucsc_browser_url
+from .load_testing import FetchLoadTestResult
+from .load_testing import run_fetch_load_test
+from .local_ucsc_server import format_ucsc_dna_page
+from .local_ucsc_server import LocalUcscServer
+from .packed_sequence import PackedSequence
+from .rate_limiting import CrossProcessRateLimiter
+from .rate_limiting import get_ucsc_rate_limiter
+from .rate_limiting import set_ucsc_rate_limiter
+from .rate_limiting import TokenBucketRateLimiter
+from .refseq_table import load_ucsc_refseq_table
+from .refseq_table import RefSeqTable
+from .retries import get_ucsc_request_statistics
+from .retries import get_ucsc_retry_policy
+from .retries import RequestStatistics
+from .retries import reset_ucsc_request_statistics
+from .retries import RetryPolicy
+from .retries import set_ucsc_retry_policy
+from .scanning import iter_sequence_chunks
+from .scanning import scan_chromosome_for_alignments
+from .scanning import scan_strand_windows
+from .scanning import ScanHit
+from .seed_index import MAX_SEED_LENGTH
+from .seed_index import SeedIndex
+from .sequence_cache import get_default_sequence_cache
+from .sequence_cache import SequenceCache
+from .sequence_cache import set_default_sequence_cache
+from .sequence_sources import FastaSequenceSource
+from .sequence_sources import register_sequence_source
+from .sequence_sources import SEQUENCE_SOURCES
+from .sequence_sources import SequenceSource
+from .sequence_sources import TwoBitSequenceSource
+from .sequence_sources import unregister_sequence_source
+from .sequence_sources import write_fasta_index
+from .sequence_views import SequenceView
 
 __all__ = [
     "GenomicSequence",
@@ -64,4 +155,95 @@ __all__ = [
     "UrlNotImplementedForGenomeError",
     "SpCasTarget",
     "sp_cas_off_target_score",
+    "find_all_alignments_iteratively",
+    "ALIGNMENT_ENGINES",
+    "AlignmentEngineNotImplementedError",
+    "BEST_FIRST_ENGINE",
+    "sa_cas_off_target_scores",
+    "sp_cas_off_target_scores",
+    "CasScoringProfile",
+    "CAS_SCORING_PROFILES",
+    "register_cas_variety",
+    "CasVarietyAlreadyRegisteredError",
+    "align_crispr_targets",
+    "find_min_edit_distances",
+    "find_pam_anchored_window_starts",
+    "create_alignment_string",
+    "sequence_sources",
+    "SequenceSource",
+    "TwoBitSequenceSource",
+    "InvalidTwoBitFileError",
+    "ChromosomeNotInSequenceSourceError",
+    "CoordinatesOutsideOfChromosomeError",
+    "FastaSequenceSource",
+    "write_fasta_index",
+    "InvalidFastaFileError",
+    "SEQUENCE_SOURCES",
+    "register_sequence_source",
+    "unregister_sequence_source",
+    "SequenceSourceAlreadyRegisteredError",
+    "sequence_cache",
+    "SequenceCache",
+    "get_default_sequence_cache",
+    "set_default_sequence_cache",
+    "DEFAULT_SEQUENCE_CACHE_MAX_BASES",
+    "merge_nearby_ranges",
+    "DEFAULT_BULK_FETCH_MAX_GAP",
+    "get_ucsc_session",
+    "request_sequence_from_ucsc",
+    "UCSC_SESSION_POOL_MAX_SIZE",
+    "UcscResponseMissingSequenceError",
+    "rate_limiting",
+    "TokenBucketRateLimiter",
+    "get_ucsc_rate_limiter",
+    "set_ucsc_rate_limiter",
+    "CrossProcessRateLimiter",
+    "retries",
+    "RetryPolicy",
+    "RequestStatistics",
+    "get_ucsc_retry_policy",
+    "set_ucsc_retry_policy",
+    "get_ucsc_request_statistics",
+    "reset_ucsc_request_statistics",
+    "UcscTemporarilyUnavailableError",
+    "UCSC_REQUEST_TIMEOUT_SECONDS",
+    "UCSC_BROWSER_URL",
+    "get_ucsc_browser_url",
+    "set_ucsc_browser_url",
+    "local_ucsc_server",
+    "LocalUcscServer",
+    "format_ucsc_dna_page",
+    "load_testing",
+    "FetchLoadTestResult",
+    "run_fetch_load_test",
+    "packed_sequence",
+    "PackedSequence",
+    "sequence_views",
+    "SequenceView",
+    "scanning",
+    "ScanHit",
+    "iter_sequence_chunks",
+    "scan_chromosome_for_alignments",
+    "scan_strand_windows",
+    "DEFAULT_SCAN_CHUNK_SIZE",
+    "seed_index",
+    "SeedIndex",
+    "DEFAULT_SEED_LENGTH",
+    "MAX_SEED_LENGTH",
+    "InvalidSeedIndexFileError",
+    "genome_search",
+    "OffTargetSite",
+    "find_off_target_sites",
+    "cli",
+    "gene_index",
+    "IntervalIndex",
+    "GeneIndex",
+    "CutSiteAnnotation",
+    "refseq_table",
+    "RefSeqTable",
+    "load_ucsc_refseq_table",
+    "InvalidRefSeqTableFileError",
+    "iter_ucsc_refseq_table_rows",
+    "iter_ucsc_refseq_table_isoforms",
+    "iter_ucsc_refseq_table_genes",
 ]
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Command line interface for genome-wide off-target searches."""
+import argparse
+import sys
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import TextIO
+
+from .constants import DEFAULT_SEED_LENGTH
+from .crispr_target import CAS_SCORING_PROFILES
+from .crispr_target import CrisprTarget
+from .genome_search import find_off_target_sites
+from .genome_search import OffTargetSite
+from .seed_index import SeedIndex
+from .sequence_sources import FastaSequenceSource
+from .sequence_sources import SequenceSource
+from .sequence_sources import TwoBitSequenceSource
+
+OFF_TARGET_SITE_COLUMNS = (
+    "chromosome",
+    "start",
+    "end",
+    "strand",
+    "score",
+    "crispr_alignment",
+    "alignment",
+    "genome_alignment",
+)
+
+
+def open_sequence_source(filepath: str) -> SequenceSource:
+    """Open a .2bit file, or otherwise a FASTA file."""
+    if filepath.lower().endswith(".2bit"):
+        return TwoBitSequenceSource(filepath)
+    return FastaSequenceSource(filepath)
+
+
+def _create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="nuclease-off-target",
+        description="Find the off-target sites of a CRISPR guide anywhere in a genome.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser(
+        "build-index", help="index the seeds of a genome, which is done once"
+    )
+    build_parser.add_argument("genome", help="a .2bit or FASTA file")
+    build_parser.add_argument("index", help="where to save the seed index")
+    build_parser.add_argument(
+        "--seed-length", type=int, default=DEFAULT_SEED_LENGTH, help="bases per seed"
+    )
+    build_parser.add_argument(
+        "--chromosomes", nargs="+", help="only index these chromosomes"
+    )
+
+    search_parser = subparsers.add_parser(
+        "search", help="find the off-target sites of a guide using a seed index"
+    )
+    search_parser.add_argument(
+        "genome", help="the .2bit or FASTA file the index was built from"
+    )
+    search_parser.add_argument("index", help="the seed index")
+    search_parser.add_argument("guide", help="the guide sequence, without the PAM")
+    search_parser.add_argument(
+        "--cas-variety",
+        choices=sorted(CAS_SCORING_PROFILES),
+        default="Sa",
+        help="the Cas variety, which sets the PAM and the scoring",
+    )
+    search_parser.add_argument("--mismatches", type=int, default=4)
+    search_parser.add_argument("--bulges", type=int, default=1)
+    search_parser.add_argument("--rna-bulges", type=int, default=1)
+    search_parser.add_argument("--dna-bulges", type=int, default=1)
+    search_parser.add_argument("--engine", default="recursive")
+    search_parser.add_argument(
+        "--max-pam-misalignments",
+        type=int,
+        help="only align windows that place the PAM on a stretch with at most this many substitutions",
+    )
+    return parser
+
+
+def _format_off_target_site(site: OffTargetSite) -> str:
+    return "\t".join(
+        (
+            site.chromosome,
+            str(site.start_coord),
+            str(site.end_coord),
+            "+" if site.is_positive_strand else "-",
+            f"{site.score:g}",
+        )
+        + site.formatted_alignment
+    )
+
+
+def main(
+    argv: Optional[Sequence[str]] = None, out_file: Optional[TextIO] = None
+) -> int:
+    """Run the nuclease-off-target command.
+
+    Args:
+        argv: the command line arguments, excluding the program name. Defaults to sys.argv[1:]
+        out_file: where to write the off-target sites, as tab-separated values with a header row. Defaults to sys.stdout
+    """
+    args = _create_parser().parse_args(argv)
+    if out_file is None:
+        out_file = sys.stdout
+    with open_sequence_source(args.genome) as sequence_source:
+        if args.command == "build-index":
+            seed_index = SeedIndex.build(
+                sequence_source,
+                args.index,
+                seed_length=args.seed_length,
+                chromosomes=args.chromosomes,
+            )
+            out_file.write(
+                f"Indexed {seed_index.num_positions} seeds of length {seed_index.seed_length} in {len(seed_index.chromosomes)} chromosomes\n"
+            )
+            return 0
+        scoring_profile = CAS_SCORING_PROFILES[args.cas_variety]
+        sites = find_off_target_sites(
+            CrisprTarget(
+                args.guide.upper(),
+                scoring_profile.pam,
+                scoring_profile.cut_site_relative_to_pam,
+            ),
+            SeedIndex(args.index),
+            sequence_source,
+            args.mismatches,
+            args.bulges,
+            args.rna_bulges,
+            args.dna_bulges,
+            engine=args.engine,
+            max_pam_misalignments=args.max_pam_misalignments,
+            cas_variety=args.cas_variety,
+        )
+    lines: List[str] = ["\t".join(OFF_TARGET_SITE_COLUMNS)]
+    lines.extend(_format_off_target_site(site) for site in sites)
+    out_file.write("\n".join(lines) + "\n")
+    return 0
@@ -6,6 +6,13 @@ from typing import Union
 from immutabledict import immutabledict
 
 SECONDS_BETWEEN_UCSC_REQUESTS = 3  # 10 # Eli (12/26/20): 3 seconds seems sufficient to avoid getting locked out of the system
+UCSC_BROWSER_URL = "https://genome.ucsc.edu"
+UCSC_SESSION_POOL_MAX_SIZE = 10
+UCSC_REQUEST_TIMEOUT_SECONDS = 60
+DEFAULT_SEQUENCE_CACHE_MAX_BASES = 200_000_000  # roughly 200 MB of sequence on disk
+DEFAULT_SCAN_CHUNK_SIZE = 1_000_000
+DEFAULT_SEED_LENGTH = 10  # about 3,000 occurrences of each seed in a human genome
+DEFAULT_BULK_FETCH_MAX_GAP = 5000  # downloading a few kb of extra sequence is much faster than waiting between UCSC requests
 # for displaying vertical alignments
 VERTICAL_ALIGNMENT_MATCH_CHARACTER = " "
 VERTICAL_ALIGNMENT_MISMATCH_CHARACTER = "X"
@@ -14,14 +21,36 @@ VERTICAL_ALIGNMENT_DNA_BULGE_CHARACTER = "+"
 VERTICAL_ALIGNMENT_RNA_BULGE_CHARACTER = "-"
 SEPARATION_BETWEEN_GUIDE_AND_PAM = " "
 
+# Penalties in the PAM are listed by position starting from its 3' end. A mismatch in the PAM also gets the additional penalty for its position unless the genome base is one of the listed bases. Any position not listed in the PAM bulge penalties uses the RNA/DNA bulge penalty of the guide.
 CAS_VARIETIES: Dict[
-    str, Dict[str, Union[int, str, Dict[int, Union[int, float]]]]
+    str,
+    Dict[
+        str,
+        Union[
+            int,
+            float,
+            str,
+            Dict[int, Union[int, float]],
+            Dict[int, Dict[str, Union[int, float]]],
+        ],
+    ],
 ] = immutabledict(
     {
         "Sa": immutabledict(
             {
                 "PAM": "NNGRRT",
                 "cut_site_relative_to_pam": -3,
+                "PAM-mismatch-penalties-starting-from-3-prime-end": immutabledict(
+                    {0: 2, 1: 20, 2: 20, 3: 40, 4: 40, 5: 40}
+                ),
+                "additional-PAM-mismatch-penalties-starting-from-3-prime-end": immutabledict(),
+                "PAM-mismatch-bases-without-additional-penalty": immutabledict(),
+                "PAM-bulge-penalties-starting-from-3-prime-end": immutabledict(
+                    {1: 0.3, 2: 0.3, 3: 0.3, 4: 0.3, 5: 0.3}
+                ),
+                "RNA-bulge-penalty": 0.51,
+                "DNA-bulge-penalty": 0.7,
+                "second-bulge-penalty": 5,
                 "mismatch-penalties-starting-from-PAM": immutabledict(
                     {
                         0: 6,
@@ -54,6 +83,21 @@ CAS_VARIETIES: Dict[
             {
                 "PAM": "NGG",
                 "cut_site_relative_to_pam": -3,
+                "PAM-mismatch-penalties-starting-from-3-prime-end": immutabledict(
+                    {0: 20, 1: 0.3, 2: 0.3}
+                ),
+                "additional-PAM-mismatch-penalties-starting-from-3-prime-end": immutabledict(
+                    {1: 19.7, 2: 19.7}
+                ),
+                "PAM-mismatch-bases-without-additional-penalty": immutabledict(
+                    {1: "A", 2: "A"}
+                ),
+                "PAM-bulge-penalties-starting-from-3-prime-end": immutabledict(
+                    {0: 0, 1: 0, 2: 0}
+                ),
+                "RNA-bulge-penalty": 0.51,
+                "DNA-bulge-penalty": 0.7,
+                "second-bulge-penalty": 5,
                 "mismatch-penalties-starting-from-PAM": immutabledict(
                     {
                         0: 6,
@@ -84,3 +128,14 @@ CAS_VARIETIES: Dict[
         ),
     }
 )
+
+# the columns of the "RefSeq All (ncbiRefSeq)" table from the UCSC Genome Table Browser
+REFSEQ_TRANSCRIPT_NAME_COLUMN = 1
+REFSEQ_CHROMOSOME_COLUMN = 2
+REFSEQ_STRAND_COLUMN = 3
+REFSEQ_TRANSCRIPT_START_COLUMN = 4
+REFSEQ_TRANSCRIPT_END_COLUMN = 5
+REFSEQ_EXON_COUNT_COLUMN = 8
+REFSEQ_EXON_STARTS_COLUMN = 9
+REFSEQ_EXON_ENDS_COLUMN = 10
+REFSEQ_GENE_NAME_COLUMN = 12
@@ -1,14 +1,28 @@
 # -*- coding: utf-8 -*-
 """Genomic sequences."""
+from collections import defaultdict
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import heapq
+import itertools
 import re
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
 from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import Sequence
 from typing import Set
 from typing import Tuple
 from typing import Union
 
 from Bio.Seq import Seq
 from immutabledict import immutabledict
+import numpy as np
+from numpy.typing import NDArray
 import parasail
 from parasail.bindings_v2 import Result
 from stdlib_utils import is_system_windows
@@ -20,6 +34,8 @@ from .constants import VERTICAL_ALIGNMENT_DNA_BULGE_CHARACTER
 from .constants import VERTICAL_ALIGNMENT_MATCH_CHARACTER
 from .constants import VERTICAL_ALIGNMENT_MISMATCH_CHARACTER
 from .constants import VERTICAL_ALIGNMENT_RNA_BULGE_CHARACTER
+from .exceptions import AlignmentEngineNotImplementedError
+from .exceptions import CasVarietyAlreadyRegisteredError
 from .genomic_sequence import GenomicSequence
 
 OUTER_CIGAR_DELETIONS_REGEX = re.compile(r"(\d+)D.*\D(\d+)D")
@@ -38,6 +54,24 @@ def check_base_match(possibly_ambiguous_base: str, other_base: str) -> bool:
     return False
 
 
+@functools.lru_cache(maxsize=None)
+def _get_base_match_table(possibly_ambiguous_base: str) -> NDArray[np.bool_]:
+    """Find which byte values check_base_match treats as a match for the base.
+
+    Returns:
+        a read-only array indexed by the byte of the other base
+    """
+    is_match = np.array(
+        [
+            check_base_match(possibly_ambiguous_base, chr(byte_value))
+            for byte_value in range(256)
+        ],
+        dtype=bool,
+    )
+    is_match.setflags(write=False)
+    return is_match
+
+
 def _count_mismatches_excluding_gaps(
     possibly_ambiguous_sequence: str, other_seq: str
 ) -> int:
@@ -117,9 +151,6 @@ def _find_index_in_alignment_in_crispr_from_three_prime(  # pylint: disable=inva
     return start_idx
 
 
-SA_CAS_PAM_POSITIONS_FOR_BULGES = (1, 2, 3, 4, 5)
-
-
 def sa_cas_off_target_score(alignment: Tuple[str, str, str]) -> Union[float, int]:
     """Calculate COSMID off-target score for SaCas alignment.
 
@@ -168,62 +199,7 @@ def sa_cas_off_target_score(alignment: Tuple[str, str, str]) -> Union[float, int
         #. If at least two DNA bulges appear in the overall alignment: 5
         #. If at least two RNA bulges appear in the overall alignment: 5
     """
-    score: Union[float, int] = 0
-    rev_crispr = "".join(reversed(alignment[0]))
-    rev_genome = "".join(reversed(alignment[2]))
-    crispr_base_position = 0
-    guide_mismatch_penalties = CAS_VARIETIES["Sa"][
-        "mismatch-penalties-starting-from-PAM"
-    ]
-    if not isinstance(guide_mismatch_penalties, immutabledict):
-        raise NotImplementedError(
-            "The mismatch penalties should always be a dictionary."
-        )
-    total_bulge_count = 0
-    for index, crispr_char in enumerate(rev_crispr):
-        genome_char = rev_genome[index]
-        is_dna_bulge = crispr_char == ALIGNMENT_GAP_CHARACTER
-        is_rna_bulge = genome_char == ALIGNMENT_GAP_CHARACTER
-        is_mismatch = is_dna_bulge or is_rna_bulge
-        if not is_mismatch:
-            is_mismatch = not check_base_match(crispr_char, genome_char)
-        if is_mismatch:
-            if crispr_base_position == 0:
-                score += 2
-            elif crispr_base_position in (1, 2):
-                score += 20
-            elif crispr_base_position in (
-                3,
-                4,
-                5,
-            ):  # treat any DNA bulges in the "N"s of the PAM as a bulge at the G
-                score += 40
-            else:
-                score += guide_mismatch_penalties[
-                    crispr_base_position
-                    - len(
-                        SaCasTarget.pam  # pylint:disable=no-member # Eli (1/28/21): not sure why pylint isn't recognizing the .pam class attribute
-                    )
-                ]
-        if is_rna_bulge:
-            if crispr_base_position in SA_CAS_PAM_POSITIONS_FOR_BULGES:
-                score += 0.3
-            else:
-                score += 0.51
-            total_bulge_count += 1
-            if total_bulge_count == 2:
-                score += 5  # Eli (10/19/20): request was made to add an extra 5 point penalty for the 2nd observed bulge
-        if is_dna_bulge:
-            if crispr_base_position in SA_CAS_PAM_POSITIONS_FOR_BULGES:
-                score += 0.3
-            else:
-                score += 0.7
-            total_bulge_count += 1
-            if total_bulge_count == 2:
-                score += 5  # Eli (10/19/20): request was made to add an extra 5 point penalty for the 2nd observed bulge
-        if not is_dna_bulge:
-            crispr_base_position += 1
-    return score
+    return CAS_SCORING_PROFILES["Sa"].score_alignment(alignment)
 
 
 def sp_cas_off_target_score(alignment: Tuple[str, str, str]) -> Union[float, int]:
@@ -273,54 +249,315 @@ def sp_cas_off_target_score(alignment: Tuple[str, str, str]) -> Union[float, int
         #. If at least two DNA bulges appear in the overall alignment: 5
         #. If at least two RNA bulges appear in the overall alignment: 5
     """
-    score: Union[float, int] = 0
-    rev_crispr = "".join(reversed(alignment[0]))
-    rev_genome = "".join(reversed(alignment[2]))
-    length_of_pam = len(
-        SpCasTarget.pam  # pylint:disable=no-member # Eli (3/29/21): not sure why pylint isn't recognizing the .pam class attribute
+    return CAS_SCORING_PROFILES["Sp"].score_alignment(alignment)
+
+
+def _encode_reversed_alignments(
+    alignments: Sequence[Tuple[str, str, str]]
+) -> Tuple[NDArray[np.uint8], NDArray[np.uint8]]:
+    """Encode alignments as fixed-width uint8 arrays scanning from the 3' end.
+
+    Shorter alignments are padded on their 5' end with columns that can never be scored (an "N" in the CRISPR aligned to an "N" in the genome).
+    """
+    width = max(len(crispr_seq) for crispr_seq, _, _ in alignments)
+    encoded_seqs: List[NDArray[np.uint8]] = list()
+    for seq_idx in (0, 2):
+        padded_seqs = "".join(
+            alignment[seq_idx][::-1].ljust(width, "N") for alignment in alignments
+        )
+        encoded_seqs.append(
+            np.frombuffer(padded_seqs.encode("ascii"), dtype=np.uint8).reshape(
+                len(alignments), width
+            )
+        )
+    return encoded_seqs[0], encoded_seqs[1]
+
+
+def _find_alignment_column_features(
+    rev_crispr: NDArray[np.uint8], rev_genome: NDArray[np.uint8]
+) -> Tuple[NDArray[np.bool_], NDArray[np.bool_], NDArray[np.bool_], NDArray[np.int64]]:
+    """Vectorized equivalent of the per-column checks in the scalar scorers.
+
+    Returns:
+        whether each column is a DNA bulge, an RNA bulge, any kind of mismatch, and the CRISPR base position of the column (the number of CRISPR bases 3' of it)
+    """
+    gap = ord(ALIGNMENT_GAP_CHARACTER)
+    is_dna_bulge = rev_crispr == gap
+    is_rna_bulge = rev_genome == gap
+    is_base_match = (
+        (rev_crispr == ord("N"))
+        | (rev_crispr == rev_genome)
+        | (
+            (rev_crispr == ord("R"))
+            & ((rev_genome == ord("A")) | (rev_genome == ord("G")))
+        )
     )
-    crispr_base_position = 0
-    guide_mismatch_penalties = CAS_VARIETIES["Sa"][
-        "mismatch-penalties-starting-from-PAM"
-    ]
-    if not isinstance(guide_mismatch_penalties, immutabledict):
-        raise NotImplementedError(
-            "The mismatch penalties should always be a dictionary."
-        )
-    total_bulge_count = 0
-    for index, crispr_char in enumerate(rev_crispr):
-        genome_char = rev_genome[index]
-        is_dna_bulge = crispr_char == ALIGNMENT_GAP_CHARACTER
-        is_rna_bulge = genome_char == ALIGNMENT_GAP_CHARACTER
-        is_mismatch = is_dna_bulge or is_rna_bulge
-        if not is_mismatch:
-            is_mismatch = not check_base_match(crispr_char, genome_char)
+    is_mismatch = is_dna_bulge | is_rna_bulge | ~is_base_match
+    is_crispr_base = ~is_dna_bulge
+    crispr_base_positions = (
+        np.cumsum(is_crispr_base, axis=1, dtype=np.int64) - is_crispr_base
+    )
+    return is_dna_bulge, is_rna_bulge, is_mismatch, crispr_base_positions
+
+
+class CasScoringProfile:  # pylint:disable=too-many-instance-attributes
+    """COSMID-style off-target scoring rules for one Cas variety.
+
+    The rules are compiled once into flat tables indexed by the position of the CRISPR base, counting from the 3' end of the PAM (so the 3'-most base of the PAM is position 0).
+
+    Args:
+        name: the name of the Cas variety
+        cas_variety: the scoring rules, in the same format as the entries of `CAS_VARIETIES`
+    """
+
+    def __init__(self, name: str, cas_variety: Mapping[str, Any]) -> None:
+        self.name = name
+        self.pam = str(cas_variety["PAM"])
+        self.cut_site_relative_to_pam = int(cas_variety["cut_site_relative_to_pam"])
+        pam_mismatch_penalties = cas_variety[
+            "PAM-mismatch-penalties-starting-from-3-prime-end"
+        ]
+        guide_mismatch_penalties = cas_variety["mismatch-penalties-starting-from-PAM"]
+        self.mismatch_penalties: Tuple[Union[float, int], ...] = tuple(
+            pam_mismatch_penalties[idx] for idx in range(len(self.pam))
+        ) + tuple(
+            guide_mismatch_penalties[idx]
+            for idx in range(len(guide_mismatch_penalties))
+        )
+        num_positions = len(self.mismatch_penalties)
+        additional_mismatch_penalties = cas_variety[
+            "additional-PAM-mismatch-penalties-starting-from-3-prime-end"
+        ]
+        self.additional_mismatch_penalties: Tuple[Union[float, int], ...] = tuple(
+            additional_mismatch_penalties.get(idx, 0) for idx in range(num_positions)
+        )
+        exempt_bases = cas_variety["PAM-mismatch-bases-without-additional-penalty"]
+        self.bases_without_additional_mismatch_penalty: Tuple[str, ...] = tuple(
+            exempt_bases.get(idx, "") for idx in range(num_positions)
+        )
+        pam_bulge_penalties = cas_variety[
+            "PAM-bulge-penalties-starting-from-3-prime-end"
+        ]
+        self.rna_bulge_penalties: Tuple[Union[float, int], ...] = tuple(
+            pam_bulge_penalties.get(idx, cas_variety["RNA-bulge-penalty"])
+            for idx in range(num_positions)
+        )
+        self.dna_bulge_penalties: Tuple[Union[float, int], ...] = tuple(
+            pam_bulge_penalties.get(idx, cas_variety["DNA-bulge-penalty"])
+            for idx in range(num_positions)
+        )
+        self.second_bulge_penalty: Union[float, int] = cas_variety[
+            "second-bulge-penalty"
+        ]
+
+        # Tables for scoring batches of alignments. The additional mismatch table is also indexed by the ASCII code of the genome character.
+        self.mismatch_penalty_table = np.array(
+            self.mismatch_penalties, dtype=np.float64
+        )
+        self.additional_mismatch_penalty_table = np.repeat(
+            np.array(self.additional_mismatch_penalties, dtype=np.float64)[
+                :, np.newaxis
+            ],
+            256,
+            axis=1,
+        )
+        for position, genome_chars in enumerate(
+            self.bases_without_additional_mismatch_penalty
+        ):
+            for genome_char in genome_chars:
+                self.additional_mismatch_penalty_table[position, ord(genome_char)] = 0
+        self.rna_bulge_penalty_table = np.array(
+            self.rna_bulge_penalties, dtype=np.float64
+        )
+        self.dna_bulge_penalty_table = np.array(
+            self.dna_bulge_penalties, dtype=np.float64
+        )
+
+    def add_column_score(  # pylint:disable=too-many-arguments
+        self,
+        score: Union[float, int],
+        crispr_base_position: int,
+        genome_char: str,
+        is_mismatch: bool,
+        is_rna_bulge: bool,
+        is_dna_bulge: bool,
+        total_bulge_count: int,
+    ) -> Union[float, int]:
+        """Add the penalties of a single column of an alignment to a score.
+
+        Each penalty is added to the running score one at a time, in the same order as scanning the whole alignment, so building up a score column by column gives exactly the same floating point result as `score_alignment`.
+
+        Args:
+            score: the score of the columns 3' of this one
+            crispr_base_position: the number of CRISPR bases 3' of this column
+            genome_char: the genome character in this column
+            is_mismatch: whether there is any type of misalignment in this column
+            is_rna_bulge: whether the genome has a gap in this column
+            is_dna_bulge: whether the CRISPR has a gap in this column
+            total_bulge_count: the number of bulges in the 3' part of the alignment including this column
+        """
         if is_mismatch:
-            if crispr_base_position == 0:
-                score += 20
-            elif crispr_base_position in (1, 2):
-                score += 0.3
-                if genome_char != "A":
-                    score += 19.7
-            else:
-                score += guide_mismatch_penalties[crispr_base_position - length_of_pam]
+            score += self.mismatch_penalties[crispr_base_position]
+            if (
+                genome_char
+                not in self.bases_without_additional_mismatch_penalty[
+                    crispr_base_position
+                ]
+            ):
+                score += self.additional_mismatch_penalties[crispr_base_position]
         if is_rna_bulge:
-            if crispr_base_position >= length_of_pam:
-                score += 0.51
-            total_bulge_count += 1
-            if total_bulge_count == 2:
-                score += 5
+            score += self.rna_bulge_penalties[crispr_base_position]
         if is_dna_bulge:
-            if (
-                crispr_base_position >= length_of_pam
-            ):  # in SA_CAS_PAM_POSITIONS_FOR_BULGES:
-                score += 0.7
-            total_bulge_count += 1
-            if total_bulge_count == 2:
-                score += 5
-        if not is_dna_bulge:
-            crispr_base_position += 1
-    return score
+            score += self.dna_bulge_penalties[crispr_base_position]
+        if (is_rna_bulge or is_dna_bulge) and total_bulge_count == 2:
+            score += self.second_bulge_penalty
+        return score
+
+    def score_alignment(self, alignment: Tuple[str, str, str]) -> Union[float, int]:
+        """Calculate the off-target score of an alignment.
+
+        The alignment is scanned from the 3' end, so DNA bulges are scored according to the position of the base in the guide 3' to the bulge.
+        """
+        score: Union[float, int] = 0
+        rev_crispr = "".join(reversed(alignment[0]))
+        rev_genome = "".join(reversed(alignment[2]))
+        crispr_base_position = 0
+        total_bulge_count = 0
+        for index, crispr_char in enumerate(rev_crispr):
+            genome_char = rev_genome[index]
+            is_dna_bulge = crispr_char == ALIGNMENT_GAP_CHARACTER
+            is_rna_bulge = genome_char == ALIGNMENT_GAP_CHARACTER
+            is_mismatch = is_dna_bulge or is_rna_bulge
+            if not is_mismatch:
+                is_mismatch = not check_base_match(crispr_char, genome_char)
+            if is_rna_bulge or is_dna_bulge:
+                total_bulge_count += 1
+            score = self.add_column_score(
+                score,
+                crispr_base_position,
+                genome_char,
+                is_mismatch,
+                is_rna_bulge,
+                is_dna_bulge,
+                total_bulge_count,
+            )
+            if not is_dna_bulge:
+                crispr_base_position += 1
+        return score
+
+    def score_alignments(
+        self, alignments: Sequence[Tuple[str, str, str]]
+    ) -> NDArray[np.float64]:
+        """Calculate the off-target scores of many alignments at once.
+
+        Each score is identical to the one `score_alignment` gives for that alignment. The columns are scored with NumPy array operations and then summed from the 3' end in the same order as the scalar scan.
+
+        Returns:
+            the score of each alignment, in the same order as the alignments
+        """
+        if len(alignments) == 0:
+            return np.zeros(0, dtype=np.float64)
+        rev_crispr, rev_genome = _encode_reversed_alignments(alignments)
+        (
+            is_dna_bulge,
+            is_rna_bulge,
+            is_mismatch,
+            crispr_base_positions,
+        ) = _find_alignment_column_features(rev_crispr, rev_genome)
+        mismatch_scores = np.zeros(is_mismatch.shape, dtype=np.float64)
+        mismatch_scores[is_mismatch] = self.mismatch_penalty_table[
+            crispr_base_positions[is_mismatch]
+        ]
+        additional_mismatch_scores = np.zeros(is_mismatch.shape, dtype=np.float64)
+        additional_mismatch_scores[
+            is_mismatch
+        ] = self.additional_mismatch_penalty_table[
+            crispr_base_positions[is_mismatch], rev_genome[is_mismatch]
+        ]
+        rna_bulge_scores = np.zeros(is_rna_bulge.shape, dtype=np.float64)
+        rna_bulge_scores[is_rna_bulge] = self.rna_bulge_penalty_table[
+            crispr_base_positions[is_rna_bulge]
+        ]
+        dna_bulge_scores = np.zeros(is_dna_bulge.shape, dtype=np.float64)
+        dna_bulge_scores[is_dna_bulge] = self.dna_bulge_penalty_table[
+            crispr_base_positions[is_dna_bulge]
+        ]
+        is_bulge = is_rna_bulge | is_dna_bulge
+        second_bulge_scores = np.where(
+            is_bulge & (np.cumsum(is_bulge, axis=1) == 2),
+            self.second_bulge_penalty,
+            0,
+        )
+        # interleave the penalties of each column in the order the scalar scan adds them, and cumsum adds them one at a time, so the floating point result matches the scalar scan exactly
+        penalties = np.stack(
+            (
+                mismatch_scores,
+                additional_mismatch_scores,
+                rna_bulge_scores,
+                dna_bulge_scores,
+                second_bulge_scores,
+            ),
+            axis=2,
+        ).reshape(len(alignments), -1)
+        scores: NDArray[np.float64] = np.cumsum(penalties, axis=1)[:, -1]
+        return scores
+
+
+CAS_SCORING_PROFILES: Dict[str, CasScoringProfile] = {
+    name: CasScoringProfile(name, cas_variety)
+    for name, cas_variety in CAS_VARIETIES.items()
+}
+
+
+def register_cas_variety(
+    name: str, cas_variety: Mapping[str, Any]
+) -> CasScoringProfile:
+    """Compile the scoring rules for a new Cas variety and make them available.
+
+    Args:
+        name: the name of the Cas variety
+        cas_variety: the scoring rules, in the same format as the entries of `CAS_VARIETIES`
+
+    Returns:
+        the compiled scoring profile, which is also added to `CAS_SCORING_PROFILES`
+    """
+    if name in CAS_SCORING_PROFILES:
+        raise CasVarietyAlreadyRegisteredError(name)
+    profile = CasScoringProfile(name, cas_variety)
+    CAS_SCORING_PROFILES[name] = profile
+    return profile
+
+
+def sa_cas_off_target_scores(
+    alignments: Sequence[Tuple[str, str, str]]
+) -> NDArray[np.float64]:
+    """Calculate COSMID off-target scores for many SaCas alignments at once.
+
+    Each score is identical to the one `sa_cas_off_target_score` gives for that alignment.
+
+    Args:
+        alignments: the alignments to score, in the same format as `sa_cas_off_target_score` accepts
+
+    Returns:
+        the score of each alignment, in the same order as the alignments
+    """
+    return CAS_SCORING_PROFILES["Sa"].score_alignments(alignments)
+
+
+def sp_cas_off_target_scores(
+    alignments: Sequence[Tuple[str, str, str]]
+) -> NDArray[np.float64]:
+    """Calculate COSMID off-target scores for many SpCas alignments at once.
+
+    Each score is identical to the one `sp_cas_off_target_score` gives for that alignment.
+
+    Args:
+        alignments: the alignments to score, in the same format as `sp_cas_off_target_score` accepts
+
+    Returns:
+        the score of each alignment, in the same order as the alignments
+    """
+    return CAS_SCORING_PROFILES["Sp"].score_alignments(alignments)
 
 
 def create_space_in_alignment_between_guide_and_pam(  # pylint:disable=invalid-name # Eli (10/9/20): I know this is too long, but unsure a better way to describe it
@@ -492,8 +729,148 @@ def find_all_possible_alignments(
     )
 
 
-def _create_alignment_string(crispr_seq: str, genome_seq: str) -> str:
-    """Create the middle alignment string for vertical display."""
+def find_all_alignments_iteratively(  # pylint:disable=too-many-locals,too-many-branches
+    crispr_seq: str,
+    genome_seq: str,
+    allowed_mismatches: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    found_alignments: Optional[Set[Tuple[str, str]]] = None,
+) -> Set[Tuple[str, str]]:
+    """Find all possible potential CRISPR/Genome alignments without recursion.
+
+    Enumerates exactly the same set of alignments as `find_all_possible_alignments` (same bulge rules and same pruning of superfluous bulges), but walks the search tree with an explicit stack. The partially aligned strings are written into a pair of preallocated buffers shared by every branch, so strings are only created when a complete alignment is found.
+
+    Returns: A set of tuples of the CRISPR alignment string and Genome alignment string.
+    """
+    if found_alignments is None:
+        found_alignments = set()
+    crispr_len = len(crispr_seq)
+    max_alignment_len = crispr_len + max(allowed_dna_bulges, 0)
+    aligned_crispr_buffer = [""] * max_alignment_len
+    aligned_genome_buffer = [""] * max_alignment_len
+    gap = ALIGNMENT_GAP_CHARACTER
+
+    # Each entry is a branch of the search tree:
+    # (num aligned chars, crispr idx, genome idx, remaining mismatches, total bulges, RNA bulges, DNA bulges, crispr char, genome char)
+    # The two chars are written into the buffers at index `num aligned chars - 1` when the branch is visited. Every branch visited between pushing and popping an entry is a descendant of one of its siblings, so the buffer contents 5' of that index still belong to its ancestors.
+    stack: List[Tuple[int, int, int, int, int, int, int, str, str]] = [
+        (
+            0,
+            0,
+            0,
+            allowed_mismatches,
+            allowed_total_bulges,
+            allowed_rna_bulges,
+            allowed_dna_bulges,
+            "",
+            "",
+        )
+    ]
+    while stack:
+        (
+            num_aligned,
+            crispr_idx,
+            genome_idx,
+            remaining_mismatches,
+            remaining_total_bulges,
+            remaining_rna_bulges,
+            remaining_dna_bulges,
+            crispr_char,
+            genome_char,
+        ) = stack.pop()
+        if num_aligned > 0:
+            aligned_crispr_buffer[num_aligned - 1] = crispr_char
+            aligned_genome_buffer[num_aligned - 1] = genome_char
+
+        if crispr_idx == crispr_len:
+            aligned_crispr_seq = "".join(aligned_crispr_buffer[:num_aligned])
+            aligned_genome_seq = "".join(aligned_genome_buffer[:num_aligned])
+            # prune superfluous alignments where offseting bulges could just be deleted
+            if not _is_superfluous_bulge_alignment(
+                aligned_crispr_seq, aligned_genome_seq
+            ):
+                found_alignments.add((aligned_crispr_seq, aligned_genome_seq))
+            continue
+
+        next_crispr_char = crispr_seq[crispr_idx]
+        next_genome_char = genome_seq[genome_idx]
+        if (
+            num_aligned > 1
+            and remaining_mismatches > 0
+            and remaining_total_bulges > 0
+            and crispr_char
+            != gap  # Don't allow back-to-back bulges or bulges longer than 1 character
+            and genome_char != gap
+        ):
+            if remaining_rna_bulges > 0 and crispr_idx < crispr_len - 1:
+                stack.append(
+                    (
+                        num_aligned + 1,
+                        crispr_idx + 1,
+                        genome_idx,
+                        remaining_mismatches - 1,
+                        remaining_total_bulges - 1,
+                        remaining_rna_bulges - 1,
+                        remaining_dna_bulges,
+                        next_crispr_char,
+                        gap,
+                    )
+                )
+            if remaining_dna_bulges > 0 and next_crispr_char != "N":
+                stack.append(
+                    (
+                        num_aligned + 1,
+                        crispr_idx,
+                        genome_idx + 1,
+                        remaining_mismatches - 1,
+                        remaining_total_bulges - 1,
+                        remaining_rna_bulges,
+                        remaining_dna_bulges - 1,
+                        gap,
+                        next_genome_char,
+                    )
+                )
+
+        if not check_base_match(next_crispr_char, next_genome_char):
+            remaining_mismatches -= 1
+            if remaining_mismatches < 0:
+                continue
+        stack.append(
+            (
+                num_aligned + 1,
+                crispr_idx + 1,
+                genome_idx + 1,
+                remaining_mismatches,
+                remaining_total_bulges,
+                remaining_rna_bulges,
+                remaining_dna_bulges,
+                next_crispr_char,
+                next_genome_char,
+            )
+        )
+    return found_alignments
+
+
+ALIGNMENT_ENGINES: Mapping[str, Callable[..., Set[Tuple[str, str]]]] = immutabledict(
+    {
+        "recursive": find_all_possible_alignments,
+        "iterative": find_all_alignments_iteratively,
+    }
+)
+
+
+def create_alignment_string(crispr_seq: str, genome_seq: str) -> str:
+    """Create the middle alignment string for vertical display.
+
+    Args:
+        crispr_seq: the CRISPR target row of the alignment, with gaps for DNA bulges
+        genome_seq: the genome row of the alignment, with gaps for RNA bulges
+
+    Returns:
+        a character for each column, marking a match, a mismatch or the kind of bulge
+    """
     alignment_str = ""
     for char_idx, crispr_char in enumerate(crispr_seq):
         genome_char = genome_seq[char_idx]
@@ -509,41 +886,112 @@ def _create_alignment_string(crispr_seq: str, genome_seq: str) -> str:
 
 
 def _get_best_scoring_alignment(
-    set_of_alignments: Set[Tuple[str, str]]
+    set_of_alignments: Set[Tuple[str, str]], cas_variety: str = "Sa"
 ) -> Tuple[Tuple[str, str], Union[float, int]]:
-    best_scoring_alignment: Optional[Tuple[str, str]] = None
-    best_score: Union[float, int] = 9999999
-    for crispr_seq, genome_seq in set_of_alignments:
-        iter_score = sa_cas_off_target_score((crispr_seq, "", genome_seq))
-        if iter_score < best_score:
-            best_score = iter_score
-            best_scoring_alignment = (crispr_seq, genome_seq)
-    if best_scoring_alignment is None:
+    if not set_of_alignments:
         raise NotImplementedError(
             "This should never happen...unless no alignments were provided as an input."
         )
-    return best_scoring_alignment, best_score
+    alignments = list(set_of_alignments)
+    scores = CAS_SCORING_PROFILES[cas_variety].score_alignments(
+        [(crispr_seq, "", genome_seq) for crispr_seq, genome_seq in alignments]
+    )
+    best_idx = int(np.argmin(scores))  # the first of any tied alignments
+    return alignments[best_idx], float(scores[best_idx])
+
+
+def find_pam_anchored_window_starts(  # pylint:disable=too-many-arguments
+    crispr_target_seq: str,
+    pam: str,
+    genome_seq: str,
+    max_pam_misalignments: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    num_windows: Optional[int] = None,
+) -> List[int]:
+    """Find the start of the windows that could align the PAM to an anchor.
+
+    An anchor is any stretch of the genome that matches the PAM (without gaps) with no more than the allowed number of misalignments. Bulges 5' of the PAM shift where the PAM lands relative to the start of the window, so every window that could place the PAM on an anchor given the allowed RNA and DNA bulges is included.
+
+    Args:
+        crispr_target_seq: the CRISPR target, including the PAM
+        pam: the PAM at the 3' end of crispr_target_seq
+        genome_seq: the genome sequence the windows are in
+        max_pam_misalignments: the most substitutions allowed between the PAM and an anchor
+        allowed_total_bulges: the maximum number of RNA+DNA bulges
+        allowed_rna_bulges: the maximum number of RNA bulges
+        allowed_dna_bulges: the maximum number of DNA bulges
+        num_windows: only window starts below this are included. Defaults to the number of windows scanned by `_find_all_alignments_across_sequence`.
+
+    Returns:
+        a sorted list of the window start indices in the genome sequence
+    """
+    pam_len = len(pam)
+    max_possible_length_of_genome_alignment = (  # pylint: disable=invalid-name
+        len(crispr_target_seq) + allowed_dna_bulges
+    )
+    if num_windows is None:
+        num_windows = len(genome_seq) - max_possible_length_of_genome_alignment
+    max_rna_bulge_shift = min(allowed_rna_bulges, allowed_total_bulges)
+    max_dna_bulge_shift = min(allowed_dna_bulges, allowed_total_bulges)
+    window_starts: Set[int] = set()
+    for pam_start_idx in range(len(genome_seq) - pam_len + 1):
+        misalignment_count = 0
+        for pam_idx, pam_char in enumerate(pam):
+            if not check_base_match(pam_char, genome_seq[pam_start_idx + pam_idx]):
+                misalignment_count += 1
+                if misalignment_count > max_pam_misalignments:
+                    break
+        else:
+            unbulged_window_start = pam_start_idx - (len(crispr_target_seq) - pam_len)
+            for window_start in range(
+                max(unbulged_window_start - max_dna_bulge_shift, 0),
+                min(unbulged_window_start + max_rna_bulge_shift + 1, num_windows),
+            ):
+                window_starts.add(window_start)
+    return sorted(window_starts)
 
 
-def _find_all_alignments_across_sequence(
+def _find_all_alignments_across_sequence(  # pylint:disable=too-many-arguments
     crispr_target_seq: str,
     genome_seq: str,
     allowed_mismatches: int,
     allowed_total_bulges: int,
     allowed_rna_bulges: int,
     allowed_dna_bulges: int,
+    engine: str = "recursive",
+    window_starts: Optional[Sequence[int]] = None,
+    workers: int = 1,
 ) -> Set[Tuple[str, str]]:
+    if workers > 1:
+        return _find_all_alignments_in_parallel(
+            crispr_target_seq,
+            [genome_seq],
+            allowed_mismatches,
+            allowed_total_bulges,
+            allowed_rna_bulges,
+            allowed_dna_bulges,
+            engine,
+            [window_starts],
+            workers,
+        )[0]
+    if engine not in ALIGNMENT_ENGINES:
+        raise AlignmentEngineNotImplementedError(engine)
+    find_alignments_in_window = ALIGNMENT_ENGINES[engine]
 
     max_possible_length_of_genome_alignment = (  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
         len(crispr_target_seq) + allowed_dna_bulges
     )
+    if window_starts is None:
+        window_starts = range(len(genome_seq) - max_possible_length_of_genome_alignment)
 
     current_strand_alignments = set()
-    for idx in range(len(genome_seq) - max_possible_length_of_genome_alignment):
+    for idx in window_starts:
         iter_genome_seq = genome_seq[
             idx : idx + max_possible_length_of_genome_alignment
         ]
-        iter_alignments = find_all_possible_alignments(
+        iter_alignments = find_alignments_in_window(
             str(crispr_target_seq),
             iter_genome_seq,
             allowed_mismatches,
@@ -555,6 +1003,610 @@ def _find_all_alignments_across_sequence(
     return current_strand_alignments
 
 
+def _split_windows_into_chunks(
+    genome_seq: str,
+    window_starts: Sequence[int],
+    window_length: int,
+    num_chunks: int,
+) -> List[Tuple[str, List[int]]]:
+    """Split the windows of a sequence into chunks that can be scanned independently.
+
+    Each chunk holds a contiguous run of the windows, and consecutive chunks overlap by the window length so that every window lies entirely within its chunk.
+
+    Returns: the part of the genome sequence covered by each chunk, and the window starts within it
+    """
+    chunks: List[Tuple[str, List[int]]] = list()
+    chunk_size = max(-(-len(window_starts) // num_chunks), 1)
+    for chunk_idx in range(0, len(window_starts), chunk_size):
+        chunk_window_starts = window_starts[chunk_idx : chunk_idx + chunk_size]
+        chunk_start = chunk_window_starts[0]
+        chunks.append(
+            (
+                genome_seq[chunk_start : chunk_window_starts[-1] + window_length],
+                [window_start - chunk_start for window_start in chunk_window_starts],
+            )
+        )
+    return chunks
+
+
+def _find_all_alignments_in_parallel(  # pylint:disable=too-many-arguments,too-many-locals
+    crispr_target_seq: str,
+    genome_seqs: Sequence[str],
+    allowed_mismatches: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    engine: str,
+    window_starts_for_each_seq: Sequence[Optional[Sequence[int]]],
+    workers: int,
+) -> List[Set[Tuple[str, str]]]:
+    """Scan several sequences in a process pool.
+
+    Every sequence is split into chunks of windows, and all the chunks of all the sequences are scheduled as independent tasks. The merged alignments of each sequence are identical to scanning it serially with `_find_all_alignments_across_sequence`.
+
+    Returns: the set of alignments found in each sequence
+    """
+    if engine not in ALIGNMENT_ENGINES:
+        raise AlignmentEngineNotImplementedError(engine)
+    window_length = len(crispr_target_seq) + allowed_dna_bulges
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures_for_each_seq: List[List["Future[Set[Tuple[str, str]]]"]] = list()
+        for genome_seq, window_starts in zip(genome_seqs, window_starts_for_each_seq):
+            if window_starts is None:
+                window_starts = range(len(genome_seq) - window_length)
+            futures_for_each_seq.append(
+                [
+                    executor.submit(
+                        _find_all_alignments_across_sequence,
+                        crispr_target_seq,
+                        chunk_seq,
+                        allowed_mismatches,
+                        allowed_total_bulges,
+                        allowed_rna_bulges,
+                        allowed_dna_bulges,
+                        engine=engine,
+                        window_starts=chunk_window_starts,
+                    )
+                    for chunk_seq, chunk_window_starts in _split_windows_into_chunks(
+                        genome_seq, window_starts, window_length, workers
+                    )
+                ]
+            )
+        alignments_for_each_seq: List[Set[Tuple[str, str]]] = list()
+        for futures in futures_for_each_seq:
+            alignments: Set[Tuple[str, str]] = set()
+            for future in futures:
+                alignments.update(future.result())
+            alignments_for_each_seq.append(alignments)
+    return alignments_for_each_seq
+
+
+def find_min_edit_distances(
+    crispr_target_seq: str,
+    windows: NDArray[np.uint8],
+    max_rna_bulges: int,
+    max_dna_bulges: int,
+) -> NDArray[np.int64]:
+    """Find the fewest mismatches (including bulges) of any alignment in each window.
+
+    The alignments start at the beginning of the window, the same as the
+    ones the alignment engines find, so this is a lower bound for them. It
+    is calculated for all the windows at once with a dynamic program over
+    the diagonals that the allowed bulges can reach, so windows that
+    cannot hold a site are skipped without enumerating their alignments.
+    Bases match the same as with check_base_match.
+
+    Args:
+        crispr_target_seq: the CRISPR target, including the PAM
+        windows: the ASCII codes of the genome bases of each window, one row per window
+        max_rna_bulges: the most RNA bulges any alignment may have
+        max_dna_bulges: the most DNA bulges any alignment may have
+
+    Returns:
+        the lowest number of mismatches and bulges of each window
+    """
+    num_windows = len(windows)
+    unreachable = len(crispr_target_seq) + windows.shape[1] + 1
+    num_diagonals = max_rna_bulges + max_dna_bulges + 1
+    # each diagonal is a number of genome bases aligned minus the number of CRISPR bases aligned, offset by max_rna_bulges. Before any CRISPR bases are aligned, every genome base is a DNA bulge.
+    distances = [
+        np.full(
+            num_windows,
+            diagonal - max_rna_bulges if diagonal >= max_rna_bulges else unreachable,
+            dtype=np.int64,
+        )
+        for diagonal in range(num_diagonals)
+    ]
+    for num_crispr_bases, crispr_base in enumerate(crispr_target_seq, start=1):
+        is_match = _get_base_match_table(crispr_base)
+        next_distances: List[NDArray[np.int64]] = list()
+        for diagonal in range(num_diagonals):
+            num_genome_bases = num_crispr_bases + diagonal - max_rna_bulges
+            distance = np.full(num_windows, unreachable, dtype=np.int64)
+            if diagonal + 1 < num_diagonals:
+                distance = np.minimum(distance, distances[diagonal + 1] + 1)
+            if num_genome_bases >= 1:
+                distance = np.minimum(
+                    distance,
+                    distances[diagonal] + ~is_match[windows[:, num_genome_bases - 1]],
+                )
+            if diagonal > 0:
+                distance = np.minimum(distance, next_distances[diagonal - 1] + 1)
+            next_distances.append(distance)
+        distances = next_distances
+    min_distances: NDArray[np.int64] = np.minimum.reduce(distances)
+    return min_distances
+
+
+def _find_all_alignments_for_each_crispr(  # pylint:disable=too-many-arguments,too-many-locals
+    crispr_target_seqs: Sequence[str],
+    genome_seq: str,
+    allowed_mismatches: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    engine: str,
+    window_starts_for_each_crispr: Sequence[Optional[Sequence[int]]],
+) -> List[Set[Tuple[str, str]]]:
+    """Scan one sequence for several CRISPR targets in a single pass over its windows.
+
+    The sequence is encoded once, and the windows of each CRISPR target are all checked at once with `find_min_edit_distances` against that shared encoding. Only the windows that could hold an alignment within the allowed mismatches are passed to the alignment engine, visiting the union of them in order and slicing each window out of the sequence once for all the CRISPR targets of the same length. The alignments found for each CRISPR target are identical to scanning the sequence for it alone with `_find_all_alignments_across_sequence`.
+
+    Returns: the set of alignments found for each CRISPR target
+    """
+    find_alignments_in_window = ALIGNMENT_ENGINES[engine]
+    genome_bases = np.frombuffer(genome_seq.encode("ascii"), dtype=np.uint8)
+    max_rna_bulge_shift = min(allowed_rna_bulges, allowed_total_bulges)
+    max_dna_bulge_shift = min(allowed_dna_bulges, allowed_total_bulges)
+    crispr_idxs_by_window_start: Dict[int, List[int]] = defaultdict(list)
+    for crispr_idx, (crispr_target_seq, window_starts) in enumerate(
+        zip(crispr_target_seqs, window_starts_for_each_crispr)
+    ):
+        window_length = len(crispr_target_seq) + allowed_dna_bulges
+        num_windows = len(genome_seq) - window_length
+        if num_windows <= 0:
+            continue
+        all_windows = np.lib.stride_tricks.sliding_window_view(
+            genome_bases, window_length
+        )[:num_windows]
+        if window_starts is None:
+            candidate_starts = np.arange(num_windows)
+            windows = all_windows
+        else:
+            candidate_starts = np.array(sorted(set(window_starts)), dtype=np.int64)
+            candidate_starts = candidate_starts[
+                (candidate_starts >= 0) & (candidate_starts < num_windows)
+            ]
+            windows = all_windows[candidate_starts]
+        min_edit_distances = find_min_edit_distances(
+            crispr_target_seq, windows, max_rna_bulge_shift, max_dna_bulge_shift
+        )
+        for window_start in candidate_starts[
+            min_edit_distances <= allowed_mismatches
+        ].tolist():
+            crispr_idxs_by_window_start[window_start].append(crispr_idx)
+
+    alignments_for_each_crispr: List[Set[Tuple[str, str]]] = [
+        set() for _ in crispr_target_seqs
+    ]
+    for window_start in sorted(crispr_idxs_by_window_start):
+        windows_by_length: Dict[int, str] = dict()
+        for crispr_idx in crispr_idxs_by_window_start[window_start]:
+            crispr_target_seq = crispr_target_seqs[crispr_idx]
+            window_length = len(crispr_target_seq) + allowed_dna_bulges
+            if window_length not in windows_by_length:
+                windows_by_length[window_length] = genome_seq[
+                    window_start : window_start + window_length
+                ]
+            alignments_for_each_crispr[crispr_idx].update(
+                find_alignments_in_window(
+                    crispr_target_seq,
+                    windows_by_length[window_length],
+                    allowed_mismatches,
+                    allowed_total_bulges,
+                    allowed_rna_bulges,
+                    allowed_dna_bulges,
+                )
+            )
+    return alignments_for_each_crispr
+
+
+def _find_best_alignment_across_strands(  # pylint:disable=too-many-arguments,too-many-locals
+    crispr_target_seq: str,
+    current_strand_genome_seq: str,
+    opposite_strand_genome_seq: str,
+    allowed_mismatches: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    engine: str,
+    current_strand_window_starts: Optional[Sequence[int]],
+    opposite_strand_window_starts: Optional[Sequence[int]],
+    workers: int = 1,
+    cas_variety: str = "Sa",
+) -> Tuple[Tuple[str, str], bool]:
+    """Find all alignments on both strands and then pick the best scoring.
+
+    Returns: the CRISPR alignment string and Genome alignment string, and whether it was found on the opposite strand
+    """
+    if workers > 1:
+        alignments_for_each_strand = _find_all_alignments_in_parallel(
+            crispr_target_seq,
+            [current_strand_genome_seq, opposite_strand_genome_seq],
+            allowed_mismatches,
+            allowed_total_bulges,
+            allowed_rna_bulges,
+            allowed_dna_bulges,
+            engine,
+            [current_strand_window_starts, opposite_strand_window_starts],
+            workers,
+        )
+        current_strand_alignments = alignments_for_each_strand[0]
+        opposite_strand_alignments = alignments_for_each_strand[1]
+    else:
+        current_strand_alignments = _find_all_alignments_across_sequence(
+            crispr_target_seq,
+            current_strand_genome_seq,
+            allowed_mismatches,
+            allowed_total_bulges,
+            allowed_rna_bulges,
+            allowed_dna_bulges,
+            engine=engine,
+            window_starts=current_strand_window_starts,
+        )
+        opposite_strand_alignments = _find_all_alignments_across_sequence(
+            crispr_target_seq,
+            opposite_strand_genome_seq,
+            allowed_mismatches,
+            allowed_total_bulges,
+            allowed_rna_bulges,
+            allowed_dna_bulges,
+            engine=engine,
+            window_starts=opposite_strand_window_starts,
+        )
+
+    (
+        best_scoring_alignment,
+        is_best_on_opposite_strand,
+        _,
+    ) = _pick_best_alignment_across_strands(
+        current_strand_alignments, opposite_strand_alignments, cas_variety
+    )
+    return best_scoring_alignment, is_best_on_opposite_strand
+
+
+def _pick_best_alignment_across_strands(  # pylint:disable=invalid-name
+    current_strand_alignments: Set[Tuple[str, str]],
+    opposite_strand_alignments: Set[Tuple[str, str]],
+    cas_variety: str,
+) -> Tuple[Tuple[str, str], bool, Union[float, int]]:
+    """Pick the best scoring of all the alignments found on both strands.
+
+    Returns: the CRISPR alignment string and Genome alignment string, whether it was found on the opposite strand, and its score
+    """
+    best_scoring_current_strand_alignment: Tuple[  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
+        str, str
+    ] = (
+        "",
+        "",
+    )
+    best_current_strand_alignment_score: Union[  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
+        float, int
+    ] = 999999
+    if current_strand_alignments:
+        (
+            best_scoring_current_strand_alignment,  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
+            best_current_strand_alignment_score,  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
+        ) = _get_best_scoring_alignment(current_strand_alignments, cas_variety)
+
+    best_scoring_opposite_strand_alignment: Tuple[  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
+        str, str
+    ] = (
+        "",
+        "",
+    )
+    best_opposite_strand_alignment_score: Union[  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
+        float, int
+    ] = 999999
+    if opposite_strand_alignments:
+        (
+            best_scoring_opposite_strand_alignment,  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
+            best_opposite_strand_alignment_score,  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
+        ) = _get_best_scoring_alignment(opposite_strand_alignments, cas_variety)
+
+    best_scoring_alignment = (
+        best_scoring_current_strand_alignment
+        if best_current_strand_alignment_score < best_opposite_strand_alignment_score
+        else best_scoring_opposite_strand_alignment
+    )
+    return (
+        best_scoring_alignment,
+        best_scoring_alignment == best_scoring_opposite_strand_alignment,
+        min(best_current_strand_alignment_score, best_opposite_strand_alignment_score),
+    )
+
+
+BEST_FIRST_ENGINE = "best-first"
+
+
+def _find_best_alignment_best_first(  # pylint:disable=too-many-arguments,too-many-locals,too-many-branches,too-many-statements
+    crispr_target_seq: str,
+    genome_seqs: Sequence[str],
+    allowed_mismatches: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    window_starts_for_each_seq: Optional[Sequence[Optional[Sequence[int]]]] = None,
+    cas_variety: str = "Sa",
+) -> Optional[Tuple[int, Tuple[str, str], Union[float, int]]]:
+    """Find only the best scoring alignment across several genome sequences.
+
+    Considers exactly the same alignments as scanning every window of the sequences with `find_all_possible_alignments`, but the alignments are built from the 3' end so that the off-target scores of the Cas variety accumulate in the same order as `CasScoringProfile.score_alignment`. The partial score of a branch is therefore a lower bound for any alignment completed from it, and branches are expanded lowest partial score first. The first complete alignment reached is the optimal one, and every branch whose lower bound is above it is never expanded.
+
+    Ties between sequences are resolved in favor of the later sequence.
+
+    Returns: the index of the sequence the alignment was found in, the CRISPR alignment string and Genome alignment string, and the score. None if no alignment was found.
+    """
+    if window_starts_for_each_seq is None:
+        window_starts_for_each_seq = [None] * len(genome_seqs)
+    scoring_profile = CAS_SCORING_PROFILES[cas_variety]
+    gap = ALIGNMENT_GAP_CHARACTER
+    crispr_len = len(crispr_target_seq)
+    last_crispr_char = crispr_target_seq[-1]
+    max_possible_length_of_genome_alignment = (  # pylint: disable=invalid-name
+        crispr_len + allowed_dna_bulges
+    )
+    max_rna_bulge_shift = min(allowed_rna_bulges, allowed_total_bulges)
+    max_dna_bulge_shift = min(allowed_dna_bulges, allowed_total_bulges)
+    num_windows_for_each_seq: List[int] = list()
+    window_start_sets_for_each_seq: List[Optional[Set[int]]] = list()
+    counter = itertools.count()
+
+    # Each entry is a branch of the search tree:
+    # (partial score, sequence rank, tie breaker, sequence idx, num CRISPR chars still to align, genome idx of next char to align, mismatches, total bulges, RNA bulges, DNA bulges, whether 3' column is a bulge, CRISPR char of 3' column, linked list of aligned columns)
+    heap: List[Tuple[Any, ...]] = list()
+    for seq_idx, genome_seq in enumerate(genome_seqs):
+        num_windows = len(genome_seq) - max_possible_length_of_genome_alignment
+        num_windows_for_each_seq.append(num_windows)
+        window_starts = window_starts_for_each_seq[seq_idx]
+        anchors: Iterable[int]
+        if window_starts is None:
+            window_start_sets_for_each_seq.append(None)
+            anchors = range(
+                max(crispr_len - 1 - max_rna_bulge_shift, 0),
+                min(
+                    num_windows + crispr_len - 1 + max_dna_bulge_shift, len(genome_seq)
+                ),
+            )
+        else:
+            window_start_sets_for_each_seq.append(set(window_starts))
+            anchor_set: Set[int] = set()
+            for window_start in window_starts:
+                anchor_set.update(
+                    range(
+                        max(window_start + crispr_len - 1 - max_rna_bulge_shift, 0),
+                        min(
+                            window_start + crispr_len + max_dna_bulge_shift,
+                            len(genome_seq),
+                        ),
+                    )
+                )
+            anchors = sorted(anchor_set)
+        for anchor_idx in anchors:
+            # The 3' CRISPR character can't be a bulge
+            genome_char = genome_seq[anchor_idx]
+            is_mismatch = not check_base_match(last_crispr_char, genome_char)
+            if is_mismatch and allowed_mismatches < 1:
+                continue
+            heap.append(
+                (
+                    scoring_profile.add_column_score(
+                        0, 0, genome_char, is_mismatch, False, False, 0
+                    ),
+                    -seq_idx,
+                    next(counter),
+                    seq_idx,
+                    crispr_len - 1,
+                    anchor_idx - 1,
+                    int(is_mismatch),
+                    0,
+                    0,
+                    0,
+                    False,
+                    last_crispr_char,
+                    (last_crispr_char, genome_char, None),
+                )
+            )
+    heapq.heapify(heap)
+
+    while heap:
+        (
+            score,
+            seq_rank,
+            _,
+            seq_idx,
+            num_remaining_crispr,
+            genome_idx,
+            num_mismatches,
+            num_bulges,
+            num_rna_bulges,
+            num_dna_bulges,
+            is_three_prime_column_bulge,
+            three_prime_crispr_char,
+            aligned_columns,
+        ) = heapq.heappop(heap)
+        if num_remaining_crispr == 0:
+            window_start = genome_idx + 1
+            if window_start >= num_windows_for_each_seq[seq_idx]:
+                continue
+            valid_window_starts = window_start_sets_for_each_seq[seq_idx]
+            if (
+                valid_window_starts is not None
+                and window_start not in valid_window_starts
+            ):
+                continue
+            aligned_crispr_chars: List[str] = list()
+            aligned_genome_chars: List[str] = list()
+            while aligned_columns is not None:
+                aligned_crispr_chars.append(aligned_columns[0])
+                aligned_genome_chars.append(aligned_columns[1])
+                aligned_columns = aligned_columns[2]
+            aligned_crispr_seq = "".join(aligned_crispr_chars)
+            aligned_genome_seq = "".join(aligned_genome_chars)
+            # prune superfluous alignments where offseting bulges could just be deleted
+            if _is_superfluous_bulge_alignment(aligned_crispr_seq, aligned_genome_seq):
+                continue
+            return seq_idx, (aligned_crispr_seq, aligned_genome_seq), score
+
+        genome_seq = genome_seqs[seq_idx]
+        crispr_char = crispr_target_seq[num_remaining_crispr - 1]
+        crispr_base_position = crispr_len - num_remaining_crispr
+        if genome_idx >= 0:
+            genome_char = genome_seq[genome_idx]
+            is_mismatch = not check_base_match(crispr_char, genome_char)
+            if not is_mismatch or num_mismatches < allowed_mismatches:
+                heapq.heappush(
+                    heap,
+                    (
+                        scoring_profile.add_column_score(
+                            score,
+                            crispr_base_position,
+                            genome_char,
+                            is_mismatch,
+                            False,
+                            False,
+                            num_bulges,
+                        ),
+                        seq_rank,
+                        next(counter),
+                        seq_idx,
+                        num_remaining_crispr - 1,
+                        genome_idx - 1,
+                        num_mismatches + int(is_mismatch),
+                        num_bulges,
+                        num_rna_bulges,
+                        num_dna_bulges,
+                        False,
+                        crispr_char,
+                        (crispr_char, genome_char, aligned_columns),
+                    ),
+                )
+        if (
+            is_three_prime_column_bulge  # Don't allow back-to-back bulges or bulges longer than 1 character
+            or num_mismatches >= allowed_mismatches
+            or num_bulges >= allowed_total_bulges
+        ):
+            continue
+        # The first two columns of the alignment can't be bulges, so there must be at least two CRISPR characters 5' of any bulge
+        if num_rna_bulges < allowed_rna_bulges and num_remaining_crispr > 2:
+            heapq.heappush(
+                heap,
+                (
+                    scoring_profile.add_column_score(
+                        score,
+                        crispr_base_position,
+                        gap,
+                        True,
+                        True,
+                        False,
+                        num_bulges + 1,
+                    ),
+                    seq_rank,
+                    next(counter),
+                    seq_idx,
+                    num_remaining_crispr - 1,
+                    genome_idx,
+                    num_mismatches + 1,
+                    num_bulges + 1,
+                    num_rna_bulges + 1,
+                    num_dna_bulges,
+                    True,
+                    crispr_char,
+                    (crispr_char, gap, aligned_columns),
+                ),
+            )
+        if (
+            num_dna_bulges < allowed_dna_bulges
+            and num_remaining_crispr > 1
+            and genome_idx >= 0
+            and three_prime_crispr_char
+            != "N"  # it makes no sense to bulge at an "N"...anything is possible there
+        ):
+            heapq.heappush(
+                heap,
+                (
+                    scoring_profile.add_column_score(
+                        score,
+                        crispr_base_position,
+                        genome_seq[genome_idx],
+                        True,
+                        False,
+                        True,
+                        num_bulges + 1,
+                    ),
+                    seq_rank,
+                    next(counter),
+                    seq_idx,
+                    num_remaining_crispr,
+                    genome_idx - 1,
+                    num_mismatches + 1,
+                    num_bulges + 1,
+                    num_rna_bulges,
+                    num_dna_bulges + 1,
+                    True,
+                    gap,
+                    (gap, genome_seq[genome_idx], aligned_columns),
+                ),
+            )
+    return None
+
+
+def _best_first_search_in_parallel(  # pylint:disable=too-many-arguments
+    crispr_target_seq: str,
+    genome_seqs: Sequence[str],
+    allowed_mismatches: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    window_starts_for_each_seq: Sequence[Optional[Sequence[int]]],
+    workers: int,
+    cas_variety: str = "Sa",
+) -> Optional[Tuple[int, Tuple[str, str], Union[float, int]]]:
+    """Run the best-first search on each sequence as an independent task in a process pool.
+
+    The sequences are not split into chunks, because the order in which a single search expands tied branches is what decides which of several equally scoring alignments is returned. The result is identical to searching all the sequences at once with `_find_best_alignment_best_first`.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _find_best_alignment_best_first,
+                crispr_target_seq,
+                [genome_seq],
+                allowed_mismatches,
+                allowed_total_bulges,
+                allowed_rna_bulges,
+                allowed_dna_bulges,
+                window_starts_for_each_seq=[window_starts],
+                cas_variety=cas_variety,
+            )
+            for genome_seq, window_starts in zip(
+                genome_seqs, window_starts_for_each_seq
+            )
+        ]
+        best_result: Optional[Tuple[int, Tuple[str, str], Union[float, int]]] = None
+        best_score: Union[float, int] = 0
+        for seq_idx, future in enumerate(futures):
+            result = future.result()
+            if result is None:
+                continue
+            _, alignment, score = result
+            # ties are resolved in favor of the later sequence
+            if best_result is None or score <= best_score:
+                best_result = (seq_idx, alignment, score)
+                best_score = score
+    return best_result
+
+
 class CrisprAlignment:  # pylint:disable=too-few-public-methods
     """Create an alignment of CRISPR to the Genome."""
 
@@ -567,83 +1619,139 @@ class CrisprAlignment:  # pylint:disable=too-few-public-methods
         self.formatted_alignment: Tuple[str, str, str]
         self.cut_site_coord: int  # the base 5' (on positive strand...so always closer to start coordinate of chromosome) of the blunt cut
 
+    def _find_window_starts(
+        self,
+        genomic_sequence: GenomicSequence,
+        max_pam_misalignments: Optional[int],
+        allowed_total_bulges: int,
+        allowed_rna_bulges: int,
+        allowed_dna_bulges: int,
+    ) -> Optional[List[int]]:
+        if max_pam_misalignments is None:
+            return None
+        return find_pam_anchored_window_starts(
+            str(self.crispr_target.sequence),
+            self.crispr_target.pam,
+            str(genomic_sequence.sequence),
+            max_pam_misalignments,
+            allowed_total_bulges,
+            allowed_rna_bulges,
+            allowed_dna_bulges,
+        )
+
     def find_optimal_alignment(
         self,
         allowed_mismatches: int,
         allowed_total_bulges: int,
         allowed_rna_bulges: int,
         allowed_dna_bulges: int,
+        engine: str = "recursive",
+        max_pam_misalignments: Optional[int] = None,
+        workers: int = 1,
+        cas_variety: str = "Sa",
     ) -> None:
         """Align CRISPR to genome.
 
         Searches through both strands to find the optimal alignment (for
-        SaCas9). Revcomps the genomic sequnce if the highest scoring
+        SaCas9 by default). Revcomps the genomic sequnce if the highest scoring
         alignment was on the reverse strand. Calculates cut site
         coordinate and the formatted alignment.
-        """
-        current_strand_alignments = _find_all_alignments_across_sequence(
-            str(self.crispr_target.sequence),
-            str(self.genomic_sequence.sequence),
-            allowed_mismatches,
-            allowed_total_bulges,
-            allowed_rna_bulges,
-            allowed_dna_bulges,
-        )
-
-        best_scoring_current_strand_alignment: Tuple[  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
-            str, str
-        ] = (
-            "",
-            "",
-        )
-        best_current_strand_alignment_score: Union[  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
-            float, int
-        ] = 999999
-        if current_strand_alignments:
-            (
-                best_scoring_current_strand_alignment,  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
-                best_current_strand_alignment_score,  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
-            ) = _get_best_scoring_alignment(current_strand_alignments)
 
+        Args:
+            allowed_mismatches: the maximum number of mismatches (including bulges)
+            allowed_total_bulges: the maximum number of RNA+DNA bulges
+            allowed_rna_bulges: the maximum number of RNA bulges
+            allowed_dna_bulges: the maximum number of DNA bulges
+            engine: which key of ALIGNMENT_ENGINES to use to enumerate the alignments in each window of the genomic sequence, or BEST_FIRST_ENGINE to search only for the best scoring alignment with a best-first branch-and-bound search
+            max_pam_misalignments: if provided, only the windows of the genomic sequence that could place the PAM on a stretch matching it with at most this many substitutions are searched. Otherwise every window is searched.
+            workers: if more than 1, the strands are scanned in a pool of this many processes. The windows of each strand are split into overlapping chunks that are scanned as independent tasks (the best-first search instead runs each strand as a single task). The result is identical to scanning serially.
+            cas_variety: which key of CAS_SCORING_PROFILES to score the alignments with
+        """
         opposite_strand_genomic_sequence = (  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
             self.genomic_sequence.create_reverse_complement()
         )
-        opposite_strand_alignments = _find_all_alignments_across_sequence(
-            str(self.crispr_target.sequence),
-            str(opposite_strand_genomic_sequence.sequence),
-            allowed_mismatches,
+        current_strand_window_starts = self._find_window_starts(
+            self.genomic_sequence,
+            max_pam_misalignments,
             allowed_total_bulges,
             allowed_rna_bulges,
             allowed_dna_bulges,
         )
-
-        best_scoring_opposite_strand_alignment: Tuple[  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
-            str, str
-        ] = (
-            "",
-            "",
+        opposite_strand_window_starts = self._find_window_starts(
+            opposite_strand_genomic_sequence,
+            max_pam_misalignments,
+            allowed_total_bulges,
+            allowed_rna_bulges,
+            allowed_dna_bulges,
         )
-        best_opposite_strand_alignment_score: Union[  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
-            float, int
-        ] = 999999
-        if opposite_strand_alignments:
+        if engine == BEST_FIRST_ENGINE:
+            genome_seqs = [
+                str(self.genomic_sequence.sequence),
+                str(opposite_strand_genomic_sequence.sequence),
+            ]
+            window_starts_for_each_seq = [
+                current_strand_window_starts,
+                opposite_strand_window_starts,
+            ]
+            if workers > 1:
+                best_result = _best_first_search_in_parallel(
+                    str(self.crispr_target.sequence),
+                    genome_seqs,
+                    allowed_mismatches,
+                    allowed_total_bulges,
+                    allowed_rna_bulges,
+                    allowed_dna_bulges,
+                    window_starts_for_each_seq,
+                    workers,
+                    cas_variety=cas_variety,
+                )
+            else:
+                best_result = _find_best_alignment_best_first(
+                    str(self.crispr_target.sequence),
+                    genome_seqs,
+                    allowed_mismatches,
+                    allowed_total_bulges,
+                    allowed_rna_bulges,
+                    allowed_dna_bulges,
+                    window_starts_for_each_seq=window_starts_for_each_seq,
+                    cas_variety=cas_variety,
+                )
+            best_scoring_alignment: Tuple[str, str] = ("", "")
+            is_best_on_opposite_strand = True
+            if best_result is not None:
+                best_scoring_alignment = best_result[1]
+                is_best_on_opposite_strand = best_result[0] == 1
+        else:
             (
-                best_scoring_opposite_strand_alignment,  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
-                best_opposite_strand_alignment_score,  # pylint: disable=invalid-name # Eli (10/13/20): I know it's too long
-            ) = _get_best_scoring_alignment(opposite_strand_alignments)
-
-        best_scoring_alignment = (
-            best_scoring_current_strand_alignment
-            if best_current_strand_alignment_score
-            < best_opposite_strand_alignment_score
-            else best_scoring_opposite_strand_alignment
-        )
-        if best_scoring_alignment == best_scoring_opposite_strand_alignment:
+                best_scoring_alignment,
+                is_best_on_opposite_strand,
+            ) = _find_best_alignment_across_strands(
+                str(self.crispr_target.sequence),
+                str(self.genomic_sequence.sequence),
+                str(opposite_strand_genomic_sequence.sequence),
+                allowed_mismatches,
+                allowed_total_bulges,
+                allowed_rna_bulges,
+                allowed_dna_bulges,
+                engine,
+                current_strand_window_starts,
+                opposite_strand_window_starts,
+                workers=workers,
+                cas_variety=cas_variety,
+            )
+        if is_best_on_opposite_strand:
             self.genomic_sequence = opposite_strand_genomic_sequence
+        self._set_optimal_alignment(best_scoring_alignment)
+
+    def _set_optimal_alignment(self, best_scoring_alignment: Tuple[str, str]) -> None:
+        """Calculate the formatted alignment and cut site coordinate.
 
+        Args:
+            best_scoring_alignment: the CRISPR alignment string and Genome alignment string, found on the strand of the current genomic sequence
+        """
         self.formatted_alignment = (
             best_scoring_alignment[0],
-            _create_alignment_string(
+            create_alignment_string(
                 best_scoring_alignment[0], best_scoring_alignment[1]
             ),
             best_scoring_alignment[1],
@@ -740,7 +1848,7 @@ class CrisprAlignment:  # pylint:disable=too-few-public-methods
                 )
 
         # print (cigar_elements)
-        alignment_str = _create_alignment_string(final_crispr_str, final_genomic_str)
+        alignment_str = create_alignment_string(final_crispr_str, final_genomic_str)
         self.formatted_alignment = (
             final_crispr_str,
             alignment_str,
@@ -774,3 +1882,147 @@ class CrisprAlignment:  # pylint:disable=too-few-public-methods
                 - left_count_to_trim
                 - len(five_prime_genome_seq)
             )
+
+
+def align_crispr_targets(  # pylint:disable=too-many-arguments,too-many-locals
+    crispr_targets: Sequence[CrisprTarget],
+    genomic_sequences: Union[GenomicSequence, Sequence[GenomicSequence]],
+    allowed_mismatches: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    engine: str = "recursive",
+    max_pam_misalignments: Optional[int] = None,
+    cas_variety: str = "Sa",
+) -> List[Optional[CrisprAlignment]]:
+    """Find the optimal alignment of many CRISPR targets to the same genome.
+
+    Each genomic sequence is reverse complemented only once, and for the engines in ALIGNMENT_ENGINES each strand is scanned in a single pass over its windows that is shared by all the CRISPR targets. The result for each CRISPR target is the same as calling `CrisprAlignment.find_optimal_alignment` for it with each genomic sequence and keeping the best scoring one (ties go to the earlier genomic sequence).
+
+    Args:
+        crispr_targets: the CRISPR targets to align
+        genomic_sequences: the genomic sequence, or several of them, to search
+        allowed_mismatches: the maximum number of mismatches (including bulges)
+        allowed_total_bulges: the maximum number of RNA+DNA bulges
+        allowed_rna_bulges: the maximum number of RNA bulges
+        allowed_dna_bulges: the maximum number of DNA bulges
+        engine: which key of ALIGNMENT_ENGINES to use to enumerate the alignments in each window, or BEST_FIRST_ENGINE to search only for the best scoring alignment of each CRISPR target
+        max_pam_misalignments: if provided, only the windows that could place the PAM of the CRISPR target on a stretch matching it with at most this many substitutions are searched
+        cas_variety: which key of CAS_SCORING_PROFILES to score the alignments with
+
+    Returns:
+        for each CRISPR target, a CrisprAlignment with its formatted alignment, cut site coordinate and genomic sequence (reverse complemented if the alignment is on the reverse strand) set just as `find_optimal_alignment` sets them. None if no alignment was found for the CRISPR target.
+    """
+    if engine != BEST_FIRST_ENGINE and engine not in ALIGNMENT_ENGINES:
+        raise AlignmentEngineNotImplementedError(engine)
+    if isinstance(genomic_sequences, GenomicSequence):
+        genomic_sequences = [genomic_sequences]
+    crispr_target_seqs = [
+        str(crispr_target.sequence) for crispr_target in crispr_targets
+    ]
+    # the best score, genomic sequence on the strand of the alignment, and the alignment itself
+    best_for_each_crispr: List[
+        Optional[Tuple[Union[float, int], GenomicSequence, Tuple[str, str]]]
+    ] = [None] * len(crispr_targets)
+    for genomic_sequence in genomic_sequences:
+        strands = (genomic_sequence, genomic_sequence.create_reverse_complement())
+        strand_seqs = [str(strand.sequence) for strand in strands]
+        window_starts_by_crispr: List[List[Optional[List[int]]]] = [
+            [
+                None
+                if max_pam_misalignments is None
+                else find_pam_anchored_window_starts(
+                    crispr_target_seq,
+                    crispr_target.pam,
+                    strand_seq,
+                    max_pam_misalignments,
+                    allowed_total_bulges,
+                    allowed_rna_bulges,
+                    allowed_dna_bulges,
+                )
+                for strand_seq in strand_seqs
+            ]
+            for crispr_target, crispr_target_seq in zip(
+                crispr_targets, crispr_target_seqs
+            )
+        ]
+        results_for_each_crispr: List[
+            Optional[Tuple[int, Tuple[str, str], Union[float, int]]]
+        ] = list()
+        if engine == BEST_FIRST_ENGINE:
+            for crispr_target_seq, window_starts_for_each_strand in zip(
+                crispr_target_seqs, window_starts_by_crispr
+            ):
+                results_for_each_crispr.append(
+                    _find_best_alignment_best_first(
+                        crispr_target_seq,
+                        strand_seqs,
+                        allowed_mismatches,
+                        allowed_total_bulges,
+                        allowed_rna_bulges,
+                        allowed_dna_bulges,
+                        window_starts_for_each_seq=window_starts_for_each_strand,
+                        cas_variety=cas_variety,
+                    )
+                )
+        else:
+            alignments_by_strand = [
+                _find_all_alignments_for_each_crispr(
+                    crispr_target_seqs,
+                    strand_seq,
+                    allowed_mismatches,
+                    allowed_total_bulges,
+                    allowed_rna_bulges,
+                    allowed_dna_bulges,
+                    engine,
+                    [
+                        window_starts_for_each_strand[strand_idx]
+                        for window_starts_for_each_strand in window_starts_by_crispr
+                    ],
+                )
+                for strand_idx, strand_seq in enumerate(strand_seqs)
+            ]
+            for current_strand_alignments, opposite_strand_alignments in zip(
+                *alignments_by_strand
+            ):
+                if not current_strand_alignments and not opposite_strand_alignments:
+                    results_for_each_crispr.append(None)
+                    continue
+                (
+                    best_scoring_alignment,
+                    is_best_on_opposite_strand,
+                    best_score,
+                ) = _pick_best_alignment_across_strands(
+                    current_strand_alignments, opposite_strand_alignments, cas_variety
+                )
+                results_for_each_crispr.append(
+                    (
+                        int(is_best_on_opposite_strand),
+                        best_scoring_alignment,
+                        best_score,
+                    )
+                )
+        for crispr_idx, result in enumerate(results_for_each_crispr):
+            if result is None:
+                continue
+            strand_idx, alignment, score = result
+            best_so_far = best_for_each_crispr[crispr_idx]
+            if best_so_far is None or score < best_so_far[0]:
+                best_for_each_crispr[crispr_idx] = (
+                    score,
+                    strands[strand_idx],
+                    alignment,
+                )
+
+    crispr_alignments: List[Optional[CrisprAlignment]] = list()
+    for crispr_target, best in zip(crispr_targets, best_for_each_crispr):
+        if best is None:
+            crispr_alignments.append(None)
+            continue
+        _, strand, alignment = best
+        crispr_alignment = CrisprAlignment(crispr_target, strand)
+        crispr_alignment._set_optimal_alignment(  # pylint:disable=protected-access # this module creates the alignment, so it is allowed to finish setting it up
+            alignment
+        )
+        crispr_alignments.append(crispr_alignment)
+    return crispr_alignments
@@ -19,3 +19,52 @@ class DnaRequestGenomeMismatchError(Exception):
 
 class UrlNotImplementedForGenomeError(NotImplementedError):
     pass
+
+
+class AlignmentEngineNotImplementedError(NotImplementedError):
+    pass
+
+
+class CasVarietyAlreadyRegisteredError(KeyError):
+    pass
+
+
+class InvalidTwoBitFileError(Exception):
+    pass
+
+
+class ChromosomeNotInSequenceSourceError(KeyError):
+    pass
+
+
+class CoordinatesOutsideOfChromosomeError(ValueError):
+    pass
+
+
+class InvalidFastaFileError(Exception):
+    pass
+
+
+class SequenceSourceAlreadyRegisteredError(KeyError):
+    pass
+
+
+class UcscResponseMissingSequenceError(Exception):
+    pass
+
+
+class UcscTemporarilyUnavailableError(Exception):
+    def __init__(self, status_code: int, retry_after_seconds: float = 0.0) -> None:
+        super().__init__(
+            f"The UCSC Browser responded with status {status_code}, so the request should be tried again later."
+        )
+        self.status_code = status_code
+        self.retry_after_seconds = retry_after_seconds
+
+
+class InvalidSeedIndexFileError(Exception):
+    pass
+
+
+class InvalidRefSeqTableFileError(Exception):
+    pass
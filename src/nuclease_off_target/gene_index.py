@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""Finding the genes and exons that overlap positions in a genome."""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict
+from typing import Generic
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import TypeVar
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .crispr_target import CrisprAlignment
+from .genomic_sequence import ExonCoordinates
+from .genomic_sequence import GeneCoordinates
+from .genomic_sequence import GeneIsoformCoordinates
+
+T = TypeVar("T")
+
+_LEAF_SUBTREE_LEVEL = 3  # subtrees this small are scanned instead of descended into
+
+
+class _ChromosomeIntervals(Generic[T]):
+    """An implicit augmented interval tree over the intervals of one chromosome.
+
+    The intervals are sorted by start, and the sorted array is itself a
+    balanced binary search tree: the node at index i is at the level given
+    by the number of trailing 1 bits of i, and also holds the largest end
+    coordinate of its subtree.
+    """
+
+    def __init__(
+        self, starts: Sequence[int], ends: Sequence[int], items: Sequence[T]
+    ) -> None:
+        order = np.argsort(np.array(starts, dtype=np.int64), kind="stable")
+        self.starts: NDArray[np.int64] = np.array(starts, dtype=np.int64)[order]
+        self.ends: NDArray[np.int64] = np.array(ends, dtype=np.int64)[order]
+        self.items: List[T] = [items[idx] for idx in order.tolist()]
+        self.max_ends = self.ends.copy()
+        num_intervals = len(self.starts)
+        # nodes past the end of the array are missing, and take the largest end of the last real node below them
+        last_idx = (num_intervals - 1) & ~1
+        last_max_end = int(self.max_ends[last_idx])
+        level = 1
+        while 1 << level <= num_intervals:
+            half_width = 1 << (level - 1)
+            node_idxs = np.arange((half_width << 1) - 1, num_intervals, half_width << 2)
+            right_child_idxs = node_idxs + half_width
+            right_max_ends = np.where(
+                right_child_idxs < num_intervals,
+                self.max_ends[np.minimum(right_child_idxs, num_intervals - 1)],
+                last_max_end,
+            )
+            self.max_ends[node_idxs] = np.maximum(
+                np.maximum(
+                    self.max_ends[node_idxs], self.max_ends[node_idxs - half_width]
+                ),
+                right_max_ends,
+            )
+            last_idx = (
+                last_idx - half_width
+                if (last_idx >> level) & 1
+                else last_idx + half_width
+            )
+            if last_idx < num_intervals:
+                last_max_end = max(last_max_end, int(self.max_ends[last_idx]))
+            level += 1
+        self.max_level = level - 1
+
+    def find_overlapping(self, start_coord: int, end_coord: int) -> List[T]:
+        """Find the intervals overlapping a range, in order of start."""
+        num_intervals = len(self.starts)
+        overlapping: List[T] = list()
+        # (node index, level, whether its left subtree was already searched)
+        stack = [((1 << self.max_level) - 1, self.max_level, False)]
+        while stack:
+            node_idx, level, is_left_searched = stack.pop()
+            if level <= _LEAF_SUBTREE_LEVEL:
+                first_idx = node_idx >> level << level
+                for idx in range(
+                    first_idx, min(first_idx + (1 << (level + 1)) - 1, num_intervals)
+                ):
+                    if self.starts[idx] > end_coord:
+                        break
+                    if self.ends[idx] >= start_coord:
+                        overlapping.append(self.items[idx])
+            elif not is_left_searched:
+                stack.append((node_idx, level, True))
+                left_child_idx = node_idx - (1 << (level - 1))
+                if (
+                    left_child_idx >= num_intervals
+                    or self.max_ends[left_child_idx] >= start_coord
+                ):
+                    stack.append((left_child_idx, level - 1, False))
+            elif node_idx < num_intervals and self.starts[node_idx] <= end_coord:
+                if self.ends[node_idx] >= start_coord:
+                    overlapping.append(self.items[node_idx])
+                stack.append((node_idx + (1 << (level - 1)), level - 1, False))
+        return overlapping
+
+    def find_overlapping_batch(
+        self, coords: NDArray[np.int64]
+    ) -> Tuple[NDArray[np.int64], NDArray[np.int64]]:
+        """Find every pair of a position and an interval covering it.
+
+        Returns:
+            the index in coords of the position and the index in items of the interval of each pair
+        """
+        order = np.argsort(coords, kind="stable")
+        sorted_coords = coords[order]
+        first_ranks = np.searchsorted(sorted_coords, self.starts, side="left")
+        num_covered = np.maximum(
+            np.searchsorted(sorted_coords, self.ends, side="right") - first_ranks, 0
+        )
+        interval_idxs = np.repeat(np.arange(len(self.starts)), num_covered)
+        ranks = (
+            np.arange(len(interval_idxs))
+            - np.repeat(np.cumsum(num_covered) - num_covered, num_covered)
+            + np.repeat(first_ranks, num_covered)
+        )
+        return order[ranks], interval_idxs
+
+
+class IntervalIndex(Generic[T]):
+    """Items located at ranges of coordinates across the chromosomes of a genome.
+
+    Finding the items that overlap a position or range takes O(log n + k)
+    time for n items on the chromosome and k overlapping items. Ranges are
+    inclusive of both ends, the same as GenomicCoordinates.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[str, int, int, T]]) -> None:
+        """Index some items.
+
+        Args:
+            intervals: the chromosome, start coordinate, end coordinate and item of each interval
+        """
+        intervals_by_chromosome: Dict[
+            str, Tuple[List[int], List[int], List[T]]
+        ] = defaultdict(lambda: (list(), list(), list()))
+        for chromosome, start_coord, end_coord, item in intervals:
+            starts, ends, items = intervals_by_chromosome[chromosome]
+            starts.append(start_coord)
+            ends.append(end_coord)
+            items.append(item)
+        self._intervals_by_chromosome = {
+            chromosome: _ChromosomeIntervals(starts, ends, items)
+            for chromosome, (starts, ends, items) in intervals_by_chromosome.items()
+        }
+
+    def __len__(self) -> int:
+        return sum(
+            len(chromosome_intervals.starts)
+            for chromosome_intervals in self._intervals_by_chromosome.values()
+        )
+
+    def find_overlapping(
+        self, chromosome: str, start_coord: int, end_coord: Optional[int] = None
+    ) -> List[T]:
+        """Find the items overlapping a position or range.
+
+        Args:
+            chromosome: the chromosome to search
+            start_coord: the first coordinate of the range
+            end_coord: the last coordinate of the range. Defaults to start_coord, to find the items covering a single position
+
+        Returns:
+            the overlapping items, in order of start coordinate
+        """
+        if end_coord is None:
+            end_coord = start_coord
+        if chromosome not in self._intervals_by_chromosome:
+            return list()
+        return self._intervals_by_chromosome[chromosome].find_overlapping(
+            start_coord, end_coord
+        )
+
+    def find_overlapping_batch(
+        self, chromosomes: Sequence[str], coords: Sequence[int]
+    ) -> List[List[T]]:
+        """Find the items covering each of many positions at once.
+
+        The positions on each chromosome are sorted and matched against all
+        of its intervals in a few vectorized passes, which is much faster
+        than searching for each position separately when there are
+        thousands of them.
+
+        Args:
+            chromosomes: the chromosome of each position
+            coords: the coordinate of each position
+
+        Returns:
+            the items covering each position, in order of start coordinate
+        """
+        overlapping: List[List[T]] = [list() for _ in coords]
+        all_coords = np.array(coords, dtype=np.int64)
+        all_chromosomes = np.array(chromosomes, dtype=object)
+        for chromosome in set(chromosomes):
+            if chromosome not in self._intervals_by_chromosome:
+                continue
+            chromosome_intervals = self._intervals_by_chromosome[chromosome]
+            query_idxs = np.flatnonzero(all_chromosomes == chromosome)
+            coord_idxs, interval_idxs = chromosome_intervals.find_overlapping_batch(
+                all_coords[query_idxs]
+            )
+            # the pairs are in order of interval, so the items of each position stay in order of start
+            for coord_idx, interval_idx in zip(
+                query_idxs[coord_idxs].tolist(), interval_idxs.tolist()
+            ):
+                overlapping[coord_idx].append(chromosome_intervals.items[interval_idx])
+        return overlapping
+
+
+@dataclass(frozen=True)
+class CutSiteAnnotation:
+    """The genes, isoforms and exons a cut site falls in."""
+
+    genes: Tuple[GeneCoordinates, ...]
+    isoforms: Tuple[GeneIsoformCoordinates, ...]
+    exons: Tuple[ExonCoordinates, ...]
+
+    @property
+    def is_exonic(self) -> bool:
+        return len(self.exons) > 0
+
+
+class GeneIndex:
+    """Interval indices of the genes, isoforms and exons of a genome.
+
+    Unlike create_dict_by_chromosome_from_genes, which only groups the
+    genes by chromosome, this finds the ones overlapping a position
+    without checking every gene on the chromosome.
+    """
+
+    def __init__(self, genes: Iterable[GeneCoordinates]) -> None:
+        genes = list(genes)
+        isoforms = [isoform for gene in genes for isoform in gene.get_isoforms()]
+        self.genes: IntervalIndex[GeneCoordinates] = IntervalIndex(
+            (gene.chromosome, gene.get_start_coord(), gene.get_end_coord(), gene)
+            for gene in genes
+        )
+        self.isoforms: IntervalIndex[GeneIsoformCoordinates] = IntervalIndex(
+            (
+                isoform.chromosome,
+                isoform.get_start_coord(),
+                isoform.get_end_coord(),
+                isoform,
+            )
+            for isoform in isoforms
+        )
+        self.exons: IntervalIndex[ExonCoordinates] = IntervalIndex(
+            (
+                exon.coordinates.chromosome,
+                exon.coordinates.start_coord,
+                exon.coordinates.end_coord,
+                exon,
+            )
+            for isoform in isoforms
+            for exon in isoform.get_all_exon_coordinates()
+        )
+
+    def annotate_cut_sites(
+        self, chromosomes: Sequence[str], cut_site_coords: Sequence[int]
+    ) -> List[CutSiteAnnotation]:
+        """Find the genes, isoforms and exons each cut site falls in.
+
+        Args:
+            chromosomes: the chromosome of each cut site
+            cut_site_coords: the coordinate of each cut site, such as CrisprAlignment.cut_site_coord
+
+        Returns:
+            the annotation of each cut site, in the same order
+        """
+        return [
+            CutSiteAnnotation(tuple(genes), tuple(isoforms), tuple(exons))
+            for genes, isoforms, exons in zip(
+                self.genes.find_overlapping_batch(chromosomes, cut_site_coords),
+                self.isoforms.find_overlapping_batch(chromosomes, cut_site_coords),
+                self.exons.find_overlapping_batch(chromosomes, cut_site_coords),
+            )
+        ]
+
+    def annotate_crispr_alignments(
+        self, crispr_alignments: Sequence[CrisprAlignment]
+    ) -> List[CutSiteAnnotation]:
+        """Annotate the cut site of each alignment."""
+        return self.annotate_cut_sites(
+            [
+                crispr_alignment.genomic_sequence.chromosome
+                for crispr_alignment in crispr_alignments
+            ],
+            [crispr_alignment.cut_site_coord for crispr_alignment in crispr_alignments],
+        )
@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""Finding off-target sites anywhere in a genome."""
+from dataclasses import dataclass
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from immutabledict import immutabledict
+import numpy as np
+from numpy.typing import NDArray
+
+from .crispr_target import ALIGNMENT_ENGINES
+from .crispr_target import CAS_SCORING_PROFILES
+from .crispr_target import CrisprTarget
+from .crispr_target import find_min_edit_distances
+from .exceptions import AlignmentEngineNotImplementedError
+from .scanning import scan_strand_windows
+from .scanning import ScanHit
+from .seed_index import reverse_complement_seed_codes
+from .seed_index import SEED_BASES
+from .seed_index import SeedIndex
+from .sequence_sources import SequenceSource
+from .sequence_views import SequenceView
+
+# the CRISPR bases that check_base_match treats as ambiguous
+_MATCHING_SEED_BASES = immutabledict({"N": SEED_BASES, "R": "AG"})
+WINDOWS_PER_ALIGNMENT_BATCH = 100_000
+MAX_SEED_NEIGHBORHOOD_SIZE = 10_000  # seeds with more substitutions than this are not considered, since encoding them takes too long
+
+
+@dataclass(frozen=True)
+class OffTargetSite(ScanHit):
+    """The best scoring alignment at a site found by find_off_target_sites."""
+
+    score: float
+
+
+def _find_seed_neighborhood(
+    crispr_segment: str, max_substitutions: int
+) -> NDArray[np.int64]:
+    """Encode every seed matching part of a CRISPR target with at most this many substitutions."""
+    substitutions_by_seed_code: Dict[int, int] = {0: 0}
+    for crispr_base in crispr_segment:
+        matching_bases = _MATCHING_SEED_BASES.get(crispr_base, crispr_base)
+        next_substitutions_by_seed_code: Dict[int, int] = dict()
+        for seed_code, num_substitutions in substitutions_by_seed_code.items():
+            for base_code, base in enumerate(SEED_BASES):
+                next_num_substitutions = num_substitutions + int(
+                    base not in matching_bases
+                )
+                if next_num_substitutions <= max_substitutions:
+                    next_substitutions_by_seed_code[
+                        (seed_code << 2) | base_code
+                    ] = next_num_substitutions
+        substitutions_by_seed_code = next_substitutions_by_seed_code
+    return np.array(sorted(substitutions_by_seed_code), dtype=np.int64)
+
+
+def _count_seed_neighborhood(crispr_segment: str, max_substitutions: int) -> int:
+    """Count the seeds _find_seed_neighborhood would encode, without encoding them."""
+    num_seeds_by_num_substitutions = [1] + [0] * max_substitutions
+    for crispr_base in crispr_segment:
+        matching_bases = _MATCHING_SEED_BASES.get(crispr_base, crispr_base)
+        num_matching_bases = sum(base in matching_bases for base in SEED_BASES)
+        num_seeds_by_num_substitutions = [
+            num_seeds * num_matching_bases
+            + (
+                num_seeds_by_num_substitutions[num_substitutions - 1]
+                * (len(SEED_BASES) - num_matching_bases)
+                if num_substitutions > 0
+                else 0
+            )
+            for num_substitutions, num_seeds in enumerate(
+                num_seeds_by_num_substitutions
+            )
+        ]
+    return sum(num_seeds_by_num_substitutions)
+
+
+def _find_max_seed_substitutions(
+    num_segments: int, allowed_mismatches: int, max_num_bulges: int
+) -> int:
+    """Find how many substitutions the best matching segment can have.
+
+    The mismatches of a site include its bulges, and each bulge is within
+    at most one segment. So if a site has B bulges, at least
+    num_segments - B segments have no bulge and share at most
+    allowed_mismatches - B substitutions, and one of them has no more than
+    their share.
+    """
+    return max(
+        (allowed_mismatches - num_bulges) // (num_segments - num_bulges)
+        for num_bulges in range(max_num_bulges + 1)
+    )
+
+
+def _extract_windows(
+    regions: Sequence[Tuple[int, str, NDArray[np.int64]]], window_length: int
+) -> NDArray[np.uint8]:
+    """Copy the bases of the windows of some regions into one array.
+
+    Args:
+        regions: the start, strand sequence and indices of the windows of each region
+
+    Returns:
+        the ASCII code of each base, with a row for each window
+    """
+    region_bases = np.frombuffer(
+        "".join(strand_seq for _, strand_seq, _ in regions).encode("ascii"),
+        dtype=np.uint8,
+    )
+    region_offsets = np.cumsum([0] + [len(strand_seq) for _, strand_seq, _ in regions])
+    window_starts = np.concatenate(
+        [
+            region_offset + window_idxs
+            for region_offset, (_, _, window_idxs) in zip(region_offsets, regions)
+        ]
+    )
+    windows: NDArray[np.uint8] = region_bases[
+        window_starts[:, np.newaxis] + np.arange(window_length)
+    ]
+    return windows
+
+
+def _choose_seeds(
+    crispr_target_seq: str,
+    seed_index: SeedIndex,
+    allowed_mismatches: int,
+    max_num_bulges: int,
+) -> List[Tuple[int, int, NDArray[np.int64]]]:
+    """Choose the seeds to look up so as few windows as possible are aligned.
+
+    Every way of splitting the CRISPR target into equal segments is
+    considered. Any stretch of a segment that is no longer than the
+    indexed seeds can be looked up for it, so the stretch whose seeds
+    occur the fewest times in the genome is picked for each segment, and
+    then the split with the fewest occurrences overall.
+
+    Returns:
+        the offset in the CRISPR target, the length and the codes of the seeds for each segment
+    """
+    best_seeds: List[Tuple[int, int, NDArray[np.int64]]] = list()
+    best_num_positions: Optional[int] = None
+    for num_segments in range(max_num_bulges + 1, len(crispr_target_seq) + 1):
+        max_substitutions = _find_max_seed_substitutions(
+            num_segments, allowed_mismatches, max_num_bulges
+        )
+        segment_length = len(crispr_target_seq) // num_segments
+        seed_length = min(segment_length, seed_index.seed_length)
+        seeds = list()
+        num_positions = 0
+        for segment_offset in range(0, num_segments * segment_length, segment_length):
+            best_segment_seed: Optional[Tuple[int, int, NDArray[np.int64]]] = None
+            best_segment_num_positions = 0
+            for seed_offset in range(
+                segment_offset, segment_offset + segment_length - seed_length + 1
+            ):
+                seed = crispr_target_seq[seed_offset : seed_offset + seed_length]
+                if (
+                    _count_seed_neighborhood(seed, max_substitutions)
+                    > MAX_SEED_NEIGHBORHOOD_SIZE
+                ):
+                    continue
+                seed_codes = _find_seed_neighborhood(seed, max_substitutions)
+                segment_num_positions = seed_index.count_seed_positions(
+                    seed_codes, seed_length
+                ) + seed_index.count_seed_positions(
+                    reverse_complement_seed_codes(seed_codes, seed_length), seed_length
+                )
+                if (
+                    best_segment_seed is None
+                    or segment_num_positions < best_segment_num_positions
+                ):
+                    best_segment_seed = (seed_offset, seed_length, seed_codes)
+                    best_segment_num_positions = segment_num_positions
+            if best_segment_seed is None:
+                break
+            seeds.append(best_segment_seed)
+            num_positions += best_segment_num_positions
+        else:
+            if best_num_positions is None or num_positions < best_num_positions:
+                best_seeds = seeds
+                best_num_positions = num_positions
+    if best_num_positions is None:
+        raise ValueError(
+            f"The {len(crispr_target_seq)} bases of the CRISPR target cannot be split into seeds that find every site with {allowed_mismatches} mismatches and {max_num_bulges} bulges. Allow fewer mismatches or bulges."
+        )
+    return best_seeds
+
+
+def find_off_target_sites(  # pylint:disable=too-many-arguments,too-many-locals
+    crispr_target: CrisprTarget,
+    seed_index: SeedIndex,
+    sequence_source: SequenceSource,
+    allowed_mismatches: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    engine: str = "recursive",
+    max_pam_misalignments: Optional[int] = None,
+    cas_variety: str = "Sa",
+) -> List[OffTargetSite]:
+    """Find every site in a genome that a CRISPR target aligns to.
+
+    The CRISPR target is split into segments. By the pigeonhole principle,
+    any site within the allowed mismatches and bulges matches one of the
+    segments with only a few substitutions and no bulges, so only the
+    windows around the occurrences of those seeds in the seed index are
+    aligned with the alignment engine. The result is the same as scanning
+    every window of both strands of the indexed chromosomes with
+    scan_chromosome_for_alignments, except for sites whose seeds are all
+    within seed_index.seed_length bases of a base other than A, C, G or T
+    or of the end of a chromosome, since those seeds are not indexed.
+
+    Args:
+        crispr_target: the CRISPR target to search for
+        seed_index: the index of the genome, built from the same sequence source
+        sequence_source: where to read the sequence around each seed occurrence from
+        allowed_mismatches: the maximum number of mismatches (including bulges)
+        allowed_total_bulges: the maximum number of RNA+DNA bulges
+        allowed_rna_bulges: the maximum number of RNA bulges
+        allowed_dna_bulges: the maximum number of DNA bulges
+        engine: which key of ALIGNMENT_ENGINES to use to align the windows around each seed occurrence
+        max_pam_misalignments: if provided, only the windows that could place the PAM on a stretch matching it with at most this many substitutions are aligned
+        cas_variety: which key of CAS_SCORING_PROFILES to score the alignments with
+
+    Returns:
+        the lowest scoring alignment at each site (the alignments on the same strand ending at the same 3' base), in order of score and then position
+    """
+    if engine not in ALIGNMENT_ENGINES:
+        raise AlignmentEngineNotImplementedError(engine)
+    find_alignments_in_window = ALIGNMENT_ENGINES[engine]
+    scoring_profile = CAS_SCORING_PROFILES[cas_variety]
+    crispr_target_seq = str(crispr_target.sequence)
+    window_length = len(crispr_target_seq) + allowed_dna_bulges
+    max_rna_bulge_shift = min(allowed_rna_bulges, allowed_total_bulges)
+    max_dna_bulge_shift = min(allowed_dna_bulges, allowed_total_bulges)
+    seeds = _choose_seeds(
+        crispr_target_seq,
+        seed_index,
+        allowed_mismatches,
+        min(
+            allowed_total_bulges,
+            max_rna_bulge_shift + max_dna_bulge_shift,
+            allowed_mismatches,
+        ),
+    )
+
+    # the positive strand position of the first base of each window that could hold a site
+    all_window_starts: Tuple[List[NDArray[np.int64]], List[NDArray[np.int64]]] = (
+        list(),
+        list(),
+    )
+    bulge_shifts = np.arange(-max_dna_bulge_shift, max_rna_bulge_shift + 1)
+    for seed_offset, seed_length, seed_codes in seeds:
+        positive_strand_positions = seed_index.find_seed_positions(
+            seed_codes, seed_length
+        )
+        all_window_starts[0].append(
+            (positive_strand_positions - seed_offset)[:, np.newaxis] + bulge_shifts
+        )
+        negative_strand_positions = seed_index.find_seed_positions(
+            reverse_complement_seed_codes(seed_codes, seed_length), seed_length
+        )
+        all_window_starts[1].append(
+            (negative_strand_positions + seed_length + seed_offset - window_length)[
+                :, np.newaxis
+            ]
+            - bulge_shifts
+        )
+
+    hits: List[ScanHit] = list()
+    allowed_bulges = (allowed_total_bulges, allowed_rna_bulges, allowed_dna_bulges)
+
+    def align_regions(
+        chromosome: str,
+        is_positive_strand: bool,
+        regions: List[Tuple[int, str, NDArray[np.int64]]],
+    ) -> None:
+        min_edit_distances = find_min_edit_distances(
+            crispr_target_seq,
+            _extract_windows(regions, window_length),
+            max_rna_bulge_shift,
+            max_dna_bulge_shift,
+        )
+        region_window_offsets = np.cumsum(
+            [0] + [len(window_idxs) for _, _, window_idxs in regions]
+        )
+        possible_site_window_idxs = np.flatnonzero(
+            min_edit_distances <= allowed_mismatches
+        )
+        # most regions hold no possible sites, so only visit the ones that do
+        for region_idx in np.unique(
+            np.searchsorted(
+                region_window_offsets, possible_site_window_idxs, side="right"
+            )
+            - 1
+        ).tolist():
+            region_start, strand_seq, window_idxs = regions[region_idx]
+            is_possible_site = (
+                min_edit_distances[
+                    region_window_offsets[region_idx] : region_window_offsets[
+                        region_idx + 1
+                    ]
+                ]
+                <= allowed_mismatches
+            )
+            hits.extend(
+                scan_strand_windows(
+                    crispr_target,
+                    find_alignments_in_window,
+                    chromosome,
+                    region_start + 1,
+                    is_positive_strand,
+                    strand_seq,
+                    window_idxs[is_possible_site].tolist(),
+                    allowed_mismatches,
+                    allowed_bulges,
+                    max_pam_misalignments,
+                )
+            )
+
+    for is_positive_strand, strand_window_starts in zip(
+        (True, False), all_window_starts
+    ):
+        genome_window_starts = np.unique(
+            np.concatenate(strand_window_starts, axis=None)
+        )
+        chromosome_idxs, window_starts = seed_index.locate(genome_window_starts)
+        for chromosome_idx, chromosome in enumerate(seed_index.chromosomes):
+            chromosome_window_starts = window_starts[
+                (chromosome_idxs == chromosome_idx)
+                & (window_starts >= 0)
+                & (
+                    window_starts
+                    <= seed_index.chromosome_sizes[chromosome_idx] - window_length
+                )
+            ]
+            if len(chromosome_window_starts) == 0:
+                continue
+            # windows close together are aligned from a single read of the sequence source
+            region_breaks = (
+                np.flatnonzero(np.diff(chromosome_window_starts) > window_length) + 1
+            )
+            regions: List[Tuple[int, str, NDArray[np.int64]]] = list()
+            num_windows_in_regions = 0
+            for region_window_starts in np.split(
+                chromosome_window_starts, region_breaks
+            ):
+                region_start = int(region_window_starts[0])
+                region_end = int(region_window_starts[-1]) + window_length
+                region_seq = sequence_source.fetch_sequence(
+                    chromosome, region_start + 1, region_end
+                ).upper()
+                if is_positive_strand:
+                    regions.append(
+                        (region_start, region_seq, region_window_starts - region_start)
+                    )
+                else:
+                    regions.append(
+                        (
+                            region_start,
+                            str(SequenceView.from_str(region_seq).reverse_complement()),
+                            (region_end - window_length - region_window_starts)[::-1],
+                        )
+                    )
+                num_windows_in_regions += len(region_window_starts)
+                if num_windows_in_regions >= WINDOWS_PER_ALIGNMENT_BATCH:
+                    align_regions(chromosome, is_positive_strand, regions)
+                    regions = list()
+                    num_windows_in_regions = 0
+            if regions:
+                align_regions(chromosome, is_positive_strand, regions)
+
+    scores = scoring_profile.score_alignments(
+        [(hit.crispr_alignment, "", hit.genome_alignment) for hit in hits]
+    )
+    best_hit_idx_by_site: Dict[Tuple[str, bool, int], int] = dict()
+    for hit_idx, hit in enumerate(hits):
+        site = (
+            hit.chromosome,
+            hit.is_positive_strand,
+            hit.end_coord if hit.is_positive_strand else hit.start_coord,
+        )
+        best_hit_idx = best_hit_idx_by_site.get(site)
+        if best_hit_idx is None or scores[hit_idx] < scores[best_hit_idx]:
+            best_hit_idx_by_site[site] = hit_idx
+    chromosome_order = {
+        chromosome: chromosome_idx
+        for chromosome_idx, chromosome in enumerate(seed_index.chromosomes)
+    }
+    sites = [
+        OffTargetSite(
+            hits[hit_idx].chromosome,
+            hits[hit_idx].start_coord,
+            hits[hit_idx].end_coord,
+            hits[hit_idx].is_positive_strand,
+            hits[hit_idx].crispr_alignment,
+            hits[hit_idx].genome_alignment,
+            float(scores[hit_idx]),
+        )
+        for hit_idx in best_hit_idx_by_site.values()
+    ]
+    return sorted(
+        sites,
+        key=lambda site: (
+            site.score,
+            chromosome_order[site.chromosome],
+            site.start_coord,
+            not site.is_positive_strand,
+        ),
+    )
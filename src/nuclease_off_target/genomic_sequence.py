@@ -1,30 +1,60 @@
 # -*- coding: utf-8 -*-
 """Genomic sequences."""
+from array import array
+import asyncio
 from collections import defaultdict
-import csv
 from dataclasses import dataclass
 import datetime
+import functools
+import gzip
+import itertools
+import os
 import re
+import sys
+import threading
 import time
 from typing import Any
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
 from typing import Sequence
 from typing import Set
+from typing import Tuple
 from typing import Union
 
 from Bio.Seq import Seq
-from bs4 import BeautifulSoup
 from immutable_data_validation import validate_int
 from immutable_data_validation import validate_str
 import requests
+import requests.adapters
 
+from .constants import DEFAULT_BULK_FETCH_MAX_GAP
+from .constants import REFSEQ_CHROMOSOME_COLUMN
+from .constants import REFSEQ_GENE_NAME_COLUMN
 from .constants import SECONDS_BETWEEN_UCSC_REQUESTS
+from .constants import UCSC_BROWSER_URL
+from .constants import UCSC_REQUEST_TIMEOUT_SECONDS
+from .constants import UCSC_SESSION_POOL_MAX_SIZE
 from .exceptions import DnaRequestGenomeMismatchError
 from .exceptions import IsoformInDifferentChromosomeError
 from .exceptions import IsoformInDifferentStrandError
+from .exceptions import UcscResponseMissingSequenceError
+from .exceptions import UcscTemporarilyUnavailableError
 from .exceptions import UrlNotImplementedForGenomeError
+from .packed_sequence import PackedSequence
+from .rate_limiting import get_ucsc_rate_limiter
+from .rate_limiting import TokenBucketRateLimiter
+from .retries import get_ucsc_retry_policy
+from .retries import parse_retry_after_header
+from .retries import record_ucsc_request_statistics
+from .retries import RetryPolicy
+from .sequence_cache import get_default_sequence_cache
+from .sequence_cache import SequenceCache
+from .sequence_sources import SEQUENCE_SOURCES
+from .sequence_sources import SequenceSource
+from .sequence_views import SequenceView
 
 time_of_last_request_to_ucsc_browser = datetime.datetime(
     year=2019, month=1, day=1
@@ -43,7 +73,36 @@ def set_time_of_last_request_to_ucsc_browser(  # pylint:disable=invalid-name # E
     time_of_last_request_to_ucsc_browser = new_time
 
 
-GENOME_BUILD_IN_RESPONSE_HEADER_REGEX = re.compile(r"\&gt\;(\w+)\_")
+ucsc_browser_url = UCSC_BROWSER_URL  # pylint:disable=invalid-name # this is a global singleton that is deliberately reassigned
+
+
+def get_ucsc_browser_url() -> str:
+    return ucsc_browser_url
+
+
+def set_ucsc_browser_url(new_url: str) -> None:
+    """Send requests for the UCSC Browser somewhere else.
+
+    Useful for pointing at a mirror, or at a LocalUcscServer for testing
+    and benchmarking without network access.
+    """
+    global ucsc_browser_url  # pylint:disable=global-statement,invalid-name # this is a deliberate use to set up a global singleton
+    ucsc_browser_url = new_url.rstrip("/")
+
+
+# the > starting the FASTA header is HTML-escaped in some responses
+GENOME_BUILD_IN_RESPONSE_HEADER_REGEX = re.compile(r"(?:>|\&gt\;)(\w+)\_")
+# pages that say this instead of holding a sequence mean the browser is throttling requests
+UCSC_THROTTLE_PAGE_REGEX = re.compile(r"too many requests|slowed down", re.IGNORECASE)
+
+_UCSC_SESSIONS_BY_PROCESS_ID: Dict[int, requests.Session] = dict()
+_UCSC_REQUEST_LOCK = threading.Lock()
+_RETRYABLE_UCSC_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    UcscTemporarilyUnavailableError,
+)
 
 
 def _extract_genome_build_from_ucsc_response_header_line(  # pylint:disable=invalid-name # Eli (12/27/20): I know this is long, not sure how to shorten it
@@ -57,43 +116,267 @@ def _extract_genome_build_from_ucsc_response_header_line(  # pylint:disable=inva
     return match[1]
 
 
-def request_sequence_from_ucsc(url: str, expected_genome: str) -> str:
-    """Request DNA sequence from UCSC Genome Browser."""
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    pre_dom_elements = soup.find_all(
-        "pre"
-    )  # the genomic text is contained within a <pre> tag
-    sequence_element = pre_dom_elements[0]
-    sequence_element_lines = str(sequence_element).split("\n")
-    sequence_info_line = sequence_element_lines[1]
+def get_ucsc_session() -> requests.Session:
+    """Get the HTTP session for requests to the UCSC Browser.
+
+    The session keeps a pool of connections alive between requests. Each
+    process gets its own, since connections cannot be shared across a
+    fork.
+    """
+    process_id = os.getpid()
+    if process_id not in _UCSC_SESSIONS_BY_PROCESS_ID:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=UCSC_SESSION_POOL_MAX_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _UCSC_SESSIONS_BY_PROCESS_ID[process_id] = session
+    return _UCSC_SESSIONS_BY_PROCESS_ID[process_id]
+
+
+def _parse_ucsc_dna_response_lines(
+    lines: Iterator[str], status_code: int
+) -> Tuple[str, str]:
+    """Extract the header line and sequence from the first <pre> block.
+
+    Lines are consumed only up to the closing tag. A page without a <pre>
+    block that says requests are being throttled raises
+    UcscTemporarilyUnavailableError, so it can be tried again later.
+    """
+    is_throttle_page = False
+    for line in lines:
+        tag_idx = line.lower().find("<pre>")
+        if tag_idx != -1:
+            text_after_tag = line[tag_idx + len("<pre>") :]
+            break
+        if UCSC_THROTTLE_PAGE_REGEX.search(line) is not None:
+            is_throttle_page = True
+    else:
+        if is_throttle_page:
+            raise UcscTemporarilyUnavailableError(status_code)
+        raise UcscResponseMissingSequenceError(
+            "No <pre> block was found in the response"
+        )
+    header_line: Optional[str] = None
+    lines_of_sequence: List[str] = list()
+    for line in itertools.chain([text_after_tag], lines):
+        tag_idx = line.lower().find("</pre>")
+        text = (line if tag_idx == -1 else line[:tag_idx]).strip()
+        if text:
+            if header_line is None:
+                header_line = text
+            else:
+                lines_of_sequence.append(text)
+        if tag_idx != -1:
+            break
+    if header_line is None:
+        raise UcscResponseMissingSequenceError(
+            "The <pre> block in the response was empty"
+        )
+    return header_line, "".join(lines_of_sequence)
+
+
+def _request_ucsc_dna_page(url: str) -> Tuple[str, str]:
+    with get_ucsc_session().get(
+        url, stream=True, timeout=UCSC_REQUEST_TIMEOUT_SECONDS
+    ) as response:
+        record_ucsc_request_statistics(requests=1)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise UcscTemporarilyUnavailableError(
+                response.status_code,
+                retry_after_seconds=parse_retry_after_header(
+                    response.headers.get("Retry-After")
+                ),
+            )
+        response.raise_for_status()
+        bytes_received = 0
+
+        def decode_lines() -> Iterator[str]:
+            nonlocal bytes_received
+            for line in response.iter_lines():
+                bytes_received += len(line) + 1  # the newline is stripped
+                yield line.decode("utf-8") if isinstance(line, bytes) else line
+
+        lines = decode_lines()
+        try:
+            sequence_info_line, sequence = _parse_ucsc_dna_response_lines(
+                lines, response.status_code
+            )
+            # reading the rest of the page lets the connection go back to the pool instead of being closed
+            for _ in lines:
+                pass
+        finally:
+            record_ucsc_request_statistics(bytes_received=bytes_received)
+    return sequence_info_line, sequence
+
+
+def request_sequence_from_ucsc(
+    url: str,
+    expected_genome: str,
+    retry_policy: Optional[RetryPolicy] = None,
+    rate_limiter: Optional[TokenBucketRateLimiter] = None,
+) -> str:
+    """Request DNA sequence from UCSC Genome Browser.
+
+    The response is streamed and parsed line by line, so even
+    multi-megabase sequences never need the whole page in memory at once.
+
+    Connection problems, throttling (429 or a throttle page) and server
+    errors (5xx) are retried according to the retry_policy, or the one set
+    with set_ucsc_retry_policy. Other pages without a sequence are not.
+
+    The caller waits for the rate limit before the first attempt. Each
+    retry then waits for the rate_limiter too, or without one waits at
+    least SECONDS_BETWEEN_UCSC_REQUESTS.
+    """
+    if retry_policy is None:
+        retry_policy = get_ucsc_retry_policy()
+    retry_idx = 0
+    while True:
+        try:
+            sequence_info_line, sequence = _request_ucsc_dna_page(url)
+            break
+        except _RETRYABLE_UCSC_ERRORS as error:
+            if retry_idx >= retry_policy.max_retries:
+                raise
+            minimum_seconds = (
+                0.0 if rate_limiter is not None else SECONDS_BETWEEN_UCSC_REQUESTS
+            )
+            if isinstance(error, UcscTemporarilyUnavailableError):
+                minimum_seconds = max(minimum_seconds, error.retry_after_seconds)
+            backoff_seconds = retry_policy.get_backoff_seconds(
+                retry_idx, minimum_seconds=minimum_seconds
+            )
+            record_ucsc_request_statistics(retries=1, seconds_waited=backoff_seconds)
+            time.sleep(backoff_seconds)
+            if rate_limiter is not None:
+                record_ucsc_request_statistics(seconds_waited=rate_limiter.acquire())
+            retry_idx += 1
     actual_genome = _extract_genome_build_from_ucsc_response_header_line(
         sequence_info_line
     )
     if actual_genome != expected_genome:
         raise DnaRequestGenomeMismatchError(actual_genome, expected_genome)
-    lines_of_sequence = sequence_element_lines[2:-1]
-    return "".join(lines_of_sequence)
+    return sequence
+
+
+def _get_ucsc_dna_url(
+    genome: str,
+    chromosome: str,
+    start_coord: int,
+    end_coord: int,
+    is_positive_strand: bool,
+) -> str:
+    if genome in ["hg19", "hg38"]:
+        session_id = "909569459_N8as0yXh8yH3IXZZJcwFBa5u6it3"
+    elif genome == "rheMac10":
+        session_id = "984495847_dAhfBDjxXdqsabeD2KSx3Tv3LPzC"
+    else:
+        raise UrlNotImplementedForGenomeError(genome)
+    return f"{get_ucsc_browser_url()}/cgi-bin/hgc?hgsid={session_id}&g=htcGetDna2&table=&i=mixed&getDnaPos={chromosome}%3A{start_coord}-{end_coord}&db={genome}&hgSeq.cdsExon=1&hgSeq.padding5=0&hgSeq.padding3=0&hgSeq.casing=upper&boolshad.hgSeq.maskRepeats=0&hgSeq.repMasking=lower{'' if is_positive_strand else '&hgSeq.revComp=on'}&boolshad.hgSeq.revComp=1&submit=get+DNA"
 
 
-@dataclass
-class GenomicCoordinates:
+def _request_sequence_with_delay(
+    genome: str,
+    chromosome: str,
+    start_coord: int,
+    end_coord: int,
+    is_positive_strand: bool,
+    rate_limiter: Optional[TokenBucketRateLimiter] = None,
+) -> str:
+    url = _get_ucsc_dna_url(
+        genome, chromosome, start_coord, end_coord, is_positive_strand
+    )
+    if rate_limiter is None:
+        rate_limiter = get_ucsc_rate_limiter()
+    if rate_limiter is not None:
+        record_ucsc_request_statistics(seconds_waited=rate_limiter.acquire())
+        return request_sequence_from_ucsc(url, genome, rate_limiter=rate_limiter)
+    # without a limiter, requests are made one at a time so that concurrent threads can't both read the same time of the last request
+    with _UCSC_REQUEST_LOCK:
+        seconds_since_last_call = (
+            datetime.datetime.utcnow() - get_time_of_last_request_to_ucsc_browser()
+        ).total_seconds()
+        seconds_to_wait = SECONDS_BETWEEN_UCSC_REQUESTS - seconds_since_last_call
+        if seconds_to_wait > 0:
+            time.sleep(seconds_to_wait)
+            record_ucsc_request_statistics(seconds_waited=seconds_to_wait)
+        try:
+            return request_sequence_from_ucsc(url, genome)
+        finally:
+            # failed requests count against the spacing too
+            set_time_of_last_request_to_ucsc_browser(datetime.datetime.utcnow())
+
+
+def merge_nearby_ranges(
+    ranges: Sequence[Tuple[int, int]], max_gap: int
+) -> List[Tuple[int, int, List[int]]]:
+    """Merge ranges that overlap or are separated by at most max_gap bases.
+
+    Args:
+        ranges: (start_coord, end_coord) of each range, inclusive of both ends
+        max_gap: the largest number of bases between two ranges that still get merged
+
+    Returns:
+        (start_coord, end_coord, indices of the merged ranges) of each merged range, sorted by start_coord
+    """
+    merged_ranges: List[Tuple[int, int, List[int]]] = list()
+    for idx in sorted(range(len(ranges)), key=lambda idx: ranges[idx]):
+        start_coord, end_coord = ranges[idx]
+        if merged_ranges and start_coord - merged_ranges[-1][1] - 1 <= max_gap:
+            merged_start_coord, merged_end_coord, idxs = merged_ranges[-1]
+            idxs.append(idx)
+            merged_ranges[-1] = (
+                merged_start_coord,
+                max(merged_end_coord, end_coord),
+                idxs,
+            )
+            continue
+        merged_ranges.append((start_coord, end_coord, [idx]))
+    return merged_ranges
+
+
+class _FrozenSlots:  # pylint:disable=too-few-public-methods
+    """Let frozen dataclasses with __slots__ be pickled and copied."""
+
+    __slots__: Tuple[str, ...] = ()
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # the default restores each slot with setattr, which frozen dataclasses forbid
+        return (
+            self.__class__,
+            tuple(getattr(self, name) for name in self.__slots__),
+        )
+
+
+@dataclass(frozen=True)
+class GenomicCoordinates(_FrozenSlots):
     """Coordinates representing a sequence stretch in a genome.
 
     Start coordinate should always be a lower value than the end
     coordinate.
+
+    The genome and chromosome strings are interned, so the millions of
+    coordinates in a gene model share a single copy of each.
     """
 
+    __slots__ = ("genome", "chromosome", "start_coord", "end_coord")
+
     genome: str
     chromosome: str
     start_coord: int
     end_coord: int
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "genome", sys.intern(self.genome))
+        object.__setattr__(self, "chromosome", sys.intern(self.chromosome))
 
-@dataclass
-class ExonCoordinates:
+
+@dataclass(frozen=True)
+class ExonCoordinates(_FrozenSlots):
     """Coordinates representing an exon."""
 
+    __slots__ = ("coordinates", "is_positive_strand")
+
     coordinates: GenomicCoordinates
     is_positive_strand: bool
 
@@ -112,17 +395,66 @@ class ExonCoordinates:
 
 
 class GeneIsoformCoordinates:
-    """Coordinates for a specific isoform of a gene."""
+    """Coordinates for a specific isoform of a gene.
+
+    The exon bounds are kept in a single array of 64-bit integers rather
+    than as ExonCoordinates objects, which get_all_exon_coordinates creates
+    when asked for. The start and end of the whole isoform are found once,
+    when the bounds are set.
+    """
+
+    __slots__ = (
+        "is_positive_strand",
+        "genome",
+        "chromosome",
+        "_exon_bounds",
+        "_start_coord",
+        "_end_coord",
+    )
 
     def __init__(self, all_exon_coordinates: Sequence[ExonCoordinates]) -> None:
-        self._exon_coordinates = all_exon_coordinates
-        self.is_positive_strand = all_exon_coordinates[0].is_positive_strand
-        self.genome = all_exon_coordinates[0].coordinates.genome
-        self.chromosome = all_exon_coordinates[0].coordinates.chromosome
+        first_exon_coordinates = all_exon_coordinates[0].coordinates
+        self._set_exon_bounds(
+            first_exon_coordinates.genome,
+            first_exon_coordinates.chromosome,
+            all_exon_coordinates[0].is_positive_strand,
+            (exon.coordinates.start_coord for exon in all_exon_coordinates),
+            (exon.coordinates.end_coord for exon in all_exon_coordinates),
+        )
 
-        self._start_coord: int
-        self._end_coord: int
-        self._calculate_coordinates_from_exons()
+    def _set_exon_bounds(  # pylint:disable=too-many-arguments
+        self,
+        genome: str,
+        chromosome: str,
+        is_positive_strand: bool,
+        exon_starts: Iterable[int],
+        exon_ends: Iterable[int],
+    ) -> None:
+        self.is_positive_strand = is_positive_strand
+        self.genome = sys.intern(genome)
+        self.chromosome = sys.intern(chromosome)
+        # the start and end of each exon, one after the other. Built from a list so the array is allocated at its exact size.
+        self._exon_bounds = array(
+            "q", list(itertools.chain.from_iterable(zip(exon_starts, exon_ends)))
+        )
+        self._start_coord = min(self._exon_bounds[::2])
+        self._end_coord = max(self._exon_bounds[1::2])
+
+    @classmethod
+    def from_exon_bounds(  # pylint:disable=too-many-arguments
+        cls,
+        genome: str,
+        chromosome: str,
+        is_positive_strand: bool,
+        exon_starts: Iterable[int],
+        exon_ends: Iterable[int],
+    ) -> "GeneIsoformCoordinates":
+        """Create an instance without creating an ExonCoordinates for each exon."""
+        isoform = cls.__new__(cls)
+        isoform._set_exon_bounds(
+            genome, chromosome, is_positive_strand, exon_starts, exon_ends
+        )
+        return isoform
 
     @classmethod
     def from_ucsc_refseq_table_row(
@@ -133,36 +465,34 @@ class GeneIsoformCoordinates:
         Intended to be used on data gathered from the USCS Genome Table Browser using the "RefSeq All (ncbiRefSeq)" table under Track "NCBI RefSeq"
         Example (hg19):   https://genome.ucsc.edu/cgi-bin/hgTables?hgsid=923625121_aiwBounEVv5j3SwEeuFGRaRYYCOu&clade=mammal&org=&db=hg19&hgta_group=genes&hgta_track=refSeqComposite&hgta_table=ncbiRefSeq&hgta_regionType=genome&position=&hgta_outputType=primaryTable&hgta_outFileName=
         """
-        all_exons: List[ExonCoordinates] = list()
         num_exons = validate_int(table_row[8])
         exon_starts = validate_str(table_row[9]).split(",")
         exon_ends = validate_str(table_row[10]).split(",")
         is_positive_strand = table_row[3] == "+"
         chromosome = validate_str(table_row[2])
-        for exon_idx in range(num_exons):
-            start_coord = validate_int(exon_starts[exon_idx])
-            end_coord = validate_int(exon_ends[exon_idx])
-            all_exons.append(
-                ExonCoordinates.from_coordinate_info(
-                    genome, chromosome, start_coord, end_coord, is_positive_strand
-                )
-            )
-        return cls(all_exons)
-
-    def _calculate_coordinates_from_exons(self) -> None:
-        """Help init calculate internal attributes."""
-        self._start_coord = 10 ** 12  # way larger than any chromosome coordinate
-        self._end_coord = 0
-        for iter_exon_coords in self._exon_coordinates:
-            iter_exon_start = iter_exon_coords.coordinates.start_coord
-            iter_exon_end = iter_exon_coords.coordinates.end_coord
-            if iter_exon_start < self._start_coord:
-                self._start_coord = iter_exon_start
-            if iter_exon_end > self._end_coord:
-                self._end_coord = iter_exon_end
+        return cls.from_exon_bounds(
+            genome,
+            chromosome,
+            is_positive_strand,
+            (validate_int(exon_starts[exon_idx]) for exon_idx in range(num_exons)),
+            (validate_int(exon_ends[exon_idx]) for exon_idx in range(num_exons)),
+        )
 
     def get_all_exon_coordinates(self) -> Sequence[ExonCoordinates]:
-        return self._exon_coordinates
+        return tuple(
+            ExonCoordinates.from_coordinate_info(
+                self.genome,
+                self.chromosome,
+                start_coord,
+                end_coord,
+                self.is_positive_strand,
+            )
+            for start_coord, end_coord in zip(*self.get_exon_bounds())
+        )
+
+    def get_exon_bounds(self) -> Tuple[Sequence[int], Sequence[int]]:
+        """Get the start and end coordinates of the exons, without creating objects for them."""
+        return self._exon_bounds[::2], self._exon_bounds[1::2]
 
     def get_start_coord(self) -> int:
         return self._start_coord
@@ -174,6 +504,16 @@ class GeneIsoformCoordinates:
 class GeneCoordinates:
     """Coordinates representing a gene with potentially several isoforms."""
 
+    __slots__ = (
+        "name",
+        "is_positive_strand",
+        "genome",
+        "chromosome",
+        "_isoforms",
+        "_end_coord",
+        "_start_coord",
+    )
+
     def __init__(self, name: str, an_isoform: GeneIsoformCoordinates) -> None:
         self.name = name
         self.is_positive_strand = an_isoform.is_positive_strand
@@ -225,6 +565,103 @@ class GeneCoordinates:
         return self._end_coord
 
 
+def iter_ucsc_refseq_table_rows(
+    filepath: str, only_include_chromosomes: Optional[Iterable[str]] = None
+) -> Iterator[List[str]]:
+    """Read the rows of a table from the UCSC Genome browser one at a time.
+
+    Files ending in .gz are decompressed as they are read. Rows on other
+    chromosomes are skipped after reading only their chromosome column,
+    before the rest of the row is split up.
+
+    Args:
+        filepath: the full path of the file to open to parse
+        only_include_chromosomes: the chromosomes to include. Defaults to every chromosome
+
+    Yields:
+        the fields of each row after the header row
+    """
+    included_chromosomes = (
+        None if only_include_chromosomes is None else set(only_include_chromosomes)
+    )
+    with (
+        gzip.open(filepath, "rt", newline="")
+        if filepath.endswith(".gz")
+        else open(filepath, newline="")
+    ) as in_file:
+        next(in_file, None)  # skip header row
+        for line in in_file:
+            if included_chromosomes is not None:
+                chromosome = line.split("\t", REFSEQ_CHROMOSOME_COLUMN + 1)[
+                    REFSEQ_CHROMOSOME_COLUMN
+                ]
+                if chromosome not in included_chromosomes:
+                    continue
+            yield line.rstrip("\r\n").split("\t")
+
+
+def iter_ucsc_refseq_table_isoforms(
+    genome: str, filepath: str, only_include_chromosomes: Optional[Iterable[str]] = None
+) -> Iterator[Tuple[str, GeneIsoformCoordinates]]:
+    """Parse the isoforms of a table from the UCSC Genome browser as it is read.
+
+    Args:
+        genome: the genome build, e.g. hg38
+        filepath: the full path of the file to open to parse. It may be compressed with gzip
+        only_include_chromosomes: the chromosomes to include. Defaults to every chromosome
+
+    Yields:
+        the name of the gene and the coordinates of each isoform, in the order of the table
+    """
+    for row in iter_ucsc_refseq_table_rows(filepath, only_include_chromosomes):
+        gene_name = validate_str(row[REFSEQ_GENE_NAME_COLUMN])
+        yield gene_name, GeneIsoformCoordinates.from_ucsc_refseq_table_row(genome, row)
+
+
+def iter_ucsc_refseq_table_genes(
+    genome: str, filepath: str, only_include_chromosomes: Optional[Iterable[str]] = None
+) -> Iterator[GeneCoordinates]:
+    """Parse the genes of a table from the UCSC Genome browser as it is read.
+
+    Only the genes of the chromosome being read are held at a time, which
+    needs the rows of each chromosome to be together, as they are in the
+    tables from the UCSC Genome browser. A gene with isoforms on more than
+    one chromosome is yielded once for each of them.
+
+    Args:
+        genome: the genome build, e.g. hg38
+        filepath: the full path of the file to open to parse. It may be compressed with gzip
+        only_include_chromosomes: the chromosomes to include. Defaults to every chromosome
+
+    Yields:
+        each gene once all of its isoforms are read, in order of their first row within each chromosome
+
+    Raises:
+        ValueError: if the rows of a chromosome are not all together
+    """
+    genes: Dict[str, GeneCoordinates] = dict()
+    chromosome: Optional[str] = None
+    finished_chromosomes: Set[str] = set()
+    for gene_name, isoform in iter_ucsc_refseq_table_isoforms(
+        genome, filepath, only_include_chromosomes
+    ):
+        if isoform.chromosome != chromosome:
+            if isoform.chromosome in finished_chromosomes:
+                raise ValueError(
+                    f"The rows of {filepath} for {isoform.chromosome} are not all together, so its genes cannot be yielded as it is read. Use iter_ucsc_refseq_table_isoforms instead."
+                )
+            if chromosome is not None:
+                finished_chromosomes.add(chromosome)
+            yield from genes.values()
+            genes = dict()
+            chromosome = isoform.chromosome
+        if gene_name in genes:
+            genes[gene_name].add_isoform(isoform)
+        else:
+            genes[gene_name] = GeneCoordinates(gene_name, isoform)
+    yield from genes.values()
+
+
 def parse_ucsc_refseq_table_into_gene_coordinates(  # pylint:disable=invalid-name # Eli (10/19/20): I know this is a long name
     genome: str, filepath: str, only_include_chromosomes: Optional[Sequence[str]] = None
 ) -> Dict[str, GeneCoordinates]:
@@ -235,29 +672,21 @@ def parse_ucsc_refseq_table_into_gene_coordinates(  # pylint:disable=invalid-nam
 
     Args:
         genome: the genome build, e.g. hg38
-        filepath: the full path of the file to open to parse
+        filepath: the full path of the file to open to parse. It may be compressed with gzip
         only_include_chromosomes: a list of chromosomes to include. A typical use case for this is only including the "regular" numbered chromosomes, to exclude things like chr6_apd_hap1. This may make cross-referencing another database (like TSGene) easier
 
     Returns: a dictionary with the name of the gene as the key and the GeneCoordinates as the value
+
+    To load a whole genome's table quickly, use RefSeqTable.from_ucsc_refseq_table instead, which only creates the GeneCoordinates that are looked up. To process the genes without holding all of them, use iter_ucsc_refseq_table_genes.
     """
     dict_of_genes: Dict[str, GeneCoordinates] = dict()
-    with open(filepath, newline="") as csvfile:
-        the_reader = csv.reader(csvfile, delimiter="\t")
-        for row_idx, row in enumerate(the_reader):
-            if row_idx == 0:
-                continue  # skip header row
-            iter_isoform = GeneIsoformCoordinates.from_ucsc_refseq_table_row(
-                genome, row
-            )
-            if only_include_chromosomes is not None:
-                if iter_isoform.chromosome not in only_include_chromosomes:
-                    continue
-            gene_name = validate_str(row[12])
-            iter_gene = GeneCoordinates(gene_name, iter_isoform)
-            if gene_name not in dict_of_genes:
-                dict_of_genes[gene_name] = iter_gene
-            else:
-                dict_of_genes[gene_name].add_isoform(iter_isoform)
+    for gene_name, iter_isoform in iter_ucsc_refseq_table_isoforms(
+        genome, filepath, only_include_chromosomes
+    ):
+        if gene_name not in dict_of_genes:
+            dict_of_genes[gene_name] = GeneCoordinates(gene_name, iter_isoform)
+        else:
+            dict_of_genes[gene_name].add_isoform(iter_isoform)
     return dict_of_genes
 
 
@@ -272,7 +701,16 @@ def create_dict_by_chromosome_from_genes(
 
 
 class GenomicSequence:
-    """Basic definition of a genomic sequence."""
+    """Basic definition of a genomic sequence.
+
+    The bases are held in a SequenceView, so reverse complements and trims
+    share them instead of copying. The sequence attribute copies them out
+    the first time it is used.
+
+    The sequence can also be given as a PackedSequence to hold it in a
+    quarter of the memory. The sequence attribute of a packed instance is
+    decoded each time it is used rather than kept.
+    """
 
     def __init__(
         self,
@@ -280,26 +718,65 @@ class GenomicSequence:
         chromosome: str,
         start_coord: int,
         is_positive_strand: bool,
-        sequence: str,
+        sequence: Union[str, SequenceView],
     ) -> None:
         self.genome = genome
         self.chromosome = chromosome
         self.start_coord = start_coord
         self.is_positive_strand = is_positive_strand
-        self.sequence = Seq(sequence)
-        self.end_coord = self.start_coord + len(self.sequence) - 1
+        self.sequence_view = (
+            sequence
+            if isinstance(sequence, SequenceView)
+            else SequenceView.from_str(str(sequence))
+        )
+        self._sequence: Optional[Seq] = None
+        self.end_coord = self.start_coord + len(sequence) - 1
+
+    @property
+    def sequence(self) -> Seq:
+        if isinstance(self.sequence_view, PackedSequence):
+            return Seq(str(self.sequence_view))
+        if self._sequence is None:
+            self._sequence = Seq(str(self.sequence_view))
+        return self._sequence
+
+    @property
+    def packed_sequence(self) -> Optional[PackedSequence]:
+        if isinstance(self.sequence_view, PackedSequence):
+            return self.sequence_view
+        return None
+
+    def create_packed(self) -> "GenomicSequence":
+        """Create an instance holding the sequence packed 4 bases to a byte."""
+        cls = self.__class__
+        if self.packed_sequence is not None:
+            return self
+        return cls(
+            self.genome,
+            self.chromosome,
+            self.start_coord,
+            self.is_positive_strand,
+            PackedSequence.from_str(str(self.sequence_view)),
+        )
 
     def create_reverse_complement(self) -> "GenomicSequence":
+        """Create an instance for the opposite strand of the same range."""
         cls = self.__class__
         new_sequence = cls(
             self.genome,
             self.chromosome,
             self.start_coord,
             not self.is_positive_strand,
-            str(self.sequence.reverse_complement()),
+            self.sequence_view.reverse_complement(),
         )
         return new_sequence
 
+    def _get_sequence_between(
+        self, start: Optional[int], end: Optional[int]
+    ) -> SequenceView:
+        start, end, _ = slice(start, end).indices(len(self.sequence_view))
+        return self.sequence_view.subsequence(start, end)
+
     def create_three_prime_trim(self, num_bases_to_trim: int) -> "GenomicSequence":
         """Create an instance with some 3' bases trimmed from the sequence."""
         cls = self.__class__
@@ -309,7 +786,7 @@ class GenomicSequence:
                 self.chromosome,
                 self.start_coord,
                 self.is_positive_strand,
-                str(self.sequence)[:-num_bases_to_trim],
+                self._get_sequence_between(None, -num_bases_to_trim),
             )
             return new_sequence
         new_sequence = cls(
@@ -317,7 +794,7 @@ class GenomicSequence:
             self.chromosome,
             self.start_coord + num_bases_to_trim,
             self.is_positive_strand,
-            str(self.sequence)[:-num_bases_to_trim],
+            self._get_sequence_between(None, -num_bases_to_trim),
         )
         return new_sequence
 
@@ -330,7 +807,7 @@ class GenomicSequence:
                 self.chromosome,
                 self.start_coord + num_bases_to_trim,
                 self.is_positive_strand,
-                str(self.sequence)[num_bases_to_trim:],
+                self._get_sequence_between(num_bases_to_trim, None),
             )
             return new_sequence
         new_sequence = cls(
@@ -338,7 +815,7 @@ class GenomicSequence:
             self.chromosome,
             self.start_coord,
             self.is_positive_strand,
-            str(self.sequence)[num_bases_to_trim:],
+            self._get_sequence_between(num_bases_to_trim, None),
         )
         return new_sequence
 
@@ -350,24 +827,223 @@ class GenomicSequence:
         start_coord: int,
         end_coord: int,
         is_positive_strand: bool,
+        sequence_source: Optional[SequenceSource] = None,
+        sequence_cache: Optional[SequenceCache] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
     ) -> "GenomicSequence":
-        """Create a GenomicSequence from the UCSC Browser."""
-        seconds_since_last_call = (
-            datetime.datetime.utcnow() - get_time_of_last_request_to_ucsc_browser()
-        ).total_seconds()
-        seconds_to_wait = SECONDS_BETWEEN_UCSC_REQUESTS - seconds_since_last_call
-        if seconds_to_wait > 0:
-            time.sleep(seconds_to_wait)
-        if genome in ["hg19", "hg38"]:
-            session_id = "909569459_N8as0yXh8yH3IXZZJcwFBa5u6it3"
-        elif genome == "rheMac10":
-            session_id = "984495847_dAhfBDjxXdqsabeD2KSx3Tv3LPzC"
-        else:
-            raise UrlNotImplementedForGenomeError(genome)
-        url = f"https://genome.ucsc.edu/cgi-bin/hgc?hgsid={session_id}&g=htcGetDna2&table=&i=mixed&getDnaPos={chromosome}%3A{start_coord}-{end_coord}&db={genome}&hgSeq.cdsExon=1&hgSeq.padding5=0&hgSeq.padding3=0&hgSeq.casing=upper&boolshad.hgSeq.maskRepeats=0&hgSeq.repMasking=lower{'' if is_positive_strand else '&hgSeq.revComp=on'}&boolshad.hgSeq.revComp=1&submit=get+DNA"
-        sequence = request_sequence_from_ucsc(url, genome)
-        set_time_of_last_request_to_ucsc_browser(datetime.datetime.utcnow())
-        return cls(genome, chromosome, start_coord, is_positive_strand, sequence)
+        """Create a GenomicSequence from the UCSC Browser.
+
+        If a sequence_source is supplied, or one has been registered for
+        the genome, the DNA is read from it instead of the UCSC Browser,
+        without any network requests or waiting.
+
+        Otherwise, if a sequence_cache is supplied or a default one has
+        been set, the request is served from any cached range containing
+        it, and the UCSC Browser is only asked on a miss.
+
+        Requests to the UCSC Browser wait for the rate_limiter, or the one
+        set with set_ucsc_rate_limiter. Without either, they are spaced
+        SECONDS_BETWEEN_UCSC_REQUESTS apart.
+        """
+        if sequence_source is None:
+            sequence_source = SEQUENCE_SOURCES.get(genome)
+        if sequence_source is not None:
+            sequence = sequence_source.fetch_sequence(
+                chromosome, start_coord, end_coord
+            )
+            return cls._from_positive_strand_sequence(
+                genome, chromosome, start_coord, is_positive_strand, sequence
+            )
+        if sequence_cache is None:
+            sequence_cache = get_default_sequence_cache()
+        if sequence_cache is None:
+            sequence = _request_sequence_with_delay(
+                genome,
+                chromosome,
+                start_coord,
+                end_coord,
+                is_positive_strand,
+                rate_limiter=rate_limiter,
+            )
+            return cls(genome, chromosome, start_coord, is_positive_strand, sequence)
+        cached_sequence = sequence_cache.fetch_sequence(
+            genome, chromosome, start_coord, end_coord
+        )
+        if cached_sequence is None:
+            # only the positive strand is cached, the other strand is derived from it locally
+            cached_sequence = _request_sequence_with_delay(
+                genome,
+                chromosome,
+                start_coord,
+                end_coord,
+                True,
+                rate_limiter=rate_limiter,
+            )
+            sequence_cache.store_sequence(
+                genome, chromosome, start_coord, end_coord, cached_sequence
+            )
+        return cls._from_positive_strand_sequence(
+            genome, chromosome, start_coord, is_positive_strand, cached_sequence
+        )
+
+    @classmethod
+    async def from_coordinates_async(
+        cls,
+        genome: str,
+        chromosome: str,
+        start_coord: int,
+        end_coord: int,
+        is_positive_strand: bool,
+        sequence_source: Optional[SequenceSource] = None,
+        sequence_cache: Optional[SequenceCache] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+    ) -> "GenomicSequence":
+        """Create a GenomicSequence without blocking the event loop.
+
+        Takes the same arguments as from_coordinates. Waiting for the rate
+        limiter happens on the event loop, and only the blocking work of
+        reading the sequence source or cache and making the HTTP request
+        (with any retries) is run in the default executor of the loop, so
+        other tasks keep running.
+
+        Without any rate limiter, requests are spaced
+        SECONDS_BETWEEN_UCSC_REQUESTS apart one at a time under a thread
+        lock, so that waiting is done in the executor instead.
+        """
+        loop = asyncio.get_running_loop()
+        if sequence_source is None:
+            sequence_source = SEQUENCE_SOURCES.get(genome)
+        if rate_limiter is None:
+            rate_limiter = get_ucsc_rate_limiter()
+        if sequence_source is not None or rate_limiter is None:
+            return await loop.run_in_executor(
+                None,
+                functools.partial(
+                    cls.from_coordinates,
+                    genome,
+                    chromosome,
+                    start_coord,
+                    end_coord,
+                    is_positive_strand,
+                    sequence_source=sequence_source,
+                    sequence_cache=sequence_cache,
+                ),
+            )
+        if sequence_cache is None:
+            sequence_cache = get_default_sequence_cache()
+        if sequence_cache is not None:
+            cached_sequence = await loop.run_in_executor(
+                None,
+                sequence_cache.fetch_sequence,
+                genome,
+                chromosome,
+                start_coord,
+                end_coord,
+            )
+            if cached_sequence is not None:
+                return cls._from_positive_strand_sequence(
+                    genome, chromosome, start_coord, is_positive_strand, cached_sequence
+                )
+        # only the positive strand is cached, the other strand is derived from it locally
+        is_requested_strand_positive = is_positive_strand or sequence_cache is not None
+        url = _get_ucsc_dna_url(
+            genome, chromosome, start_coord, end_coord, is_requested_strand_positive
+        )
+        record_ucsc_request_statistics(
+            seconds_waited=await rate_limiter.acquire_async()
+        )
+        sequence = await loop.run_in_executor(
+            None,
+            functools.partial(
+                request_sequence_from_ucsc, url, genome, rate_limiter=rate_limiter
+            ),
+        )
+        if sequence_cache is None:
+            return cls(genome, chromosome, start_coord, is_positive_strand, sequence)
+        await loop.run_in_executor(
+            None,
+            sequence_cache.store_sequence,
+            genome,
+            chromosome,
+            start_coord,
+            end_coord,
+            sequence,
+        )
+        return cls._from_positive_strand_sequence(
+            genome, chromosome, start_coord, is_positive_strand, sequence
+        )
+
+    @classmethod
+    def bulk_from_coordinates(
+        cls,
+        all_coordinates: Sequence[Tuple[str, str, int, int, bool]],
+        max_gap: int = DEFAULT_BULK_FETCH_MAX_GAP,
+        sequence_source: Optional[SequenceSource] = None,
+        sequence_cache: Optional[SequenceCache] = None,
+    ) -> List["GenomicSequence"]:
+        """Create many GenomicSequences with as few requests as possible.
+
+        Ranges on the same chromosome that overlap or are separated by at
+        most max_gap bases are fetched together with a single call to
+        from_coordinates, then sliced apart locally.
+
+        Args:
+            all_coordinates: (genome, chromosome, start_coord, end_coord, is_positive_strand) for each sequence
+            max_gap: the largest number of bases between two ranges that still get fetched together
+            sequence_source: passed on to from_coordinates
+            sequence_cache: passed on to from_coordinates
+
+        Returns:
+            a GenomicSequence for each set of coordinates, in the same order
+        """
+        idxs_by_chromosome: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for idx, (genome, chromosome, _, _, _) in enumerate(all_coordinates):
+            idxs_by_chromosome[(genome, chromosome)].append(idx)
+        results: Dict[int, GenomicSequence] = dict()
+        for (genome, chromosome), idxs in idxs_by_chromosome.items():
+            ranges = [all_coordinates[idx][2:4] for idx in idxs]
+            for merged_start, merged_end, idxs_in_range in merge_nearby_ranges(
+                ranges, max_gap
+            ):
+                merged_genomic_sequence = cls.from_coordinates(
+                    genome,
+                    chromosome,
+                    merged_start,
+                    merged_end,
+                    True,
+                    sequence_source=sequence_source,
+                    sequence_cache=sequence_cache,
+                )
+                # the results are views sharing the bases of the merged range
+                merged_sequence = merged_genomic_sequence.sequence_view
+                for range_idx in idxs_in_range:
+                    idx = idxs[range_idx]
+                    start_coord, end_coord = ranges[range_idx]
+                    offset = start_coord - merged_start
+                    results[idx] = cls._from_positive_strand_sequence(
+                        genome,
+                        chromosome,
+                        start_coord,
+                        all_coordinates[idx][4],
+                        merged_sequence.subsequence(
+                            offset, offset + end_coord - start_coord + 1
+                        ),
+                    )
+        return [results[idx] for idx in range(len(all_coordinates))]
+
+    @classmethod
+    def _from_positive_strand_sequence(
+        cls,
+        genome: str,
+        chromosome: str,
+        start_coord: int,
+        is_positive_strand: bool,
+        sequence: Union[str, SequenceView],
+    ) -> "GenomicSequence":
+        positive_strand_sequence = cls(genome, chromosome, start_coord, True, sequence)
+        if is_positive_strand:
+            return positive_strand_sequence
+        return positive_strand_sequence.create_reverse_complement()
 
     def __str__(self) -> str:
         return f'<{self.__class__.__name__} {self.genome} {self.chromosome}:{self.start_coord}-{self.end_coord} {"+" if self.is_positive_strand else "-"}>'
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Measuring the throughput and latency of sequence fetches."""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import time
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+
+from .genomic_sequence import GenomicSequence
+
+
+@dataclass(frozen=True)
+class FetchLoadTestResult:
+    """The outcome of a run of run_fetch_load_test."""
+
+    num_workers: int
+    elapsed_seconds: float
+    latencies_seconds: Tuple[float, ...]
+    num_errors: int
+
+    @property
+    def num_fetches(self) -> int:
+        return len(self.latencies_seconds) + self.num_errors
+
+    @property
+    def fetches_per_second(self) -> float:
+        """Successful fetches per second of wall-clock time."""
+        return len(self.latencies_seconds) / self.elapsed_seconds
+
+    def get_latency_percentile(self, percentile: float) -> float:
+        """Get a percentile (0-100) of the latency of successful fetches."""
+        if len(self.latencies_seconds) == 0:
+            raise ValueError("No fetches succeeded, so there are no latencies")
+        return float(np.percentile(self.latencies_seconds, percentile))
+
+    def summarize(self) -> str:
+        return (
+            f"{self.num_fetches} fetches ({self.num_errors} errors) with {self.num_workers} workers in {self.elapsed_seconds:.3f} s: "
+            f"{self.fetches_per_second:.1f} fetches/s, latency p50 {self.get_latency_percentile(50) * 1000:.1f} ms, "
+            f"p95 {self.get_latency_percentile(95) * 1000:.1f} ms, max {self.get_latency_percentile(100) * 1000:.1f} ms"
+        )
+
+
+def _time_fetch(
+    fetch: Callable[..., Any], coordinates: Tuple[str, str, int, int, bool]
+) -> Optional[float]:
+    start = time.perf_counter()
+    try:
+        fetch(*coordinates)
+    except Exception:  # pylint:disable=broad-except # any failure is counted as an error rather than stopping the test
+        return None
+    return time.perf_counter() - start
+
+
+def run_fetch_load_test(
+    all_coordinates: Sequence[Tuple[str, str, int, int, bool]],
+    num_workers: int,
+    fetch: Callable[..., Any] = GenomicSequence.from_coordinates,
+) -> FetchLoadTestResult:
+    """Fetch many sequences concurrently and time them.
+
+    Point the UCSC Browser URL at a LocalUcscServer with
+    set_ucsc_browser_url to benchmark caching, connection pooling and rate
+    limiting without network access.
+
+    Args:
+        all_coordinates: the genome, chromosome, start and end coordinates, and strand of each fetch
+        num_workers: how many threads fetch at the same time
+        fetch: called with each set of coordinates. Defaults to GenomicSequence.from_coordinates.
+
+    Returns:
+        the latency of each successful fetch, and the number that failed
+    """
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        start = time.perf_counter()
+        latencies = list(
+            executor.map(
+                lambda coordinates: _time_fetch(fetch, coordinates), all_coordinates
+            )
+        )
+        elapsed_seconds = time.perf_counter() - start
+    successful_latencies = tuple(
+        latency for latency in latencies if latency is not None
+    )
+    return FetchLoadTestResult(
+        num_workers=num_workers,
+        elapsed_seconds=elapsed_seconds,
+        latencies_seconds=successful_latencies,
+        num_errors=len(latencies) - len(successful_latencies),
+    )
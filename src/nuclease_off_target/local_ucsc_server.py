@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""A local stand-in for the DNA pages of the UCSC Genome Browser."""
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import random
+import re
+import threading
+import time
+from typing import Any
+from typing import Dict
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+from .exceptions import ChromosomeNotInSequenceSourceError
+from .exceptions import CoordinatesOutsideOfChromosomeError
+from .sequence_sources import SequenceSource
+
+DNA_POSITION_REGEX = re.compile(r"^(\w+):(\d+)-(\d+)$")
+LOCAL_UCSC_BASES_PER_LINE = 50
+_REVERSE_COMPLEMENT_TABLE = str.maketrans("ACGTNacgtn", "TGCANtgcan")
+THROTTLE_PAGE = "<HTML><HEAD><TITLE>Too Many Requests</TITLE></HEAD><BODY>\nYour access is being slowed down because of too many requests. Please try again later.\n</BODY></HTML>\n"
+ERROR_PAGE = "<HTML><HEAD><TITLE>Error</TITLE></HEAD><BODY>\n{}\n</BODY></HTML>\n"
+
+
+def format_ucsc_dna_page(
+    genome: str,
+    chromosome: str,
+    start_coord: int,
+    end_coord: int,
+    is_positive_strand: bool,
+    sequence: str,
+) -> str:
+    """Lay out a sequence the way the UCSC Browser's get DNA page does."""
+    lines = [
+        "<HTML><HEAD><TITLE>UCSC Genome Browser DNA</TITLE></HEAD><BODY>",
+        "<PRE>",
+        f"&gt;{genome}_dna range={chromosome}:{start_coord}-{end_coord} 5'pad=0 3'pad=0 strand={'+' if is_positive_strand else '-'} repeatMasking=none",
+    ]
+    lines.extend(
+        sequence[idx : idx + LOCAL_UCSC_BASES_PER_LINE]
+        for idx in range(0, len(sequence), LOCAL_UCSC_BASES_PER_LINE)
+    )
+    lines.extend(["</PRE>", "</BODY></HTML>", ""])
+    return "\n".join(lines)
+
+
+class LocalUcscServer(ThreadingHTTPServer):
+    """Serve hgc?...getDnaPos=... requests from local sequence sources.
+
+    Responses follow the layout of the real UCSC Browser, so
+    GenomicSequence.from_coordinates can be pointed at this server with
+    set_ucsc_browser_url to be exercised and benchmarked without network
+    access. Each request is handled in its own thread.
+
+    Args:
+        sequence_sources: the source of DNA for each genome, e.g. a FastaSequenceSource
+        address: the host and port to listen on. Port 0 picks a free port.
+        latency_seconds: how long to wait before answering each request
+        throttle_fraction: the fraction of requests answered with a throttle page
+        error_fraction: the fraction of requests answered with a server error
+        throttle_status: the status of throttle pages. UCSC uses 429, but 200 pages without sequence can be served too.
+        retry_after_seconds: the Retry-After header sent with throttle pages
+        error_status: the status of server errors
+        seed: for the random choice of which requests are throttled or fail
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        sequence_sources: Mapping[str, SequenceSource],
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        latency_seconds: float = 0.0,
+        throttle_fraction: float = 0.0,
+        error_fraction: float = 0.0,
+        throttle_status: int = 429,
+        retry_after_seconds: Optional[float] = None,
+        error_status: int = 503,
+        seed: Optional[int] = None,
+    ) -> None:
+        if throttle_fraction + error_fraction > 1:
+            raise ValueError(
+                f"throttle_fraction and error_fraction cannot add up to more than 1, not {throttle_fraction + error_fraction}"
+            )
+        super().__init__(address, _LocalUcscRequestHandler)
+        self.sequence_sources = dict(sequence_sources)
+        self.latency_seconds = latency_seconds
+        self.throttle_fraction = throttle_fraction
+        self.error_fraction = error_fraction
+        self.throttle_status = throttle_status
+        self.retry_after_seconds = retry_after_seconds
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.status_counts: Dict[int, int] = dict()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def requests_served(self) -> int:
+        with self._lock:
+            return sum(self.status_counts.values())
+
+    def choose_outcome(self) -> str:
+        """Decide whether the next request gets an error, a throttle page or sequence."""
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.error_fraction:
+            return "error"
+        if draw < self.error_fraction + self.throttle_fraction:
+            return "throttle"
+        return "sequence"
+
+    def count_status(self, status: int) -> None:
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def start(self) -> "LocalUcscServer":
+        """Start answering requests in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self) -> "LocalUcscServer":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+
+class _LocalUcscRequestHandler(BaseHTTPRequestHandler):
+    server: LocalUcscServer
+    protocol_version = "HTTP/1.1"  # keep connections alive, like the real browser
+
+    def _send_page(
+        self, status: int, page: str, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        encoded_page = page.encode("utf-8")
+        # counted before the client can see the response
+        self.server.count_status(status)
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=UTF-8")
+        self.send_header("Content-Length", str(len(encoded_page)))
+        for name, value in (headers or dict()).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded_page)
+
+    def do_GET(  # pylint:disable=invalid-name # the name is required by http.server
+        self,
+    ) -> None:
+        """Answer a request for the DNA of a range."""
+        if self.server.latency_seconds > 0:
+            time.sleep(self.server.latency_seconds)
+        split_url = urlsplit(self.path)
+        if split_url.path != "/cgi-bin/hgc":
+            self._send_page(404, ERROR_PAGE.format(f"No page at {split_url.path}"))
+            return
+        outcome = self.server.choose_outcome()
+        if outcome == "error":
+            self._send_page(
+                self.server.error_status, ERROR_PAGE.format("Internal server error")
+            )
+            return
+        if outcome == "throttle":
+            headers = dict()
+            if self.server.retry_after_seconds is not None:
+                headers["Retry-After"] = f"{self.server.retry_after_seconds:g}"
+            self._send_page(self.server.throttle_status, THROTTLE_PAGE, headers)
+            return
+        status, page = self._create_dna_page(parse_qs(split_url.query))
+        self._send_page(status, page)
+
+    def _create_dna_page(self, query: Dict[str, Any]) -> Tuple[int, str]:
+        genome = query.get("db", [""])[0]
+        position = query.get("getDnaPos", [""])[0]
+        match = DNA_POSITION_REGEX.match(position)
+        if match is None:
+            return 400, ERROR_PAGE.format(f"Invalid position: {position}")
+        if genome not in self.server.sequence_sources:
+            return 400, ERROR_PAGE.format(f"Unknown genome: {genome}")
+        chromosome = match[1]
+        start_coord = int(match[2])
+        end_coord = int(match[3])
+        try:
+            sequence = self.server.sequence_sources[genome].fetch_sequence(
+                chromosome, start_coord, end_coord
+            )
+        except (
+            ChromosomeNotInSequenceSourceError,
+            CoordinatesOutsideOfChromosomeError,
+        ):
+            return 400, ERROR_PAGE.format(f"Invalid position: {position}")
+        is_positive_strand = query.get("hgSeq.revComp", [""])[0] != "on"
+        if not is_positive_strand:
+            sequence = sequence.translate(_REVERSE_COMPLEMENT_TABLE)[::-1]
+        if query.get("hgSeq.casing", [""])[0] == "upper":
+            sequence = sequence.upper()
+        page = format_ucsc_dna_page(
+            genome, chromosome, start_coord, end_coord, is_positive_strand, sequence
+        )
+        return 200, page
+
+    def log_message(  # pylint:disable=arguments-differ # only silencing the logging
+        self, *args: Any
+    ) -> None:
+        pass
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Compact storage of DNA sequence at 2 bits per base."""
+from typing import Iterator
+from typing import NamedTuple
+from typing import Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .sequence_views import SequenceView
+
+PACKED_BASES = "ACGT"  # complementary bases have codes adding up to 3
+
+_ASCII_TO_CODE: NDArray[np.uint8] = np.zeros(256, dtype=np.uint8)
+_ASCII_TO_CODE[np.frombuffer(b"ACGTacgt", dtype=np.uint8)] = [0, 1, 2, 3, 0, 1, 2, 3]
+
+# each packed byte holds 4 bases, most significant bits first
+_PACKED_BYTE_TO_ASCII: NDArray[np.uint8] = np.array(
+    [
+        [ord(PACKED_BASES[(byte >> shift) & 3]) for shift in (6, 4, 2, 0)]
+        for byte in range(256)
+    ],
+    dtype=np.uint8,
+)
+
+_IS_AMBIGUOUS_ASCII: NDArray[np.bool_] = np.ones(256, dtype=bool)
+_IS_AMBIGUOUS_ASCII[np.frombuffer(b"ACGTN", dtype=np.uint8)] = False
+
+_IS_LETTER_ASCII: NDArray[np.bool_] = np.zeros(256, dtype=bool)
+_IS_LETTER_ASCII[ord("A") : ord("Z") + 1] = True
+_IS_LETTER_ASCII[ord("a") : ord("z") + 1] = True
+
+_LOWERCASE_BIT = 0x20
+
+
+def _find_runs(
+    is_in_run: NDArray[np.bool_],
+) -> Tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Find the start (inclusive) and end (exclusive) of each run of True."""
+    edges = np.diff(np.concatenate(([0], is_in_run.view(np.int8), [0])))
+    return (
+        np.flatnonzero(edges == 1).astype(np.int64),
+        np.flatnonzero(edges == -1).astype(np.int64),
+    )
+
+
+def _clip_runs(
+    run_starts: NDArray[np.int64],
+    run_ends: NDArray[np.int64],
+    buffer_start: int,
+    buffer_end: int,
+) -> Iterator[Tuple[int, int]]:
+    """Find the runs overlapping a range, relative to the start of the range."""
+    first_run_idx = np.searchsorted(run_ends, buffer_start, side="right")
+    last_run_idx = np.searchsorted(run_starts, buffer_end, side="left")
+    for run_start, run_end in zip(
+        run_starts[first_run_idx:last_run_idx], run_ends[first_run_idx:last_run_idx]
+    ):
+        yield max(run_start, buffer_start) - buffer_start, min(
+            run_end, buffer_end
+        ) - buffer_start
+
+
+class _PackedBuffers(NamedTuple):
+    bases: NDArray[np.uint8]
+    n_run_starts: NDArray[np.int64]
+    n_run_ends: NDArray[np.int64]
+    ambiguous_positions: NDArray[np.int64]
+    ambiguous_bases: NDArray[np.uint8]
+    lowercase_run_starts: NDArray[np.int64]
+    lowercase_run_ends: NDArray[np.int64]
+
+
+class PackedSequence(SequenceView):
+    """DNA sequence packed 4 bases to a byte.
+
+    A, C, G and T take 2 bits each. Runs of N, other IUPAC ambiguity codes
+    and runs of lowercase (soft-masked) bases are kept in small side
+    tables, so any sequence round-trips exactly.
+
+    Slicing or converting to a str decodes only the bases asked for, and
+    subsequences and reverse complements share the packed buffers.
+
+    Create one with PackedSequence.from_str.
+    """
+
+    @classmethod
+    def from_str(cls, sequence: str) -> "PackedSequence":
+        """Pack a sequence of IUPAC bases, in any mix of cases."""
+        ascii_bases = np.frombuffer(sequence.encode("ascii"), dtype=np.uint8)
+        if not _IS_LETTER_ASCII[ascii_bases].all():
+            raise ValueError("A packed sequence can only contain letters")
+        codes = _ASCII_TO_CODE[ascii_bases]
+        num_padding_bases = -len(codes) % 4
+        if num_padding_bases:
+            codes = np.concatenate((codes, np.zeros(num_padding_bases, dtype=np.uint8)))
+        codes = codes.reshape(-1, 4)
+        bases = (
+            (codes[:, 0] << 6) | (codes[:, 1] << 4) | (codes[:, 2] << 2) | codes[:, 3]
+        )
+
+        is_lowercase = (ascii_bases & _LOWERCASE_BIT).astype(bool)
+        uppercase_bases = ascii_bases & ~np.uint8(_LOWERCASE_BIT)
+        is_n = uppercase_bases == ord("N")
+        is_ambiguous = _IS_AMBIGUOUS_ASCII[uppercase_bases]
+        n_run_starts, n_run_ends = _find_runs(is_n)
+        lowercase_run_starts, lowercase_run_ends = _find_runs(is_lowercase)
+        ambiguous_positions = np.flatnonzero(is_ambiguous).astype(np.int64)
+        buffers = _PackedBuffers(
+            bases=bases.astype(np.uint8),
+            n_run_starts=n_run_starts,
+            n_run_ends=n_run_ends,
+            ambiguous_positions=ambiguous_positions,
+            ambiguous_bases=uppercase_bases[ambiguous_positions],
+            lowercase_run_starts=lowercase_run_starts,
+            lowercase_run_ends=lowercase_run_ends,
+        )
+        return cls(buffers, 0, len(ascii_bases), False)
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the buffers, which may be shared with other sequences."""
+        buffers: _PackedBuffers = self._buffer
+        return sum(buffer.nbytes for buffer in buffers)
+
+    def _decode(self, buffer_start: int, buffer_end: int) -> str:
+        """Decode part of the buffers into positive strand bases."""
+        buffers: _PackedBuffers = self._buffer
+        first_byte = buffer_start // 4
+        last_byte = (buffer_end + 3) // 4
+        skipped_bases = buffer_start - first_byte * 4
+        ascii_bases = _PACKED_BYTE_TO_ASCII[
+            buffers.bases[first_byte:last_byte]
+        ].ravel()[skipped_bases : skipped_bases + buffer_end - buffer_start]
+        for run_start, run_end in _clip_runs(
+            buffers.n_run_starts, buffers.n_run_ends, buffer_start, buffer_end
+        ):
+            ascii_bases[run_start:run_end] = ord("N")
+        first_ambiguous_idx, last_ambiguous_idx = np.searchsorted(
+            buffers.ambiguous_positions, [buffer_start, buffer_end]
+        )
+        ascii_bases[
+            buffers.ambiguous_positions[first_ambiguous_idx:last_ambiguous_idx]
+            - buffer_start
+        ] = buffers.ambiguous_bases[first_ambiguous_idx:last_ambiguous_idx]
+        for run_start, run_end in _clip_runs(
+            buffers.lowercase_run_starts,
+            buffers.lowercase_run_ends,
+            buffer_start,
+            buffer_end,
+        ):
+            ascii_bases[run_start:run_end] |= _LOWERCASE_BIT
+        return ascii_bases.tobytes().decode("ascii")
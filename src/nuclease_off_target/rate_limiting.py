@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Limiting the rate of requests to remote services."""
+import asyncio
+import struct
+import threading
+import time
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+# tokens left and the time of the last refill
+_CROSS_PROCESS_STATE_STRUCT = struct.Struct("<dd")
+
+
+class TokenBucketRateLimiter:
+    """Allow bursts of requests while holding a long-term request rate.
+
+    The bucket holds up to `burst` tokens and refills at
+    `requests_per_second`. Every request takes a token, and waits if the
+    bucket is empty.
+
+    A token is reserved under a lock before any waiting happens, so one
+    limiter can be shared by any number of threads and asyncio tasks
+    without two of them ever claiming the same slot.
+    """
+
+    def __init__(self, requests_per_second: float, burst: int = 1) -> None:
+        if requests_per_second <= 0:
+            raise ValueError(
+                f"requests_per_second must be positive, not {requests_per_second}"
+            )
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1, not {burst}")
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._time_of_last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take_token(
+        self, tokens: float, time_of_last_refill: float, current_time: float
+    ) -> Tuple[float, float]:
+        """Refill the bucket for the time that has passed, then take a token.
+
+        Returns:
+            the tokens left in the bucket, and the number of seconds to wait before the token can be used
+        """
+        # the clock going backwards should never cause tokens to be removed
+        seconds_passed = max(current_time - time_of_last_refill, 0.0)
+        tokens = min(
+            float(self.burst), tokens + seconds_passed * self.requests_per_second
+        )
+        tokens -= 1
+        if tokens >= 0:
+            return tokens, 0.0
+        return tokens, -tokens / self.requests_per_second
+
+    def reserve(self) -> float:
+        """Take a token, even if it will only be available in the future.
+
+        Returns:
+            the number of seconds to wait before the token can be used
+        """
+        with self._lock:
+            current_time = time.monotonic()
+            self._tokens, seconds_to_wait = self._take_token(
+                self._tokens, self._time_of_last_refill, current_time
+            )
+            self._time_of_last_refill = current_time
+            return seconds_to_wait
+
+    def acquire(self) -> float:
+        """Block the current thread until a request is allowed.
+
+        Returns:
+            the number of seconds waited
+        """
+        seconds_to_wait = self.reserve()
+        if seconds_to_wait > 0:
+            time.sleep(seconds_to_wait)
+        return seconds_to_wait
+
+    async def acquire_async(self) -> float:
+        """Wait without blocking the event loop until a request is allowed.
+
+        Returns:
+            the number of seconds waited
+        """
+        seconds_to_wait = self.reserve()
+        if seconds_to_wait > 0:
+            await asyncio.sleep(seconds_to_wait)
+        return seconds_to_wait
+
+
+class CrossProcessRateLimiter(TokenBucketRateLimiter):
+    """A token bucket shared by every process on a host that uses the same file.
+
+    The tokens and the time of the last refill are stored in the file,
+    which is locked while a token is taken. Wall-clock time is used since
+    monotonic clocks are not comparable between processes on every
+    platform.
+
+    Instances can be pickled, so the limiter can be passed to worker
+    processes. Forked workers also share it through set_ucsc_rate_limiter.
+    Locking relies on fcntl, so this is only available on POSIX systems.
+    """
+
+    def __init__(
+        self, filepath: str, requests_per_second: float, burst: int = 1
+    ) -> None:
+        super().__init__(requests_per_second, burst=burst)
+        self.filepath = filepath
+
+    def reserve(self) -> float:
+        """Take a token, even if it will only be available in the future.
+
+        Returns:
+            the number of seconds to wait before the token can be used
+        """
+        import fcntl  # pylint:disable=import-outside-toplevel # fcntl does not exist on Windows, and importing it here keeps the rest of the package usable there
+
+        # the file lock is per process, so threads within this process still need the thread lock
+        with self._lock, open(self.filepath, "a+b") as state_file:
+            fcntl.flock(state_file.fileno(), fcntl.LOCK_EX)
+            current_time = time.time()
+            state_file.seek(0)
+            state = state_file.read()
+            if len(state) == _CROSS_PROCESS_STATE_STRUCT.size:
+                tokens, time_of_last_refill = _CROSS_PROCESS_STATE_STRUCT.unpack(state)
+            else:  # a new (or unreadable) file starts with a full bucket
+                tokens, time_of_last_refill = float(self.burst), current_time
+            tokens, seconds_to_wait = self._take_token(
+                tokens, time_of_last_refill, current_time
+            )
+            state_file.seek(0)
+            state_file.truncate()
+            state_file.write(_CROSS_PROCESS_STATE_STRUCT.pack(tokens, current_time))
+            state_file.flush()
+            # the lock is released when the file is closed
+        return seconds_to_wait
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+ucsc_rate_limiter: Optional[  # pylint:disable=invalid-name # this is a global singleton that is deliberately reassigned
+    TokenBucketRateLimiter
+] = None
+
+
+def get_ucsc_rate_limiter() -> Optional[TokenBucketRateLimiter]:
+    return ucsc_rate_limiter
+
+
+def set_ucsc_rate_limiter(new_limiter: Optional[TokenBucketRateLimiter]) -> None:
+    """Set the limiter that all requests to the UCSC Browser go through.
+
+    Use None to go back to spacing requests SECONDS_BETWEEN_UCSC_REQUESTS
+    apart, one at a time.
+    """
+    global ucsc_rate_limiter  # pylint:disable=global-statement,invalid-name # this is a deliberate use to set up a global singleton
+    ucsc_rate_limiter = new_limiter
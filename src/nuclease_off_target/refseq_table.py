@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""Columnar loading of RefSeq tables from the UCSC Genome Browser."""
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .constants import REFSEQ_CHROMOSOME_COLUMN
+from .constants import REFSEQ_EXON_COUNT_COLUMN
+from .constants import REFSEQ_EXON_ENDS_COLUMN
+from .constants import REFSEQ_EXON_STARTS_COLUMN
+from .constants import REFSEQ_GENE_NAME_COLUMN
+from .constants import REFSEQ_STRAND_COLUMN
+from .constants import REFSEQ_TRANSCRIPT_END_COLUMN
+from .constants import REFSEQ_TRANSCRIPT_NAME_COLUMN
+from .constants import REFSEQ_TRANSCRIPT_START_COLUMN
+from .exceptions import InvalidRefSeqTableFileError
+from .genomic_sequence import GeneCoordinates
+from .genomic_sequence import GeneIsoformCoordinates
+from .genomic_sequence import iter_ucsc_refseq_table_rows
+
+REFSEQ_TABLE_FILE_SIGNATURE = b"NOTREFS\x01"
+REFSEQ_TABLE_FILE_EXTENSION = ".refseq"
+_REFSEQ_TABLE_COLUMNS = (
+    "transcript_names",
+    "gene_names",
+    "chromosome_codes",
+    "is_positive_strand",
+    "transcript_starts",
+    "transcript_ends",
+    "exon_offsets",
+    "exon_starts",
+    "exon_ends",
+)
+# a cached table that fails to load like this is stale, e.g. partly written or from another version, and is parsed again
+_STALE_REFSEQ_TABLE_CACHE_ERRORS = (
+    InvalidRefSeqTableFileError,
+    OSError,
+    KeyError,
+    ValueError,
+    struct.error,
+)
+
+
+def _parse_comma_separated_ints(values: Sequence[str]) -> NDArray[np.int64]:
+    """Parse lists like exonStarts, each with a trailing comma, into one array."""
+    joined = ",".join(value.rstrip(",") for value in values if value.rstrip(","))
+    if not joined:
+        return np.zeros(0, dtype=np.int64)
+    return np.array(joined.split(","), dtype=np.int64)
+
+
+class RefSeqTable(
+    Mapping[str, GeneCoordinates]
+):  # pylint:disable=too-many-instance-attributes
+    """The isoforms of a RefSeq table held as columns of NumPy arrays.
+
+    Each row of the table is an isoform. The exons of all the isoforms
+    are laid end to end, and exon_offsets holds where the exons of each
+    isoform start, so the exons of isoform i are
+    exon_starts[exon_offsets[i] : exon_offsets[i + 1]].
+
+    It is also a mapping from gene name to GeneCoordinates, the same as
+    the dictionary from parse_ucsc_refseq_table_into_gene_coordinates.
+    The GeneCoordinates of a gene are only created the first time it is
+    looked up, so loading a whole genome's table creates no objects per
+    exon.
+    """
+
+    def __init__(  # pylint:disable=too-many-arguments
+        self,
+        genome: str,
+        transcript_names: NDArray[np.str_],
+        gene_names: NDArray[np.str_],
+        chromosomes: Sequence[str],
+        chromosome_codes: NDArray[np.int32],
+        is_positive_strand: NDArray[np.bool_],
+        transcript_starts: NDArray[np.int64],
+        transcript_ends: NDArray[np.int64],
+        exon_offsets: NDArray[np.int64],
+        exon_starts: NDArray[np.int64],
+        exon_ends: NDArray[np.int64],
+    ) -> None:
+        """Hold already parsed columns.
+
+        Args:
+            chromosomes: the names of the chromosomes that chromosome_codes index into
+            exon_offsets: the index of the first exon of each isoform, followed by the total number of exons
+        """
+        self.genome = genome
+        self.transcript_names = transcript_names
+        self.gene_names = gene_names
+        self.chromosomes = list(chromosomes)
+        self.chromosome_codes = chromosome_codes
+        self.is_positive_strand = is_positive_strand
+        self.transcript_starts = transcript_starts
+        self.transcript_ends = transcript_ends
+        self.exon_offsets = exon_offsets
+        self.exon_starts = exon_starts
+        self.exon_ends = exon_ends
+        self._isoform_idxs_by_gene: Optional[Dict[str, List[int]]] = None
+        self._genes: Dict[str, GeneCoordinates] = dict()
+
+    @classmethod
+    def from_ucsc_refseq_table(
+        cls,
+        genome: str,
+        filepath: str,
+        only_include_chromosomes: Optional[Sequence[str]] = None,
+    ) -> "RefSeqTable":
+        """Load a table from the UCSC Genome Browser into columns.
+
+        Intended to be used on the same "RefSeq All (ncbiRefSeq)" table as parse_ucsc_refseq_table_into_gene_coordinates. The exon lists of all rows are parsed into integers together instead of field by field.
+
+        Args:
+            genome: the genome build, e.g. hg38
+            filepath: the full path of the file to open to parse
+            only_include_chromosomes: a list of chromosomes to include
+        """
+        rows = list(iter_ucsc_refseq_table_rows(filepath, only_include_chromosomes))
+        columns = list(zip(*rows)) if rows else [()] * (REFSEQ_GENE_NAME_COLUMN + 1)
+        chromosomes, chromosome_codes = np.unique(
+            np.array(columns[REFSEQ_CHROMOSOME_COLUMN], dtype=str), return_inverse=True
+        )
+        exon_counts = np.array(columns[REFSEQ_EXON_COUNT_COLUMN], dtype=np.int64)
+        exon_starts = _parse_comma_separated_ints(columns[REFSEQ_EXON_STARTS_COLUMN])
+        exon_ends = _parse_comma_separated_ints(columns[REFSEQ_EXON_ENDS_COLUMN])
+        if not len(exon_starts) == len(exon_ends) == exon_counts.sum():
+            raise ValueError(
+                f"The exon starts and ends in {filepath} do not match the exon counts"
+            )
+        return cls(
+            genome,
+            np.array(columns[REFSEQ_TRANSCRIPT_NAME_COLUMN], dtype=str),
+            np.array(columns[REFSEQ_GENE_NAME_COLUMN], dtype=str),
+            chromosomes.tolist(),
+            chromosome_codes.astype(np.int32),
+            np.array(columns[REFSEQ_STRAND_COLUMN], dtype=str) == "+",
+            np.array(columns[REFSEQ_TRANSCRIPT_START_COLUMN], dtype=np.int64),
+            np.array(columns[REFSEQ_TRANSCRIPT_END_COLUMN], dtype=np.int64),
+            np.concatenate(([0], np.cumsum(exon_counts))).astype(np.int64),
+            exon_starts,
+            exon_ends,
+        )
+
+    def save(self, filepath: str) -> None:
+        """Save the columns to a file that RefSeqTable.load can memory-map.
+
+        The file holds a JSON header describing the columns, then the raw
+        bytes of each column, each starting at a multiple of 8 bytes.
+        """
+        columns = [
+            np.ascontiguousarray(getattr(self, name)) for name in _REFSEQ_TABLE_COLUMNS
+        ]
+        column_offsets = list()
+        next_offset = 0
+        for column in columns:
+            column_offsets.append(next_offset)
+            next_offset += column.nbytes + (-column.nbytes % 8)
+        header = json.dumps(
+            {
+                "genome": self.genome,
+                "chromosomes": self.chromosomes,
+                "columns": [
+                    {
+                        "name": name,
+                        "dtype": column.dtype.str,
+                        "length": len(column),
+                        "offset": column_offset,
+                    }
+                    for name, column, column_offset in zip(
+                        _REFSEQ_TABLE_COLUMNS, columns, column_offsets
+                    )
+                ],
+            }
+        ).encode("utf-8")
+        with open(filepath, "wb") as out_file:
+            out_file.write(REFSEQ_TABLE_FILE_SIGNATURE)
+            out_file.write(struct.pack("<Q", len(header)))
+            out_file.write(header)
+            out_file.write(b"\0" * (-out_file.tell() % 8))
+            for column in columns:
+                out_file.write(column.tobytes())
+                out_file.write(b"\0" * (-column.nbytes % 8))
+
+    @classmethod
+    def load(cls, filepath: str) -> "RefSeqTable":
+        """Memory-map a table saved with RefSeqTable.save.
+
+        Nothing is parsed, so this takes milliseconds, and processes that
+        load the same file share its pages.
+        """
+        with open(filepath, "rb") as in_file:
+            if (
+                in_file.read(len(REFSEQ_TABLE_FILE_SIGNATURE))
+                != REFSEQ_TABLE_FILE_SIGNATURE
+            ):
+                raise InvalidRefSeqTableFileError(
+                    f"{filepath} does not have a RefSeq table signature"
+                )
+            header_size = struct.unpack("<Q", in_file.read(8))[0]
+            header = json.loads(in_file.read(header_size).decode("utf-8"))
+        data_offset = len(REFSEQ_TABLE_FILE_SIGNATURE) + 8 + header_size
+        data_offset += -data_offset % 8
+        columns: Dict[str, Any] = dict()
+        for column_info in header["columns"]:
+            # numpy cannot memory-map an empty range
+            columns[column_info["name"]] = (
+                np.memmap(
+                    filepath,
+                    dtype=column_info["dtype"],
+                    mode="r",
+                    offset=data_offset + column_info["offset"],
+                    shape=(column_info["length"],),
+                )
+                if column_info["length"] > 0
+                else np.zeros(0, dtype=column_info["dtype"])
+            )
+        return cls(
+            genome=header["genome"], chromosomes=header["chromosomes"], **columns
+        )
+
+    @property
+    def num_isoforms(self) -> int:
+        return len(self.transcript_names)
+
+    def get_isoform(self, isoform_idx: int) -> GeneIsoformCoordinates:
+        """Create the coordinates of one row of the table."""
+        first_exon_idx = self.exon_offsets[isoform_idx]
+        last_exon_idx = self.exon_offsets[isoform_idx + 1]
+        return GeneIsoformCoordinates.from_exon_bounds(
+            self.genome,
+            self.chromosomes[self.chromosome_codes[isoform_idx]],
+            bool(self.is_positive_strand[isoform_idx]),
+            self.exon_starts[first_exon_idx:last_exon_idx].tolist(),
+            self.exon_ends[first_exon_idx:last_exon_idx].tolist(),
+        )
+
+    def _get_isoform_idxs_by_gene(self) -> Dict[str, List[int]]:
+        """Group the isoforms by gene the first time it is needed."""
+        if self._isoform_idxs_by_gene is None:
+            self._isoform_idxs_by_gene = dict()
+            for isoform_idx, gene_name in enumerate(self.gene_names.tolist()):
+                self._isoform_idxs_by_gene.setdefault(gene_name, list()).append(
+                    isoform_idx
+                )
+        return self._isoform_idxs_by_gene
+
+    def __getitem__(self, gene_name: str) -> GeneCoordinates:
+        if gene_name not in self._genes:
+            isoform_idxs = self._get_isoform_idxs_by_gene()[gene_name]
+            gene = GeneCoordinates(gene_name, self.get_isoform(isoform_idxs[0]))
+            for isoform_idx in isoform_idxs[1:]:
+                gene.add_isoform(self.get_isoform(isoform_idx))
+            self._genes[gene_name] = gene
+        return self._genes[gene_name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._get_isoform_idxs_by_gene())
+
+    def __len__(self) -> int:
+        return len(self._get_isoform_idxs_by_gene())
+
+
+def _get_refseq_table_cache_filepath(
+    cache_dir: str,
+    genome: str,
+    filepath: str,
+    only_include_chromosomes: Optional[Sequence[str]],
+) -> str:
+    """Name the cached table after everything that affects its contents."""
+    file_stats = os.stat(filepath)
+    key = json.dumps(
+        [
+            os.path.abspath(filepath),
+            file_stats.st_size,
+            file_stats.st_mtime_ns,
+            genome,
+            None
+            if only_include_chromosomes is None
+            else sorted(set(only_include_chromosomes)),
+        ]
+    )
+    return os.path.join(
+        cache_dir,
+        hashlib.sha256(key.encode("utf-8")).hexdigest() + REFSEQ_TABLE_FILE_EXTENSION,
+    )
+
+
+def load_ucsc_refseq_table(
+    genome: str,
+    filepath: str,
+    only_include_chromosomes: Optional[Sequence[str]] = None,
+    cache_dir: Optional[str] = None,
+) -> RefSeqTable:
+    """Load a RefSeq table, reusing a previously parsed copy if there is one.
+
+    The first load parses the table and saves it in cache_dir. Later loads
+    with the same arguments memory-map the saved copy instead, until the
+    table file changes size or modification time.
+
+    Args:
+        genome: the genome build, e.g. hg38
+        filepath: the full path of the table from the UCSC Genome Browser
+        only_include_chromosomes: a list of chromosomes to include
+        cache_dir: the folder to keep parsed tables in. If None, the table is always parsed
+    """
+    if cache_dir is None:
+        return RefSeqTable.from_ucsc_refseq_table(
+            genome, filepath, only_include_chromosomes=only_include_chromosomes
+        )
+    cache_filepath = _get_refseq_table_cache_filepath(
+        cache_dir, genome, filepath, only_include_chromosomes
+    )
+    if os.path.exists(cache_filepath):
+        try:
+            return RefSeqTable.load(cache_filepath)
+        except _STALE_REFSEQ_TABLE_CACHE_ERRORS:
+            pass  # overwritten below
+    table = RefSeqTable.from_ucsc_refseq_table(
+        genome, filepath, only_include_chromosomes=only_include_chromosomes
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    # written under a temporary name first, so other processes never load a partly written file
+    file_descriptor, temp_filepath = tempfile.mkstemp(
+        dir=cache_dir, suffix=REFSEQ_TABLE_FILE_EXTENSION
+    )
+    os.close(file_descriptor)
+    try:
+        table.save(temp_filepath)
+        os.replace(temp_filepath, cache_filepath)
+    finally:
+        # only still there if saving failed
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+    return table
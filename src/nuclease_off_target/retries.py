@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Retrying failed requests and accounting for them."""
+from dataclasses import dataclass
+from dataclasses import replace
+import random
+import threading
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how patiently to retry a failed request.
+
+    The wait before each retry grows exponentially up to
+    max_backoff_seconds. A random fraction of up to jitter_fraction is then
+    taken off, so that clients which failed together don't all retry at
+    the same moment.
+    """
+
+    max_retries: int = 5
+    initial_backoff_seconds: float = 2.0
+    backoff_multiplier: float = 2.0
+    max_backoff_seconds: float = 60.0
+    jitter_fraction: float = 0.5
+
+    def get_backoff_seconds(
+        self, retry_idx: int, minimum_seconds: float = 0.0
+    ) -> float:
+        """Calculate how long to wait before a retry.
+
+        Args:
+            retry_idx: 0 for the first retry, 1 for the second, etc.
+            minimum_seconds: a lower bound, such as one requested by the server
+
+        Returns:
+            the number of seconds to wait
+        """
+        backoff_seconds = min(
+            self.max_backoff_seconds,
+            self.initial_backoff_seconds * self.backoff_multiplier ** retry_idx,
+        )
+        backoff_seconds *= 1 - self.jitter_fraction * random.random()
+        return max(backoff_seconds, minimum_seconds)
+
+
+@dataclass(frozen=True)
+class RequestStatistics:
+    """Running totals of the requests made to a remote service."""
+
+    requests: int = 0
+    retries: int = 0
+    bytes_received: int = 0
+    seconds_waited: float = 0.0
+
+
+_UCSC_REQUEST_STATISTICS_LOCK = threading.Lock()
+
+ucsc_retry_policy: RetryPolicy = (  # pylint:disable=invalid-name # this is a global singleton that is deliberately reassigned
+    RetryPolicy()
+)
+ucsc_request_statistics: RequestStatistics = (  # pylint:disable=invalid-name # this is a global singleton that is deliberately reassigned
+    RequestStatistics()
+)
+
+
+def get_ucsc_retry_policy() -> RetryPolicy:
+    """Get the policy for retrying failed requests to the UCSC Browser."""
+    return ucsc_retry_policy
+
+
+def set_ucsc_retry_policy(new_policy: RetryPolicy) -> None:
+    global ucsc_retry_policy  # pylint:disable=global-statement,invalid-name # this is a deliberate use to set up a global singleton
+    ucsc_retry_policy = new_policy
+
+
+def get_ucsc_request_statistics() -> RequestStatistics:
+    """Get the totals for requests to the UCSC Browser from this process."""
+    return ucsc_request_statistics
+
+
+def record_ucsc_request_statistics(
+    requests: int = 0,
+    retries: int = 0,
+    bytes_received: int = 0,
+    seconds_waited: float = 0.0,
+) -> None:
+    """Add to the totals for requests to the UCSC Browser.
+
+    Safe to call from any thread.
+    """
+    global ucsc_request_statistics  # pylint:disable=global-statement,invalid-name # this is a deliberate use to set up a global singleton
+    with _UCSC_REQUEST_STATISTICS_LOCK:
+        current = ucsc_request_statistics
+        ucsc_request_statistics = replace(
+            current,
+            requests=current.requests + requests,
+            retries=current.retries + retries,
+            bytes_received=current.bytes_received + bytes_received,
+            seconds_waited=current.seconds_waited + seconds_waited,
+        )
+
+
+def reset_ucsc_request_statistics() -> None:
+    global ucsc_request_statistics  # pylint:disable=global-statement,invalid-name # this is a deliberate use to set up a global singleton
+    with _UCSC_REQUEST_STATISTICS_LOCK:
+        ucsc_request_statistics = RequestStatistics()
+
+
+def parse_retry_after_header(value: Optional[str]) -> float:
+    """Get the number of seconds from a Retry-After header.
+
+    Returns:
+        the number of seconds, or 0 if the header is missing or is not a number of seconds
+    """
+    if value is None:
+        return 0.0
+    try:
+        return max(float(value), 0.0)
+    except ValueError:  # an HTTP date, which UCSC does not send
+        return 0.0
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""Scanning whole chromosomes for alignments with constant memory."""
+from dataclasses import dataclass
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from .constants import ALIGNMENT_GAP_CHARACTER
+from .constants import DEFAULT_SCAN_CHUNK_SIZE
+from .crispr_target import ALIGNMENT_ENGINES
+from .crispr_target import create_alignment_string
+from .crispr_target import CrisprTarget
+from .crispr_target import find_pam_anchored_window_starts
+from .exceptions import AlignmentEngineNotImplementedError
+from .sequence_sources import SequenceSource
+from .sequence_views import SequenceView
+
+
+@dataclass(frozen=True)
+class ScanHit:
+    """An alignment found while scanning a chromosome.
+
+    The coordinates are 1-based and inclusive on the positive strand,
+    whichever strand the alignment is on.
+    """
+
+    chromosome: str
+    start_coord: int
+    end_coord: int
+    is_positive_strand: bool
+    crispr_alignment: str
+    genome_alignment: str
+
+    @property
+    def formatted_alignment(self) -> Tuple[str, str, str]:
+        return (
+            self.crispr_alignment,
+            create_alignment_string(self.crispr_alignment, self.genome_alignment),
+            self.genome_alignment,
+        )
+
+
+def iter_sequence_chunks(
+    sequence_source: SequenceSource,
+    chromosome: str,
+    chunk_size: int,
+    overlap: int,
+) -> Iterator[Tuple[int, str]]:
+    """Read a chromosome in consecutive chunks.
+
+    Each chunk starts chunk_size bases after the previous one and also
+    holds the first `overlap` bases of the next, so that anything up to
+    overlap + 1 bases long lies entirely within some chunk.
+
+    Yields:
+        the start coordinate and the positive strand sequence of each chunk
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, not {chunk_size}")
+    chromosome_size = sequence_source.get_chromosome_size(chromosome)
+    for chunk_start_coord in range(1, chromosome_size + 1, chunk_size):
+        chunk_end_coord = min(
+            chunk_start_coord + chunk_size + overlap - 1, chromosome_size
+        )
+        yield chunk_start_coord, sequence_source.fetch_sequence(
+            chromosome, chunk_start_coord, chunk_end_coord
+        )
+
+
+def scan_strand_windows(  # pylint:disable=too-many-arguments,too-many-locals
+    crispr_target: CrisprTarget,
+    find_alignments_in_window: Callable[..., Set[Tuple[str, str]]],
+    chromosome: str,
+    region_start_coord: int,
+    is_positive_strand: bool,
+    strand_seq: str,
+    window_starts: Sequence[int],
+    allowed_mismatches: int,
+    allowed_bulges: Tuple[int, int, int],
+    max_pam_misalignments: Optional[int],
+) -> Iterator[ScanHit]:
+    """Find the alignments in some windows of one strand of a region.
+
+    This is the part of scan_chromosome_for_alignments shared with
+    searches that pick the windows some other way, such as
+    find_off_target_sites.
+
+    Args:
+        crispr_target: the CRISPR target to align
+        find_alignments_in_window: a value of ALIGNMENT_ENGINES
+        chromosome: the name of the chromosome, for the hits
+        region_start_coord: the positive strand coordinate of the first base of the region
+        is_positive_strand: whether strand_seq is the positive strand of the region
+        strand_seq: the uppercase sequence of the region on the strand being scanned
+        window_starts: the indices in strand_seq of the windows to scan, in order
+        allowed_mismatches: the maximum number of mismatches (including bulges)
+        allowed_bulges: the allowed total, RNA and DNA bulges
+        max_pam_misalignments: if provided, only the windows that could place the PAM on a stretch matching it with at most this many substitutions are searched
+
+    Yields:
+        each alignment, in order of window
+    """
+    crispr_target_seq = str(crispr_target.sequence)
+    window_length = len(crispr_target_seq) + allowed_bulges[2]
+    region_end_coord = region_start_coord + len(strand_seq) - 1
+    if max_pam_misalignments is not None:
+        anchored_window_starts = set(
+            find_pam_anchored_window_starts(
+                crispr_target_seq,
+                crispr_target.pam,
+                strand_seq,
+                max_pam_misalignments,
+                *allowed_bulges,
+                num_windows=len(strand_seq) - window_length + 1,
+            )
+        )
+        window_starts = [
+            window_start
+            for window_start in window_starts
+            if window_start in anchored_window_starts
+        ]
+    for window_start in window_starts:
+        alignments = find_alignments_in_window(
+            crispr_target_seq,
+            strand_seq[window_start : window_start + window_length],
+            allowed_mismatches,
+            *allowed_bulges,
+        )
+        for crispr_alignment, genome_alignment in sorted(alignments):
+            num_genome_bases = len(genome_alignment) - genome_alignment.count(
+                ALIGNMENT_GAP_CHARACTER
+            )
+            if is_positive_strand:
+                start_coord = region_start_coord + window_start
+                end_coord = start_coord + num_genome_bases - 1
+            else:
+                end_coord = region_end_coord - window_start
+                start_coord = end_coord - num_genome_bases + 1
+            yield ScanHit(
+                chromosome,
+                start_coord,
+                end_coord,
+                is_positive_strand,
+                crispr_alignment,
+                genome_alignment,
+            )
+
+
+def scan_chromosome_for_alignments(  # pylint:disable=too-many-arguments
+    crispr_target: CrisprTarget,
+    sequence_source: SequenceSource,
+    chromosome: str,
+    allowed_mismatches: int,
+    allowed_total_bulges: int,
+    allowed_rna_bulges: int,
+    allowed_dna_bulges: int,
+    engine: str = "recursive",
+    max_pam_misalignments: Optional[int] = None,
+    chunk_size: int = DEFAULT_SCAN_CHUNK_SIZE,
+) -> Iterator[ScanHit]:
+    """Find every alignment of a CRISPR target along a whole chromosome.
+
+    The chromosome is read in overlapping chunks, and both strands of each
+    chunk are scanned window by window with the alignment engine. Hits are
+    yielded as they are found, so only one chunk is held in memory no
+    matter how long the chromosome is. Every window that fits entirely in
+    the chromosome is scanned exactly once, whatever the chunk_size.
+
+    Args:
+        crispr_target: the CRISPR target to align
+        sequence_source: where to read the chromosome from, e.g. a TwoBitSequenceSource
+        chromosome: the name of the chromosome in the sequence source
+        allowed_mismatches: the maximum number of mismatches (including bulges)
+        allowed_total_bulges: the maximum number of RNA+DNA bulges
+        allowed_rna_bulges: the maximum number of RNA bulges
+        allowed_dna_bulges: the maximum number of DNA bulges
+        engine: which key of ALIGNMENT_ENGINES to use to enumerate the alignments in each window
+        max_pam_misalignments: if provided, only the windows that could place the PAM on a stretch matching it with at most this many substitutions are searched
+        chunk_size: how many windows of each strand are scanned per chunk
+
+    Yields:
+        each alignment, in order of chunk, then strand (positive first), then window
+    """
+    if engine not in ALIGNMENT_ENGINES:
+        raise AlignmentEngineNotImplementedError(engine)
+    find_alignments_in_window = ALIGNMENT_ENGINES[engine]
+    window_length = len(crispr_target.sequence) + allowed_dna_bulges
+    allowed_bulges = (allowed_total_bulges, allowed_rna_bulges, allowed_dna_bulges)
+    for chunk_start_coord, chunk_seq in iter_sequence_chunks(
+        sequence_source, chromosome, chunk_size, window_length - 1
+    ):
+        chunk_seq = chunk_seq.upper()
+        num_windows = len(chunk_seq) - window_length + 1
+        if num_windows < 1:
+            continue  # the end of the chromosome is too short to hold a window
+        # a window belongs to the chunk holding the lowest coordinate it covers, which is the end of a window on the reverse strand
+        yield from scan_strand_windows(
+            crispr_target,
+            find_alignments_in_window,
+            chromosome,
+            chunk_start_coord,
+            True,
+            chunk_seq,
+            range(0, min(chunk_size, num_windows)),
+            allowed_mismatches,
+            allowed_bulges,
+            max_pam_misalignments,
+        )
+        yield from scan_strand_windows(
+            crispr_target,
+            find_alignments_in_window,
+            chromosome,
+            chunk_start_coord,
+            False,
+            str(SequenceView.from_str(chunk_seq).reverse_complement()),
+            range(max(num_windows - chunk_size, 0), num_windows),
+            allowed_mismatches,
+            allowed_bulges,
+            max_pam_misalignments,
+        )
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""A persistent index of where every short seed occurs in a genome."""
+import itertools
+import json
+import struct
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .constants import DEFAULT_SCAN_CHUNK_SIZE
+from .constants import DEFAULT_SEED_LENGTH
+from .exceptions import InvalidSeedIndexFileError
+from .scanning import iter_sequence_chunks
+from .sequence_sources import SequenceSource
+
+SEED_INDEX_SIGNATURE = b"NOTSEED\x01"
+SEED_BASES = "ACGT"  # complementary bases have codes adding up to 3
+MAX_SEED_LENGTH = (
+    13  # the offsets of every possible seed take 4**13 * 8 bytes = 512 MiB
+)
+
+_ASCII_TO_SEED_CODE: NDArray[np.uint8] = np.full(256, 4, dtype=np.uint8)
+_ASCII_TO_SEED_CODE[np.frombuffer(b"ACGTacgt", dtype=np.uint8)] = [0, 1, 2, 3] * 2
+
+
+def _encode_seeds(
+    sequence: str, seed_length: int
+) -> Tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Encode every seed of a sequence made up only of A, C, G and T.
+
+    Each base takes 2 bits, with the 5' base in the most significant bits.
+
+    Returns: the code of each seed and the index in the sequence where it starts
+    """
+    codes = _ASCII_TO_SEED_CODE[np.frombuffer(sequence.encode("ascii"), np.uint8)]
+    num_seeds = max(len(codes) - seed_length + 1, 0)
+    seed_codes = np.zeros(num_seeds, dtype=np.int64)
+    for base_idx in range(seed_length):
+        seed_codes = (seed_codes << 2) | (
+            codes[base_idx : base_idx + num_seeds] & 3
+        ).astype(np.int64)
+    num_other_bases_before = np.concatenate(([0], np.cumsum(codes > 3)))
+    is_valid = (
+        num_other_bases_before[seed_length : seed_length + num_seeds]
+        == num_other_bases_before[:num_seeds]
+    )
+    return seed_codes[is_valid], np.flatnonzero(is_valid).astype(np.int64)
+
+
+def reverse_complement_seed_codes(
+    seed_codes: NDArray[np.int64], seed_length: int
+) -> NDArray[np.int64]:
+    """Encode the reverse complement of each seed."""
+    reverse_complement_codes = np.zeros(len(seed_codes), dtype=np.int64)
+    for base_idx in range(seed_length):
+        reverse_complement_codes = (reverse_complement_codes << 2) | (
+            3 - ((seed_codes >> (2 * base_idx)) & 3)
+        )
+    return reverse_complement_codes
+
+
+def _get_data_offset(header_size: int) -> int:
+    """Align the arrays after the header to 8 bytes."""
+    header_end = len(SEED_INDEX_SIGNATURE) + 8 + header_size
+    return header_end + (-header_end % 8)
+
+
+class SeedIndex:
+    """Where every seed (k-mer) of a genome occurs.
+
+    The index is a single file that is memory-mapped, so opening it is
+    instant and only the pages holding the seeds looked up are read from
+    disk. It holds a JSON header describing the chromosomes, then the
+    offset of the first occurrence of each possible seed, then the
+    occurrences themselves grouped by seed and in order of position.
+
+    Positions are 0-based and count from the start of the first chromosome,
+    as if the chromosomes were laid end to end in the order they were
+    indexed. Seeds containing any base other than A, C, G or T are not
+    indexed.
+
+    Create one with SeedIndex.build, or open an existing one by its filepath.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        self.filepath = filepath
+        with open(filepath, "rb") as in_file:
+            if in_file.read(len(SEED_INDEX_SIGNATURE)) != SEED_INDEX_SIGNATURE:
+                raise InvalidSeedIndexFileError(
+                    f"{filepath} does not have a seed index signature"
+                )
+            header_size = struct.unpack("<Q", in_file.read(8))[0]
+            header = json.loads(in_file.read(header_size).decode("utf-8"))
+        self.seed_length: int = header["seed_length"]
+        self.chromosomes: List[str] = header["chromosomes"]
+        self.chromosome_sizes: List[int] = header["chromosome_sizes"]
+        self._chromosome_offsets = np.array(
+            header["chromosome_offsets"], dtype=np.int64
+        )
+        data_offset = _get_data_offset(header_size)
+        num_possible_seeds = 4 ** self.seed_length
+        self._seed_offsets = np.memmap(
+            filepath,
+            dtype="<i8",
+            mode="r",
+            offset=data_offset,
+            shape=(num_possible_seeds + 1,),
+        )
+        num_positions = int(self._seed_offsets[-1])
+        # numpy cannot memory-map an empty range
+        self._positions = (
+            np.memmap(
+                filepath,
+                dtype=header["position_dtype"],
+                mode="r",
+                offset=data_offset + self._seed_offsets.nbytes,
+                shape=(num_positions,),
+            )
+            if num_positions > 0
+            else np.zeros(0, dtype=header["position_dtype"])
+        )
+
+    @classmethod
+    def build(  # pylint:disable=too-many-arguments,too-many-locals
+        cls,
+        sequence_source: SequenceSource,
+        filepath: str,
+        seed_length: int = DEFAULT_SEED_LENGTH,
+        chromosomes: Optional[Sequence[str]] = None,
+        chunk_size: int = DEFAULT_SCAN_CHUNK_SIZE,
+    ) -> "SeedIndex":
+        """Index every seed of a genome and save the index to a file.
+
+        The genome is read twice in chunks: once to count the occurrences
+        of each seed and once to write their positions into place in the
+        memory-mapped file. Memory use depends on the chunk size and the
+        seed length, not on the size of the genome.
+
+        Args:
+            sequence_source: where to read the genome from, e.g. a TwoBitSequenceSource
+            filepath: where to save the index
+            seed_length: the number of bases in each seed, at most MAX_SEED_LENGTH
+            chromosomes: which chromosomes to index, in order. Defaults to every chromosome in the sequence source
+            chunk_size: how many bases to read from the sequence source at a time
+        """
+        if not 1 <= seed_length <= MAX_SEED_LENGTH:
+            raise ValueError(
+                f"seed_length must be between 1 and {MAX_SEED_LENGTH}, not {seed_length}"
+            )
+        if chromosomes is None:
+            chromosomes = sequence_source.chromosomes
+        chromosome_sizes = [
+            sequence_source.get_chromosome_size(chromosome)
+            for chromosome in chromosomes
+        ]
+        chromosome_offsets = list(itertools.accumulate([0] + chromosome_sizes))[:-1]
+
+        def iter_genome_seeds() -> Iterator[
+            Tuple[NDArray[np.int64], NDArray[np.int64]]
+        ]:
+            for chromosome, chromosome_offset in zip(chromosomes, chromosome_offsets):
+                for chunk_start_coord, chunk_seq in iter_sequence_chunks(
+                    sequence_source, chromosome, chunk_size, seed_length - 1
+                ):
+                    seed_codes, seed_idxs = _encode_seeds(chunk_seq, seed_length)
+                    yield seed_codes, chromosome_offset + chunk_start_coord - 1 + seed_idxs
+
+        num_possible_seeds = 4 ** seed_length
+        seed_counts = np.zeros(num_possible_seeds, dtype=np.int64)
+        for seed_codes, _ in iter_genome_seeds():
+            unique_codes, unique_counts = np.unique(seed_codes, return_counts=True)
+            seed_counts[unique_codes] += unique_counts
+        seed_offsets = np.concatenate(([0], np.cumsum(seed_counts))).astype("<i8")
+        num_positions = int(seed_offsets[-1])
+        position_dtype = "<u4" if sum(chromosome_sizes) <= 2 ** 32 else "<u8"
+
+        header = json.dumps(
+            {
+                "seed_length": seed_length,
+                "chromosomes": list(chromosomes),
+                "chromosome_sizes": chromosome_sizes,
+                "chromosome_offsets": chromosome_offsets,
+                "position_dtype": position_dtype,
+            }
+        ).encode("utf-8")
+        data_offset = _get_data_offset(len(header))
+        with open(filepath, "wb") as out_file:
+            out_file.write(SEED_INDEX_SIGNATURE)
+            out_file.write(struct.pack("<Q", len(header)))
+            out_file.write(header)
+            out_file.write(b"\0" * (data_offset - out_file.tell()))
+            out_file.write(seed_offsets.tobytes())
+            out_file.truncate(
+                out_file.tell() + num_positions * np.dtype(position_dtype).itemsize
+            )
+
+        if num_positions > 0:
+            positions = np.memmap(
+                filepath,
+                dtype=position_dtype,
+                mode="r+",
+                offset=data_offset + seed_offsets.nbytes,
+                shape=(num_positions,),
+            )
+            next_position_idxs = seed_offsets[:-1].copy()
+            for seed_codes, genome_positions in iter_genome_seeds():
+                order = np.argsort(seed_codes, kind="stable")
+                sorted_codes = seed_codes[order]
+                unique_codes, first_idxs, unique_counts = np.unique(
+                    sorted_codes, return_index=True, return_counts=True
+                )
+                rank_within_seed = np.arange(len(sorted_codes)) - np.repeat(
+                    first_idxs, unique_counts
+                )
+                positions[
+                    next_position_idxs[sorted_codes] + rank_within_seed
+                ] = genome_positions[order]
+                next_position_idxs[unique_codes] += unique_counts
+            positions.flush()
+            del positions
+        return cls(filepath)
+
+    @property
+    def num_positions(self) -> int:
+        return len(self._positions)
+
+    def _find_seed_ranges(
+        self, seed_codes: NDArray[np.int64], seed_length: Optional[int]
+    ) -> Tuple[NDArray[np.int64], NDArray[np.int64]]:
+        if seed_length is None:
+            seed_length = self.seed_length
+        if not 1 <= seed_length <= self.seed_length:
+            raise ValueError(
+                f"seed_length must be between 1 and the {self.seed_length} bases of the indexed seeds, not {seed_length}"
+            )
+        # the indexed seeds starting with a shorter seed are next to each other
+        shift = 2 * (self.seed_length - seed_length)
+        return (
+            self._seed_offsets[seed_codes << shift],
+            self._seed_offsets[(seed_codes + 1) << shift],
+        )
+
+    def count_seed_positions(
+        self, seed_codes: NDArray[np.int64], seed_length: Optional[int] = None
+    ) -> int:
+        """Count the occurrences of the seeds, without reading them."""
+        starts, ends = self._find_seed_ranges(seed_codes, seed_length)
+        return int((ends - starts).sum())
+
+    def find_seed_positions(
+        self, seed_codes: NDArray[np.int64], seed_length: Optional[int] = None
+    ) -> NDArray[np.int64]:
+        """Find every occurrence of any of the seeds.
+
+        Args:
+            seed_codes: the seeds to look up, encoded with 2 bits per base in the order of SEED_BASES and the 5' base in the most significant bits
+            seed_length: the number of bases in each seed to look up. Seeds shorter than the indexed ones are found at the start of them. Defaults to the length of the indexed seeds
+
+        Returns:
+            the genome positions of the occurrences, grouped by seed
+        """
+        starts, ends = self._find_seed_ranges(seed_codes, seed_length)
+        return np.concatenate(
+            [np.zeros(0, dtype=np.int64)]
+            + [
+                self._positions[start:end].astype(np.int64)
+                for start, end in zip(starts, ends)
+            ]
+        )
+
+    def locate(
+        self, genome_positions: NDArray[np.int64]
+    ) -> Tuple[NDArray[np.int64], NDArray[np.int64]]:
+        """Convert genome positions to positions within each chromosome.
+
+        Returns:
+            the index in `chromosomes` of the chromosome of each position, and the 0-based position within it
+        """
+        chromosome_idxs = (
+            np.searchsorted(self._chromosome_offsets, genome_positions, side="right")
+            - 1
+        )
+        return (
+            chromosome_idxs,
+            genome_positions - self._chromosome_offsets[chromosome_idxs],
+        )
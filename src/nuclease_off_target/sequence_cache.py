@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Persistent cache of genomic sequences."""
+from contextlib import closing
+import sqlite3
+from typing import Optional
+
+from .constants import DEFAULT_SEQUENCE_CACHE_MAX_BASES
+
+SEQUENCE_CACHE_TIMEOUT_SECONDS = 30
+
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS sequences (
+    genome TEXT NOT NULL,
+    chromosome TEXT NOT NULL,
+    start_coord INTEGER NOT NULL,
+    end_coord INTEGER NOT NULL,
+    sequence TEXT NOT NULL,
+    last_access INTEGER NOT NULL,
+    PRIMARY KEY (genome, chromosome, start_coord, end_coord)
+)
+"""
+_CREATE_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS sequences_by_last_access ON sequences (last_access)"
+)
+_NEXT_ACCESS_SQL = "(SELECT COALESCE(MAX(last_access), 0) + 1 FROM sequences)"
+
+
+class SequenceCache:
+    """Positive strand sequences stored in an SQLite database on disk.
+
+    Any requested range that lies within a cached range is sliced out of
+    it. Once more than max_bases are stored, the least recently used
+    ranges are evicted.
+
+    A new connection is opened for every operation, and every write is its
+    own transaction, so the same file can be shared by many threads and
+    processes at once.
+    """
+
+    def __init__(
+        self, filepath: str, max_bases: int = DEFAULT_SEQUENCE_CACHE_MAX_BASES
+    ) -> None:
+        self.filepath = filepath
+        self.max_bases = max_bases
+        with closing(self._connect()) as connection:
+            # write-ahead logging lets processes keep reading while another one writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_CREATE_TABLE_SQL)
+            connection.execute(_CREATE_INDEX_SQL)
+
+    def _connect(self) -> sqlite3.Connection:
+        # autocommit mode, so that transactions are only the explicit ones
+        return sqlite3.connect(
+            self.filepath, timeout=SEQUENCE_CACHE_TIMEOUT_SECONDS, isolation_level=None
+        )
+
+    def fetch_sequence(
+        self, genome: str, chromosome: str, start_coord: int, end_coord: int
+    ) -> Optional[str]:
+        """Get the positive strand sequence if it is within a cached range.
+
+        Returns:
+            the sequence, or None if no cached range covers the coordinates
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT start_coord, end_coord, sequence FROM sequences WHERE genome = ? AND chromosome = ? AND start_coord <= ? AND end_coord >= ? ORDER BY end_coord - start_coord LIMIT 1",
+                (genome, chromosome, start_coord, end_coord),
+            ).fetchone()
+            if row is None:
+                return None
+            cached_start_coord, cached_end_coord, cached_sequence = row
+            # a single statement, so the access counter stays unique even with other processes writing
+            connection.execute(
+                f"UPDATE sequences SET last_access = {_NEXT_ACCESS_SQL} WHERE genome = ? AND chromosome = ? AND start_coord = ? AND end_coord = ?",
+                (genome, chromosome, cached_start_coord, cached_end_coord),
+            )
+        offset = start_coord - cached_start_coord
+        return str(cached_sequence[offset : offset + end_coord - start_coord + 1])
+
+    def store_sequence(
+        self,
+        genome: str,
+        chromosome: str,
+        start_coord: int,
+        end_coord: int,
+        sequence: str,
+    ) -> None:
+        """Add the positive strand sequence of a range to the cache.
+
+        Cached ranges inside the new one are replaced by it.
+        """
+        if len(sequence) > self.max_bases:
+            return
+        with closing(self._connect()) as connection:
+            # take the write lock up front so the eviction sees a consistent total
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "DELETE FROM sequences WHERE genome = ? AND chromosome = ? AND start_coord >= ? AND end_coord <= ?",
+                    (genome, chromosome, start_coord, end_coord),
+                )
+                connection.execute(
+                    f"INSERT INTO sequences VALUES (?, ?, ?, ?, ?, {_NEXT_ACCESS_SQL})",
+                    (genome, chromosome, start_coord, end_coord, sequence),
+                )
+                self._evict_least_recently_used(connection)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def _evict_least_recently_used(self, connection: sqlite3.Connection) -> None:
+        bases_to_evict = self._count_bases(connection) - self.max_bases
+        if bases_to_evict <= 0:
+            return
+        cursor = connection.execute(
+            "SELECT rowid, end_coord - start_coord + 1 FROM sequences ORDER BY last_access"
+        )
+        rowids_to_evict = list()
+        # the newly stored range is never evicted since it always fits on its own and was accessed last
+        while bases_to_evict > 0:
+            rowid, num_bases = cursor.fetchone()
+            rowids_to_evict.append((rowid,))
+            bases_to_evict -= num_bases
+        connection.executemany("DELETE FROM sequences WHERE rowid = ?", rowids_to_evict)
+
+    @staticmethod
+    def _count_bases(connection: sqlite3.Connection) -> int:
+        count: int = connection.execute(
+            "SELECT COALESCE(SUM(end_coord - start_coord + 1), 0) FROM sequences"
+        ).fetchone()[0]
+        return count
+
+    @property
+    def total_bases(self) -> int:
+        with closing(self._connect()) as connection:
+            return self._count_bases(connection)
+
+    def clear(self) -> None:
+        with closing(self._connect()) as connection:
+            connection.execute("DELETE FROM sequences")
+
+
+default_sequence_cache: Optional[  # pylint:disable=invalid-name # this is a global singleton that is deliberately reassigned
+    SequenceCache
+] = None
+
+
+def get_default_sequence_cache() -> Optional[SequenceCache]:
+    return default_sequence_cache
+
+
+def set_default_sequence_cache(new_cache: Optional[SequenceCache]) -> None:
+    """Set the cache GenomicSequence.from_coordinates uses when none is given.
+
+    Use None to stop caching.
+    """
+    global default_sequence_cache  # pylint:disable=global-statement,invalid-name # this is a deliberate use to set up a global singleton
+    default_sequence_cache = new_cache
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""Local sources of genomic DNA sequence."""
+from bisect import bisect_right
+import mmap
+import os
+import struct
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .exceptions import ChromosomeNotInSequenceSourceError
+from .exceptions import CoordinatesOutsideOfChromosomeError
+from .exceptions import InvalidFastaFileError
+from .exceptions import InvalidTwoBitFileError
+from .exceptions import SequenceSourceAlreadyRegisteredError
+
+TWO_BIT_SIGNATURE = 0x1A412743
+TWO_BIT_BASES = "TCAG"
+
+# each packed byte holds 4 bases, most significant bits first
+_TWO_BIT_BYTE_TO_BASES: NDArray[np.uint8] = np.array(
+    [
+        [ord(TWO_BIT_BASES[(byte >> shift) & 3]) for shift in (6, 4, 2, 0)]
+        for byte in range(256)
+    ],
+    dtype=np.uint8,
+)
+
+
+class SequenceSource:
+    """Base class for anything that can provide the DNA of a genome.
+
+    Coordinates follow the same convention as the UCSC Genome Browser
+    positions used by GenomicSequence.from_coordinates: 1-based and
+    inclusive of both ends.
+    """
+
+    def fetch_sequence(self, chromosome: str, start_coord: int, end_coord: int) -> str:
+        """Get the uppercase sequence of the positive strand."""
+        raise NotImplementedError("Subclasses must implement this method")
+
+    @property
+    def chromosomes(self) -> List[str]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def get_chromosome_size(self, chromosome: str) -> int:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def close(self) -> None:
+        """Release any resources held by the source."""
+
+    def __enter__(self) -> "SequenceSource":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def _validate_coordinates(
+    chromosome: str, start_coord: int, end_coord: int, chromosome_size: int
+) -> None:
+    if start_coord < 1 or end_coord > chromosome_size or start_coord > end_coord:
+        raise CoordinatesOutsideOfChromosomeError(
+            f"{chromosome}:{start_coord}-{end_coord} is not within the {chromosome_size} bases of {chromosome}"
+        )
+
+
+class TwoBitSequenceSource(SequenceSource):
+    """Random access to the sequences in a UCSC .2bit file.
+
+    The file is memory-mapped, so only the pages holding the requested
+    bases are ever read from disk.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        self.filepath = filepath
+        with open(filepath, "rb") as in_file:
+            self._mmap = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+        # (size, N block starts, N block ends, offset of the packed DNA) parsed lazily for each chromosome
+        self._records: Dict[str, Tuple[int, List[int], List[int], int]] = dict()
+        try:
+            self._record_offsets = self._parse_index()
+        except InvalidTwoBitFileError:
+            self._mmap.close()
+            raise
+
+    def _parse_index(self) -> Dict[str, int]:
+        filepath = self.filepath
+        if len(self._mmap) < 16:
+            raise InvalidTwoBitFileError(f"{filepath} is too short to be a .2bit file")
+        for byte_order in ("<", ">"):
+            if struct.unpack_from(f"{byte_order}I", self._mmap)[0] == TWO_BIT_SIGNATURE:
+                self._byte_order = byte_order
+                break
+        else:
+            raise InvalidTwoBitFileError(f"{filepath} does not have a .2bit signature")
+        version, sequence_count = struct.unpack_from(
+            f"{self._byte_order}II", self._mmap, 4
+        )
+        if version not in (0, 1):
+            raise InvalidTwoBitFileError(
+                f"{filepath} has unsupported .2bit version {version}"
+            )
+        offset_format = f"{self._byte_order}{'Q' if version == 1 else 'I'}"
+        offset_size = struct.calcsize(offset_format)
+
+        record_offsets: Dict[str, int] = dict()
+        index_position = 16
+        for _ in range(sequence_count):
+            name_size = self._mmap[index_position]
+            index_position += 1
+            name = self._mmap[index_position : index_position + name_size].decode(
+                "ascii"
+            )
+            index_position += name_size
+            record_offsets[name] = struct.unpack_from(
+                offset_format, self._mmap, index_position
+            )[0]
+            index_position += offset_size
+        return record_offsets
+
+    @property
+    def chromosomes(self) -> List[str]:
+        return list(self._record_offsets.keys())
+
+    def _get_record(self, chromosome: str) -> Tuple[int, List[int], List[int], int]:
+        if chromosome in self._records:
+            return self._records[chromosome]
+        if chromosome not in self._record_offsets:
+            raise ChromosomeNotInSequenceSourceError(
+                f"{chromosome} is not in {self.filepath}"
+            )
+        position = self._record_offsets[chromosome]
+        uint_format = f"{self._byte_order}I"
+        dna_size, n_block_count = struct.unpack_from(
+            f"{self._byte_order}II", self._mmap, position
+        )
+        position += 8
+        n_block_starts = list(
+            struct.unpack_from(
+                f"{self._byte_order}{n_block_count}I", self._mmap, position
+            )
+        )
+        position += 4 * n_block_count
+        n_block_sizes = struct.unpack_from(
+            f"{self._byte_order}{n_block_count}I", self._mmap, position
+        )
+        position += 4 * n_block_count
+        n_block_ends = [
+            block_start + block_size
+            for block_start, block_size in zip(n_block_starts, n_block_sizes)
+        ]
+        # soft-masking (lowercase) blocks are skipped since sequences are always provided in uppercase, the same as the UCSC Browser queries
+        mask_block_count = struct.unpack_from(uint_format, self._mmap, position)[0]
+        position += 4 + 8 * mask_block_count
+        position += 4  # reserved
+        record = (dna_size, n_block_starts, n_block_ends, position)
+        self._records[chromosome] = record
+        return record
+
+    def get_chromosome_size(self, chromosome: str) -> int:
+        return self._get_record(chromosome)[0]
+
+    def fetch_sequence(self, chromosome: str, start_coord: int, end_coord: int) -> str:
+        """Get the uppercase sequence of the positive strand.
+
+        Only the packed bytes covering the requested range are decoded.
+        """
+        dna_size, n_block_starts, n_block_ends, dna_offset = self._get_record(
+            chromosome
+        )
+        _validate_coordinates(chromosome, start_coord, end_coord, dna_size)
+        range_start = start_coord - 1
+        range_end = end_coord
+        first_byte = range_start // 4
+        # slicing copies just the needed bytes out of the map, so no numpy view keeps the mmap from being closed
+        packed = np.frombuffer(
+            self._mmap[dna_offset + first_byte : dna_offset + (range_end + 3) // 4],
+            dtype=np.uint8,
+        )
+        bases = _TWO_BIT_BYTE_TO_BASES[packed].reshape(-1)
+        bases = bases[range_start - 4 * first_byte :][: range_end - range_start]
+
+        # N blocks are sorted and non-overlapping, so the search can begin with the last block starting before the range
+        block_idx = max(bisect_right(n_block_starts, range_start) - 1, 0)
+        while block_idx < len(n_block_starts) and n_block_starts[block_idx] < range_end:
+            overlap_start = max(n_block_starts[block_idx], range_start)
+            overlap_end = min(n_block_ends[block_idx], range_end)
+            if overlap_start < overlap_end:
+                bases[overlap_start - range_start : overlap_end - range_start] = ord(
+                    "N"
+                )
+            block_idx += 1
+        return bases.tobytes().decode("ascii")
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+def write_fasta_index(fasta_filepath: str, index_filepath: Optional[str] = None) -> str:
+    """Create a samtools-compatible .fai index in a single pass over a FASTA file.
+
+    Args:
+        fasta_filepath: the uncompressed FASTA file
+        index_filepath: where to write the index. Defaults to the FASTA file path with .fai appended
+
+    Returns:
+        the path of the index file
+    """
+    if index_filepath is None:
+        index_filepath = f"{fasta_filepath}.fai"
+    # (name, length, offset of first base, bases per line, bytes per line)
+    entries: List[Tuple[str, int, int, int, int]] = list()
+    name: Optional[str] = None
+    length = offset = line_bases = line_width = 0
+    is_previous_line_short = False
+    position = 0
+    with open(fasta_filepath, "rb") as in_file:
+        for line in in_file:
+            line_start = position
+            position += len(line)
+            if line.startswith(b">"):
+                if name is not None:
+                    entries.append((name, length, offset, line_bases, line_width))
+                name = line[1:].split()[0].decode("ascii")
+                length = 0
+                offset = position
+                line_bases = 0
+                line_width = 0
+                is_previous_line_short = False
+                continue
+            bases = line.rstrip(b"\r\n")
+            if name is None:
+                raise InvalidFastaFileError(
+                    f"{fasta_filepath} has sequence before the first header at byte {line_start}"
+                )
+            if not bases:
+                is_previous_line_short = True
+                continue
+            # byte offsets can only be calculated if every line but the last of a sequence is the same length
+            if is_previous_line_short or (0 < line_bases < len(bases)):
+                raise InvalidFastaFileError(
+                    f"{name} in {fasta_filepath} has lines of different lengths at byte {line_start}"
+                )
+            if line_bases == 0:
+                line_bases = len(bases)
+                line_width = len(line)
+            is_previous_line_short = len(bases) < line_bases
+            length += len(bases)
+    if name is not None:
+        entries.append((name, length, offset, line_bases, line_width))
+    with open(index_filepath, "w") as out_file:
+        for entry in entries:
+            out_file.write("\t".join(str(value) for value in entry) + "\n")
+    return index_filepath
+
+
+class FastaSequenceSource(SequenceSource):
+    """Random access to the sequences in an uncompressed, indexed FASTA file.
+
+    If the .fai index does not exist yet, it is created. The FASTA file is
+    memory-mapped and the byte offsets of a range are calculated from the
+    index, so whole chromosomes are never read.
+    """
+
+    def __init__(self, filepath: str, index_filepath: Optional[str] = None) -> None:
+        self.filepath = filepath
+        if index_filepath is None:
+            index_filepath = f"{filepath}.fai"
+        if not os.path.isfile(index_filepath):
+            write_fasta_index(filepath, index_filepath)
+        self.index_filepath = index_filepath
+
+        # (length, offset of first base, bases per line, bytes per line)
+        self._index: Dict[str, Tuple[int, int, int, int]] = dict()
+        with open(index_filepath) as in_file:
+            for line in in_file:
+                name, length, offset, line_bases, line_width = line.split("\t")[:5]
+                self._index[name] = (
+                    int(length),
+                    int(offset),
+                    int(line_bases),
+                    int(line_width),
+                )
+        with open(filepath, "rb") as in_file:
+            self._mmap = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def chromosomes(self) -> List[str]:
+        return list(self._index.keys())
+
+    def _get_index_entry(self, chromosome: str) -> Tuple[int, int, int, int]:
+        if chromosome not in self._index:
+            raise ChromosomeNotInSequenceSourceError(
+                f"{chromosome} is not in {self.filepath}"
+            )
+        return self._index[chromosome]
+
+    def get_chromosome_size(self, chromosome: str) -> int:
+        return self._get_index_entry(chromosome)[0]
+
+    def fetch_sequence(self, chromosome: str, start_coord: int, end_coord: int) -> str:
+        """Get the uppercase sequence of the positive strand."""
+        length, offset, line_bases, line_width = self._get_index_entry(chromosome)
+        _validate_coordinates(chromosome, start_coord, end_coord, length)
+        first_base_idx = start_coord - 1
+        last_base_idx = end_coord - 1
+        start_byte = (
+            offset
+            + (first_base_idx // line_bases) * line_width
+            + first_base_idx % line_bases
+        )
+        end_byte = (
+            offset
+            + (last_base_idx // line_bases) * line_width
+            + last_base_idx % line_bases
+            + 1
+        )
+        return (
+            self._mmap[start_byte:end_byte]
+            .translate(None, b"\r\n")
+            .upper()
+            .decode("ascii")
+        )
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+SEQUENCE_SOURCES: Dict[str, SequenceSource] = dict()
+
+
+def register_sequence_source(genome: str, sequence_source: SequenceSource) -> None:
+    """Make GenomicSequence.from_coordinates read a genome from a local source.
+
+    Args:
+        genome: the name of the genome, e.g. hg38
+        sequence_source: the source to read the sequence of the genome from
+    """
+    if genome in SEQUENCE_SOURCES:
+        raise SequenceSourceAlreadyRegisteredError(genome)
+    SEQUENCE_SOURCES[genome] = sequence_source
+
+
+def unregister_sequence_source(genome: str) -> SequenceSource:
+    """Stop using a local source for a genome.
+
+    Returns:
+        the source that was registered, so that it can be closed if needed
+    """
+    return SEQUENCE_SOURCES.pop(genome)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Views of a strand and range of a sequence that share its bases."""
+from typing import Any
+from typing import Tuple
+from typing import Union
+
+_COMPLEMENT_TABLE = str.maketrans(
+    "ACGTRYKMBVDHSWNacgtrykmbvdhswn", "TGCAYRMKVBHDSWNtgcayrmkvbhdswn"
+)
+
+
+class SequenceView:
+    """A range of bases on either strand, sharing the buffer they come from.
+
+    Subsequences and reverse complements are new views of the same
+    buffer, so creating them takes the same time and memory no matter how
+    long the sequence is. Bases are only copied out when the view is
+    indexed, sliced or converted to a str.
+
+    Create one with SequenceView.from_str.
+    """
+
+    def __init__(
+        self,
+        buffer: Any,
+        offset: int,
+        length: int,
+        is_reverse_complement: bool,
+    ) -> None:
+        self._buffer = buffer
+        self._offset = offset
+        self._length = length
+        self.is_reverse_complement = is_reverse_complement
+
+    @classmethod
+    def from_str(cls, sequence: str) -> "SequenceView":
+        return cls(sequence, 0, len(sequence), False)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _decode(self, buffer_start: int, buffer_end: int) -> str:
+        """Get part of the buffer as positive strand bases."""
+        buffer: str = self._buffer
+        if buffer_start == 0 and buffer_end == len(buffer):
+            return buffer  # no need to copy the whole string
+        return buffer[buffer_start:buffer_end]
+
+    def _get_buffer_range(self, start: int, end: int) -> Tuple[int, int]:
+        if self.is_reverse_complement:
+            return (
+                self._offset + self._length - end,
+                self._offset + self._length - start,
+            )
+        return self._offset + start, self._offset + end
+
+    def _decode_to_str(self, start: int, end: int) -> str:
+        if end <= start:
+            return ""
+        bases = self._decode(*self._get_buffer_range(start, end))
+        if self.is_reverse_complement:
+            return bases.translate(_COMPLEMENT_TABLE)[::-1]
+        return bases
+
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        """Copy out a single base or a slice as a str."""
+        if isinstance(key, slice):
+            start, end, step = key.indices(self._length)
+            if step == 1:
+                return self._decode_to_str(start, end)
+            return self._decode_to_str(0, self._length)[key]
+        idx = range(self._length)[key]
+        return self._decode_to_str(idx, idx + 1)
+
+    def __str__(self) -> str:
+        return self._decode_to_str(0, self._length)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} of {self._length} bases{' reverse complemented' if self.is_reverse_complement else ''}>"
+
+    def shares_buffer_with(self, other: "SequenceView") -> bool:
+        return (
+            self._buffer
+            is other._buffer  # pylint:disable=protected-access # comparing two instances of the same class
+        )
+
+    def subsequence(self, start: int, end: int) -> "SequenceView":
+        """Create a view of bases start (inclusive) to end (exclusive).
+
+        Negative positions count from the end, like slicing.
+        """
+        start, end, _ = slice(start, end).indices(self._length)
+        end = max(start, end)
+        cls = self.__class__
+        buffer_start, _ = self._get_buffer_range(start, end)
+        return cls(self._buffer, buffer_start, end - start, self.is_reverse_complement)
+
+    def reverse_complement(self) -> "SequenceView":
+        """Create a view of the other strand of the same range."""
+        cls = self.__class__
+        return cls(
+            self._buffer, self._offset, self._length, not self.is_reverse_complement
+        )
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+import os
+
+from nuclease_off_target import FastaSequenceSource
+import pytest
+
+FASTA_LINE_BASES = 60
+
+
+# each test module using fasta_source defines a fasta_sequences fixture with the name and sequence of each of its chromosomes
+@pytest.fixture(scope="function", name="fasta_source")
+def fixture_fasta_source(fasta_sequences, tmp_path):
+    filepath = os.path.join(tmp_path, "genome.fa")
+    with open(filepath, "w") as out_file:
+        for name, sequence in fasta_sequences.items():
+            out_file.write(f">{name}\n")
+            for idx in range(0, len(sequence), FASTA_LINE_BASES):
+                out_file.write(sequence[idx : idx + FASTA_LINE_BASES] + "\n")
+    with FastaSequenceSource(filepath) as source:
+        yield source
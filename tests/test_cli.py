@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+from nuclease_off_target import cli
+from nuclease_off_target import SeedIndex
+import pytest
+
+# made up
+CHR1_SEQUENCE = (
+    "CCTAGGACTTACGATCCAGTACGGATTCGATGCCA"
+    + "GATTCCGTAGACAGACTAGGCAAGGAAT"
+    + "TTGACCAGTAGGCATGCAGTCGATACGGACTAGT"
+    + "GATTCCGTAGACAGtCTAGGCAAGGAAT"
+    + "ACGTAGCTAGTTCGGA"
+)
+
+
+@pytest.fixture(scope="function", name="genome_filepath")
+def fixture_genome_filepath(tmp_path):
+    filepath = os.path.join(tmp_path, "genome.fa")
+    with open(filepath, "w") as out_file:
+        out_file.write(f">chr1\n{CHR1_SEQUENCE}\n")
+    yield filepath
+
+
+def test_main__builds_index_then_searches_it(genome_filepath, tmp_path):
+    index_filepath = os.path.join(tmp_path, "genome.seeds")
+    out_file = io.StringIO()
+    assert (
+        cli.main(
+            ["build-index", genome_filepath, index_filepath, "--seed-length", "6"],
+            out_file=out_file,
+        )
+        == 0
+    )
+    assert out_file.getvalue().startswith("Indexed ")
+    assert SeedIndex(index_filepath).seed_length == 6
+
+    out_file = io.StringIO()
+    assert (
+        cli.main(
+            [
+                "search",
+                genome_filepath,
+                index_filepath,
+                "gattccgtagacagactaggca",
+                "--mismatches",
+                "1",
+                "--bulges",
+                "0",
+                "--max-pam-misalignments",
+                "0",
+            ],
+            out_file=out_file,
+        )
+        == 0
+    )
+    lines = out_file.getvalue().splitlines()
+    assert lines[0].split("\t") == list(cli.OFF_TARGET_SITE_COLUMNS)
+    assert lines[1].split("\t") == [
+        "chr1",
+        "36",
+        "63",
+        "+",
+        "0",
+        "GATTCCGTAGACAGACTAGGCANNGRRT",
+        " " * 28,
+        "GATTCCGTAGACAGACTAGGCAAGGAAT",
+    ]
+    assert lines[2].split("\t")[:5] == ["chr1", "98", "125", "+", "1.1"]
+    assert len(lines) == 3
+
+
+def test_main__writes_to_stdout_by_default(genome_filepath, tmp_path, capsys):
+    cli.main(
+        [
+            "build-index",
+            genome_filepath,
+            os.path.join(tmp_path, "genome.seeds"),
+            "--chromosomes",
+            "chr1",
+        ]
+    )
+    assert "in 1 chromosomes" in capsys.readouterr().out
+
+
+def test_open_sequence_source__opens_two_bit_files(mocker):
+    mocked_two_bit_source = mocker.patch.object(cli, "TwoBitSequenceSource")
+    assert cli.open_sequence_source("hg38.2bit") is mocked_two_bit_source.return_value
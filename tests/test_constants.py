@@ -27,6 +27,26 @@ def test_cas_varieties():
         "Sa": {
             "PAM": "NNGRRT",
             "cut_site_relative_to_pam": -3,
+            "PAM-mismatch-penalties-starting-from-3-prime-end": {
+                0: 2,
+                1: 20,
+                2: 20,
+                3: 40,
+                4: 40,
+                5: 40,
+            },
+            "additional-PAM-mismatch-penalties-starting-from-3-prime-end": {},
+            "PAM-mismatch-bases-without-additional-penalty": {},
+            "PAM-bulge-penalties-starting-from-3-prime-end": {
+                1: 0.3,
+                2: 0.3,
+                3: 0.3,
+                4: 0.3,
+                5: 0.3,
+            },
+            "RNA-bulge-penalty": 0.51,
+            "DNA-bulge-penalty": 0.7,
+            "second-bulge-penalty": 5,
             "mismatch-penalties-starting-from-PAM": {
                 0: 6,
                 1: 5,
@@ -55,6 +75,16 @@ def test_cas_varieties():
         "Sp": {
             "PAM": "NGG",
             "cut_site_relative_to_pam": -3,
+            "PAM-mismatch-penalties-starting-from-3-prime-end": {0: 20, 1: 0.3, 2: 0.3},
+            "additional-PAM-mismatch-penalties-starting-from-3-prime-end": {
+                1: 19.7,
+                2: 19.7,
+            },
+            "PAM-mismatch-bases-without-additional-penalty": {1: "A", 2: "A"},
+            "PAM-bulge-penalties-starting-from-3-prime-end": {0: 0, 1: 0, 2: 0},
+            "RNA-bulge-penalty": 0.51,
+            "DNA-bulge-penalty": 0.7,
+            "second-bulge-penalty": 5,
             "mismatch-penalties-starting-from-PAM": {
                 0: 6,
                 1: 5,
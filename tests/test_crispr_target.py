@@ -1,25 +1,38 @@
 # -*- coding: utf-8 -*-
 from types import SimpleNamespace
 
+from nuclease_off_target import align_crispr_targets
+from nuclease_off_target import ALIGNMENT_ENGINES
 from nuclease_off_target import ALIGNMENT_GAP_CHARACTER
+from nuclease_off_target import AlignmentEngineNotImplementedError
+from nuclease_off_target import BEST_FIRST_ENGINE
+from nuclease_off_target import CAS_SCORING_PROFILES
 from nuclease_off_target import CAS_VARIETIES
+from nuclease_off_target import CasVarietyAlreadyRegisteredError
 from nuclease_off_target import check_base_match
 from nuclease_off_target import create_space_in_alignment_between_guide_and_pam
 from nuclease_off_target import crispr_target
 from nuclease_off_target import CrisprAlignment
 from nuclease_off_target import CrisprTarget
 from nuclease_off_target import extract_cigar_str_from_result
+from nuclease_off_target import find_all_alignments_iteratively
 from nuclease_off_target import find_all_possible_alignments
+from nuclease_off_target import find_min_edit_distances
+from nuclease_off_target import find_pam_anchored_window_starts
 from nuclease_off_target import GenomicSequence
+from nuclease_off_target import register_cas_variety
 from nuclease_off_target import sa_cas_off_target_score
+from nuclease_off_target import sa_cas_off_target_scores
 from nuclease_off_target import SaCasTarget
 from nuclease_off_target import SEPARATION_BETWEEN_GUIDE_AND_PAM
 from nuclease_off_target import sp_cas_off_target_score
+from nuclease_off_target import sp_cas_off_target_scores
 from nuclease_off_target import SpCasTarget
 from nuclease_off_target import VERTICAL_ALIGNMENT_DNA_BULGE_CHARACTER
 from nuclease_off_target import VERTICAL_ALIGNMENT_MATCH_CHARACTER
 from nuclease_off_target import VERTICAL_ALIGNMENT_MISMATCH_CHARACTER
 from nuclease_off_target import VERTICAL_ALIGNMENT_RNA_BULGE_CHARACTER
+import numpy as np
 import pytest
 from pytest import approx
 
@@ -931,7 +944,12 @@ def test_sp_cas_off_target_score(
         ),
     ],
 )
+@pytest.mark.parametrize(
+    "test_find_function",
+    [find_all_possible_alignments, find_all_alignments_iteratively],
+)
 def test_find_all_possible_alignments(
+    test_find_function,
     test_crispr_seq,
     test_genome_seq,
     test_mismatches,
@@ -941,7 +959,7 @@ def test_find_all_possible_alignments(
     expected_alignments,
     test_description,
 ):
-    actual_alignments = find_all_possible_alignments(
+    actual_alignments = test_find_function(
         test_crispr_seq,
         test_genome_seq,
         test_mismatches,
@@ -955,7 +973,11 @@ def test_find_all_possible_alignments(
     assert actual_alignments == expected_alignments
 
 
-def test_CrisprAlignment__find_optimal_alignment__located_on_positive_strand():
+@pytest.mark.parametrize("test_max_pam_misalignments", [None, 1])
+@pytest.mark.parametrize("test_engine", ["recursive", "iterative", "best-first"])
+def test_CrisprAlignment__find_optimal_alignment__located_on_positive_strand(
+    test_engine, test_max_pam_misalignments
+):
     gs = GenomicSequence(
         "hg19",
         "chr11",
@@ -965,7 +987,14 @@ def test_CrisprAlignment__find_optimal_alignment__located_on_positive_strand():
     )
     ct = SaCasTarget("GCAGAACTACACACCAGGGCC")
     ca = CrisprAlignment(ct, gs)
-    ca.find_optimal_alignment(6, 1, 1, 0)
+    ca.find_optimal_alignment(
+        6,
+        1,
+        1,
+        0,
+        engine=test_engine,
+        max_pam_misalignments=test_max_pam_misalignments,
+    )
     assert ca.genomic_sequence.is_positive_strand is True
     assert ca.formatted_alignment == (
         "GCAGAACTACACACCAGGGCCNNGRRT",
@@ -983,7 +1012,12 @@ def test_CrisprAlignment__find_optimal_alignment__located_on_positive_strand():
     assert ca.cut_site_coord == 117756114 + 498
 
 
-def test_CrisprAlignment__find_optimal_alignment__located_on_negative_strand__flips_strand():
+@pytest.mark.parametrize("test_workers", [1, 2])
+@pytest.mark.parametrize("test_max_pam_misalignments", [None, 0])
+@pytest.mark.parametrize("test_engine", ["recursive", "iterative", "best-first"])
+def test_CrisprAlignment__find_optimal_alignment__located_on_negative_strand__flips_strand(
+    test_engine, test_max_pam_misalignments, test_workers
+):
     gs = GenomicSequence(
         "hg19",
         "chr8",
@@ -993,7 +1027,15 @@ def test_CrisprAlignment__find_optimal_alignment__located_on_negative_strand__fl
     )
     ct = SaCasTarget("GCAGAACTACACACCAGGGCC")
     ca = CrisprAlignment(ct, gs)
-    ca.find_optimal_alignment(7, 1, 0, 1)
+    ca.find_optimal_alignment(
+        7,
+        1,
+        0,
+        1,
+        engine=test_engine,
+        max_pam_misalignments=test_max_pam_misalignments,
+        workers=test_workers,
+    )
     assert ca.genomic_sequence.is_positive_strand is False
     assert ca.formatted_alignment == (
         "GCAGAACTACACACCAGGGCCNNGRRT",
@@ -1008,3 +1050,839 @@ def test_CrisprAlignment__find_optimal_alignment__located_on_negative_strand__fl
         "CTAGAATTATACACCAGAGCCAAGGGT",
     )
     assert ca.cut_site_coord == 126962200
+
+
+def test_find_all_alignments_iteratively__adds_to_provided_set():
+    existing_alignment = ("GTTAGGACTATTAGCGTGATNGG", "GTTAGGACTATTAGCGTGATAGG")
+    found_alignments = {existing_alignment}
+    actual = find_all_alignments_iteratively(
+        "GTTAGGACTATTAGCGTGATNGG",
+        "GTTAGGACTATTAGCGTGATCGGA",
+        0,
+        0,
+        0,
+        0,
+        found_alignments=found_alignments,
+    )
+    assert actual is found_alignments
+    assert actual == {
+        existing_alignment,
+        ("GTTAGGACTATTAGCGTGATNGG", "GTTAGGACTATTAGCGTGATCGG"),
+    }
+
+
+def test_ALIGNMENT_ENGINES():
+    assert ALIGNMENT_ENGINES == {
+        "recursive": find_all_possible_alignments,
+        "iterative": find_all_alignments_iteratively,
+    }
+
+
+def test_find_all_alignments_across_sequence__engines_find_identical_alignments():
+    genome_seq = "GGAAGGAACAGGGGTTTCAAAGTTTCCATCCAAATAAGACGAAGTCCGTTTGTCTTATTTGGTTCGTCCACCAGCAGAGAGGGGAGAGGACTGGCTGGCGCCCAAGTGGGAGGGCCTTTAACACAGCCGTCCTGGGCCCCACTGTGCTGATAAGAAATCTCACCAGGGCCTTGAAGAGGACCAGATCCAGGCACTAAATCAGCGAGGCGG"
+    crispr_seq = "GCAGAACTACACACCAGGGCCNNGRRT"
+    expected = crispr_target._find_all_alignments_across_sequence(
+        crispr_seq, genome_seq, 7, 2, 1, 1, engine="recursive"
+    )
+    # confirm pre-condition
+    assert len(expected) > 0
+
+    actual = crispr_target._find_all_alignments_across_sequence(
+        crispr_seq, genome_seq, 7, 2, 1, 1, engine="iterative"
+    )
+    assert actual == expected
+
+
+def test_CrisprAlignment__find_optimal_alignment__raises_error_for_unknown_engine():
+    gs = GenomicSequence("hg19", "chr1", 10, True, "AGCTGGATTCCGTAGACAGACTAGGTGGACTG")
+    ca = CrisprAlignment(SaCasTarget("GATTCCGTAGACAGACTAGG"), gs)
+    with pytest.raises(AlignmentEngineNotImplementedError, match="parasail"):
+        ca.find_optimal_alignment(3, 1, 1, 1, engine="parasail")
+
+
+@pytest.mark.parametrize(
+    ",".join(
+        (
+            "test_genome_seq",
+            "test_max_pam_misalignments",
+            "test_bulges",
+            "expected_window_starts",
+            "test_description",
+        )
+    ),
+    [
+        (
+            "ACGTTAGGACTATTAGCGTGATAGGTTTTTTTTTTT",
+            0,
+            (0, 0, 0),
+            [2],
+            "exact PAM with no bulges allowed",
+        ),
+        (
+            "ACGTTAGGACTATTAGCGTGATAGGTTTTTTTTTTT",
+            0,
+            (1, 1, 1),
+            [1, 2, 3],
+            "windows shifted by possible RNA and DNA bulges",
+        ),
+        (
+            "ACGTTAGGACTATTAGCGTGATAGGTTTTTTTTTTT",
+            0,
+            (1, 0, 1),
+            [1, 2],
+            "only DNA bulges allowed",
+        ),
+        (
+            "ACGTTAGGACTATTAGCGTGATACGTTTTTTTTTTT",
+            0,
+            (0, 0, 0),
+            [],
+            "PAM mismatch not allowed",
+        ),
+        (
+            "ACGTTAGGACTATTAGCGTGATACGTTTTTTTTTTT",
+            1,
+            (0, 0, 0),
+            [2, 3],
+            "one PAM mismatch allowed",
+        ),
+        (
+            "AGGTTAGGACTATTAGCGTGATACCTTTTTTTTTTTTTTTTTTTAGG",
+            0,
+            (0, 0, 0),
+            [],
+            "anchors too close to the ends of the sequence are ignored",
+        ),
+    ],
+)
+def test_find_pam_anchored_window_starts(
+    test_genome_seq,
+    test_max_pam_misalignments,
+    test_bulges,
+    expected_window_starts,
+    test_description,
+):
+    actual = find_pam_anchored_window_starts(
+        "GTTAGGACTATTAGCGTGATNGG",
+        "NGG",
+        test_genome_seq,
+        test_max_pam_misalignments,
+        *test_bulges,
+    )
+    assert actual == expected_window_starts
+
+
+def test_CrisprAlignment__find_optimal_alignment__only_searches_pam_anchored_windows(
+    mocker,
+):
+    gs = GenomicSequence(
+        "hg19",
+        "chr1",
+        10,
+        True,
+        "TTTTTTTTTTTTTTTTAGCTGGATTCCGTAGACAGACTAGGTGGACTGTTTTTTTTTTTTTTTTTTTT",
+    )
+    ca = CrisprAlignment(SpCasTarget("GATTCCGTAGACAGACTAGG"), gs)
+    spied_find = mocker.spy(crispr_target, "_find_all_alignments_across_sequence")
+    ca.find_optimal_alignment(0, 0, 0, 0, max_pam_misalignments=0)
+    assert spied_find.call_args_list[0][1]["window_starts"] == [18, 21]
+    assert spied_find.call_args_list[1][1]["window_starts"] == [20]
+    assert ca.formatted_alignment[2] == "GATTCCGTAGACAGACTAGGTGG"
+
+
+def test_BEST_FIRST_ENGINE():
+    assert BEST_FIRST_ENGINE == "best-first"
+
+
+@pytest.mark.parametrize(
+    ",".join(
+        (
+            "test_allowed_misalignments",
+            "test_max_pam_misalignments",
+            "test_description",
+        )
+    ),
+    [
+        ((7, 2, 1, 1), None, "bulges and mismatches allowed"),
+        ((6, 2, 2, 2), None, "several bulges of each type allowed"),
+        ((7, 2, 1, 1), 1, "only PAM anchored windows"),
+    ],
+)
+def test_find_best_alignment_best_first__matches_best_score_of_all_alignments(
+    test_allowed_misalignments, test_max_pam_misalignments, test_description
+):
+    genome_seq = "GGAAGGAACAGGGGTTTCAAAGTTTCCATCCAAATAAGACGAAGTCCGTTTGTCTTATTTGGTTCGTCCACCAGCAGAGAGGGGAGAGGACTGGCTGGCGCCCAAGTGGGAGGGCCTTTAACACAGCCGTCCTGGGCCCCACTGTGCTGATAAGAAATCTCACCAGGGCCTTGAAGAGGACCAGATCCAGGCACTAAATCAGCGAGGCGG"
+    crispr_seq = "GCAGAACTACACACCAGGGCCNNGRRT"
+    window_starts = None
+    if test_max_pam_misalignments is not None:
+        window_starts = find_pam_anchored_window_starts(
+            crispr_seq,
+            "NNGRRT",
+            genome_seq,
+            test_max_pam_misalignments,
+            *test_allowed_misalignments[1:],
+        )
+    all_alignments = crispr_target._find_all_alignments_across_sequence(
+        crispr_seq,
+        genome_seq,
+        *test_allowed_misalignments,
+        window_starts=window_starts,
+    )
+    _, expected_score = crispr_target._get_best_scoring_alignment(all_alignments)
+
+    actual = crispr_target._find_best_alignment_best_first(
+        crispr_seq,
+        [genome_seq],
+        *test_allowed_misalignments,
+        window_starts_for_each_seq=[window_starts],
+    )
+    assert actual is not None
+    actual_seq_idx, actual_alignment, actual_score = actual
+    assert actual_seq_idx == 0
+    assert actual_alignment in all_alignments
+    assert actual_score == approx(expected_score)
+    assert actual_score == sa_cas_off_target_score(
+        (actual_alignment[0], "", actual_alignment[1])
+    )
+
+
+def test_find_best_alignment_best_first__returns_none_if_nothing_found():
+    actual = crispr_target._find_best_alignment_best_first(
+        "GTTAGGACTATTAGCGTGATNNGRRT",
+        ["GTTAGCACTGTTAGCGTGATAAGAGTACGTTTT"],
+        0,
+        0,
+        0,
+        0,
+    )
+    assert actual is None
+
+
+def test_find_best_alignment_best_first__prefers_later_sequence_when_tied():
+    genome_seq = "TTTGTTAGGACTATTAGCGTGATAGGTTTT"
+    actual = crispr_target._find_best_alignment_best_first(
+        "GTTAGGACTATTAGCGTGATNGG", [genome_seq, genome_seq], 0, 0, 0, 0
+    )
+    assert actual == (1, ("GTTAGGACTATTAGCGTGATNGG", "GTTAGGACTATTAGCGTGATAGG"), 0)
+
+
+def test_find_best_alignment_best_first__ignores_alignments_outside_of_windows():
+    # the exact match is too close to the 3' end of the sequence to be in any window
+    actual = crispr_target._find_best_alignment_best_first(
+        "GTTAGGACTATTAGCGTGATNGG",
+        ["GTTAGCACTATTAGCGTGATAGGTTTTGTTAGGACTATTAGCGTGATAGG"],
+        1,
+        0,
+        0,
+        0,
+    )
+    assert actual == (0, ("GTTAGGACTATTAGCGTGATNGG", "GTTAGCACTATTAGCGTGATAGG"), 0.35)
+
+
+def test_find_best_alignment_best_first__ignores_alignments_starting_after_the_last_window():
+    # allowing a DNA bulge shortens the range of windows, so the exact match at the very end is not in any window
+    actual = crispr_target._find_best_alignment_best_first(
+        "GTTAGGACTATTAGCGTGATNGG", ["GTTAGGACTATTAGCGTGATAGGT"], 1, 1, 0, 1
+    )
+    assert actual is None
+
+
+def test_find_best_alignment_best_first__does_not_extend_past_the_five_prime_end_of_the_sequence():
+    actual = crispr_target._find_best_alignment_best_first(
+        "GTTAGGACTATTAGCGTGATNGG", ["TTAGGACTATTAGCGTGATAGGT"], 1, 1, 1, 0
+    )
+    assert actual is None
+
+
+def test_find_best_alignment_best_first__ignores_alignments_shifted_out_of_the_valid_window_starts():
+    actual = crispr_target._find_best_alignment_best_first(
+        "GTTAGGACTATTAGCGTGATNGG",
+        ["TGTTAGGACTATTAGCGTGATAGGTTT"],
+        1,
+        1,
+        0,
+        1,
+        window_starts_for_each_seq=[[0]],
+    )
+    assert actual is None
+
+
+def test_find_best_alignment_best_first__skips_superfluous_bulge_alignments(mocker):
+    spied_is_superfluous = mocker.spy(crispr_target, "_is_superfluous_bulge_alignment")
+    actual = crispr_target._find_best_alignment_best_first(
+        "GTTAGGACTATTAGCGTGATNNGRRT",
+        ["GTTAGGACTATTAGCGTGATCCAGATACG"],
+        3,
+        2,
+        1,
+        1,
+    )
+    spied_is_superfluous.assert_any_call(
+        "GTTAGGACTATTAGCGTGA-TNNGRRT", "GTTAGGACTATTAGCGTGATCCAG-AT"
+    )
+    assert actual == (
+        0,
+        ("GTTAGGACTATTAGCGTGATNNGRRT", "GTTAGGACTATTAGCGTGATCCAGAT"),
+        40,
+    )
+
+
+@pytest.mark.parametrize("test_engine", ["recursive", "iterative", "best-first"])
+def test_CrisprAlignment__find_optimal_alignment__raises_error_when_no_alignment_found(
+    test_engine,
+):
+    gs = GenomicSequence("hg19", "chr1", 10, True, "AGCTGGATTCCGTAGACAGACTAGGTGGACTG")
+    ca = CrisprAlignment(SaCasTarget("TTTTTTTTTTTTTTTTTTTT"), gs)
+    with pytest.raises(NotImplementedError, match="should never complete normally"):
+        ca.find_optimal_alignment(0, 0, 0, 0, engine=test_engine)
+
+
+@pytest.mark.parametrize(
+    "test_crispr_seq,test_scalar_function,test_batch_function",
+    [
+        (
+            "GCAGAACTACACACCAGGGCCNNGRRT",
+            sa_cas_off_target_score,
+            sa_cas_off_target_scores,
+        ),
+        ("GCAGAACTACACACCAGGGCCNGG", sp_cas_off_target_score, sp_cas_off_target_scores),
+    ],
+)
+def test_batch_off_target_scores__are_identical_to_scalar_scores(
+    test_crispr_seq, test_scalar_function, test_batch_function
+):
+    genome_seq = "GGAAGGAACAGGGGTTTCAAAGTTTCCATCCAAATAAGACGAAGTCCGTTTGTCTTATTTGGTTCGTCCACCAGCAGAGAGGGGAGAGGACTGGCTGGCGCCCAAGTGGGAGGGCCTTTAACACAGCCGTCCTGGGCCCCACTGTGCTGATAAGAAATCTCACCAGGGCCTTGAAGAGGACCAGATCCAGGCACTAAATCAGCGAGGCGG"
+    alignments = [
+        (crispr_alignment, "", genome_alignment)
+        for crispr_alignment, genome_alignment in sorted(
+            crispr_target._find_all_alignments_across_sequence(
+                test_crispr_seq, genome_seq, 8, 2, 2, 2
+            )
+        )
+    ]
+    # include alignments of different widths, and a bulge in the same column as a mismatch in the PAM
+    alignments.extend(
+        [
+            (test_crispr_seq[1:], "", "T" * (len(test_crispr_seq) - 1)),
+            (
+                test_crispr_seq[:-2] + ALIGNMENT_GAP_CHARACTER + test_crispr_seq[-2:],
+                "",
+                "C" * len(test_crispr_seq) + "T",
+            ),
+        ]
+    )
+    assert len(alignments) > 40
+
+    actual = test_batch_function(alignments)
+
+    assert list(actual) == [test_scalar_function(alignment) for alignment in alignments]
+
+
+def test_sa_cas_off_target_score__adds_each_penalty_to_the_running_score_in_scan_order():
+    alignment = ("TCGAAAACTTAAGACACTCTGTNNGRRT", "", "TAGTA-CCTTATGAGGCTCTGTAGGGTA")
+    # summing the penalties of each column before adding them to the score would give 26.000000000000004
+    assert sa_cas_off_target_score(alignment) == 26.000000000000007
+    assert list(sa_cas_off_target_scores([alignment])) == [26.000000000000007]
+
+
+@pytest.mark.parametrize(
+    "test_batch_function", [sa_cas_off_target_scores, sp_cas_off_target_scores]
+)
+def test_batch_off_target_scores__returns_empty_array_when_no_alignments(
+    test_batch_function,
+):
+    actual = test_batch_function([])
+    assert actual.shape == (0,)
+
+
+def test_get_best_scoring_alignment__scores_alignments_in_a_single_batch(mocker):
+    spied_batch = mocker.spy(CAS_SCORING_PROFILES["Sa"], "score_alignments")
+    spied_scalar = mocker.spy(CAS_SCORING_PROFILES["Sa"], "score_alignment")
+    actual = crispr_target._get_best_scoring_alignment(
+        {
+            ("GTTAGGACTATTAGCGTGATNNGRRT", "GTTAGGACTATTAGCGTGATAAGAGT"),
+            ("GTTAGGACTATTAGCGTGATNNGRRT", "GTTAGGACTATTAGCGTGATAAGCCT"),
+            ("GTTAGGACTATTAGCGTGATNNGRRT", "GCTAGGACTATTAACGTGATNNGRRT"),
+        }
+    )
+    assert actual == (("GTTAGGACTATTAGCGTGATNNGRRT", "GTTAGGACTATTAGCGTGATAAGAGT"), 0)
+    assert spied_batch.call_count == 1
+    assert spied_scalar.call_count == 0
+
+
+def test_CAS_SCORING_PROFILES__compiled_from_CAS_VARIETIES():
+    assert set(CAS_SCORING_PROFILES.keys()) == set(CAS_VARIETIES.keys())
+    sa_profile = CAS_SCORING_PROFILES["Sa"]
+    assert sa_profile.name == "Sa"
+    assert sa_profile.pam == SaCasTarget.pam
+    assert sa_profile.cut_site_relative_to_pam == SaCasTarget.cut_site_relative_to_pam
+    assert sa_profile.mismatch_penalties[:8] == (2, 20, 20, 40, 40, 40, 6, 5)
+    assert len(sa_profile.mismatch_penalties) == 28
+    assert sa_profile.rna_bulge_penalties[:7] == (0.51, 0.3, 0.3, 0.3, 0.3, 0.3, 0.51)
+    assert sa_profile.dna_bulge_penalties[:7] == (0.7, 0.3, 0.3, 0.3, 0.3, 0.3, 0.7)
+    sp_profile = CAS_SCORING_PROFILES["Sp"]
+    assert sp_profile.mismatch_penalties[:4] == (20, 0.3, 0.3, 6)
+    assert sp_profile.additional_mismatch_penalties[:4] == (0, 19.7, 19.7, 0)
+    assert sp_profile.bases_without_additional_mismatch_penalty[:4] == (
+        "",
+        "A",
+        "A",
+        "",
+    )
+    assert sp_profile.additional_mismatch_penalty_table[1, ord("A")] == 0
+    assert sp_profile.additional_mismatch_penalty_table[1, ord("C")] == 19.7
+
+
+def test_sp_cas_off_target_score__adds_the_additional_pam_mismatch_penalty_after_the_base_one():
+    actual = sp_cas_off_target_score(
+        ("GCACACATTTTGCGCTGTAANGG", "", "GCACACATTTTGCGCTGTAAACG")
+    )
+    # 0.3 + 19.7, not a single penalty of 20
+    assert actual == 20
+    assert isinstance(actual, float)
+
+
+def test_register_cas_variety__new_variety_is_used_by_scalar_and_batch_scoring(
+    mocker,
+):
+    mocker.patch.dict(CAS_SCORING_PROFILES)
+    new_variety = dict(CAS_VARIETIES["Sp"])
+    new_variety["PAM"] = "NNG"
+    new_variety["PAM-mismatch-penalties-starting-from-3-prime-end"] = {
+        0: 10,
+        1: 10,
+        2: 10,
+    }
+    new_variety["additional-PAM-mismatch-penalties-starting-from-3-prime-end"] = {}
+    new_variety["PAM-mismatch-bases-without-additional-penalty"] = {}
+
+    profile = register_cas_variety("custom", new_variety)
+
+    assert CAS_SCORING_PROFILES["custom"] is profile
+    alignment = ("GTGTTCATCTTTGGTTTTGTNNG", "", "GTGTTCATCTTTGGTTTTGAGGC")
+    assert profile.score_alignment(alignment) == 16
+    assert list(profile.score_alignments([alignment])) == [16]
+
+
+def _register_reversed_guide_penalties_cas_variety():
+    new_variety = dict(CAS_VARIETIES["Sp"])
+    guide_mismatch_penalties = new_variety["mismatch-penalties-starting-from-PAM"]
+    new_variety["mismatch-penalties-starting-from-PAM"] = {
+        idx: guide_mismatch_penalties[19 - idx] for idx in range(20)
+    }
+    register_cas_variety("reversed", new_variety)
+
+
+# the first site has a mismatch next to the PAM, the second a mismatch at the 5' end of the guide
+CAS_VARIETY_GENOME_SEQ = (
+    "TTT" + "GTTAGGACTATTAGCGTGAAAGG" + "TTTTT" + "CTTAGGACTATTAGCGTGATAGG" + "TTT"
+)
+
+
+@pytest.mark.parametrize("test_engine", ["recursive", "iterative", "best-first"])
+def test_CrisprAlignment__find_optimal_alignment__scores_with_requested_cas_variety(
+    test_engine, mocker
+):
+    mocker.patch.dict(CAS_SCORING_PROFILES)
+    _register_reversed_guide_penalties_cas_variety()
+    gs = GenomicSequence("hg19", "chr1", 100, True, CAS_VARIETY_GENOME_SEQ)
+
+    default_alignment = CrisprAlignment(SpCasTarget("GTTAGGACTATTAGCGTGAT"), gs)
+    default_alignment.find_optimal_alignment(1, 0, 0, 0, engine=test_engine)
+    reversed_alignment = CrisprAlignment(SpCasTarget("GTTAGGACTATTAGCGTGAT"), gs)
+    reversed_alignment.find_optimal_alignment(
+        1, 0, 0, 0, engine=test_engine, cas_variety="reversed"
+    )
+
+    assert default_alignment.formatted_alignment[2] == "CTTAGGACTATTAGCGTGATAGG"
+    assert reversed_alignment.formatted_alignment[2] == "GTTAGGACTATTAGCGTGAAAGG"
+
+
+@pytest.mark.parametrize("test_engine", ["recursive", "best-first"])
+def test_align_crispr_targets__scores_with_requested_cas_variety(test_engine, mocker):
+    mocker.patch.dict(CAS_SCORING_PROFILES)
+    _register_reversed_guide_penalties_cas_variety()
+    gs = GenomicSequence("hg19", "chr1", 100, True, CAS_VARIETY_GENOME_SEQ)
+
+    actual = align_crispr_targets(
+        [SpCasTarget("GTTAGGACTATTAGCGTGAT")],
+        gs,
+        1,
+        0,
+        0,
+        0,
+        engine=test_engine,
+        cas_variety="reversed",
+    )
+
+    assert actual[0].formatted_alignment[2] == "GTTAGGACTATTAGCGTGAAAGG"
+
+
+def test_register_cas_variety__raises_error_if_name_already_registered(mocker):
+    mocker.patch.dict(CAS_SCORING_PROFILES)
+    with pytest.raises(CasVarietyAlreadyRegisteredError, match="Sa"):
+        register_cas_variety("Sa", CAS_VARIETIES["Sp"])
+    assert CAS_SCORING_PROFILES["Sa"].pam == "NNGRRT"
+
+
+@pytest.mark.parametrize(
+    "test_window_starts,test_num_chunks,expected,test_description",
+    [
+        (
+            range(8),
+            3,
+            [
+                ("GATTCC", [0, 1, 2]),
+                ("TCCGTA", [0, 1, 2]),
+                ("GTAGA", [0, 1]),
+            ],
+            "every window",
+        ),
+        (
+            [1, 2, 7],
+            2,
+            [("ATTCC", [0, 1]), ("TAGA", [0])],
+            "only some windows",
+        ),
+        ([], 4, [], "no windows"),
+    ],
+)
+def test_split_windows_into_chunks(
+    test_window_starts, test_num_chunks, expected, test_description
+):
+    actual = crispr_target._split_windows_into_chunks(
+        "GATTCCGTAGACAG", test_window_starts, 4, test_num_chunks
+    )
+    assert actual == expected
+
+
+@pytest.mark.parametrize("test_max_pam_misalignments", [None, 1])
+@pytest.mark.parametrize("test_engine", ["recursive", "iterative"])
+def test_find_all_alignments_across_sequence__parallel_scan_is_identical_to_serial(
+    test_engine, test_max_pam_misalignments
+):
+    genome_seq = "GGAAGGAACAGGGGTTTCAAAGTTTCCATCCAAATAAGACGAAGTCCGTTTGTCTTATTTGGTTCGTCCACCAGCAGAGAGGGGAGAGGACTGGCTGGCGCCCAAGTGGGAGGGCCTTTAACACAGCCGTCCTGGGCCCCACTGTGCTGATAAGAAATCTCACCAGGGCCTTGAAGAGGACCAGATCCAGGCACTAAATCAGCGAGGCGG"
+    crispr_seq = "GCAGAACTACACACCAGGGCCNNGRRT"
+    window_starts = None
+    if test_max_pam_misalignments is not None:
+        window_starts = find_pam_anchored_window_starts(
+            crispr_seq, "NNGRRT", genome_seq, test_max_pam_misalignments, 2, 1, 1
+        )
+    expected = crispr_target._find_all_alignments_across_sequence(
+        crispr_seq,
+        genome_seq,
+        7,
+        2,
+        1,
+        1,
+        engine=test_engine,
+        window_starts=window_starts,
+    )
+    assert len(expected) > 0
+
+    actual = crispr_target._find_all_alignments_across_sequence(
+        crispr_seq,
+        genome_seq,
+        7,
+        2,
+        1,
+        1,
+        engine=test_engine,
+        window_starts=window_starts,
+        workers=3,
+    )
+    assert actual == expected
+
+
+def test_find_all_alignments_across_sequence__parallel_scan_raises_error_for_unknown_engine():
+    with pytest.raises(AlignmentEngineNotImplementedError, match="parasail"):
+        crispr_target._find_all_alignments_across_sequence(
+            "GTTAGGACTATTAGCGTGATNGG",
+            "GTTAGGACTATTAGCGTGATAGGTTTTTTT",
+            0,
+            0,
+            0,
+            0,
+            engine="parasail",
+            workers=2,
+        )
+
+
+@pytest.mark.parametrize(
+    "test_genome_seqs,expected,test_description",
+    [
+        (
+            ["TTTGTTAGGACTATTAGCGTGATAGGTTTT", "TTTGTTAGGACTATTAGCGTGATAGGTTTT"],
+            (1, ("GTTAGGACTATTAGCGTGATNGG", "GTTAGGACTATTAGCGTGATAGG"), 0),
+            "tie goes to the later sequence",
+        ),
+        (
+            ["TTTGTTAGGACTATTAGCGTGATAGGTTTT", "TTTGTTAGGACTATTAGCGTGATACGTTTT"],
+            (0, ("GTTAGGACTATTAGCGTGATNGG", "GTTAGGACTATTAGCGTGATAGG"), 0),
+            "later sequence has a worse score",
+        ),
+        (
+            ["TTTTTTTTTTTTTTTTTTTTTTTTTTTTTT", "TTTGTTAGGACTATTAGCGTGATAGGTTTT"],
+            (1, ("GTTAGGACTATTAGCGTGATNGG", "GTTAGGACTATTAGCGTGATAGG"), 0),
+            "nothing found in the first sequence",
+        ),
+        (
+            ["TTTTTTTTTTTTTTTTTTTTTTTTTTTTTT", "TTTTTTTTTTTTTTTTTTTTTTTTTTTTTT"],
+            None,
+            "nothing found at all",
+        ),
+    ],
+)
+def test_best_first_search_in_parallel__is_identical_to_searching_sequences_together(
+    test_genome_seqs, expected, test_description
+):
+    actual = crispr_target._best_first_search_in_parallel(
+        "GTTAGGACTATTAGCGTGATNGG", test_genome_seqs, 1, 0, 0, 0, [None, None], 2
+    )
+    assert actual == expected
+    assert actual == crispr_target._find_best_alignment_best_first(
+        "GTTAGGACTATTAGCGTGATNGG", test_genome_seqs, 1, 0, 0, 0
+    )
+
+
+ALIGN_CRISPR_TARGETS_GENOME_SEQ = "GGAAGGAACAGGGGTTTCAAAGTTTCCATCCAAATAAGACGAAGTCCGTTTGTCTTATTTGGTTCGTCCACCAGCAGAGAGGGGAGAGGACTGGCTGGCGCCCAAGTGGGAGGGCCTTTAACACAGCCGTCCTGGGCCCCACTGTGCTGATAAGAAATCTCACCAGGGCCTTGAAGAGGACCAGATCCAGGCACTAAATCAGCGAGGCGG"
+
+
+@pytest.mark.parametrize("test_max_pam_misalignments", [None, 1])
+@pytest.mark.parametrize("test_engine", ["recursive", "iterative", "best-first"])
+def test_align_crispr_targets__matches_find_optimal_alignment_for_each_target(
+    test_engine, test_max_pam_misalignments
+):
+    crispr_targets = [
+        SaCasTarget("GCAGAACTACACACCAGGGCC"),
+        SaCasTarget("TCCTCTTCAAGGCCCTGGTGA"),  # on the reverse strand
+        SpCasTarget("GGTTCGTCCACCAGCAGAGAG"),
+        SpCasTarget("CCCAAGTGGGAGGGCCTTTAA"),
+    ]
+    gs = GenomicSequence(
+        "hg19", "chr11", 117756114, True, ALIGN_CRISPR_TARGETS_GENOME_SEQ
+    )
+
+    actual = align_crispr_targets(
+        crispr_targets,
+        gs,
+        7,
+        1,
+        1,
+        1,
+        engine=test_engine,
+        max_pam_misalignments=test_max_pam_misalignments,
+    )
+
+    assert len(actual) == len(crispr_targets)
+    for iter_crispr_target, actual_alignment in zip(crispr_targets, actual):
+        expected_alignment = CrisprAlignment(iter_crispr_target, gs)
+        expected_alignment.find_optimal_alignment(
+            7,
+            1,
+            1,
+            1,
+            engine=test_engine,
+            max_pam_misalignments=test_max_pam_misalignments,
+        )
+        assert actual_alignment.crispr_target is iter_crispr_target
+        assert actual_alignment.formatted_alignment == (
+            expected_alignment.formatted_alignment
+        )
+        assert actual_alignment.cut_site_coord == expected_alignment.cut_site_coord
+        assert (
+            actual_alignment.genomic_sequence.is_positive_strand
+            is expected_alignment.genomic_sequence.is_positive_strand
+        )
+    assert actual[1].genomic_sequence.is_positive_strand is False
+
+
+def test_align_crispr_targets__reverse_complements_each_sequence_once(mocker):
+    spied_revcomp = mocker.spy(GenomicSequence, "create_reverse_complement")
+    spied_window_engine = mocker.spy(
+        crispr_target, "_find_all_alignments_for_each_crispr"
+    )
+    gs = GenomicSequence("hg19", "chr11", 10, True, ALIGN_CRISPR_TARGETS_GENOME_SEQ)
+    align_crispr_targets(
+        [SaCasTarget("GCAGAACTACACACCAGGGCC"), SpCasTarget("GGTTCGTCCACCAGCAGAGAG")],
+        [gs, gs],
+        2,
+        0,
+        0,
+        0,
+    )
+    assert spied_revcomp.call_count == 2
+    assert spied_window_engine.call_count == 4
+
+
+@pytest.mark.parametrize("test_engine", ["recursive", "best-first"])
+def test_align_crispr_targets__picks_best_of_several_genomic_sequences(test_engine):
+    crispr_targets = [
+        SpCasTarget("GTTAGGACTATTAGCGTGAT"),
+        SpCasTarget("TTTTTTTTTTTTTTTTTTTT"),
+    ]
+    first_gs = GenomicSequence(
+        "hg19", "chr1", 100, True, "TTTGTTAGCACTATTAGCGTGATAGGTTTTTT"
+    )
+    second_gs = GenomicSequence(
+        "hg19", "chr2", 200, True, "TTTGTTAGGACTATTAGCGTGATAGGTTTTTT"
+    )
+    tied_gs = GenomicSequence("hg19", "chr3", 300, True, second_gs.sequence)
+
+    actual = align_crispr_targets(
+        crispr_targets, [first_gs, second_gs, tied_gs], 1, 0, 0, 0, engine=test_engine
+    )
+
+    assert actual[0].genomic_sequence.chromosome == "chr2"
+    assert actual[0].formatted_alignment[1] == VERTICAL_ALIGNMENT_MATCH_CHARACTER * 23
+    assert actual[0].cut_site_coord == 200 + 19
+    assert actual[1] is None
+
+
+def test_align_crispr_targets__raises_error_for_unknown_engine():
+    gs = GenomicSequence("hg19", "chr1", 10, True, "AGCTGGATTCCGTAGACAGACTAGGTGGACTG")
+    with pytest.raises(AlignmentEngineNotImplementedError, match="parasail"):
+        align_crispr_targets(
+            [SaCasTarget("GATTCCGTAGACAGACTAGG")], gs, 3, 1, 1, 1, engine="parasail"
+        )
+
+
+def test_find_all_alignments_for_each_crispr__matches_scanning_for_each_crispr_alone():
+    crispr_seqs = [
+        "GCAGAACTACACACCAGGGCCNNGRRT",
+        "GGTTCGTCCACCAGCAGAGAGNGG",
+        "CCCAAGTGGGAGGGCCTTTAANGG",
+    ]
+    window_starts_for_each_crispr = [None, [10, 50, 56, 57, 58], None]
+
+    actual = crispr_target._find_all_alignments_for_each_crispr(
+        crispr_seqs,
+        ALIGN_CRISPR_TARGETS_GENOME_SEQ,
+        6,
+        1,
+        1,
+        1,
+        "iterative",
+        window_starts_for_each_crispr,
+    )
+
+    for crispr_seq, window_starts, actual_alignments in zip(
+        crispr_seqs, window_starts_for_each_crispr, actual
+    ):
+        assert actual_alignments == crispr_target._find_all_alignments_across_sequence(
+            crispr_seq,
+            ALIGN_CRISPR_TARGETS_GENOME_SEQ,
+            6,
+            1,
+            1,
+            1,
+            engine="iterative",
+            window_starts=window_starts,
+        )
+
+
+def test_find_min_edit_distances__counts_substitutions_and_bulges():
+    windows = np.frombuffer(
+        ("ACGTAC" + "ACGTTC" + "ACGGTA" + "ACTACC").encode("ascii"), dtype=np.uint8
+    ).reshape(4, 6)
+    actual = find_min_edit_distances("ACGTA", windows, 1, 1)
+    assert actual.tolist() == [0, 1, 1, 1]
+
+
+def test_find_min_edit_distances__matches_bases_the_same_as_check_base_match():
+    windows = np.frombuffer("RAGTNR".encode("ascii"), dtype=np.uint8).reshape(6, 1)
+    expected = [
+        [
+            int(not check_base_match(crispr_base, genome_base))
+            for genome_base in "RAGTNR"
+        ]
+        for crispr_base in "RNA"
+    ]
+    actual = [
+        find_min_edit_distances(crispr_base, windows, 0, 0).tolist()
+        for crispr_base in "RNA"
+    ]
+    assert actual == expected
+
+
+@pytest.mark.parametrize(
+    "crispr_seqs,genome_seq,allowed_mismatches,allowed_bulges,test_description",
+    [
+        (["ACGTACGRRT"], "ACGTACGRRTAAAA", 0, 0, "R in CRISPR and genome"),
+        (["ACGTACGNRT"], "TTACGTACGNRTAAAA", 0, 0, "N in CRISPR and genome"),
+        (
+            ["ACGTACGRRT", "CGTACGNNGRRT"],
+            "GACGTACGRRTACGTACGNNGRRTC",
+            1,
+            1,
+            "several CRISPRs with mismatches and bulges",
+        ),
+    ],
+)
+def test_find_all_alignments_for_each_crispr__matches_scanning_for_each_crispr_alone_when_genome_has_ambiguous_bases(
+    crispr_seqs, genome_seq, allowed_mismatches, allowed_bulges, test_description
+):
+    actual = crispr_target._find_all_alignments_for_each_crispr(
+        crispr_seqs,
+        genome_seq,
+        allowed_mismatches,
+        allowed_bulges,
+        allowed_bulges,
+        allowed_bulges,
+        "recursive",
+        [None] * len(crispr_seqs),
+    )
+    expected = [
+        crispr_target._find_all_alignments_across_sequence(
+            crispr_seq,
+            genome_seq,
+            allowed_mismatches,
+            allowed_bulges,
+            allowed_bulges,
+            allowed_bulges,
+        )
+        for crispr_seq in crispr_seqs
+    ]
+    assert actual == expected
+    assert len(actual[0]) > 0
+
+
+def test_find_all_alignments_for_each_crispr__only_aligns_windows_that_could_hold_an_alignment(
+    mocker,
+):
+    spied_engine = mocker.Mock(wraps=find_all_alignments_iteratively)
+    mocker.patch.object(crispr_target, "ALIGNMENT_ENGINES", {"iterative": spied_engine})
+    crispr_seqs = ["GCAGAACTACACACCAGGGCCNNGRRT", "GGTTCGTCCACCAGCAGAGAGNGG"]
+
+    actual = crispr_target._find_all_alignments_for_each_crispr(
+        crispr_seqs,
+        ALIGN_CRISPR_TARGETS_GENOME_SEQ,
+        2,
+        0,
+        0,
+        0,
+        "iterative",
+        [None, None],
+    )
+
+    assert spied_engine.call_count == sum(len(alignments) for alignments in actual)
+    assert spied_engine.call_count > 0
+
+
+def test_find_all_alignments_for_each_crispr__shares_windows_of_same_length_and_skips_too_long_targets():
+    crispr_seqs = [
+        "GATTCCGTAGACAGACTAGGNGG",
+        "GATTCCGTAGACAGACTAGGNGG",
+        "AGCTGGATTCCGTAGACAGACTAGGTGGACTGNGG",
+    ]
+    genome_seq = "AGCTGGATTCCGTAGACAGACTAGGTGGACTG"
+
+    actual = crispr_target._find_all_alignments_for_each_crispr(
+        crispr_seqs, genome_seq, 1, 0, 0, 0, "iterative", [None, [2, 5], None]
+    )
+
+    assert actual == [
+        {("GATTCCGTAGACAGACTAGGNGG", "GATTCCGTAGACAGACTAGGTGG")},
+        {("GATTCCGTAGACAGACTAGGNGG", "GATTCCGTAGACAGACTAGGTGG")},
+        set(),
+    ]
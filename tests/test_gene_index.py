@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+
+from nuclease_off_target import CrisprAlignment
+from nuclease_off_target import CrisprTarget
+from nuclease_off_target import ExonCoordinates
+from nuclease_off_target import GeneCoordinates
+from nuclease_off_target import GeneIndex
+from nuclease_off_target import GeneIsoformCoordinates
+from nuclease_off_target import GenomicSequence
+from nuclease_off_target import IntervalIndex
+from nuclease_off_target import parse_ucsc_refseq_table_into_gene_coordinates
+import pytest
+
+PATH_OF_CURRENT_FILE = os.path.dirname(os.path.realpath(__file__))
+
+
+def _create_random_intervals(num_intervals, seed):
+    rng = random.Random(seed)
+    intervals = list()
+    for idx in range(num_intervals):
+        start_coord = rng.randint(1, 1000)
+        # mostly short intervals, with some spanning much of the chromosome like long genes
+        length = rng.choice(
+            (rng.randint(0, 20), rng.randint(0, 20), rng.randint(0, 600))
+        )
+        intervals.append(
+            (rng.choice(("chr1", "chr2")), start_coord, start_coord + length, idx)
+        )
+    return intervals
+
+
+def _find_overlapping_by_scanning(intervals, chromosome, start_coord, end_coord):
+    return sorted(
+        (
+            (interval_start, item)
+            for interval_chromosome, interval_start, interval_end, item in intervals
+            if interval_chromosome == chromosome
+            and interval_start <= end_coord
+            and interval_end >= start_coord
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "num_intervals,test_description",
+    [
+        (1, "single interval"),
+        (2, "two intervals"),
+        (15, "only leaf subtrees"),
+        (16, "a full tree"),
+        (17, "one past a full tree"),
+        (1000, "many intervals"),
+    ],
+)
+def test_IntervalIndex__finds_same_items_as_scanning_every_interval(
+    num_intervals, test_description
+):
+    intervals = _create_random_intervals(num_intervals, num_intervals)
+    index = IntervalIndex(intervals)
+    starts = {item: start_coord for _, start_coord, _, item in intervals}
+    assert len(index) == num_intervals
+    rng = random.Random(0)
+    for _ in range(200):
+        chromosome = rng.choice(("chr1", "chr2"))
+        start_coord = rng.randint(-10, 1700)
+        end_coord = start_coord + rng.choice((0, rng.randint(0, 100)))
+        actual = index.find_overlapping(chromosome, start_coord, end_coord)
+        assert [
+            (starts[item], item) for item in actual
+        ] == _find_overlapping_by_scanning(
+            intervals, chromosome, start_coord, end_coord
+        )
+
+
+def test_IntervalIndex__find_overlapping__defaults_to_a_single_position():
+    index = IntervalIndex([("chr1", 10, 20, "a"), ("chr1", 21, 30, "b")])
+    assert index.find_overlapping("chr1", 20) == ["a"]
+    assert index.find_overlapping("chr1", 21) == ["b"]
+    assert index.find_overlapping("chr1", 20, 21) == ["a", "b"]
+
+
+def test_IntervalIndex__find_overlapping__returns_nothing_for_unindexed_chromosome():
+    index = IntervalIndex([("chr1", 10, 20, "a")])
+    assert index.find_overlapping("chr2", 15) == []
+
+
+def test_IntervalIndex__find_overlapping_batch__finds_same_items_as_single_queries():
+    intervals = _create_random_intervals(500, 1)
+    index = IntervalIndex(intervals)
+    rng = random.Random(2)
+    chromosomes = [rng.choice(("chr1", "chr2", "chrX")) for _ in range(3000)]
+    coords = [rng.randint(-10, 1700) for _ in range(3000)]
+    actual = index.find_overlapping_batch(chromosomes, coords)
+    assert actual == [
+        index.find_overlapping(chromosome, coord)
+        for chromosome, coord in zip(chromosomes, coords)
+    ]
+    assert any(len(items) > 1 for items in actual)
+
+
+@pytest.fixture(scope="function", name="gene_index")
+def fixture_gene_index():
+    genes = parse_ucsc_refseq_table_into_gene_coordinates(
+        "hg19", os.path.join(PATH_OF_CURRENT_FILE, "partial_ucsc_hg19_refseq.tsv")
+    )
+    yield GeneIndex(genes.values())
+
+
+def test_GeneIndex__annotate_cut_sites__finds_genes_isoforms_and_exons(gene_index):
+    annotations = gene_index.annotate_cut_sites(
+        ["chr1", "chr1", "chr1", "chr2"], [66999300, 67000100, 1, 66999300]
+    )
+    exonic, intronic, intergenic, unindexed = annotations
+
+    assert [gene.name for gene in exonic.genes] == ["SGIP1"]
+    assert len(exonic.isoforms) == 1
+    assert [
+        (exon.coordinates.start_coord, exon.coordinates.end_coord)
+        for exon in exonic.exons
+    ] == [(66999275, 66999355)]
+    assert exonic.is_exonic is True
+
+    assert [gene.name for gene in intronic.genes] == ["SGIP1"]
+    assert len(intronic.isoforms) > 1
+    assert intronic.is_exonic is False
+
+    for annotation in (intergenic, unindexed):
+        assert annotation.genes == ()
+        assert annotation.isoforms == ()
+        assert annotation.exons == ()
+
+
+def test_GeneIndex__annotate_crispr_alignments__uses_cut_site_of_each_alignment():
+    isoform = GeneIsoformCoordinates(
+        [
+            ExonCoordinates.from_coordinate_info("hg38", "chr4", 100, 200, True),
+            ExonCoordinates.from_coordinate_info("hg38", "chr4", 300, 400, True),
+        ]
+    )
+    gene_index = GeneIndex([GeneCoordinates("GENE1", isoform)])
+    crispr_alignments = list()
+    for cut_site_coord in (150, 250):
+        crispr_alignment = CrisprAlignment(
+            CrisprTarget("GATTCCGTAGACAGACTAGGCA", "NNGRRT", -3),
+            GenomicSequence("hg38", "chr4", 1, True, "ACGT"),
+        )
+        crispr_alignment.cut_site_coord = cut_site_coord
+        crispr_alignments.append(crispr_alignment)
+
+    in_exon, in_intron = gene_index.annotate_crispr_alignments(crispr_alignments)
+
+    assert in_exon.isoforms == (isoform,)
+    assert in_exon.is_exonic is True
+    assert [gene.name for gene in in_intron.genes] == ["GENE1"]
+    assert in_intron.is_exonic is False
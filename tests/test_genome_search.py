@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+
+from nuclease_off_target import AlignmentEngineNotImplementedError
+from nuclease_off_target import CAS_SCORING_PROFILES
+from nuclease_off_target import CrisprTarget
+from nuclease_off_target import find_off_target_sites
+from nuclease_off_target import genome_search
+from nuclease_off_target import scan_chromosome_for_alignments
+from nuclease_off_target import SeedIndex
+from nuclease_off_target import SequenceView
+import numpy as np
+import pytest
+
+GUIDE = "GATTCCGTAGACAGACTAGGCA"
+PAM = "NNGRRT"
+ON_TARGET = GUIDE + "AGGAAT"
+
+
+def _reverse_complement(sequence: str) -> str:
+    return str(SequenceView.from_str(sequence).reverse_complement())
+
+
+# random backgrounds with sites planted on both strands: exact, with mismatches, with an RNA bulge and with a DNA bulge (made up)
+_background = "".join(random.Random(7).choice("ACGT") for _ in range(700))
+CHR1_SEQUENCE = (
+    _background[:50]
+    + ON_TARGET
+    + _background[78:200]
+    + _reverse_complement("GATTCCGTAGtCAGACTAaGCAAGGAAT")
+    + _background[228:300]
+    + "NNNNNNNNNN"
+    + _background[310:400]
+)
+CHR2_SEQUENCE = (
+    _background[400:500]
+    + "GATTCCGTAGACAGACTGGCAAGGAAT"
+    + _background[527:600]
+    + _reverse_complement("GATTCCGTAGACAtGACTAGGCAAGGAAT")
+    + _background[629:700]
+)
+
+
+@pytest.fixture(scope="function", name="fasta_sequences")
+def fixture_fasta_sequences():
+    return {
+        "chr1": CHR1_SEQUENCE,
+        "chr2": CHR2_SEQUENCE,
+        "chrM": "GATTCCGTAGACAGACTAGG",  # shorter than any site
+    }
+
+
+def _find_best_scanned_sites(ct, fasta_source, *scan_args, **scan_kwargs):
+    best_scores = dict()
+    for chromosome in ("chr1", "chr2"):
+        for hit in scan_chromosome_for_alignments(
+            ct, fasta_source, chromosome, *scan_args, **scan_kwargs
+        ):
+            site = (
+                hit.chromosome,
+                hit.is_positive_strand,
+                hit.end_coord if hit.is_positive_strand else hit.start_coord,
+            )
+            score = CAS_SCORING_PROFILES["Sa"].score_alignment(hit.formatted_alignment)
+            best_scores[site] = min(score, best_scores.get(site, score))
+    return best_scores
+
+
+@pytest.mark.parametrize(
+    "seed_length,allowed_mismatches,allowed_bulges,max_pam_misalignments,test_description",
+    [
+        (10, 3, 1, None, "long seeds"),
+        (5, 3, 1, None, "short seeds"),
+        (7, 2, 0, None, "no bulges"),
+        (6, 3, 1, 1, "PAM anchored"),
+    ],
+)
+def test_find_off_target_sites__finds_same_sites_as_scanning_every_window(
+    seed_length,
+    allowed_mismatches,
+    allowed_bulges,
+    max_pam_misalignments,
+    test_description,
+    fasta_source,
+    tmp_path,
+):
+    ct = CrisprTarget(GUIDE, PAM, -3)
+    seed_index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), seed_length
+    )
+    alignment_args = (
+        allowed_mismatches,
+        allowed_bulges,
+        allowed_bulges,
+        allowed_bulges,
+    )
+    expected = _find_best_scanned_sites(
+        ct,
+        fasta_source,
+        *alignment_args,
+        max_pam_misalignments=max_pam_misalignments,
+    )
+
+    sites = find_off_target_sites(
+        ct,
+        seed_index,
+        fasta_source,
+        *alignment_args,
+        max_pam_misalignments=max_pam_misalignments,
+    )
+
+    assert len(sites) > 1
+    assert {
+        (
+            site.chromosome,
+            site.is_positive_strand,
+            site.end_coord if site.is_positive_strand else site.start_coord,
+        ): site.score
+        for site in sites
+    } == expected
+    assert [site.score for site in sites] == sorted(site.score for site in sites)
+
+
+def test_find_off_target_sites__reports_planted_sites(fasta_source, tmp_path):
+    seed_index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), 8
+    )
+    sites = find_off_target_sites(
+        CrisprTarget(GUIDE, PAM, -3), seed_index, fasta_source, 2, 1, 1, 1
+    )
+    assert [
+        (site.chromosome, site.start_coord, site.end_coord, site.is_positive_strand)
+        for site in sites[:4]
+    ] == [
+        ("chr1", 51, 78, True),
+        ("chr2", 201, 229, False),
+        ("chr2", 101, 127, True),
+        ("chr1", 201, 228, False),
+    ]
+    assert sites[0].score == 0
+    assert sites[0].genome_alignment == ON_TARGET
+
+
+# two mismatches at the 3' end of the guide, and R in the genome where the PAM has R (made up)
+AMBIGUOUS_SITE = GUIDE[:20] + "TT" + "AGGRRT"
+
+
+@pytest.mark.parametrize(
+    "fasta_sequences",
+    [{"chr1": _background[:60] + AMBIGUOUS_SITE + _background[60:160]}],
+)
+def test_find_off_target_sites__finds_same_sites_as_scanning_when_genome_has_ambiguous_bases(
+    fasta_sequences, fasta_source, tmp_path
+):
+    ct = CrisprTarget(GUIDE, PAM, -3)
+    seed_index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), 8
+    )
+    expected = {
+        (hit.start_coord, hit.end_coord, hit.is_positive_strand)
+        for hit in scan_chromosome_for_alignments(ct, fasta_source, "chr1", 2, 0, 0, 0)
+    }
+
+    sites = find_off_target_sites(ct, seed_index, fasta_source, 2, 0, 0, 0)
+
+    assert {
+        (site.start_coord, site.end_coord, site.is_positive_strand) for site in sites
+    } == expected
+    assert (61, 88, True) in expected
+
+
+def test_find_off_target_sites__finds_same_sites_in_small_batches(
+    fasta_source, tmp_path, mocker
+):
+    seed_index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), 8
+    )
+    expected = find_off_target_sites(
+        CrisprTarget(GUIDE, PAM, -3), seed_index, fasta_source, 5, 1, 1, 1
+    )
+    mocker.patch.object(genome_search, "WINDOWS_PER_ALIGNMENT_BATCH", 3)
+    actual = find_off_target_sites(
+        CrisprTarget(GUIDE, PAM, -3), seed_index, fasta_source, 5, 1, 1, 1
+    )
+    assert actual == expected
+
+
+def test_extract_windows__copies_the_windows_of_each_region():
+    windows = genome_search._extract_windows(
+        [(0, "ACGTAC", np.array([0, 2])), (100, "GGTTCA", np.array([1]))], 3
+    )
+    assert windows.tobytes() == b"ACGGTAGTT"
+
+
+def test_find_off_target_sites__scores_with_requested_cas_variety(
+    fasta_source, tmp_path
+):
+    seed_index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), 8
+    )
+    sites = find_off_target_sites(
+        CrisprTarget(GUIDE, PAM, -3),
+        seed_index,
+        fasta_source,
+        2,
+        0,
+        0,
+        0,
+        cas_variety="Sp",
+    )
+    for site in sites:
+        assert site.score == CAS_SCORING_PROFILES["Sp"].score_alignment(
+            site.formatted_alignment
+        )
+
+
+def test_find_off_target_sites__raises_error_for_unknown_engine(fasta_source, tmp_path):
+    seed_index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), 8
+    )
+    with pytest.raises(AlignmentEngineNotImplementedError):
+        find_off_target_sites(
+            CrisprTarget(GUIDE, PAM, -3),
+            seed_index,
+            fasta_source,
+            2,
+            0,
+            0,
+            0,
+            engine="fake",
+        )
+
+
+def test_find_off_target_sites__raises_error_if_seeds_cannot_cover_bulges(
+    fasta_source, tmp_path
+):
+    seed_index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), 8
+    )
+    with pytest.raises(ValueError, match="Allow fewer mismatches or bulges"):
+        find_off_target_sites(
+            CrisprTarget(GUIDE, PAM, -3), seed_index, fasta_source, 30, 30, 30, 30
+        )
+
+
+def test_choose_seeds__skips_seeds_with_too_many_substitutions(fasta_source, tmp_path):
+    seed_index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), 13
+    )
+    seeds = genome_search._choose_seeds(ON_TARGET, seed_index, 6, 0)
+    assert len(seeds) > 1
+    for seed_offset, seed_length, seed_codes in seeds:
+        assert seed_length <= 13
+        assert 0 < len(seed_codes) <= genome_search.MAX_SEED_NEIGHBORHOOD_SIZE
+        assert seed_offset + seed_length <= len(ON_TARGET)
+
+
+@pytest.mark.parametrize(
+    "segment,max_substitutions,expected,test_description",
+    [
+        ("GA", 0, ["GA"], "exact"),
+        ("NG", 0, ["AG", "CG", "GG", "TG"], "N matches any base"),
+        ("RT", 0, ["AT", "GT"], "R matches A or G"),
+        (
+            "AC",
+            1,
+            ["AA", "AC", "AG", "AT", "CC", "GC", "TC"],
+            "one substitution",
+        ),
+    ],
+)
+def test_find_seed_neighborhood__encodes_every_seed_within_substitutions(
+    segment, max_substitutions, expected, test_description
+):
+    codes = genome_search._find_seed_neighborhood(segment, max_substitutions)
+    assert genome_search._count_seed_neighborhood(segment, max_substitutions) == len(
+        codes
+    )
+    assert codes.tolist() == sorted(
+        int("".join(str("ACGT".index(base)) for base in seed), 4) for seed in expected
+    )
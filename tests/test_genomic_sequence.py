@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import copy
+import dataclasses
 import datetime
+import gzip
 import os
+import pickle
+import sys
 import time
 
 from freezegun import freeze_time
@@ -12,16 +18,63 @@ from nuclease_off_target import GeneIsoformCoordinates
 from nuclease_off_target import genomic_sequence
 from nuclease_off_target import GenomicCoordinates
 from nuclease_off_target import GenomicSequence
+from nuclease_off_target import get_ucsc_session
 from nuclease_off_target import IsoformInDifferentChromosomeError
 from nuclease_off_target import IsoformInDifferentStrandError
+from nuclease_off_target import iter_ucsc_refseq_table_genes
+from nuclease_off_target import iter_ucsc_refseq_table_isoforms
+from nuclease_off_target import merge_nearby_ranges
 from nuclease_off_target import parse_ucsc_refseq_table_into_gene_coordinates
+from nuclease_off_target import rate_limiting
+from nuclease_off_target import request_sequence_from_ucsc
+from nuclease_off_target import RetryPolicy
 from nuclease_off_target import SECONDS_BETWEEN_UCSC_REQUESTS
+from nuclease_off_target import SequenceSource
+from nuclease_off_target import TokenBucketRateLimiter
+from nuclease_off_target import UCSC_REQUEST_TIMEOUT_SECONDS
+from nuclease_off_target import UCSC_SESSION_POOL_MAX_SIZE
+from nuclease_off_target import UcscResponseMissingSequenceError
 from nuclease_off_target import UrlNotImplementedForGenomeError
 import pytest
 from stdlib_utils import get_current_file_abs_directory
 
 PATH_OF_CURRENT_FILE = get_current_file_abs_directory()
 
+# positive strand of chr1 starting from coordinate 1 (made up)
+BULK_CHR1_SEQUENCE = "ACGTTGCAACGTAAGGCCTTGATCCATTAGCATCGAGGATTACA"
+
+
+UCSC_RESPONSE_LINES = [
+    "<HTML><HEAD><TITLE>DNA</TITLE></HEAD><BODY>",
+    "<PRE>",
+    "&gt;hg19_dna range=chrX:2000000-2000015 5'pad=0 3'pad=0 strand=+ repeatMasking=none",
+    "ACGTACGTAC",
+    "GGCCTT",
+    "</PRE>",
+    "</BODY></HTML>",
+]
+
+
+def _mock_ucsc_response(mocker, lines):
+    response = mocker.MagicMock()
+    response.__enter__.return_value = response
+    response.status_code = 200
+    response.iter_lines.return_value = (line.encode("utf-8") for line in lines)
+    mocked_session = mocker.MagicMock()
+    mocked_session.get.return_value = response
+    mocker.patch.object(
+        genomic_sequence, "get_ucsc_session", autospec=True, return_value=mocked_session
+    )
+    return mocked_session
+
+
+class InMemorySequenceSource(SequenceSource):
+    def fetch_sequence(self, chromosome, start_coord, end_coord):
+        sequence = (
+            BULK_CHR1_SEQUENCE if chromosome == "chr1" else BULK_CHR1_SEQUENCE[::-1]
+        )
+        return sequence[start_coord - 1 : end_coord]
+
 
 def test_GenomicSequence_init_assigns_values_and_has_str_correct():
     gs = GenomicSequence("hg38", "chr2", 10, True, "ACGATGAT")
@@ -168,6 +221,34 @@ def test_GenomicSequence_from_coordinates__sets_the_time_of_the_last_ping_to_ucs
     genomic_sequence.set_time_of_last_request_to_ucsc_browser(actual_original_time)
 
 
+@freeze_time(f"2020-10-06 14:03:{SECONDS_BETWEEN_UCSC_REQUESTS}")
+def test_GenomicSequence_from_coordinates__sets_the_time_of_the_last_ping_to_ucsc_even_if_it_fails(
+    mocker,
+):
+    mocker.patch.object(time, "sleep", autospec=True)
+    mocker.patch.object(
+        genomic_sequence,
+        "request_sequence_from_ucsc",
+        autospec=True,
+        side_effect=UcscResponseMissingSequenceError(),
+    )
+    mocked_set_time = mocker.patch.object(
+        genomic_sequence, "set_time_of_last_request_to_ucsc_browser", autospec=True
+    )
+    with pytest.raises(UcscResponseMissingSequenceError):
+        GenomicSequence.from_coordinates("hg19", "chrX", 2000000, 2000215, True)
+    mocked_set_time.assert_called_once_with(
+        datetime.datetime(
+            year=2020,
+            month=10,
+            day=6,
+            hour=14,
+            minute=3,
+            second=SECONDS_BETWEEN_UCSC_REQUESTS,
+        )
+    )
+
+
 def test_GenomicSequence_create_reverse_complement__reverses_an_existing_sequence():
     expected_genome = "hg19"
     expected_chr = "chr2"
@@ -318,6 +399,43 @@ def test_ExonCoordinates__returns_true_when_equal():
     assert ec1 == ec2
 
 
+def test_ExonCoordinates__are_frozen_and_hashable_without_instance_dict():
+    ec = ExonCoordinates.from_coordinate_info("hg38", "chr4", 5000, 60000, False)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        ec.coordinates.start_coord = 1
+    assert not hasattr(ec, "__dict__")
+    assert not hasattr(ec.coordinates, "__dict__")
+    assert (
+        len(
+            {
+                ec,
+                ExonCoordinates.from_coordinate_info(
+                    "hg38", "chr4", 5000, 60000, False
+                ),
+            }
+        )
+        == 1
+    )
+
+
+def test_GenomicCoordinates__interns_genome_and_chromosome():
+    gc = GenomicCoordinates("".join(["hg", "38"]), "".join(["chr", "4"]), 5000, 60000)
+    assert gc.genome is sys.intern("hg38")
+    assert gc.chromosome is sys.intern("chr4")
+
+
+@pytest.mark.parametrize(
+    "copy_function,test_description",
+    [
+        (lambda ec: pickle.loads(pickle.dumps(ec)), "pickle"),
+        (copy.deepcopy, "deepcopy"),
+    ],
+)
+def test_ExonCoordinates__can_be_copied(copy_function, test_description):
+    ec = ExonCoordinates.from_coordinate_info("hg38", "chr4", 5000, 60000, False)
+    assert copy_function(ec) == ec
+
+
 @pytest.fixture(scope="function", name="generic_negative_strand_gene_isoform")
 def fixture_generic_negative_strand_gene_isoform():
     gic = GeneIsoformCoordinates(
@@ -376,6 +494,49 @@ def test_GeneIsoformCoordinates__get_all_exon_coordinates(
     assert actual_coords[1].coordinates.end_coord == 60000
 
 
+@pytest.mark.parametrize(
+    "copy_function,test_description",
+    [
+        (lambda gic: pickle.loads(pickle.dumps(gic)), "pickle"),
+        (copy.deepcopy, "deepcopy"),
+    ],
+)
+def test_GeneIsoformCoordinates__can_be_copied(
+    copy_function, test_description, generic_negative_strand_gene_isoform
+):
+    gic = copy_function(generic_negative_strand_gene_isoform)
+    assert gic.get_start_coord() == 5000
+    assert gic.get_end_coord() == 62000
+    assert (
+        gic.get_all_exon_coordinates()
+        == generic_negative_strand_gene_isoform.get_all_exon_coordinates()
+    )
+
+
+def test_GeneIsoformCoordinates__get_exon_bounds(generic_negative_strand_gene_isoform):
+    exon_starts, exon_ends = generic_negative_strand_gene_isoform.get_exon_bounds()
+    assert list(exon_starts) == [61000, 5000]
+    assert list(exon_ends) == [62000, 60000]
+
+
+def test_GeneIsoformCoordinates__from_exon_bounds__creates_same_isoform_as_from_exons(
+    generic_negative_strand_gene_isoform,
+):
+    gic = GeneIsoformCoordinates.from_exon_bounds(
+        "hg38", "chr4", False, [61000, 5000], [62000, 60000]
+    )
+    assert gic.genome == "hg38"
+    assert gic.chromosome == "chr4"
+    assert gic.is_positive_strand is False
+    assert gic.get_start_coord() == 5000
+    assert gic.get_end_coord() == 62000
+    assert (
+        gic.get_all_exon_coordinates()
+        == generic_negative_strand_gene_isoform.get_all_exon_coordinates()
+    )
+    assert not hasattr(gic, "__dict__")
+
+
 def test_GeneIsoformCoordinates__get_start_coord__when_negative_strand(
     generic_negative_strand_gene_isoform,
 ):
@@ -606,6 +767,81 @@ def test_parse_ucsc_refseq_table_into_gene_coordinates__excludes_chromosomes_not
     assert len(actual_keys) == 7
 
 
+def _write_refseq_table(filepath, rows_to_write=None, open_function=open):
+    with open(
+        os.path.join(PATH_OF_CURRENT_FILE, "partial_ucsc_hg19_refseq.tsv")
+    ) as in_file:
+        lines = in_file.readlines()
+    if rows_to_write is not None:
+        lines = [lines[0]] + rows_to_write(lines[1:])
+    with open_function(filepath, "wt") as out_file:
+        out_file.writelines(lines)
+
+
+def test_parse_ucsc_refseq_table_into_gene_coordinates__reads_gzipped_table(tmp_path):
+    filepath = os.path.join(tmp_path, "refseq.tsv.gz")
+    _write_refseq_table(filepath, open_function=gzip.open)
+    actual_dict = parse_ucsc_refseq_table_into_gene_coordinates(
+        "hg19", filepath, only_include_chromosomes=["chr1", "chr9"]
+    )
+    assert len(actual_dict) == 7
+    assert len(actual_dict["PGM5P3-AS1"].get_isoforms()) == 3
+
+
+def test_iter_ucsc_refseq_table_isoforms__skips_other_chromosomes_before_parsing_rows(
+    mocker,
+):
+    spied_from_row = mocker.spy(GeneIsoformCoordinates, "from_ucsc_refseq_table_row")
+    filepath = os.path.join(PATH_OF_CURRENT_FILE, "partial_ucsc_hg19_refseq.tsv")
+
+    actual = list(
+        iter_ucsc_refseq_table_isoforms(
+            "hg19", filepath, only_include_chromosomes=iter(["chr1"])
+        )
+    )
+
+    assert [gene_name for gene_name, _ in actual] == ["SGIP1", "SGIP1"]
+    assert actual[1][1].get_start_coord() == 66999835
+    assert spied_from_row.call_count == 2
+
+
+def test_iter_ucsc_refseq_table_genes__yields_same_genes_as_parsing_whole_table():
+    filepath = os.path.join(PATH_OF_CURRENT_FILE, "partial_ucsc_hg19_refseq.tsv")
+    expected = parse_ucsc_refseq_table_into_gene_coordinates("hg19", filepath)
+
+    genes = iter_ucsc_refseq_table_genes("hg19", filepath)
+    first_gene = next(genes)
+    actual = [first_gene] + list(genes)
+
+    assert [gene.name for gene in actual] == list(expected)
+    for gene in actual:
+        assert gene.get_start_coord() == expected[gene.name].get_start_coord()
+        assert gene.get_end_coord() == expected[gene.name].get_end_coord()
+        assert len(gene.get_isoforms()) == len(expected[gene.name].get_isoforms())
+
+
+def test_iter_ucsc_refseq_table_genes__yields_gene_once_for_each_chromosome(tmp_path):
+    filepath = os.path.join(tmp_path, "refseq.tsv")
+    _write_refseq_table(
+        filepath, lambda rows: rows[:-1] + [rows[-1].replace("ZNF214", "SGIP1")]
+    )
+    actual = [
+        (gene.name, gene.chromosome)
+        for gene in iter_ucsc_refseq_table_genes("hg19", filepath)
+        if gene.name == "SGIP1"
+    ]
+    assert actual == [("SGIP1", "chr1"), ("SGIP1", "chr11")]
+
+
+def test_iter_ucsc_refseq_table_genes__raises_error_if_chromosome_rows_are_not_together(
+    tmp_path,
+):
+    filepath = os.path.join(tmp_path, "refseq.tsv")
+    _write_refseq_table(filepath, lambda rows: rows[1:] + rows[:1])
+    with pytest.raises(ValueError, match="chr1 are not all together"):
+        list(iter_ucsc_refseq_table_genes("hg19", filepath))
+
+
 def test_create_dict_by_chromosome_from_genes():
     filepath = os.path.join(PATH_OF_CURRENT_FILE, "partial_ucsc_hg19_refseq.tsv")
     genes_dict = parse_ucsc_refseq_table_into_gene_coordinates("hg19", filepath)
@@ -616,3 +852,307 @@ def test_create_dict_by_chromosome_from_genes():
     assert actual_keys == set(["chr11", "chr1", "chr9"])
     assert len(dict_by_chr["chr1"]) == 1
     assert len(dict_by_chr["chr11"]) == 4
+
+
+@pytest.mark.parametrize(
+    "ranges,max_gap,expected,test_description",
+    [
+        ([], 10, [], "no ranges"),
+        ([(5, 10)], 0, [(5, 10, [0])], "single range"),
+        ([(5, 10), (8, 20)], 0, [(5, 20, [0, 1])], "overlapping"),
+        ([(5, 10), (11, 20)], 0, [(5, 20, [0, 1])], "adjacent"),
+        ([(5, 10), (12, 20)], 0, [(5, 10, [0]), (12, 20, [1])], "gap too big"),
+        ([(5, 10), (13, 20)], 2, [(5, 20, [0, 1])], "gap within tolerance"),
+        (
+            [(30, 40), (1, 3), (5, 50), (60, 70)],
+            5,
+            [(1, 50, [1, 2, 0]), (60, 70, [3])],
+            "unsorted and contained",
+        ),
+    ],
+)
+def test_merge_nearby_ranges(ranges, max_gap, expected, test_description):
+    assert merge_nearby_ranges(ranges, max_gap) == expected
+
+
+def test_GenomicSequence_bulk_from_coordinates__returns_sequences_in_input_order(
+    mocker,
+):
+    spied_from_coordinates = mocker.spy(GenomicSequence, "from_coordinates")
+    all_coordinates = [
+        ("hg19", "chr1", 30, 35, True),
+        ("hg19", "chr2", 2, 6, False),
+        ("hg19", "chr1", 3, 8, False),
+        ("hg38", "chr1", 3, 8, True),
+        ("hg19", "chr1", 10, 12, True),
+        ("hg19", "chr1", 1, 44, True),
+    ]
+    source = InMemorySequenceSource()
+    actual = GenomicSequence.bulk_from_coordinates(
+        all_coordinates, max_gap=5, sequence_source=source
+    )
+    expected = [
+        GenomicSequence.from_coordinates(*coordinates, sequence_source=source)
+        for coordinates in all_coordinates
+    ]
+    for actual_gs, expected_gs in zip(actual, expected):
+        assert str(actual_gs) == str(expected_gs)
+        assert str(actual_gs.sequence) == str(expected_gs.sequence)
+    assert len(actual) == len(all_coordinates)
+    # one request for each combination of genome and chromosome
+    assert spied_from_coordinates.call_count == 3 + len(all_coordinates)
+
+
+def test_GenomicSequence_bulk_from_coordinates__passes_cache_to_from_coordinates(
+    mocker,
+):
+    mocked_from_coordinates = mocker.patch.object(
+        GenomicSequence,
+        "from_coordinates",
+        autospec=True,
+        return_value=GenomicSequence("hg19", "chrX", 101, True, "ACGTACGTAC"),
+    )
+    expected_cache = object()
+    actual = GenomicSequence.bulk_from_coordinates(
+        [("hg19", "chrX", 101, 104, True), ("hg19", "chrX", 107, 110, False)],
+        max_gap=2,
+        sequence_cache=expected_cache,
+    )
+    mocked_from_coordinates.assert_called_once_with(
+        "hg19",
+        "chrX",
+        101,
+        110,
+        True,
+        sequence_source=None,
+        sequence_cache=expected_cache,
+    )
+    assert [str(gs.sequence) for gs in actual] == ["ACGT", "GTAC"]
+
+
+@pytest.mark.parametrize(
+    "lines,test_description",
+    [
+        (UCSC_RESPONSE_LINES, "escaped header"),
+        (
+            [line.replace("&gt;", ">") for line in UCSC_RESPONSE_LINES],
+            "unescaped header",
+        ),
+        (
+            [
+                "<html><pre>&gt;hg19_dna range=chrX:2000000-2000015",
+                "ACGTACGTAC",
+                "GGCCTT</pre>",
+            ],
+            "tags on the same lines as the text",
+        ),
+        (UCSC_RESPONSE_LINES[:5], "truncated before closing tag"),
+    ],
+)
+def test_request_sequence_from_ucsc__parses_first_pre_block_of_streamed_response(
+    lines, test_description, mocker
+):
+    mocked_session = _mock_ucsc_response(mocker, lines)
+    actual = request_sequence_from_ucsc("https://genome.ucsc.edu/cgi-bin/hgc", "hg19")
+    assert actual == "ACGTACGTACGGCCTT"
+    mocked_session.get.assert_called_once_with(
+        "https://genome.ucsc.edu/cgi-bin/hgc",
+        stream=True,
+        timeout=UCSC_REQUEST_TIMEOUT_SECONDS,
+    )
+
+
+def test_request_sequence_from_ucsc__reads_the_whole_response(mocker):
+    mocked_session = _mock_ucsc_response(mocker, [])
+    lines = iter([line.encode("utf-8") for line in UCSC_RESPONSE_LINES])
+    mocked_session.get.return_value.iter_lines.return_value = lines
+    request_sequence_from_ucsc("https://genome.ucsc.edu/cgi-bin/hgc", "hg19")
+    assert list(lines) == []
+
+
+def test_request_sequence_from_ucsc__raises_error_if_genome_does_not_match_expected(
+    mocker,
+):
+    _mock_ucsc_response(mocker, UCSC_RESPONSE_LINES)
+    with pytest.raises(
+        DnaRequestGenomeMismatchError, match="expected hg38 but found hg19"
+    ):
+        request_sequence_from_ucsc("https://genome.ucsc.edu/cgi-bin/hgc", "hg38")
+
+
+@pytest.mark.parametrize(
+    "lines,expected_match,test_description",
+    [
+        (
+            ["<html>", "Sorry, the position was not found", "</html>"],
+            "No <pre>",
+            "no pre block",
+        ),
+        (["<PRE>", "", "</PRE>"], "empty", "empty pre block"),
+    ],
+)
+def test_request_sequence_from_ucsc__raises_error_if_response_has_no_sequence(
+    lines, expected_match, test_description, mocker
+):
+    _mock_ucsc_response(mocker, lines)
+    with pytest.raises(UcscResponseMissingSequenceError, match=expected_match):
+        request_sequence_from_ucsc(
+            "https://genome.ucsc.edu/cgi-bin/hgc",
+            "hg19",
+            retry_policy=RetryPolicy(max_retries=0),
+        )
+
+
+def test_get_ucsc_session__reuses_one_pooled_session_per_process(mocker):
+    mocker.patch.dict(genomic_sequence._UCSC_SESSIONS_BY_PROCESS_ID, clear=True)
+    session = get_ucsc_session()
+    assert get_ucsc_session() is session
+    assert session.get_adapter("https://genome.ucsc.edu")._pool_maxsize == (
+        UCSC_SESSION_POOL_MAX_SIZE
+    )
+
+    mocker.patch.object(os, "getpid", autospec=True, return_value=-1)
+    assert get_ucsc_session() is not session
+
+
+def test_GenomicSequence_from_coordinates__waits_for_rate_limiter_instead_of_fixed_delay(
+    mocker,
+):
+    mocked_request_ucsc = mocker.patch.object(
+        genomic_sequence,
+        "request_sequence_from_ucsc",
+        autospec=True,
+        return_value="ACGT",
+    )
+    spied_sleep = mocker.spy(time, "sleep")
+    spied_set_time = mocker.spy(
+        genomic_sequence, "set_time_of_last_request_to_ucsc_browser"
+    )
+    limiter = TokenBucketRateLimiter(1000, burst=2)
+    spied_acquire = mocker.spy(limiter, "acquire")
+
+    for _ in range(2):
+        GenomicSequence.from_coordinates(
+            "hg19", "chrX", 2000000, 2000003, True, rate_limiter=limiter
+        )
+
+    assert spied_acquire.call_count == 2
+    assert mocked_request_ucsc.call_count == 2
+    assert spied_sleep.call_count == 0
+    assert spied_set_time.call_count == 0
+
+
+def test_GenomicSequence_from_coordinates__uses_global_rate_limiter(mocker):
+    mocker.patch.object(
+        genomic_sequence,
+        "request_sequence_from_ucsc",
+        autospec=True,
+        return_value="ACGT",
+    )
+    limiter = TokenBucketRateLimiter(1000)
+    mocker.patch.object(rate_limiting, "ucsc_rate_limiter", limiter)
+    spied_acquire = mocker.spy(limiter, "acquire")
+
+    GenomicSequence.from_coordinates("hg19", "chrX", 2000000, 2000003, True)
+
+    assert spied_acquire.call_count == 1
+
+
+def test_GenomicSequence_from_coordinates_async__matches_from_coordinates():
+    source = InMemorySequenceSource()
+    expected = GenomicSequence.from_coordinates(
+        "hg19", "chr1", 3, 12, False, sequence_source=source
+    )
+    actual = asyncio.run(
+        GenomicSequence.from_coordinates_async(
+            "hg19", "chr1", 3, 12, False, sequence_source=source
+        )
+    )
+    assert str(actual) == str(expected)
+    assert str(actual.sequence) == str(expected.sequence)
+
+
+def test_GenomicSequence_from_coordinates_async__waits_for_rate_limiter_on_the_event_loop(
+    mocker,
+):
+    mocked_request_ucsc = mocker.patch.object(
+        genomic_sequence,
+        "request_sequence_from_ucsc",
+        autospec=True,
+        return_value="ACGT",
+    )
+    limiter = TokenBucketRateLimiter(1000)
+    spied_acquire = mocker.spy(limiter, "acquire")
+    spied_acquire_async = mocker.spy(limiter, "acquire_async")
+
+    gs = asyncio.run(
+        GenomicSequence.from_coordinates_async(
+            "hg19", "chrX", 2000000, 2000003, False, rate_limiter=limiter
+        )
+    )
+
+    assert str(gs.sequence) == "ACGT"
+    assert gs.is_positive_strand is False
+    assert spied_acquire_async.call_count == 1
+    assert spied_acquire.call_count == 0
+    assert "revComp=on" in mocked_request_ucsc.call_args[0][0]
+    assert mocked_request_ucsc.call_args[1] == {"rate_limiter": limiter}
+
+
+def test_GenomicSequence_from_coordinates_async__spaces_requests_without_rate_limiter(
+    mocker,
+):
+    mocker.patch.object(rate_limiting, "ucsc_rate_limiter", None)
+    mocker.patch.object(
+        genomic_sequence,
+        "get_time_of_last_request_to_ucsc_browser",
+        autospec=True,
+        return_value=datetime.datetime.utcnow(),
+    )
+    mocker.patch.object(
+        genomic_sequence, "set_time_of_last_request_to_ucsc_browser", autospec=True
+    )
+    mocker.patch.object(
+        genomic_sequence,
+        "request_sequence_from_ucsc",
+        autospec=True,
+        return_value="ACGT",
+    )
+    mocked_sleep = mocker.patch.object(time, "sleep", autospec=True)
+
+    gs = asyncio.run(
+        GenomicSequence.from_coordinates_async("hg19", "chrX", 2000000, 2000003, True)
+    )
+
+    assert str(gs.sequence) == "ACGT"
+    assert mocked_sleep.call_count == 1
+
+
+def test_GenomicSequence_from_coordinates_async__overlaps_waiting_for_ucsc(mocker):
+    def slow_request(url, expected_genome, rate_limiter=None):
+        time.sleep(0.2)
+        return "ACGT"
+
+    mocker.patch.object(
+        genomic_sequence,
+        "request_sequence_from_ucsc",
+        autospec=True,
+        side_effect=slow_request,
+    )
+    limiter = TokenBucketRateLimiter(1000, burst=4)
+
+    async def fetch_all():
+        return await asyncio.gather(
+            *[
+                GenomicSequence.from_coordinates_async(
+                    "hg19", "chrX", 2000000, 2000003, True, rate_limiter=limiter
+                )
+                for _ in range(4)
+            ]
+        )
+
+    start = time.monotonic()
+    results = asyncio.run(fetch_all())
+
+    assert time.monotonic() - start < 0.6
+    assert [str(gs.sequence) for gs in results] == ["ACGT"] * 4
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from nuclease_off_target import FetchLoadTestResult
+from nuclease_off_target import run_fetch_load_test
+import pytest
+
+
+def test_run_fetch_load_test__counts_errors_instead_of_stopping(mocker):
+    fetch = mocker.Mock(side_effect=[None, ValueError("boom"), None])
+    result = run_fetch_load_test(
+        [("hg19", "chr1", 1, 10, True)] * 3, num_workers=1, fetch=fetch
+    )
+    assert result.num_fetches == 3
+    assert result.num_errors == 1
+    assert len(result.latencies_seconds) == 2
+
+
+def test_FetchLoadTestResult_get_latency_percentile__raises_error_if_nothing_succeeded():
+    result = FetchLoadTestResult(
+        num_workers=1, elapsed_seconds=1.0, latencies_seconds=tuple(), num_errors=3
+    )
+    with pytest.raises(ValueError, match="No fetches succeeded"):
+        result.get_latency_percentile(50)
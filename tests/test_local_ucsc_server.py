@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+from nuclease_off_target import format_ucsc_dna_page
+from nuclease_off_target import genomic_sequence
+from nuclease_off_target import GenomicSequence
+from nuclease_off_target import get_ucsc_browser_url
+from nuclease_off_target import get_ucsc_request_statistics
+from nuclease_off_target import LocalUcscServer
+from nuclease_off_target import rate_limiting
+from nuclease_off_target import RequestStatistics
+from nuclease_off_target import retries
+from nuclease_off_target import RetryPolicy
+from nuclease_off_target import run_fetch_load_test
+from nuclease_off_target import set_ucsc_browser_url
+from nuclease_off_target import set_ucsc_rate_limiter
+from nuclease_off_target import set_ucsc_retry_policy
+from nuclease_off_target import TokenBucketRateLimiter
+from nuclease_off_target import UCSC_BROWSER_URL
+from nuclease_off_target import UcscTemporarilyUnavailableError
+import pytest
+import requests
+
+# 120 bases, so pages wrap onto several lines (made up)
+CHR1_SEQUENCE = "ACGTTGCAACGTAAGGCCTTGATCCATTAGCATCGAGGATTACA" * 2 + "GGGTTTCCCAAA" * 3
+FAST_RETRY_POLICY = RetryPolicy(
+    max_retries=2, initial_backoff_seconds=0.001, max_backoff_seconds=0.001
+)
+
+
+@pytest.fixture(scope="function", name="fasta_sequences")
+def fixture_fasta_sequences():
+    return {"chr1": CHR1_SEQUENCE}
+
+
+@pytest.fixture(scope="function", name="point_ucsc_at_server")
+def fixture_point_ucsc_at_server(mocker):
+    mocker.patch.object(genomic_sequence, "ucsc_browser_url", UCSC_BROWSER_URL)
+    mocker.patch.object(retries, "ucsc_retry_policy", RetryPolicy())
+    mocker.patch.object(retries, "ucsc_request_statistics", RequestStatistics())
+    mocker.patch.object(rate_limiting, "ucsc_rate_limiter", None)
+    servers = list()
+
+    def point_ucsc_at_server(server):
+        server.start()
+        servers.append(server)
+        set_ucsc_browser_url(server.url + "/")
+        set_ucsc_retry_policy(FAST_RETRY_POLICY)
+        set_ucsc_rate_limiter(TokenBucketRateLimiter(10000, burst=100))
+        return server
+
+    yield point_ucsc_at_server
+    for server in servers:
+        server.stop()
+
+
+def test_format_ucsc_dna_page__wraps_sequence_in_a_pre_block():
+    page = format_ucsc_dna_page("hg19", "chr1", 1, 60, False, "A" * 60)
+    assert page.splitlines()[1:6] == [
+        "<PRE>",
+        "&gt;hg19_dna range=chr1:1-60 5'pad=0 3'pad=0 strand=- repeatMasking=none",
+        "A" * 50,
+        "A" * 10,
+        "</PRE>",
+    ]
+
+
+def test_LocalUcscServer__raises_error_if_fractions_add_up_to_more_than_one(
+    fasta_source,
+):
+    with pytest.raises(ValueError, match="cannot add up to more than 1"):
+        LocalUcscServer(
+            {"hg19": fasta_source}, throttle_fraction=0.6, error_fraction=0.5
+        )
+
+
+def test_set_ucsc_browser_url__strips_trailing_slash(mocker):
+    mocker.patch.object(genomic_sequence, "ucsc_browser_url", UCSC_BROWSER_URL)
+    set_ucsc_browser_url("http://localhost:8000/")
+    assert get_ucsc_browser_url() == "http://localhost:8000"
+
+
+@pytest.mark.parametrize(
+    "is_positive_strand,expected,test_description",
+    [
+        (True, CHR1_SEQUENCE[39:104], "positive strand"),
+        (
+            False,
+            str(
+                GenomicSequence("hg19", "chr1", 40, True, CHR1_SEQUENCE[39:104])
+                .create_reverse_complement()
+                .sequence
+            ),
+            "negative strand",
+        ),
+    ],
+)
+def test_GenomicSequence_from_coordinates__fetches_from_local_server(
+    is_positive_strand, expected, test_description, fasta_source, point_ucsc_at_server
+):
+    server = point_ucsc_at_server(LocalUcscServer({"hg19": fasta_source}))
+    gs = GenomicSequence.from_coordinates("hg19", "chr1", 40, 104, is_positive_strand)
+    assert str(gs.sequence) == expected
+    assert server.status_counts == {200: 1}
+    assert get_ucsc_request_statistics().requests == 1
+
+
+def test_LocalUcscServer__throttles_requests_with_retry_after_header(
+    fasta_source, point_ucsc_at_server
+):
+    server = point_ucsc_at_server(
+        LocalUcscServer(
+            {"hg19": fasta_source}, throttle_fraction=1.0, retry_after_seconds=0.001
+        )
+    )
+    with requests.get(
+        f"{server.url}/cgi-bin/hgc?db=hg19&getDnaPos=chr1%3A1-10"
+    ) as response:
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "0.001"
+    with pytest.raises(UcscTemporarilyUnavailableError):
+        GenomicSequence.from_coordinates("hg19", "chr1", 1, 10, True)
+    assert server.requests_served == 4
+
+
+def test_LocalUcscServer__can_serve_throttle_pages_without_error_status(
+    fasta_source, point_ucsc_at_server
+):
+    server = point_ucsc_at_server(
+        LocalUcscServer(
+            {"hg19": fasta_source}, throttle_fraction=1.0, throttle_status=200
+        )
+    )
+    with pytest.raises(UcscTemporarilyUnavailableError) as error_info:
+        GenomicSequence.from_coordinates("hg19", "chr1", 1, 10, True)
+    assert error_info.value.status_code == 200
+    assert server.requests_served == 3
+
+
+def test_LocalUcscServer__injects_errors_at_the_requested_rate(
+    fasta_source, point_ucsc_at_server
+):
+    server = point_ucsc_at_server(
+        LocalUcscServer(
+            {"hg19": fasta_source},
+            throttle_fraction=0.2,
+            error_fraction=0.3,
+            seed=7,
+        )
+    )
+    set_ucsc_retry_policy(RetryPolicy(max_retries=0))
+    outcomes = list()
+    for _ in range(200):
+        try:
+            GenomicSequence.from_coordinates("hg19", "chr1", 1, 10, True)
+            outcomes.append(200)
+        except UcscTemporarilyUnavailableError as error:
+            outcomes.append(error.status_code)
+    assert server.status_counts == {
+        status: outcomes.count(status) for status in set(outcomes)
+    }
+    assert 30 <= server.status_counts[429] <= 50
+    assert 45 <= server.status_counts[503] <= 75
+
+
+@pytest.mark.parametrize(
+    "path,test_description",
+    [
+        ("/cgi-bin/hgTracks", "unknown page"),
+        ("/cgi-bin/hgc?db=hg19&getDnaPos=chr1", "invalid position"),
+        ("/cgi-bin/hgc?db=mm10&getDnaPos=chr1%3A1-10", "unknown genome"),
+        ("/cgi-bin/hgc?db=hg19&getDnaPos=chr2%3A1-10", "unknown chromosome"),
+        ("/cgi-bin/hgc?db=hg19&getDnaPos=chr1%3A100-200", "past end of chromosome"),
+    ],
+)
+def test_LocalUcscServer__rejects_invalid_requests(
+    path, test_description, fasta_source
+):
+    with LocalUcscServer({"hg19": fasta_source}) as server:
+        with requests.get(f"{server.url}{path}") as response:
+            assert response.status_code in (400, 404)
+            assert "<pre>" not in response.text.lower()
+
+
+def test_LocalUcscServer__waits_the_requested_latency(fasta_source):
+    with LocalUcscServer({"hg19": fasta_source}, latency_seconds=0.05) as server:
+        with requests.get(
+            f"{server.url}/cgi-bin/hgc?db=hg19&getDnaPos=chr1%3A1-10"
+        ) as response:
+            assert response.elapsed.total_seconds() >= 0.05
+
+
+def test_LocalUcscServer__can_be_stopped_without_being_started(fasta_source):
+    server = LocalUcscServer({"hg19": fasta_source})
+    server.stop()
+    assert server.socket.fileno() == -1
+
+
+def test_run_fetch_load_test__measures_concurrent_fetches_from_local_server(
+    fasta_source, point_ucsc_at_server
+):
+    point_ucsc_at_server(LocalUcscServer({"hg19": fasta_source}, latency_seconds=0.05))
+    all_coordinates = [
+        ("hg19", "chr1", idx, idx + 20, idx % 2 == 0) for idx in range(1, 21)
+    ]
+
+    result = run_fetch_load_test(all_coordinates, num_workers=10)
+
+    assert result.num_fetches == 20
+    assert result.num_errors == 0
+    assert result.get_latency_percentile(50) >= 0.05
+    # the workers wait on the server latency at the same time
+    assert result.elapsed_seconds < 20 * 0.05
+    assert result.fetches_per_second > 1 / 0.05
+    assert "20 fetches (0 errors) with 10 workers" in result.summarize()
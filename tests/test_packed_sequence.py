@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from nuclease_off_target import GenomicSequence
+from nuclease_off_target import PackedSequence
+import pytest
+
+# N runs, soft-masked runs and other ambiguity codes (made up)
+MIXED_SEQUENCE = "ACGTTGCAnnNNNacgtRYgattacaKMNNBVDHSWacg"
+MIXED_REVERSE_COMPLEMENT = "cgtWSDHBVNNKMtgtaatcRYacgtNNNnnTGCAACGT"
+
+
+@pytest.mark.parametrize(
+    "sequence,test_description",
+    [
+        ("", "empty"),
+        ("A", "single base"),
+        ("ACGTACGT", "whole number of bytes"),
+        ("ACGTACGTTG", "partial last byte"),
+        (MIXED_SEQUENCE, "ambiguity codes and lowercase"),
+        ("N" * 10, "all N"),
+    ],
+)
+def test_PackedSequence__round_trips_any_sequence(sequence, test_description):
+    packed = PackedSequence.from_str(sequence)
+    assert len(packed) == len(sequence)
+    assert str(packed) == sequence
+
+
+def test_PackedSequence__uses_two_bits_per_base():
+    packed = PackedSequence.from_str("ACGT" * 1000)
+    assert packed.nbytes < 1100
+
+
+def test_PackedSequence__raises_error_for_characters_other_than_letters():
+    with pytest.raises(ValueError, match="only contain letters"):
+        PackedSequence.from_str("ACGT-ACGT")
+
+
+@pytest.mark.parametrize(
+    "key,test_description",
+    [
+        (slice(None), "everything"),
+        (slice(3, 17), "middle"),
+        (slice(9, 12), "inside an N run"),
+        (slice(-8, None), "negative start"),
+        (slice(20, 5), "empty"),
+        (slice(1, 30, 3), "with a step"),
+        (5, "single base"),
+        (-1, "last base"),
+    ],
+)
+def test_PackedSequence__decodes_slices_and_single_bases(key, test_description):
+    packed = PackedSequence.from_str(MIXED_SEQUENCE)
+    assert packed[key] == MIXED_SEQUENCE[key]
+    assert packed.reverse_complement()[key] == MIXED_REVERSE_COMPLEMENT[key]
+
+
+def test_PackedSequence__raises_error_for_index_out_of_range():
+    with pytest.raises(IndexError):
+        _ = PackedSequence.from_str("ACGT")[4]
+
+
+def test_PackedSequence_reverse_complement__complements_every_code():
+    packed = PackedSequence.from_str(MIXED_SEQUENCE)
+    reverse_complement = packed.reverse_complement()
+    assert str(reverse_complement) == MIXED_REVERSE_COMPLEMENT
+    assert str(reverse_complement.reverse_complement()) == MIXED_SEQUENCE
+    assert repr(reverse_complement) == (
+        f"<PackedSequence of {len(MIXED_SEQUENCE)} bases reverse complemented>"
+    )
+
+
+@pytest.mark.parametrize(
+    "start,end,test_description",
+    [(0, 8, "start"), (5, 30, "middle"), (30, 39, "end"), (10, 10, "empty")],
+)
+def test_PackedSequence_subsequence__matches_slicing_on_either_strand(
+    start, end, test_description
+):
+    packed = PackedSequence.from_str(MIXED_SEQUENCE)
+    assert str(packed.subsequence(start, end)) == MIXED_SEQUENCE[start:end]
+    assert (
+        str(packed.reverse_complement().subsequence(start, end))
+        == MIXED_REVERSE_COMPLEMENT[start:end]
+    )
+    # flipping a subsequence gives the same bases as the matching part of the other strand
+    assert (
+        str(packed.subsequence(start, end).reverse_complement())
+        == MIXED_REVERSE_COMPLEMENT[
+            len(MIXED_SEQUENCE) - end : len(MIXED_SEQUENCE) - start
+        ]
+    )
+
+
+def test_PackedSequence_subsequence__shares_the_packed_buffers():
+    packed = PackedSequence.from_str("ACGT" * 1000)
+    view = packed.reverse_complement().subsequence(100, 200)
+    assert len(view) == 100
+    assert view.shares_buffer_with(packed)
+
+
+def test_GenomicSequence_create_packed__keeps_sequence_and_coordinates():
+    gs = GenomicSequence("hg19", "chr1", 101, True, MIXED_SEQUENCE)
+    packed_gs = gs.create_packed()
+    assert isinstance(packed_gs.packed_sequence, PackedSequence)
+    assert gs.packed_sequence is None
+    assert str(packed_gs.sequence) == MIXED_SEQUENCE
+    assert packed_gs.end_coord == gs.end_coord
+    assert packed_gs.create_packed() is packed_gs
+
+
+@pytest.mark.parametrize(
+    "create_from,test_description",
+    [
+        (lambda gs: gs.create_reverse_complement(), "reverse complement"),
+        (lambda gs: gs.create_three_prime_trim(4), "3' trim"),
+        (lambda gs: gs.create_five_prime_trim(6), "5' trim"),
+        (
+            lambda gs: gs.create_reverse_complement().create_three_prime_trim(4),
+            "3' trim of reverse complement",
+        ),
+        (
+            lambda gs: gs.create_reverse_complement().create_five_prime_trim(6),
+            "5' trim of reverse complement",
+        ),
+    ],
+)
+def test_GenomicSequence__packed_instances_match_unpacked_ones(
+    create_from, test_description
+):
+    gs = GenomicSequence("hg19", "chr1", 101, True, MIXED_SEQUENCE)
+    expected = create_from(gs)
+    actual = create_from(gs.create_packed())
+    assert actual.packed_sequence is not None
+    assert str(actual.sequence) == str(expected.sequence)
+    assert actual.start_coord == expected.start_coord
+    assert actual.end_coord == expected.end_coord
+    assert actual.is_positive_strand == expected.is_positive_strand
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+import os
+import pickle
+import time
+
+from nuclease_off_target import CrossProcessRateLimiter
+from nuclease_off_target import get_ucsc_rate_limiter
+from nuclease_off_target import rate_limiting
+from nuclease_off_target import set_ucsc_rate_limiter
+from nuclease_off_target import TokenBucketRateLimiter
+import pytest
+
+
+def _reserve_several_times(limiter, num_reservations):
+    return [limiter.reserve() for _ in range(num_reservations)]
+
+
+@pytest.mark.parametrize(
+    "requests_per_second,burst,expected_match,test_description",
+    [
+        (0, 1, "requests_per_second must be positive", "zero rate"),
+        (-1, 1, "requests_per_second must be positive", "negative rate"),
+        (1, 0, "burst must be at least 1", "zero burst"),
+    ],
+)
+def test_TokenBucketRateLimiter__raises_error_for_invalid_settings(
+    requests_per_second, burst, expected_match, test_description
+):
+    with pytest.raises(ValueError, match=expected_match):
+        TokenBucketRateLimiter(requests_per_second, burst=burst)
+
+
+def test_TokenBucketRateLimiter_reserve__allows_a_burst_then_spaces_requests(mocker):
+    mocker.patch.object(
+        time, "monotonic", autospec=True, side_effect=[100, 100, 100, 100, 100, 101]
+    )
+    limiter = TokenBucketRateLimiter(2, burst=2)
+    assert [limiter.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+    # one second refills two tokens, but both were already promised to the earlier reservations
+    assert limiter.reserve() == 0.5
+
+
+def test_TokenBucketRateLimiter_reserve__does_not_refill_beyond_burst(mocker):
+    mocker.patch.object(
+        time, "monotonic", autospec=True, side_effect=[100, 200, 200, 200]
+    )
+    limiter = TokenBucketRateLimiter(1, burst=2)
+    assert [limiter.reserve() for _ in range(3)] == [0, 0, 1.0]
+
+
+def test_TokenBucketRateLimiter_reserve__gives_every_thread_its_own_slot():
+    limiter = TokenBucketRateLimiter(0.001, burst=3)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        waits = list(executor.map(lambda _: limiter.reserve(), range(40)))
+    waits.sort()
+    assert waits[:3] == [0, 0, 0]
+    # each reservation after the burst waits about one more interval than the previous one
+    for previous_wait, wait in zip(waits[3:], waits[4:]):
+        assert wait - previous_wait == pytest.approx(1000, abs=1)
+
+
+def test_TokenBucketRateLimiter_acquire__sleeps_only_when_bucket_is_empty(mocker):
+    mocked_sleep = mocker.patch.object(time, "sleep", autospec=True)
+    mocker.patch.object(
+        TokenBucketRateLimiter, "reserve", autospec=True, side_effect=[0.0, 2.5]
+    )
+    limiter = TokenBucketRateLimiter(1)
+    limiter.acquire()
+    assert mocked_sleep.call_count == 0
+    limiter.acquire()
+    mocked_sleep.assert_called_once_with(2.5)
+
+
+def test_TokenBucketRateLimiter_acquire_async__waits_without_blocking_event_loop():
+    limiter = TokenBucketRateLimiter(20, burst=1)
+    progress = list()
+
+    async def count_while_waiting():
+        for idx in range(3):
+            progress.append(idx)
+            await asyncio.sleep(0.01)
+
+    async def acquire_twice():
+        await limiter.acquire_async()
+        start = time.monotonic()
+        await asyncio.gather(limiter.acquire_async(), count_while_waiting())
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(acquire_twice())
+
+    assert elapsed >= 0.04
+    assert progress == [0, 1, 2]
+
+
+def test_set_ucsc_rate_limiter__sets_the_global_limiter(mocker):
+    mocker.patch.object(rate_limiting, "ucsc_rate_limiter", None)
+    assert get_ucsc_rate_limiter() is None
+    limiter = TokenBucketRateLimiter(1)
+    set_ucsc_rate_limiter(limiter)
+    assert get_ucsc_rate_limiter() is limiter
+
+
+def test_CrossProcessRateLimiter__instances_using_same_file_share_one_bucket(
+    tmp_path, mocker
+):
+    mocker.patch.object(
+        time, "time", autospec=True, side_effect=[100, 100, 100, 101, 101]
+    )
+    filepath = os.path.join(tmp_path, "ucsc.ratelimit")
+    first_limiter = CrossProcessRateLimiter(filepath, 2, burst=2)
+    second_limiter = CrossProcessRateLimiter(filepath, 2, burst=2)
+
+    assert first_limiter.reserve() == 0
+    assert second_limiter.reserve() == 0
+    assert first_limiter.reserve() == 0.5
+    # one second later the two refilled tokens cover the promised one, leaving one
+    assert second_limiter.reserve() == 0
+    assert first_limiter.reserve() == 0.5
+
+
+def test_CrossProcessRateLimiter__starts_with_full_bucket_if_file_is_unreadable(
+    tmp_path,
+):
+    filepath = os.path.join(tmp_path, "ucsc.ratelimit")
+    with open(filepath, "wb") as out_file:
+        out_file.write(b"garbage")
+    limiter = CrossProcessRateLimiter(filepath, 0.001, burst=2)
+    assert _reserve_several_times(limiter, 3)[:2] == [0, 0]
+
+
+def test_CrossProcessRateLimiter__can_be_pickled(tmp_path):
+    filepath = os.path.join(tmp_path, "ucsc.ratelimit")
+    limiter = CrossProcessRateLimiter(filepath, 0.001, burst=1)
+    assert limiter.reserve() == 0
+
+    unpickled_limiter = pickle.loads(pickle.dumps(limiter))
+
+    assert unpickled_limiter.filepath == filepath
+    assert unpickled_limiter.reserve() == pytest.approx(1000, abs=1)
+
+
+def test_CrossProcessRateLimiter__gives_every_process_its_own_slot(tmp_path):
+    limiter = CrossProcessRateLimiter(
+        os.path.join(tmp_path, "ucsc.ratelimit"), 0.001, burst=2
+    )
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        waits_by_process = list(
+            executor.map(_reserve_several_times, [limiter] * 4, [5] * 4)
+        )
+    waits = sorted(wait for waits in waits_by_process for wait in waits)
+    assert waits[:2] == [0, 0]
+    for previous_wait, wait in zip(waits[2:], waits[3:]):
+        assert wait - previous_wait == pytest.approx(1000, abs=1)
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+import gzip
+import os
+import shutil
+import struct
+
+from nuclease_off_target import InvalidRefSeqTableFileError
+from nuclease_off_target import load_ucsc_refseq_table
+from nuclease_off_target import parse_ucsc_refseq_table_into_gene_coordinates
+from nuclease_off_target import refseq_table
+from nuclease_off_target import RefSeqTable
+import numpy as np
+import pytest
+
+PATH_OF_CURRENT_FILE = os.path.dirname(os.path.realpath(__file__))
+REFSEQ_FILEPATH = os.path.join(PATH_OF_CURRENT_FILE, "partial_ucsc_hg19_refseq.tsv")
+
+
+def _summarize_gene(gene):
+    return (
+        gene.name,
+        gene.genome,
+        gene.chromosome,
+        gene.is_positive_strand,
+        gene.get_start_coord(),
+        gene.get_end_coord(),
+        sorted(
+            tuple(
+                (
+                    exon.coordinates.start_coord,
+                    exon.coordinates.end_coord,
+                    exon.is_positive_strand,
+                )
+                for exon in isoform.get_all_exon_coordinates()
+            )
+            for isoform in gene.get_isoforms()
+        ),
+    )
+
+
+@pytest.mark.parametrize(
+    "only_include_chromosomes,test_description",
+    [(None, "every chromosome"), (["chr1", "chr9"], "some chromosomes")],
+)
+def test_RefSeqTable__from_ucsc_refseq_table__creates_same_genes_as_parsing_rows(
+    only_include_chromosomes, test_description
+):
+    expected = parse_ucsc_refseq_table_into_gene_coordinates(
+        "hg19", REFSEQ_FILEPATH, only_include_chromosomes=only_include_chromosomes
+    )
+    table = RefSeqTable.from_ucsc_refseq_table(
+        "hg19", REFSEQ_FILEPATH, only_include_chromosomes=only_include_chromosomes
+    )
+    assert list(table) == list(expected)
+    assert len(table) == len(expected)
+    for gene_name, gene in expected.items():
+        assert _summarize_gene(table[gene_name]) == _summarize_gene(gene)
+
+
+def test_RefSeqTable__from_ucsc_refseq_table__holds_rows_as_columns():
+    table = RefSeqTable.from_ucsc_refseq_table("hg19", REFSEQ_FILEPATH)
+
+    assert table.num_isoforms == 28
+    assert table.chromosomes == ["chr1", "chr11", "chr9"]
+    assert table.transcript_names[0] == "NM_001308203.2"
+    assert table.gene_names[0] == "SGIP1"
+    assert table.chromosomes[table.chromosome_codes[2]] == "chr9"
+    assert table.is_positive_strand[:3].tolist() == [True, True, False]
+    assert table.transcript_starts[0] == 66999275
+    assert table.transcript_ends[0] == 67216822
+    assert table.exon_offsets[:3].tolist() == [0, 22, 45]
+    assert table.exon_offsets[-1] == len(table.exon_starts) == len(table.exon_ends)
+    assert table.exon_starts[:2].tolist() == [66999275, 66999928]
+    assert table.exon_ends[21] == 67216822
+
+
+def test_RefSeqTable__creates_each_gene_only_when_first_looked_up():
+    table = RefSeqTable.from_ucsc_refseq_table("hg19", REFSEQ_FILEPATH)
+    assert table._genes == {}  # pylint:disable=protected-access
+
+    znf215 = table["ZNF215"]
+
+    assert len(znf215.get_isoforms()) == 10
+    assert table["ZNF215"] is znf215
+    assert list(table._genes) == ["ZNF215"]  # pylint:disable=protected-access
+
+
+def test_RefSeqTable__from_ucsc_refseq_table__loads_table_without_rows(tmp_path):
+    filepath = os.path.join(tmp_path, "refseq.tsv")
+    with open(REFSEQ_FILEPATH) as in_file, open(filepath, "w") as out_file:
+        out_file.write(in_file.readline())
+    table = RefSeqTable.from_ucsc_refseq_table("hg19", filepath)
+    assert len(table) == 0
+    assert table.num_isoforms == 0
+    assert table.exon_offsets.tolist() == [0]
+
+
+def test_RefSeqTable__from_ucsc_refseq_table__raises_error_if_exons_do_not_match_counts(
+    tmp_path,
+):
+    filepath = os.path.join(tmp_path, "refseq.tsv")
+    with open(REFSEQ_FILEPATH) as in_file, open(filepath, "w") as out_file:
+        out_file.write(in_file.readline())
+        row = in_file.readline().split("\t")
+        row[8] = "23"
+        out_file.write("\t".join(row))
+    with pytest.raises(ValueError, match="do not match the exon counts"):
+        RefSeqTable.from_ucsc_refseq_table("hg19", filepath)
+
+
+def _assert_tables_equal(actual, expected):
+    assert actual.genome == expected.genome
+    assert actual.chromosomes == expected.chromosomes
+    for name in (
+        "transcript_names",
+        "gene_names",
+        "chromosome_codes",
+        "is_positive_strand",
+        "transcript_starts",
+        "transcript_ends",
+        "exon_offsets",
+        "exon_starts",
+        "exon_ends",
+    ):
+        assert getattr(actual, name).tolist() == getattr(expected, name).tolist()
+
+
+def test_RefSeqTable__load__memory_maps_saved_columns(tmp_path):
+    filepath = os.path.join(tmp_path, "genes.refseq")
+    expected = RefSeqTable.from_ucsc_refseq_table("hg19", REFSEQ_FILEPATH)
+    expected.save(filepath)
+
+    actual = RefSeqTable.load(filepath)
+
+    _assert_tables_equal(actual, expected)
+    assert isinstance(actual.exon_starts, np.memmap)
+    assert _summarize_gene(actual["ZNF215"]) == _summarize_gene(expected["ZNF215"])
+
+
+def test_RefSeqTable__load__loads_saved_table_without_rows(tmp_path):
+    filepath = os.path.join(tmp_path, "genes.refseq")
+    RefSeqTable.from_ucsc_refseq_table(
+        "hg19", REFSEQ_FILEPATH, only_include_chromosomes=["chrX"]
+    ).save(filepath)
+
+    actual = RefSeqTable.load(filepath)
+
+    assert len(actual) == 0
+    assert actual.exon_offsets.tolist() == [0]
+
+
+def test_RefSeqTable__load__raises_error_if_file_is_not_a_saved_table():
+    with pytest.raises(InvalidRefSeqTableFileError, match=REFSEQ_FILEPATH):
+        RefSeqTable.load(REFSEQ_FILEPATH)
+
+
+def test_load_ucsc_refseq_table__parses_table_when_no_cache_dir(mocker):
+    spied_parse = mocker.spy(RefSeqTable, "from_ucsc_refseq_table")
+    table = load_ucsc_refseq_table("hg19", REFSEQ_FILEPATH)
+    assert spied_parse.call_count == 1
+    assert len(table) == 11
+
+
+def test_load_ucsc_refseq_table__reuses_parsed_table_with_same_arguments(
+    tmp_path, mocker
+):
+    cache_dir = os.path.join(tmp_path, "cache")
+    expected = load_ucsc_refseq_table(
+        "hg19",
+        REFSEQ_FILEPATH,
+        only_include_chromosomes=["chr1", "chr9"],
+        cache_dir=cache_dir,
+    )
+    spied_parse = mocker.spy(RefSeqTable, "from_ucsc_refseq_table")
+
+    actual = load_ucsc_refseq_table(
+        "hg19",
+        REFSEQ_FILEPATH,
+        only_include_chromosomes=["chr9", "chr1"],
+        cache_dir=cache_dir,
+    )
+
+    assert spied_parse.call_count == 0
+    assert len(os.listdir(cache_dir)) == 1
+    _assert_tables_equal(actual, expected)
+
+
+@pytest.mark.parametrize(
+    "genome,only_include_chromosomes,is_table_modified,test_description",
+    [
+        ("hg38", None, False, "different genome"),
+        ("hg19", ["chr1"], False, "different chromosomes"),
+        ("hg19", None, True, "table modified"),
+    ],
+)
+def test_load_ucsc_refseq_table__parses_table_again_when_key_changes(
+    genome,
+    only_include_chromosomes,
+    is_table_modified,
+    test_description,
+    tmp_path,
+    mocker,
+):
+    filepath = os.path.join(tmp_path, "refseq.tsv")
+    with open(REFSEQ_FILEPATH) as in_file, open(filepath, "w") as out_file:
+        out_file.write(in_file.read())
+    cache_dir = os.path.join(tmp_path, "cache")
+    load_ucsc_refseq_table("hg19", filepath, cache_dir=cache_dir)
+    if is_table_modified:
+        file_stats = os.stat(filepath)
+        os.utime(
+            filepath, ns=(file_stats.st_atime_ns, file_stats.st_mtime_ns + 10 ** 9)
+        )
+    spied_parse = mocker.spy(RefSeqTable, "from_ucsc_refseq_table")
+
+    table = load_ucsc_refseq_table(
+        genome,
+        filepath,
+        only_include_chromosomes=only_include_chromosomes,
+        cache_dir=cache_dir,
+    )
+
+    assert spied_parse.call_count == 1
+    assert len(os.listdir(cache_dir)) == 2
+    assert table.genome == genome
+
+
+@pytest.mark.parametrize(
+    "corrupt_contents,test_description",
+    [
+        (lambda contents: b"not a table", "no signature"),
+        (lambda contents: contents[:12], "truncated header size"),
+        (lambda contents: contents[:40], "truncated header"),
+        (lambda contents: contents[: len(contents) // 2 + 100], "truncated columns"),
+        (
+            lambda contents: refseq_table.REFSEQ_TABLE_FILE_SIGNATURE
+            + struct.pack("<Q", 2)
+            + b"{}",
+            "header without columns",
+        ),
+    ],
+)
+def test_load_ucsc_refseq_table__replaces_invalid_cached_table(
+    corrupt_contents, test_description, tmp_path, mocker
+):
+    cache_dir = os.path.join(tmp_path, "cache")
+    load_ucsc_refseq_table("hg19", REFSEQ_FILEPATH, cache_dir=cache_dir)
+    (cache_filename,) = os.listdir(cache_dir)
+    cache_filepath = os.path.join(cache_dir, cache_filename)
+    with open(cache_filepath, "rb") as in_file:
+        contents = in_file.read()
+    with open(cache_filepath, "wb") as out_file:
+        out_file.write(corrupt_contents(contents))
+    spied_parse = mocker.spy(RefSeqTable, "from_ucsc_refseq_table")
+
+    load_ucsc_refseq_table("hg19", REFSEQ_FILEPATH, cache_dir=cache_dir)
+    table = load_ucsc_refseq_table("hg19", REFSEQ_FILEPATH, cache_dir=cache_dir)
+
+    assert spied_parse.call_count == 1
+    assert os.listdir(cache_dir) == [cache_filename]
+    assert len(table) == 11
+
+
+def test_load_ucsc_refseq_table__removes_temporary_file_if_saving_fails(
+    tmp_path, mocker
+):
+    cache_dir = os.path.join(tmp_path, "cache")
+    mocker.patch.object(
+        RefSeqTable, "save", autospec=True, side_effect=OSError("disk full")
+    )
+    with pytest.raises(OSError, match="disk full"):
+        load_ucsc_refseq_table("hg19", REFSEQ_FILEPATH, cache_dir=cache_dir)
+    assert os.listdir(cache_dir) == []
+
+
+def test_RefSeqTable__from_ucsc_refseq_table__reads_gzipped_table(tmp_path):
+    filepath = os.path.join(tmp_path, "refseq.tsv.gz")
+    with open(REFSEQ_FILEPATH, "rb") as in_file, gzip.open(filepath, "wb") as out_file:
+        shutil.copyfileobj(in_file, out_file)
+    actual = RefSeqTable.from_ucsc_refseq_table(
+        "hg19", filepath, only_include_chromosomes=["chr11"]
+    )
+    expected = RefSeqTable.from_ucsc_refseq_table(
+        "hg19", REFSEQ_FILEPATH, only_include_chromosomes=["chr11"]
+    )
+    _assert_tables_equal(actual, expected)
+    assert actual.chromosomes == ["chr11"]
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import random
+import threading
+import time
+
+from nuclease_off_target import DnaRequestGenomeMismatchError
+from nuclease_off_target import genomic_sequence
+from nuclease_off_target import GenomicSequence
+from nuclease_off_target import get_ucsc_request_statistics
+from nuclease_off_target import get_ucsc_retry_policy
+from nuclease_off_target import RequestStatistics
+from nuclease_off_target import request_sequence_from_ucsc
+from nuclease_off_target import reset_ucsc_request_statistics
+from nuclease_off_target import retries
+from nuclease_off_target import RetryPolicy
+from nuclease_off_target import SECONDS_BETWEEN_UCSC_REQUESTS
+from nuclease_off_target import set_ucsc_retry_policy
+from nuclease_off_target import TokenBucketRateLimiter
+from nuclease_off_target import UcscResponseMissingSequenceError
+from nuclease_off_target import UcscTemporarilyUnavailableError
+from nuclease_off_target.retries import parse_retry_after_header
+from nuclease_off_target.retries import record_ucsc_request_statistics
+import pytest
+import requests
+
+DNA_PAGE = (
+    "<HTML><BODY>\n<PRE>\n"
+    "&gt;hg19_dna range=chrX:2000000-2000015 5'pad=0 3'pad=0 strand=+ repeatMasking=none\n"
+    "ACGTACGTAC\nGGCCTT\n</PRE>\n</BODY></HTML>\n"
+)
+THROTTLE_PAGE = "<HTML><BODY>\nToo many requests, please slow down.\n</BODY></HTML>\n"
+DNA_PAGE_HEADER = DNA_PAGE.splitlines()[2]
+ERROR_PAGE = "<HTML><BODY>\nSorry, the position was not found.\n</BODY></HTML>\n"
+FAST_RETRY_POLICY = RetryPolicy(
+    max_retries=2, initial_backoff_seconds=0.001, max_backoff_seconds=0.001
+)
+
+
+def _create_fast_rate_limiter():
+    return TokenBucketRateLimiter(10000, burst=100)
+
+
+class ScriptedUcscServer(ThreadingHTTPServer):
+    """Reply to each request with the next of a list of scripted responses."""
+
+    def __init__(self, responses):
+        super().__init__(("127.0.0.1", 0), _ScriptedResponseHandler)
+        self.responses = list(responses)
+        self.requested_paths = list()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/cgi-bin/hgc?getDnaPos=1"
+
+
+class _ScriptedResponseHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # pylint:disable=invalid-name # name required by http.server
+        self.server.requested_paths.append(self.path)
+        status, body, headers = self.server.responses.pop(0)
+        encoded_body = body.encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(encoded_body)))
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+    def log_message(self, *args):  # keep the test output quiet
+        pass
+
+
+@pytest.fixture(scope="function", name="start_ucsc_server")
+def fixture_start_ucsc_server(mocker):
+    mocker.patch.object(retries, "ucsc_request_statistics", RequestStatistics())
+    servers = list()
+
+    def start_ucsc_server(responses):
+        server = ScriptedUcscServer(responses)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start_ucsc_server
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize(
+    "retry_idx,random_value,expected,test_description",
+    [
+        (0, 0.0, 2.0, "first retry without jitter"),
+        (2, 0.0, 8.0, "third retry without jitter"),
+        (10, 0.0, 60.0, "capped at max_backoff_seconds"),
+        (2, 1.0, 4.0, "full jitter takes off half"),
+        (2, 0.5, 6.0, "partial jitter"),
+    ],
+)
+def test_RetryPolicy_get_backoff_seconds__grows_exponentially_with_jitter(
+    retry_idx, random_value, expected, test_description, mocker
+):
+    mocker.patch.object(random, "random", autospec=True, return_value=random_value)
+    assert RetryPolicy().get_backoff_seconds(retry_idx) == expected
+
+
+def test_RetryPolicy_get_backoff_seconds__waits_at_least_minimum_seconds(mocker):
+    mocker.patch.object(random, "random", autospec=True, return_value=0.0)
+    policy = RetryPolicy()
+    assert policy.get_backoff_seconds(0, minimum_seconds=30) == 30
+    assert policy.get_backoff_seconds(0, minimum_seconds=1) == 2
+
+
+@pytest.mark.parametrize(
+    "value,expected,test_description",
+    [
+        (None, 0.0, "missing"),
+        ("5", 5.0, "seconds"),
+        ("-3", 0.0, "negative"),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0, "http date"),
+    ],
+)
+def test_parse_retry_after_header__returns_seconds(value, expected, test_description):
+    assert parse_retry_after_header(value) == expected
+
+
+def test_set_ucsc_retry_policy__sets_the_global_policy(mocker):
+    mocker.patch.object(retries, "ucsc_retry_policy", RetryPolicy())
+    set_ucsc_retry_policy(FAST_RETRY_POLICY)
+    assert get_ucsc_retry_policy() is FAST_RETRY_POLICY
+
+
+def test_record_ucsc_request_statistics__adds_to_totals_until_reset(mocker):
+    mocker.patch.object(retries, "ucsc_request_statistics", RequestStatistics())
+    record_ucsc_request_statistics(requests=1, bytes_received=100)
+    record_ucsc_request_statistics(requests=2, retries=1, seconds_waited=1.5)
+    assert get_ucsc_request_statistics() == RequestStatistics(
+        requests=3, retries=1, bytes_received=100, seconds_waited=1.5
+    )
+    reset_ucsc_request_statistics()
+    assert get_ucsc_request_statistics() == RequestStatistics()
+
+
+def test_request_sequence_from_ucsc__counts_request_and_bytes(start_ucsc_server):
+    server = start_ucsc_server([(200, DNA_PAGE, dict())])
+    assert request_sequence_from_ucsc(server.url, "hg19") == "ACGTACGTACGGCCTT"
+    assert get_ucsc_request_statistics() == RequestStatistics(
+        requests=1, bytes_received=len(DNA_PAGE)
+    )
+
+
+@pytest.mark.parametrize(
+    "failed_response,test_description",
+    [
+        ((503, "Service Unavailable", dict()), "server error"),
+        ((429, "Too Many Requests", dict()), "too many requests"),
+        ((200, THROTTLE_PAGE, dict()), "throttle page without sequence"),
+    ],
+)
+def test_request_sequence_from_ucsc__retries_temporary_failures(
+    failed_response, test_description, start_ucsc_server
+):
+    server = start_ucsc_server(
+        [failed_response, failed_response, (200, DNA_PAGE, dict())]
+    )
+    actual = request_sequence_from_ucsc(
+        server.url,
+        "hg19",
+        retry_policy=FAST_RETRY_POLICY,
+        rate_limiter=_create_fast_rate_limiter(),
+    )
+    assert actual == "ACGTACGTACGGCCTT"
+    statistics = get_ucsc_request_statistics()
+    assert statistics.requests == 3
+    assert statistics.retries == 2
+    assert statistics.seconds_waited > 0
+
+
+def test_request_sequence_from_ucsc__waits_as_long_as_retry_after_header_asks(
+    start_ucsc_server, mocker
+):
+    mocked_sleep = mocker.patch.object(time, "sleep", autospec=True)
+    server = start_ucsc_server(
+        [(429, "Too Many Requests", {"Retry-After": "7"}), (200, DNA_PAGE, dict())]
+    )
+    request_sequence_from_ucsc(server.url, "hg19", retry_policy=FAST_RETRY_POLICY)
+    mocked_sleep.assert_called_once_with(7.0)
+    assert get_ucsc_request_statistics().seconds_waited == 7.0
+
+
+@pytest.mark.parametrize(
+    "failed_response,expected_error,test_description",
+    [
+        ((503, "", dict()), UcscTemporarilyUnavailableError, "server error"),
+        ((200, THROTTLE_PAGE, dict()), UcscTemporarilyUnavailableError, "throttle"),
+    ],
+)
+def test_request_sequence_from_ucsc__raises_error_once_retries_are_used_up(
+    failed_response, expected_error, test_description, start_ucsc_server
+):
+    server = start_ucsc_server([failed_response] * 3)
+    with pytest.raises(expected_error):
+        request_sequence_from_ucsc(
+            server.url,
+            "hg19",
+            retry_policy=FAST_RETRY_POLICY,
+            rate_limiter=_create_fast_rate_limiter(),
+        )
+    assert len(server.requested_paths) == 3
+    assert get_ucsc_request_statistics().retries == 2
+
+
+@pytest.mark.parametrize(
+    "first_response,expected_error,test_description",
+    [
+        ((404, "Not Found", dict()), requests.HTTPError, "client error"),
+        (
+            (200, DNA_PAGE.replace("hg19", "hg38"), dict()),
+            DnaRequestGenomeMismatchError,
+            "wrong genome",
+        ),
+        (
+            (200, ERROR_PAGE, dict()),
+            UcscResponseMissingSequenceError,
+            "page without sequence",
+        ),
+    ],
+)
+def test_request_sequence_from_ucsc__does_not_retry_permanent_failures(
+    first_response, expected_error, test_description, start_ucsc_server
+):
+    server = start_ucsc_server([first_response, (200, DNA_PAGE, dict())])
+    with pytest.raises(expected_error):
+        request_sequence_from_ucsc(server.url, "hg19", retry_policy=FAST_RETRY_POLICY)
+    assert len(server.requested_paths) == 1
+
+
+def test_request_sequence_from_ucsc__retries_connection_errors(mocker):
+    mocker.patch.object(retries, "ucsc_request_statistics", RequestStatistics())
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    url = f"http://127.0.0.1:{server.server_address[1]}/cgi-bin/hgc"
+    server.server_close()  # nothing is listening on the port anymore
+    with pytest.raises(requests.ConnectionError):
+        request_sequence_from_ucsc(
+            url,
+            "hg19",
+            retry_policy=FAST_RETRY_POLICY,
+            rate_limiter=_create_fast_rate_limiter(),
+        )
+    assert get_ucsc_request_statistics().retries == 2
+
+
+def test_request_sequence_from_ucsc__waits_for_rate_limiter_before_each_retry(
+    start_ucsc_server, mocker
+):
+    server = start_ucsc_server(
+        [(503, "", dict()), (503, "", dict()), (200, DNA_PAGE, dict())]
+    )
+    limiter = _create_fast_rate_limiter()
+    mocked_acquire = mocker.patch.object(
+        limiter, "acquire", autospec=True, return_value=0.5
+    )
+    request_sequence_from_ucsc(
+        server.url, "hg19", retry_policy=FAST_RETRY_POLICY, rate_limiter=limiter
+    )
+    assert mocked_acquire.call_count == 2
+    assert get_ucsc_request_statistics().seconds_waited > 1.0
+
+
+def test_request_sequence_from_ucsc__spaces_retries_without_rate_limiter(
+    start_ucsc_server, mocker
+):
+    mocked_sleep = mocker.patch.object(time, "sleep", autospec=True)
+    server = start_ucsc_server([(503, "", dict()), (200, DNA_PAGE, dict())])
+    request_sequence_from_ucsc(server.url, "hg19", retry_policy=FAST_RETRY_POLICY)
+    mocked_sleep.assert_called_once_with(SECONDS_BETWEEN_UCSC_REQUESTS)
+
+
+def test_GenomicSequence_from_coordinates__retries_wait_for_the_same_rate_limiter(
+    mocker,
+):
+    mocker.patch.object(retries, "ucsc_request_statistics", RequestStatistics())
+    mocker.patch.object(retries, "ucsc_retry_policy", FAST_RETRY_POLICY)
+    mocker.patch.object(
+        genomic_sequence,
+        "_request_ucsc_dna_page",
+        autospec=True,
+        side_effect=[UcscTemporarilyUnavailableError(503), (DNA_PAGE_HEADER, "ACGT")],
+    )
+    limiter = _create_fast_rate_limiter()
+    spied_acquire = mocker.spy(limiter, "acquire")
+    GenomicSequence.from_coordinates(
+        "hg19", "chrX", 2000000, 2000003, True, rate_limiter=limiter
+    )
+    assert spied_acquire.call_count == 2
+
+
+def test_GenomicSequence_from_coordinates__counts_time_waited_for_rate_limiter(
+    mocker,
+):
+    mocker.patch.object(retries, "ucsc_request_statistics", RequestStatistics())
+    mocker.patch.object(time, "sleep", autospec=True)
+    mocker.patch.object(
+        TokenBucketRateLimiter, "reserve", autospec=True, return_value=1.25
+    )
+    mocker.patch(
+        "nuclease_off_target.genomic_sequence.request_sequence_from_ucsc",
+        autospec=True,
+        return_value="ACGT",
+    )
+    GenomicSequence.from_coordinates(
+        "hg19",
+        "chrX",
+        2000000,
+        2000003,
+        True,
+        rate_limiter=TokenBucketRateLimiter(1),
+    )
+    assert get_ucsc_request_statistics().seconds_waited == 1.25
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import random
+
+from nuclease_off_target import ALIGNMENT_ENGINES
+from nuclease_off_target import AlignmentEngineNotImplementedError
+from nuclease_off_target import CrisprTarget
+from nuclease_off_target import iter_sequence_chunks
+from nuclease_off_target import scan_chromosome_for_alignments
+from nuclease_off_target import scan_strand_windows
+from nuclease_off_target import SequenceSource
+from nuclease_off_target import SequenceView
+import pytest
+
+GUIDE = "GATTCCGTAGACAGACTAGG"
+PAM = "NGG"
+ON_TARGET = GUIDE + "AGG"
+# a random background with the target planted on the positive strand at 51, the negative strand at 201, and with a mismatch close to the end of the chromosome
+_background = "".join(random.Random(42).choice("ACGT") for _ in range(320))
+CHR1_SEQUENCE = (
+    _background[:50]
+    + ON_TARGET
+    + _background[73:200]
+    + str(SequenceView.from_str(ON_TARGET).reverse_complement())
+    + _background[223:290]
+    + "GATTCCGTAGACAGACTAGC"
+    + "TGGcgt"
+).lower()
+
+
+@pytest.fixture(scope="function", name="fasta_sequences")
+def fixture_fasta_sequences():
+    return {"chr1": CHR1_SEQUENCE}
+
+
+def test_SequenceSource__get_chromosome_size_must_be_implemented_by_subclasses():
+    with pytest.raises(NotImplementedError):
+        SequenceSource().get_chromosome_size("chr1")
+
+
+@pytest.mark.parametrize(
+    "chunk_size,overlap,test_description",
+    [(100, 0, "no overlap"), (100, 22, "overlap"), (1000, 22, "single chunk")],
+)
+def test_iter_sequence_chunks__covers_chromosome_with_overlap(
+    chunk_size, overlap, test_description, fasta_source
+):
+    chunks = list(iter_sequence_chunks(fasta_source, "chr1", chunk_size, overlap))
+    assert [start_coord for start_coord, _ in chunks] == list(
+        range(1, len(CHR1_SEQUENCE) + 1, chunk_size)
+    )
+    for start_coord, chunk_seq in chunks:
+        assert (
+            chunk_seq
+            == CHR1_SEQUENCE[
+                start_coord - 1 : start_coord - 1 + chunk_size + overlap
+            ].upper()
+        )
+
+
+def test_iter_sequence_chunks__raises_error_for_invalid_chunk_size(fasta_source):
+    with pytest.raises(ValueError, match="at least 1"):
+        list(iter_sequence_chunks(fasta_source, "chr1", 0, 10))
+
+
+def test_scan_chromosome_for_alignments__finds_target_on_both_strands(fasta_source):
+    hits = [
+        hit
+        for hit in scan_chromosome_for_alignments(
+            CrisprTarget(GUIDE, PAM, -3), fasta_source, "chr1", 1, 0, 0, 0
+        )
+        if hit.genome_alignment == ON_TARGET
+    ]
+    assert [
+        (hit.chromosome, hit.start_coord, hit.end_coord, hit.is_positive_strand)
+        for hit in hits
+    ] == [("chr1", 51, 73, True), ("chr1", 201, 223, False)]
+    assert hits[0].formatted_alignment == (
+        GUIDE + PAM,
+        " " * 23,
+        ON_TARGET,
+    )
+
+
+@pytest.mark.parametrize(
+    "engine,allowed_mismatches,allowed_bulges,max_pam_misalignments,test_description",
+    [
+        ("recursive", 2, 0, None, "mismatches"),
+        ("iterative", 3, 1, None, "bulges"),
+        ("recursive", 3, 1, 0, "PAM anchored"),
+    ],
+)
+def test_scan_chromosome_for_alignments__same_hits_for_any_chunk_size(
+    engine,
+    allowed_mismatches,
+    allowed_bulges,
+    max_pam_misalignments,
+    test_description,
+    fasta_source,
+):
+    ct = CrisprTarget(GUIDE, PAM, -3)
+    all_hits = [
+        sorted(
+            scan_chromosome_for_alignments(
+                ct,
+                fasta_source,
+                "chr1",
+                allowed_mismatches,
+                allowed_bulges,
+                allowed_bulges,
+                allowed_bulges,
+                engine=engine,
+                max_pam_misalignments=max_pam_misalignments,
+                chunk_size=chunk_size,
+            ),
+            key=repr,
+        )
+        for chunk_size in (1, 13, 100, 1000)
+    ]
+    assert len(all_hits[0]) > 0
+    for hits in all_hits[1:]:
+        assert hits == all_hits[0]
+    for hit in all_hits[0]:
+        genome_bases = hit.genome_alignment.replace("-", "")
+        expected_bases = CHR1_SEQUENCE[hit.start_coord - 1 : hit.end_coord].upper()
+        if not hit.is_positive_strand:
+            expected_bases = str(
+                SequenceView.from_str(expected_bases).reverse_complement()
+            )
+        assert genome_bases == expected_bases
+
+
+def test_scan_chromosome_for_alignments__finds_mismatch_in_last_window(
+    fasta_source,
+):
+    hits = list(
+        scan_chromosome_for_alignments(
+            CrisprTarget(GUIDE, PAM, -3),
+            fasta_source,
+            "chr1",
+            1,
+            0,
+            0,
+            0,
+            max_pam_misalignments=0,
+            chunk_size=7,
+        )
+    )
+    assert (hits[-1].start_coord, hits[-1].end_coord) == (291, 313)
+    assert hits[-1].genome_alignment == "GATTCCGTAGACAGACTAGCTGG"
+
+
+@pytest.mark.parametrize(
+    "window_starts,expected,test_description",
+    [
+        ([10], [(51, 73)], "window of the target"),
+        ([9, 11], [], "windows next to the target"),
+    ],
+)
+def test_scan_strand_windows__only_scans_the_given_windows(
+    window_starts, expected, test_description
+):
+    hits = scan_strand_windows(
+        CrisprTarget(GUIDE, PAM, -3),
+        ALIGNMENT_ENGINES["recursive"],
+        "chr1",
+        41,
+        True,
+        CHR1_SEQUENCE[40:100].upper(),
+        window_starts,
+        0,
+        (0, 0, 0),
+        None,
+    )
+    assert [(hit.start_coord, hit.end_coord) for hit in hits] == expected
+
+
+def test_scan_chromosome_for_alignments__raises_error_for_unknown_engine(
+    fasta_source,
+):
+    with pytest.raises(AlignmentEngineNotImplementedError):
+        list(
+            scan_chromosome_for_alignments(
+                CrisprTarget(GUIDE, PAM, -3),
+                fasta_source,
+                "chr1",
+                1,
+                0,
+                0,
+                0,
+                engine="fake",
+            )
+        )
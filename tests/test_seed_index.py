@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import os
+
+from nuclease_off_target import InvalidSeedIndexFileError
+from nuclease_off_target import MAX_SEED_LENGTH
+from nuclease_off_target import seed_index
+from nuclease_off_target import SeedIndex
+from nuclease_off_target import SequenceSource
+import numpy as np
+import pytest
+
+CHR_A_SEQUENCE = "ACGTTGCAacgtNNNNNGGATCCATTAGCATCGANNA"
+CHR_B_SEQUENCE = "NNNNGATTACAGATTACA"
+
+
+@pytest.fixture(scope="function", name="fasta_sequences")
+def fixture_fasta_sequences():
+    return {"chrA": CHR_A_SEQUENCE, "chrB": CHR_B_SEQUENCE}
+
+
+def _encode_seed(seed: str) -> int:
+    return int(seed_index._encode_seeds(seed, len(seed))[0][0])
+
+
+def test_SequenceSource__chromosomes_must_be_implemented_by_subclasses():
+    with pytest.raises(NotImplementedError):
+        _ = SequenceSource().chromosomes
+
+
+@pytest.mark.parametrize(
+    "seed_length,chunk_size,test_description",
+    [
+        (4, 1000, "single chunk"),
+        (4, 3, "chunks shorter than a seed"),
+        (1, 10, "single base seeds"),
+    ],
+)
+def test_SeedIndex_build__finds_every_occurrence_of_every_seed(
+    seed_length, chunk_size, test_description, fasta_source, tmp_path
+):
+    filepath = os.path.join(tmp_path, "genome.seeds")
+    SeedIndex.build(
+        fasta_source, filepath, seed_length=seed_length, chunk_size=chunk_size
+    )
+    index = SeedIndex(filepath)
+    assert index.seed_length == seed_length
+    assert index.chromosomes == ["chrA", "chrB"]
+    assert index.chromosome_sizes == [len(CHR_A_SEQUENCE), len(CHR_B_SEQUENCE)]
+
+    genome = (CHR_A_SEQUENCE + CHR_B_SEQUENCE).upper()
+    expected_positions = dict()
+    for position in range(len(genome) - seed_length + 1):
+        seed = genome[position : position + seed_length]
+        in_one_chromosome = position + seed_length <= len(
+            CHR_A_SEQUENCE
+        ) or position >= len(CHR_A_SEQUENCE)
+        if "N" not in seed and in_one_chromosome:
+            expected_positions.setdefault(seed, list()).append(position)
+    assert index.num_positions == sum(map(len, expected_positions.values()))
+    for seed, positions in expected_positions.items():
+        assert (
+            index.find_seed_positions(np.array([_encode_seed(seed)])).tolist()
+            == positions
+        )
+
+
+def test_SeedIndex_build__indexes_only_requested_chromosomes(fasta_source, tmp_path):
+    index = SeedIndex.build(
+        fasta_source,
+        os.path.join(tmp_path, "genome.seeds"),
+        seed_length=3,
+        chromosomes=["chrB"],
+    )
+    assert index.chromosomes == ["chrB"]
+    assert index.find_seed_positions(
+        np.array([_encode_seed("GAT"), _encode_seed("TAC")])
+    ).tolist() == [4, 11, 7, 14]
+
+
+def test_SeedIndex__opens_index_without_any_seeds(fasta_source, tmp_path):
+    filepath = os.path.join(tmp_path, "genome.seeds")
+    SeedIndex.build(fasta_source, filepath, seed_length=5, chromosomes=list())
+    index = SeedIndex(filepath)
+    assert index.num_positions == 0
+    assert index.find_seed_positions(np.arange(4)).tolist() == list()
+
+
+def test_SeedIndex_locate__converts_to_chromosome_positions(fasta_source, tmp_path):
+    index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), seed_length=2
+    )
+    chromosome_idxs, positions = index.locate(
+        np.array([0, len(CHR_A_SEQUENCE) - 1, len(CHR_A_SEQUENCE), 40])
+    )
+    assert chromosome_idxs.tolist() == [0, 0, 1, 1]
+    assert positions.tolist() == [0, len(CHR_A_SEQUENCE) - 1, 0, 3]
+
+
+@pytest.mark.parametrize("seed_length", [0, MAX_SEED_LENGTH + 1])
+def test_SeedIndex_build__raises_error_for_invalid_seed_length(
+    seed_length, fasta_source, tmp_path
+):
+    with pytest.raises(ValueError, match="seed_length must be between"):
+        SeedIndex.build(
+            fasta_source, os.path.join(tmp_path, "genome.seeds"), seed_length
+        )
+
+
+def test_SeedIndex__raises_error_for_invalid_file(tmp_path):
+    filepath = os.path.join(tmp_path, "genome.seeds")
+    with open(filepath, "wb") as out_file:
+        out_file.write(b"not a seed index")
+    with pytest.raises(InvalidSeedIndexFileError, match="signature"):
+        SeedIndex(filepath)
+
+
+def test_reverse_complement_seed_codes__matches_reverse_complement_of_bases():
+    seeds = ["AAAC", "GATT", "CGCG", "TTTT"]
+    assert seed_index.reverse_complement_seed_codes(
+        np.array([_encode_seed(seed) for seed in seeds]), 4
+    ).tolist() == [_encode_seed(seed) for seed in ["GTTT", "AATC", "CGCG", "AAAA"]]
+
+
+def test_SeedIndex_find_seed_positions__finds_shorter_seeds_at_start_of_indexed_ones(
+    fasta_source, tmp_path
+):
+    index = SeedIndex.build(
+        fasta_source, os.path.join(tmp_path, "genome.seeds"), seed_length=4
+    )
+    seed_codes = np.array([_encode_seed("GAT")])
+    assert index.find_seed_positions(seed_codes, 3).tolist() == [
+        18,
+        len(CHR_A_SEQUENCE) + 4,
+        len(CHR_A_SEQUENCE) + 11,
+    ]
+    assert index.count_seed_positions(seed_codes, 3) == 3
+    with pytest.raises(ValueError, match="indexed seeds"):
+        index.find_seed_positions(seed_codes, 5)
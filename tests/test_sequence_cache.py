@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+from nuclease_off_target import genomic_sequence
+from nuclease_off_target import GenomicSequence
+from nuclease_off_target import get_default_sequence_cache
+from nuclease_off_target import sequence_cache
+from nuclease_off_target import SequenceCache
+from nuclease_off_target import set_default_sequence_cache
+from nuclease_off_target import TokenBucketRateLimiter
+import pytest
+
+# positive strand of hg19 chr1:101-130 (made up)
+CACHED_SEQUENCE = "ACGTTGCAACGTAAGGCCTTGATCCATTAG"
+
+
+@pytest.fixture(scope="function", name="cache")
+def fixture_cache(tmp_path):
+    yield SequenceCache(os.path.join(tmp_path, "sequences.sqlite"))
+
+
+@pytest.fixture(scope="function", name="mocked_request_ucsc")
+def fixture_mocked_request_ucsc(mocker):
+    mocker.patch.object(time, "sleep", autospec=True)
+    mocker.patch.object(
+        genomic_sequence, "set_time_of_last_request_to_ucsc_browser", autospec=True
+    )
+    yield mocker.patch.object(
+        genomic_sequence,
+        "request_sequence_from_ucsc",
+        autospec=True,
+        return_value=CACHED_SEQUENCE,
+    )
+
+
+def _store_range_in_cache(filepath, start_coord):
+    cache = SequenceCache(filepath)
+    cache.store_sequence("hg19", "chr1", start_coord, start_coord + 9, "A" * 10)
+
+
+def test_SequenceCache__returns_none_if_range_not_cached(cache):
+    assert cache.fetch_sequence("hg19", "chr1", 1, 10) is None
+
+
+@pytest.mark.parametrize(
+    "start_coord,end_coord,expected,test_description",
+    [
+        (101, 130, CACHED_SEQUENCE, "exact range"),
+        (101, 105, "ACGTT", "start of range"),
+        (126, 130, "ATTAG", "end of range"),
+        (111, 111, "G", "single base"),
+    ],
+)
+def test_SequenceCache__slices_any_range_inside_a_cached_range(
+    start_coord, end_coord, expected, test_description, cache
+):
+    cache.store_sequence("hg19", "chr1", 101, 130, CACHED_SEQUENCE)
+    assert cache.fetch_sequence("hg19", "chr1", start_coord, end_coord) == expected
+
+
+@pytest.mark.parametrize(
+    "genome,chromosome,start_coord,end_coord,test_description",
+    [
+        ("hg19", "chr1", 100, 110, "starts before cached range"),
+        ("hg19", "chr1", 120, 131, "ends after cached range"),
+        ("hg38", "chr1", 101, 130, "different genome"),
+        ("hg19", "chr2", 101, 130, "different chromosome"),
+    ],
+)
+def test_SequenceCache__does_not_serve_ranges_outside_of_cached_ranges(
+    genome, chromosome, start_coord, end_coord, test_description, cache
+):
+    cache.store_sequence("hg19", "chr1", 101, 130, CACHED_SEQUENCE)
+    assert cache.fetch_sequence(genome, chromosome, start_coord, end_coord) is None
+
+
+def test_SequenceCache__persists_between_instances(cache):
+    cache.store_sequence("hg19", "chr1", 101, 130, CACHED_SEQUENCE)
+    new_cache = SequenceCache(cache.filepath)
+    assert new_cache.fetch_sequence("hg19", "chr1", 101, 105) == "ACGTT"
+
+
+def test_SequenceCache__replaces_cached_ranges_inside_a_new_range(cache):
+    cache.store_sequence("hg19", "chr1", 105, 110, CACHED_SEQUENCE[4:10])
+    cache.store_sequence("hg19", "chr1", 121, 130, CACHED_SEQUENCE[20:])
+    assert cache.total_bases == 16
+    cache.store_sequence("hg19", "chr1", 101, 130, CACHED_SEQUENCE)
+    assert cache.total_bases == 30
+
+
+def test_SequenceCache__evicts_least_recently_used_ranges_above_max_bases(tmp_path):
+    cache = SequenceCache(os.path.join(tmp_path, "sequences.sqlite"), max_bases=30)
+    cache.store_sequence("hg19", "chr1", 1, 10, "A" * 10)
+    cache.store_sequence("hg19", "chr1", 101, 110, "C" * 10)
+    cache.store_sequence("hg19", "chr1", 201, 210, "G" * 10)
+    assert cache.fetch_sequence("hg19", "chr1", 1, 5) == "AAAAA"
+
+    cache.store_sequence("hg19", "chr1", 301, 310, "T" * 10)
+
+    assert cache.total_bases == 30
+    assert cache.fetch_sequence("hg19", "chr1", 101, 110) is None
+    assert cache.fetch_sequence("hg19", "chr1", 1, 10) == "A" * 10
+    assert cache.fetch_sequence("hg19", "chr1", 201, 210) == "G" * 10
+    assert cache.fetch_sequence("hg19", "chr1", 301, 310) == "T" * 10
+
+
+def test_SequenceCache__does_not_store_a_range_larger_than_max_bases(tmp_path):
+    cache = SequenceCache(os.path.join(tmp_path, "sequences.sqlite"), max_bases=10)
+    cache.store_sequence("hg19", "chr1", 1, 10, "A" * 10)
+    cache.store_sequence("hg19", "chr1", 101, 130, CACHED_SEQUENCE)
+    assert cache.fetch_sequence("hg19", "chr1", 101, 130) is None
+    assert cache.fetch_sequence("hg19", "chr1", 1, 10) == "A" * 10
+
+
+def test_SequenceCache__rolls_back_a_store_that_fails(cache, mocker):
+    cache.store_sequence("hg19", "chr1", 105, 110, CACHED_SEQUENCE[4:10])
+    mocker.patch.object(
+        SequenceCache,
+        "_evict_least_recently_used",
+        autospec=True,
+        side_effect=RuntimeError("disk full"),
+    )
+    with pytest.raises(RuntimeError, match="disk full"):
+        cache.store_sequence("hg19", "chr1", 101, 130, CACHED_SEQUENCE)
+    assert cache.fetch_sequence("hg19", "chr1", 101, 130) is None
+    assert cache.fetch_sequence("hg19", "chr1", 105, 110) == "TGCAAC"
+
+
+def test_SequenceCache__clear_removes_all_ranges(cache):
+    cache.store_sequence("hg19", "chr1", 101, 130, CACHED_SEQUENCE)
+    cache.clear()
+    assert cache.total_bases == 0
+
+
+def test_SequenceCache__can_be_written_by_many_processes_at_once(cache):
+    start_coords = range(1, 2001, 10)
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(
+            executor.map(
+                _store_range_in_cache,
+                [cache.filepath] * len(start_coords),
+                start_coords,
+            )
+        )
+    assert cache.total_bases == 2000
+
+
+def test_GenomicSequence_from_coordinates__only_requests_ucsc_on_cache_miss(
+    cache, mocked_request_ucsc
+):
+    gs = GenomicSequence.from_coordinates(
+        "hg19", "chr1", 101, 130, True, sequence_cache=cache
+    )
+    assert str(gs.sequence) == CACHED_SEQUENCE
+    assert mocked_request_ucsc.call_count == 1
+
+    gs = GenomicSequence.from_coordinates(
+        "hg19", "chr1", 103, 106, True, sequence_cache=cache
+    )
+    assert str(gs.sequence) == "GTTG"
+    assert gs.start_coord == 103
+    assert gs.end_coord == 106
+    assert mocked_request_ucsc.call_count == 1
+
+
+def test_GenomicSequence_from_coordinates__reverse_complements_cached_positive_strand(
+    cache, mocked_request_ucsc
+):
+    gs = GenomicSequence.from_coordinates(
+        "hg19", "chr1", 101, 130, False, sequence_cache=cache
+    )
+    assert str(gs.sequence) == "CTAATGGATCAAGGCCTTACGTTGCAACGT"
+    assert gs.is_positive_strand is False
+    # the positive strand is requested so that it can be cached for both strands
+    assert "revComp=on" not in mocked_request_ucsc.call_args[0][0]
+
+    gs = GenomicSequence.from_coordinates(
+        "hg19", "chr1", 103, 106, False, sequence_cache=cache
+    )
+    assert str(gs.sequence) == "CAAC"
+    assert mocked_request_ucsc.call_count == 1
+
+
+def test_GenomicSequence_from_coordinates_async__only_requests_ucsc_on_cache_miss(
+    cache, mocked_request_ucsc
+):
+    limiter = TokenBucketRateLimiter(1000, burst=2)
+
+    async def fetch_both_strands():
+        positive_gs = await GenomicSequence.from_coordinates_async(
+            "hg19", "chr1", 101, 130, True, sequence_cache=cache, rate_limiter=limiter
+        )
+        negative_gs = await GenomicSequence.from_coordinates_async(
+            "hg19", "chr1", 103, 106, False, sequence_cache=cache, rate_limiter=limiter
+        )
+        return positive_gs, negative_gs
+
+    positive_gs, negative_gs = asyncio.run(fetch_both_strands())
+
+    assert str(positive_gs.sequence) == CACHED_SEQUENCE
+    assert str(negative_gs.sequence) == "CAAC"
+    assert negative_gs.is_positive_strand is False
+    assert mocked_request_ucsc.call_count == 1
+
+
+def test_GenomicSequence_from_coordinates__uses_default_cache(
+    cache, mocked_request_ucsc, mocker
+):
+    mocker.patch.object(sequence_cache, "default_sequence_cache", None)
+    set_default_sequence_cache(cache)
+    assert get_default_sequence_cache() is cache
+    cache.store_sequence("hg19", "chr1", 101, 130, CACHED_SEQUENCE)
+
+    gs = GenomicSequence.from_coordinates("hg19", "chr1", 103, 106, True)
+
+    assert str(gs.sequence) == "GTTG"
+    assert mocked_request_ucsc.call_count == 0
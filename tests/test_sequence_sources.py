@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import struct
+import time
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from nuclease_off_target import ChromosomeNotInSequenceSourceError
+from nuclease_off_target import CoordinatesOutsideOfChromosomeError
+from nuclease_off_target import FastaSequenceSource
+from nuclease_off_target import genomic_sequence
+from nuclease_off_target import GenomicSequence
+from nuclease_off_target import InvalidFastaFileError
+from nuclease_off_target import InvalidTwoBitFileError
+from nuclease_off_target import register_sequence_source
+from nuclease_off_target import SEQUENCE_SOURCES
+from nuclease_off_target import sequence_sources
+from nuclease_off_target import SequenceSource
+from nuclease_off_target import SequenceSourceAlreadyRegisteredError
+from nuclease_off_target import TwoBitSequenceSource
+from nuclease_off_target import unregister_sequence_source
+from nuclease_off_target import UrlNotImplementedForGenomeError
+from nuclease_off_target import write_fasta_index
+import pytest
+
+# 37 bases, so the packed DNA ends partway through a byte. Contains an N block and some soft-masked (lowercase) bases
+CHR_A_SEQUENCE = "ACGTTGCAacgtNNNNNGGATCCATTAGCATCGANNA"
+CHR_B_SEQUENCE = "NNNNGATTACAGATTACA"
+
+
+def write_fasta_file(
+    filepath: str, sequences: Dict[str, str], line_bases: int, newline: str = "\n"
+) -> None:
+    with open(filepath, "w", newline="") as out_file:
+        for name, sequence in sequences.items():
+            out_file.write(f">{name} some description{newline}")
+            for idx in range(0, len(sequence), line_bases):
+                out_file.write(sequence[idx : idx + line_bases] + newline)
+
+
+def _find_blocks(sequence: str, pattern: str) -> List[Tuple[int, int]]:
+    return [
+        (match.start(), match.end() - match.start())
+        for match in re.finditer(pattern, sequence)
+    ]
+
+
+def write_two_bit_file(
+    filepath: str,
+    sequences: Dict[str, str],
+    byte_order: str = "<",
+    version: int = 0,
+) -> None:
+    offset_format = "Q" if version == 1 else "I"
+    index_size = sum(
+        1 + len(name) + struct.calcsize(offset_format) for name in sequences
+    )
+    records = list()
+    for sequence in sequences.values():
+        n_blocks = _find_blocks(sequence, "[Nn]+")
+        mask_blocks = _find_blocks(sequence, "[a-z]+")
+        record = struct.pack(f"{byte_order}I", len(sequence))
+        for blocks in (n_blocks, mask_blocks):
+            record += struct.pack(f"{byte_order}I", len(blocks))
+            record += struct.pack(
+                f"{byte_order}{len(blocks)}I", *[b[0] for b in blocks]
+            )
+            record += struct.pack(
+                f"{byte_order}{len(blocks)}I", *[b[1] for b in blocks]
+            )
+        record += struct.pack(f"{byte_order}I", 0)  # reserved
+        padded_sequence = sequence.upper().replace("N", "T")
+        padded_sequence += "T" * (-len(padded_sequence) % 4)
+        for idx in range(0, len(padded_sequence), 4):
+            packed_byte = 0
+            for base in padded_sequence[idx : idx + 4]:
+                packed_byte = (packed_byte << 2) | "TCAG".index(base)
+            record += bytes([packed_byte])
+        records.append(record)
+
+    contents = struct.pack(f"{byte_order}IIII", 0x1A412743, version, len(sequences), 0)
+    record_offset = 16 + index_size
+    for name, record in zip(sequences, records):
+        contents += bytes([len(name)]) + name.encode("ascii")
+        contents += struct.pack(f"{byte_order}{offset_format}", record_offset)
+        record_offset += len(record)
+    contents += b"".join(records)
+    with open(filepath, "wb") as out_file:
+        out_file.write(contents)
+
+
+@pytest.fixture(scope="function", name="two_bit_filepath")
+def fixture_two_bit_filepath(tmp_path):
+    filepath = os.path.join(tmp_path, "genome.2bit")
+    write_two_bit_file(filepath, {"chrA": CHR_A_SEQUENCE, "chrB": CHR_B_SEQUENCE})
+    yield filepath
+
+
+def test_SequenceSource__fetch_sequence_must_be_implemented_by_subclasses():
+    with pytest.raises(NotImplementedError):
+        SequenceSource().fetch_sequence("chr1", 1, 10)
+
+
+@pytest.mark.parametrize(
+    "byte_order,version,test_description",
+    [
+        ("<", 0, "little endian"),
+        (">", 0, "big endian"),
+        ("<", 1, "64-bit offsets"),
+    ],
+)
+def test_TwoBitSequenceSource__fetches_every_range_of_every_chromosome(
+    byte_order, version, test_description, tmp_path
+):
+    filepath = os.path.join(tmp_path, "genome.2bit")
+    sequences = {"chrA": CHR_A_SEQUENCE, "chrB": CHR_B_SEQUENCE}
+    write_two_bit_file(filepath, sequences, byte_order=byte_order, version=version)
+    with TwoBitSequenceSource(filepath) as source:
+        assert source.chromosomes == ["chrA", "chrB"]
+        for chromosome, sequence in sequences.items():
+            assert source.get_chromosome_size(chromosome) == len(sequence)
+            for start_coord in range(1, len(sequence) + 1):
+                for end_coord in range(start_coord, len(sequence) + 1):
+                    assert (
+                        source.fetch_sequence(chromosome, start_coord, end_coord)
+                        == sequence[start_coord - 1 : end_coord].upper()
+                    )
+
+
+def test_TwoBitSequenceSource__raises_error_for_unknown_chromosome(two_bit_filepath):
+    with TwoBitSequenceSource(two_bit_filepath) as source:
+        with pytest.raises(ChromosomeNotInSequenceSourceError, match="chrZ"):
+            source.fetch_sequence("chrZ", 1, 2)
+
+
+@pytest.mark.parametrize(
+    "start_coord,end_coord,test_description",
+    [
+        (0, 5, "starts before chromosome"),
+        (30, 38, "ends after chromosome"),
+        (6, 5, "start after end"),
+    ],
+)
+def test_TwoBitSequenceSource__raises_error_for_coordinates_outside_of_chromosome(
+    start_coord, end_coord, test_description, two_bit_filepath
+):
+    with TwoBitSequenceSource(two_bit_filepath) as source:
+        with pytest.raises(CoordinatesOutsideOfChromosomeError, match="37 bases"):
+            source.fetch_sequence("chrA", start_coord, end_coord)
+
+
+@pytest.mark.parametrize(
+    "contents,expected_match,test_description",
+    [
+        (b"\x00" * 8, "too short", "truncated"),
+        (b"\x00" * 16, "signature", "not a .2bit file"),
+        (
+            struct.pack("<IIII", 0x1A412743, 2, 0, 0),
+            "version 2",
+            "unknown version",
+        ),
+    ],
+)
+def test_TwoBitSequenceSource__raises_error_for_invalid_file(
+    contents, expected_match, test_description, tmp_path
+):
+    filepath = os.path.join(tmp_path, "invalid.2bit")
+    with open(filepath, "wb") as out_file:
+        out_file.write(contents)
+    with pytest.raises(InvalidTwoBitFileError, match=expected_match):
+        TwoBitSequenceSource(filepath)
+
+
+def test_GenomicSequence_from_coordinates__reads_positive_strand_from_sequence_source(
+    two_bit_filepath, mocker
+):
+    spied_sleep = mocker.spy(time, "sleep")
+    mocked_request_ucsc = mocker.patch.object(
+        genomic_sequence, "request_sequence_from_ucsc", autospec=True
+    )
+    with TwoBitSequenceSource(two_bit_filepath) as source:
+        gs = GenomicSequence.from_coordinates(
+            "hg19", "chrA", 3, 15, True, sequence_source=source
+        )
+    assert str(gs.sequence) == "GTTGCAACGTNNN"
+    assert gs.start_coord == 3
+    assert gs.end_coord == 15
+    assert gs.is_positive_strand is True
+    assert spied_sleep.call_count == 0
+    assert mocked_request_ucsc.call_count == 0
+
+
+def test_GenomicSequence_from_coordinates__reads_negative_strand_from_sequence_source(
+    two_bit_filepath,
+):
+    with TwoBitSequenceSource(two_bit_filepath) as source:
+        gs = GenomicSequence.from_coordinates(
+            "hg19", "chrA", 3, 15, False, sequence_source=source
+        )
+    assert str(gs.sequence) == "NNNACGTTGCAAC"
+    assert gs.start_coord == 3
+    assert gs.end_coord == 15
+    assert gs.is_positive_strand is False
+
+
+@pytest.fixture(scope="function", name="fasta_filepath")
+def fixture_fasta_filepath(tmp_path):
+    filepath = os.path.join(tmp_path, "genome.fa")
+    write_fasta_file(
+        filepath, {"chrA": CHR_A_SEQUENCE, "chrB": CHR_B_SEQUENCE}, line_bases=10
+    )
+    yield filepath
+
+
+def test_write_fasta_index__matches_samtools_faidx_format(fasta_filepath):
+    index_filepath = write_fasta_index(fasta_filepath)
+    assert index_filepath == f"{fasta_filepath}.fai"
+    with open(index_filepath) as in_file:
+        assert in_file.read() == "chrA\t37\t23\t10\t11\nchrB\t18\t87\t10\t11\n"
+
+
+@pytest.mark.parametrize(
+    "line_bases,newline,test_description",
+    [
+        (10, "\n", "multiple lines per sequence"),
+        (37, "\n", "last line of one sequence is full length"),
+        (100, "\n", "one line per sequence"),
+        (4, "\r\n", "windows line endings"),
+    ],
+)
+def test_FastaSequenceSource__fetches_every_range_of_every_chromosome(
+    line_bases, newline, test_description, tmp_path
+):
+    filepath = os.path.join(tmp_path, "genome.fa")
+    sequences = {"chrA": CHR_A_SEQUENCE, "chrB": CHR_B_SEQUENCE}
+    write_fasta_file(filepath, sequences, line_bases, newline=newline)
+    with FastaSequenceSource(filepath) as source:
+        assert source.chromosomes == ["chrA", "chrB"]
+        for chromosome, sequence in sequences.items():
+            assert source.get_chromosome_size(chromosome) == len(sequence)
+            for start_coord in range(1, len(sequence) + 1):
+                for end_coord in range(start_coord, len(sequence) + 1):
+                    assert (
+                        source.fetch_sequence(chromosome, start_coord, end_coord)
+                        == sequence[start_coord - 1 : end_coord].upper()
+                    )
+
+
+def test_FastaSequenceSource__builds_index_only_if_missing(fasta_filepath, mocker):
+    spied_write_index = mocker.spy(sequence_sources, "write_fasta_index")
+    FastaSequenceSource(fasta_filepath).close()
+    assert os.path.isfile(f"{fasta_filepath}.fai")
+    FastaSequenceSource(fasta_filepath).close()
+    assert spied_write_index.call_count == 1
+
+
+def test_FastaSequenceSource__uses_supplied_index_filepath(fasta_filepath, tmp_path):
+    index_filepath = os.path.join(tmp_path, "elsewhere.fai")
+    with FastaSequenceSource(fasta_filepath, index_filepath=index_filepath) as source:
+        assert source.fetch_sequence("chrB", 3, 8) == "NNGATT"
+    assert os.path.isfile(index_filepath)
+    assert not os.path.isfile(f"{fasta_filepath}.fai")
+
+
+def test_FastaSequenceSource__raises_error_for_unknown_chromosome(fasta_filepath):
+    with FastaSequenceSource(fasta_filepath) as source:
+        with pytest.raises(ChromosomeNotInSequenceSourceError, match="chrZ"):
+            source.fetch_sequence("chrZ", 1, 2)
+
+
+def test_FastaSequenceSource__raises_error_for_coordinates_outside_of_chromosome(
+    fasta_filepath,
+):
+    with FastaSequenceSource(fasta_filepath) as source:
+        with pytest.raises(CoordinatesOutsideOfChromosomeError, match="18 bases"):
+            source.fetch_sequence("chrB", 10, 19)
+
+
+@pytest.mark.parametrize(
+    "contents,expected_match,test_description",
+    [
+        ("ACGT\n>chrA\nACGT\n", "before the first header", "no header"),
+        (">chrA\nACGT\nACGTA\n", "different lengths", "longer line"),
+        (">chrA\nACGT\nAC\nAC\n", "different lengths", "short line in middle"),
+        (">chrA\nACGT\n\nACGT\n", "different lengths", "blank line in middle"),
+    ],
+)
+def test_write_fasta_index__raises_error_for_invalid_file(
+    contents, expected_match, test_description, tmp_path
+):
+    filepath = os.path.join(tmp_path, "invalid.fa")
+    with open(filepath, "w") as out_file:
+        out_file.write(contents)
+    with pytest.raises(InvalidFastaFileError, match=expected_match):
+        write_fasta_index(filepath)
+
+
+def test_write_fasta_index__writes_empty_index_for_empty_file(tmp_path):
+    filepath = os.path.join(tmp_path, "empty.fa")
+    with open(filepath, "w"):
+        pass
+    with open(write_fasta_index(filepath)) as in_file:
+        assert in_file.read() == ""
+
+
+def test_write_fasta_index__allows_blank_lines_at_end_of_sequence(tmp_path):
+    filepath = os.path.join(tmp_path, "genome.fa")
+    with open(filepath, "w") as out_file:
+        out_file.write(">chrA\nACGT\nAC\n\n>chrB\nGGCC\n")
+    with FastaSequenceSource(filepath) as source:
+        assert source.fetch_sequence("chrA", 3, 6) == "GTAC"
+        assert source.fetch_sequence("chrB", 1, 4) == "GGCC"
+
+
+def test_register_sequence_source__is_used_by_GenomicSequence_from_coordinates(
+    fasta_filepath, mocker
+):
+    mocker.patch.dict(SEQUENCE_SOURCES)
+    mocked_request_ucsc = mocker.patch.object(
+        genomic_sequence, "request_sequence_from_ucsc", autospec=True
+    )
+    with FastaSequenceSource(fasta_filepath) as source:
+        register_sequence_source("myAssembly", source)
+        gs = GenomicSequence.from_coordinates("myAssembly", "chrB", 5, 11, False)
+        assert unregister_sequence_source("myAssembly") is source
+    assert str(gs.sequence) == "TGTAATC"
+    assert gs.genome == "myAssembly"
+    assert mocked_request_ucsc.call_count == 0
+    with pytest.raises(UrlNotImplementedForGenomeError, match="myAssembly"):
+        GenomicSequence.from_coordinates("myAssembly", "chrB", 5, 11, False)
+
+
+def test_register_sequence_source__raises_error_if_genome_already_registered(
+    fasta_filepath, two_bit_filepath, mocker
+):
+    mocker.patch.dict(SEQUENCE_SOURCES)
+    with FastaSequenceSource(fasta_filepath) as fasta_source:
+        register_sequence_source("hg38", fasta_source)
+        with TwoBitSequenceSource(two_bit_filepath) as two_bit_source:
+            with pytest.raises(SequenceSourceAlreadyRegisteredError, match="hg38"):
+                register_sequence_source("hg38", two_bit_source)
+        assert SEQUENCE_SOURCES["hg38"] is fasta_source
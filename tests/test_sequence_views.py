@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from nuclease_off_target import GenomicSequence
+from nuclease_off_target import SequenceView
+import pytest
+
+SEQUENCE = "ACGTTGCAnnNNNacgtRYgattaca"
+REVERSE_COMPLEMENT = "tgtaatcRYacgtNNNnnTGCAACGT"
+
+
+@pytest.mark.parametrize(
+    "key,test_description",
+    [
+        (slice(None), "everything"),
+        (slice(3, 17), "middle"),
+        (slice(-8, None), "negative start"),
+        (slice(20, 5), "empty"),
+        (slice(1, 20, 3), "with a step"),
+        (5, "single base"),
+        (-1, "last base"),
+    ],
+)
+def test_SequenceView__copies_out_slices_and_single_bases(key, test_description):
+    view = SequenceView.from_str(SEQUENCE)
+    assert view[key] == SEQUENCE[key]
+    assert view.reverse_complement()[key] == REVERSE_COMPLEMENT[key]
+
+
+def test_SequenceView__does_not_copy_the_whole_unflipped_buffer():
+    view = SequenceView.from_str(SEQUENCE)
+    assert str(view) is SEQUENCE
+    assert len(view) == len(SEQUENCE)
+    assert repr(view.reverse_complement()) == (
+        f"<SequenceView of {len(SEQUENCE)} bases reverse complemented>"
+    )
+
+
+@pytest.mark.parametrize(
+    "start,end,test_description",
+    [(0, 8, "start"), (5, 20, "middle"), (20, 26, "end"), (-6, -2, "negative")],
+)
+def test_SequenceView_subsequence__matches_slicing_on_either_strand(
+    start, end, test_description
+):
+    view = SequenceView.from_str(SEQUENCE)
+    assert str(view.subsequence(start, end)) == SEQUENCE[start:end]
+    assert (
+        str(view.reverse_complement().subsequence(start, end))
+        == REVERSE_COMPLEMENT[start:end]
+    )
+    assert view.reverse_complement().subsequence(start, end).shares_buffer_with(view)
+
+
+def test_GenomicSequence__strand_flips_and_trims_share_the_original_bases():
+    gs = GenomicSequence("hg19", "chr1", 101, True, SEQUENCE)
+    flipped = gs.create_reverse_complement().create_reverse_complement()
+    trimmed = gs.create_reverse_complement().create_five_prime_trim(3)
+    assert flipped.sequence_view.shares_buffer_with(gs.sequence_view)
+    assert trimmed.sequence_view.shares_buffer_with(gs.sequence_view)
+    assert str(flipped.sequence) == SEQUENCE
+    assert str(trimmed.sequence) == REVERSE_COMPLEMENT[3:]
+    assert (trimmed.start_coord, trimmed.end_coord) == (101, 123)
+
+
+def test_GenomicSequence_sequence__is_only_copied_out_once():
+    gs = GenomicSequence(
+        "hg19", "chr1", 101, True, SEQUENCE
+    ).create_reverse_complement()
+    assert gs.sequence is gs.sequence
+    assert str(gs.sequence) == REVERSE_COMPLEMENT